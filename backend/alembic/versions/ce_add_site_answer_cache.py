@@ -0,0 +1,33 @@
+"""add answer_cache_enabled column to sites
+
+# Revision ID: add_site_answer_cache
+# Revises: add_chat_message_feedback
+# Create Date: 2026-10-17
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "add_site_answer_cache"
+down_revision = "add_chat_message_feedback"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sites",
+        sa.Column(
+            "answer_cache_enabled",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+            comment="是否启用语义答案缓存（相似的单轮提问直接复用已生成的答案）",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("sites", "answer_cache_enabled")
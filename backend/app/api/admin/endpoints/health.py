@@ -14,8 +14,10 @@
 
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
+from app.core.web.deps import get_current_platform_admin
+from app.models.user import User
 from app.schemas.response import ApiResponse, HealthResponse
 from app.services.health_service import HealthService, get_health_service
 
@@ -43,3 +45,24 @@ async def health_check(
     """
     health_status = await service.get_health_status()
     return ApiResponse.ok(data=health_status)
+
+
+@router.get(
+    "/checkpoints",
+    response_model=ApiResponse[dict],
+    summary="Checkpoint 存储指标",
+    operation_id="getCheckpointMetrics",
+)
+async def checkpoint_metrics(
+    refresh: bool = Query(False, description="立即执行一次清理并重新统计（全表扫描，较慢）"),
+    current_user: User = Depends(get_current_platform_admin),
+) -> ApiResponse[dict]:
+    """返回工具结果压缩 / checkpoint 清理累计数，以及最近一次统计的每会话 checkpoint 字节数。
+
+    统计与清理覆盖所有租户的会话，仅平台管理员可用。
+    """
+    from app.core.ai.graph.compaction import checkpoint_metrics, sweep_once
+
+    if refresh:
+        await sweep_once()
+    return ApiResponse.ok(data=checkpoint_metrics())
@@ -50,6 +50,20 @@ async def _ping_db(db: AsyncSession) -> bool:
         return False
 
 
+async def _connection_pools(db: AsyncSession) -> dict:
+    """本进程各 Postgres 连接池占用 / 等待统计，及 max_connections 可容纳的 worker 数。"""
+    from app.core.infra.pool_metrics import connection_budget, pool_stats
+
+    data = pool_stats()
+    try:
+        server_max = int((await db.execute(text("SHOW max_connections"))).scalar())
+        reserved = int((await db.execute(text("SHOW superuser_reserved_connections"))).scalar())
+        data["budget"] = connection_budget(server_max, reserved)
+    except Exception as e:
+        logger.warning("system_info: max_connections lookup failed: %s", e)
+    return data
+
+
 async def _ping_cache() -> tuple[str, bool]:
     from app.core.infra.cache import RedisCache, get_cache
 
@@ -90,6 +104,7 @@ async def get_system_info(
     current_user: User = Depends(get_current_user_with_tenant),
 ) -> ApiResponse[dict]:
     """并发探活四大基础引擎，返回当前系统运行时状态。"""
+    from app.core.ai.providers.embedding_cache import get_embedding_cache
     from app.core.infra.config import settings
 
     vector_type = settings.VECTOR_STORE_TYPE
@@ -102,6 +117,8 @@ async def get_system_info(
         _ping_rustfs(),
         return_exceptions=False,
     )
+    # 与 ping 共用同一会话，不能并发执行
+    connection_pools = await _connection_pools(db)
 
     # Vector connection hint
     if vector_type == "elasticsearch":
@@ -146,6 +163,11 @@ async def get_system_info(
                 "bucket": settings.RUSTFS_BUCKET_NAME,
                 "ping": rustfs_ok,
             },
+            "connection_pools": connection_pools,
+            "embedding_cache": {
+                "enabled": settings.AI_EMBEDDING_CACHE_ENABLED,
+                **get_embedding_cache().stats(),
+            },
         },
         msg=_("api.success.get"),
     )
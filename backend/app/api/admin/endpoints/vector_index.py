@@ -0,0 +1,116 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+
+"""向量索引（ANN）管理 API 端点"""
+
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.common.i18n import _
+from app.core.web.deps import get_current_platform_admin, get_current_user_with_tenant
+from app.core.web.exceptions import BadRequestException, ForbiddenException
+from app.crud.task import crud_task
+from app.db.database import get_db
+from app.models.task import TaskStatus, TaskType
+from app.models.user import User, UserRole
+from app.schemas.response import ApiResponse
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "",
+    response_model=ApiResponse[dict],
+    summary="获取向量索引状态",
+    operation_id="getVectorIndexStatus",
+)
+async def get_vector_index_status(
+    recall_sample: int = Query(
+        0, ge=0, le=200, description="抽样查询数；>0 时对比精确扫描估算 recall@10"
+    ),
+    current_user: User = Depends(get_current_user_with_tenant),
+) -> ApiResponse[dict]:
+    """返回 ANN 索引类型、有效性、体积、构建进度，以及可选的 recall 抽样结果。
+
+    recall 抽样对共享表执行精确扫描，仅平台管理员可用。
+    """
+    from app.core.vector import VectorStoreManager
+
+    if recall_sample > 0 and current_user.role != UserRole.ADMIN:
+        raise ForbiddenException(detail=_("auth.platform_admin_required"))
+
+    mgr = await VectorStoreManager.get_instance()
+    status = await mgr.index_status(recall_sample=recall_sample)
+    return ApiResponse.ok(data=status, msg=_("api.success.get"))
+
+
+@router.post(
+    ":rebuild",
+    response_model=ApiResponse[dict],
+    summary="在线重建向量索引",
+    operation_id="rebuildVectorIndex",
+)
+async def rebuild_vector_index(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_platform_admin),
+) -> ApiResponse[dict]:
+    """按当前配置 CONCURRENTLY 重建 ANN 索引（后台执行，读写不中断）；作用于共享表，仅平台管理员。"""
+    from app.core.vector import VectorStoreManager
+
+    mgr = await VectorStoreManager.get_instance()
+    status = await mgr.index_status()
+    if not status.get("managed"):
+        raise BadRequestException(detail=f"{mgr.vector_backend} 的向量索引由引擎自行维护")
+
+    async def _rebuild() -> None:
+        try:
+            await mgr.rebuild_index()
+        except Exception as e:
+            logger.error(f"向量索引重建失败: {e}", exc_info=True)
+
+    background_tasks.add_task(_rebuild)
+    logger.info(f"管理员 {current_user.id} 触发了向量索引重建")
+    return ApiResponse.ok(data={"scheduled": True}, msg=_("api.success.update"))
+
+
+@router.post(
+    ":reindex",
+    response_model=ApiResponse[dict],
+    summary="蓝绿重建向量存储",
+    operation_id="reindexVectorStore",
+)
+async def reindex_vector_store(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_platform_admin),
+) -> ApiResponse[dict]:
+    """按当前 embedding 配置在影子表 / 索引中重建全部向量，完成后原子切换（查询不中断）。
+
+    重建覆盖所有租户的文档并切换共享的在线存储，仅平台管理员可触发。上一次重建失败时，新任务从其断点续跑；进度通过任务列表接口查看。
+    """
+    from app.services.task_service import TaskService
+
+    latest = await crud_task.get_latest_by_type(db, task_type=TaskType.VECTOR_REINDEX.value)
+    if latest and latest.status in (TaskStatus.PENDING.value, TaskStatus.RUNNING.value):
+        raise BadRequestException(detail=f"向量重建任务 {latest.id} 正在进行中")
+
+    payload: dict = {}
+    if latest and latest.status == TaskStatus.FAILED.value:
+        payload["resume_task_id"] = latest.id
+
+    task = await TaskService.enqueue_task(
+        db,
+        task_type=TaskType.VECTOR_REINDEX,
+        tenant_id=current_user.tenant_id,
+        created_by=current_user.name or current_user.email,
+        payload=payload,
+    )
+    logger.info(f"管理员 {current_user.id} 触发了向量蓝绿重建 (task={task.id})")
+    return ApiResponse.ok(
+        data={"task_id": task.id, "resume_task_id": payload.get("resume_task_id")},
+        msg=_("api.success.create"),
+    )
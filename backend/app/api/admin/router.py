@@ -28,6 +28,7 @@ from app.api.admin.endpoints import (
     tasks,
     tenants,
     users,
+    vector_index,
 )
 
 api_router = APIRouter()
@@ -48,3 +49,4 @@ api_router.include_router(health.router, prefix="/health", tags=["admin-health"]
 api_router.include_router(tenants.router, prefix="/tenants", tags=["admin-tenants"])
 api_router.include_router(system_info.router, prefix="/system-info", tags=["admin-system-info"])
 api_router.include_router(data_sources.router, prefix="/data-sources", tags=["admin-data-sources"])
+api_router.include_router(vector_index.router, prefix="/vector-index", tags=["admin-vector-index"])
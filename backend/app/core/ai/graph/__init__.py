@@ -1,3 +1,4 @@
 from .logic import create_agent_graph
+from .registry import get_agent_graph, with_checkpointer
 
-__all__ = ["create_agent_graph"]
+__all__ = ["create_agent_graph", "get_agent_graph", "with_checkpointer"]
@@ -16,22 +16,65 @@
 
 使用 langgraph-checkpoint-postgres 实现聊天状态持久化。
 通过 thread_id 隔离不同会话。
+
+``CHECKPOINTER_BACKEND=tiered`` 时在 Postgres 前加一层 Redis 热层
+（见 ``tiered_checkpointer``）：活跃会话读写 Redis，轮次结束及后台定期回写 Postgres。
 """
 
+import asyncio
 import logging
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Sequence
 from contextlib import asynccontextmanager
+from typing import Any
 
+import redis.asyncio as redis
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg_pool import AsyncConnectionPool
 
 from app.core.infra.config import settings
+from app.core.infra.pool_metrics import (
+    MeteredConnectionPool,
+    register_psycopg_pool,
+    unregister_pool,
+)
+
+from .tiered_checkpointer import TieredCheckpointer
 
 logger = logging.getLogger(__name__)
 
 # 全局连接池（用于 Checkpointer）
 _pool: AsyncConnectionPool | None = None
 
+# 热层 Redis 客户端与后台回写任务（仅 tiered 模式）
+_redis: Any = None
+_writeback: asyncio.Task | None = None
+
+
+def tiered_enabled() -> bool:
+    """是否启用 Redis 热层（需同时配置 REDIS_ENABLED / REDIS_URL）。"""
+    return (
+        settings.CHECKPOINTER_BACKEND == "tiered"
+        and settings.REDIS_ENABLED
+        and bool(settings.REDIS_URL)
+    )
+
+
+def _get_redis() -> Any:
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(settings.REDIS_URL, decode_responses=False)
+    return _redis
+
+
+def _tiered(cold: BaseCheckpointSaver) -> TieredCheckpointer:
+    return TieredCheckpointer(
+        _get_redis(),
+        cold,
+        ttl=settings.CHECKPOINT_REDIS_TTL_SECONDS,
+        prefix=settings.REDIS_PREFIX,
+    )
+
 
 async def init_checkpointer_pool() -> AsyncConnectionPool:
     """初始化 Checkpointer 连接池
@@ -52,13 +95,15 @@ async def init_checkpointer_pool() -> AsyncConnectionPool:
 
     logger.info("🔗 [Checkpointer] Initializing PostgreSQL connection pool...")
 
-    _pool = AsyncConnectionPool(
+    _pool = MeteredConnectionPool(
         conninfo=db_url,
-        min_size=2,
-        max_size=10,
+        min_size=settings.CHECKPOINTER_POOL_MIN_SIZE,
+        max_size=max(settings.CHECKPOINTER_POOL_MAX_SIZE, settings.CHECKPOINTER_POOL_MIN_SIZE),
+        timeout=settings.CHECKPOINTER_POOL_TIMEOUT,
         open=False,  # 延迟打开
     )
     await _pool.open()
+    register_psycopg_pool("checkpointer", _pool)
 
     logger.info("✅ [Checkpointer] Connection pool initialized")
     return _pool
@@ -66,16 +111,20 @@ async def init_checkpointer_pool() -> AsyncConnectionPool:
 
 async def close_checkpointer_pool() -> None:
     """关闭 Checkpointer 连接池"""
-    global _pool
+    global _pool, _redis
 
     if _pool is not None:
         await _pool.close()
+        unregister_pool("checkpointer")
         _pool = None
         logger.info("🔌 [Checkpointer] Connection pool closed")
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
 
 
 @asynccontextmanager
-async def get_checkpointer() -> AsyncGenerator[AsyncPostgresSaver, None]:
+async def get_checkpointer() -> AsyncGenerator[BaseCheckpointSaver, None]:
     """获取 Checkpointer 上下文管理器
 
     [关键] AsyncPostgresSaver 持有 *pool* 而非单根连接，内部每次读写经
@@ -87,15 +136,18 @@ async def get_checkpointer() -> AsyncGenerator[AsyncPostgresSaver, None]:
     复用单例会让跨请求的写入彼此串行化。每请求新建实例代价极低
     （仅几个对象引用 + 一把 Lock），却保留了真正的并发。
 
-    使用方式:
+    使用方式（编译图进程内复用，checkpointer 经 config 按请求注入）:
+        graph = get_agent_graph(config_hash, llm)
         async with get_checkpointer() as checkpointer:
-            graph = create_agent_graph(checkpointer=checkpointer)
-            result = await graph.ainvoke(state, config)
+            result = await graph.ainvoke(state, with_checkpointer(config, checkpointer))
+
+    tiered 模式下返回包着 AsyncPostgresSaver 的 ``TieredCheckpointer``。
     """
     pool = await init_checkpointer_pool()
     # AsyncPostgresSaver 既接受 AsyncConnection 也接受 AsyncConnectionPool；
     # 传 pool 时其内部 get_connection 会按操作借/还连接。
-    yield AsyncPostgresSaver(pool)
+    saver = AsyncPostgresSaver(pool)
+    yield _tiered(saver) if tiered_enabled() else saver
 
 
 async def setup_checkpointer_tables() -> None:
@@ -112,3 +164,77 @@ async def setup_checkpointer_tables() -> None:
         await checkpointer.setup()
 
     logger.info("📦 [Checkpointer] Database tables ready")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# Redis 热层回写
+# ──────────────────────────────────────────────────────────────────────
+
+
+async def write_back_thread(thread_id: str) -> None:
+    """轮次结束后把该 thread 的热层状态合并回写 Postgres（非 tiered 模式为空操作）。"""
+    if not tiered_enabled():
+        return
+    try:
+        async with get_checkpointer() as checkpointer:
+            await checkpointer.flush(thread_id)
+    except Exception as e:
+        # 回写失败不影响本轮响应，thread 仍在脏集合里，由后台任务重试
+        logger.warning(f"⚠️ [Checkpointer] Write-back failed for {thread_id}: {e}")
+
+
+async def delete_hot_threads(thread_ids: Sequence[str]) -> None:
+    """删除会话时一并清掉热层副本，避免之后被回写复活。"""
+    if not tiered_enabled() or not thread_ids:
+        return
+    try:
+        async with get_checkpointer() as checkpointer:
+            await checkpointer.adelete_hot(thread_ids)
+    except Exception as e:
+        logger.warning(f"⚠️ [Checkpointer] Hot tier delete failed: {e}")
+
+
+async def _writeback_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with get_checkpointer() as checkpointer:
+                # 只回写空闲超过一个周期的 thread：进行中的轮次由自身结束时回写
+                flushed = await checkpointer.flush_dirty(min_idle=interval)
+            if flushed:
+                logger.debug(f"💾 [Checkpointer] Wrote back {flushed} idle thread(s)")
+        except Exception as e:
+            logger.warning(f"⚠️ [Checkpointer] Write-back sweep failed: {e}")
+
+
+def start_checkpoint_writeback() -> None:
+    global _writeback
+    interval = settings.CHECKPOINT_WRITEBACK_INTERVAL_SECONDS
+    if not tiered_enabled():
+        if settings.CHECKPOINTER_BACKEND == "tiered":
+            logger.warning(
+                "⚠️ [Checkpointer] CHECKPOINTER_BACKEND=tiered 但未配置 Redis，使用 Postgres"
+            )
+        return
+    if _writeback is not None and not _writeback.done():
+        return
+    _writeback = asyncio.create_task(_writeback_loop(interval), name="checkpoint-writeback")
+    logger.info(f"✅ [Checkpointer] Redis hot tier enabled, write-back every {interval:.0f}s")
+
+
+async def stop_checkpoint_writeback() -> None:
+    """停止后台回写，并在关闭连接池前把所有脏 thread 回写一次。"""
+    global _writeback
+    if _writeback is not None:
+        _writeback.cancel()
+        try:
+            await _writeback
+        except asyncio.CancelledError:
+            pass
+        _writeback = None
+    if tiered_enabled():
+        try:
+            async with get_checkpointer() as checkpointer:
+                await checkpointer.flush_dirty()
+        except Exception as e:
+            logger.warning(f"⚠️ [Checkpointer] Final write-back failed: {e}")
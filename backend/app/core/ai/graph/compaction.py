@@ -0,0 +1,337 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checkpoint 瘦身：工具结果压缩 + 旧 checkpoint 清理 + 存储指标
+
+1. 轮次结束后压缩本 thread 状态里的 ToolMessage：``search_knowledge_base`` 的 JSON
+   结果保留 source_index / title / metadata，正文截断到 CHECKPOINT_TOOL_RESULT_MAX_CHARS。
+   完整工具结果已由 ``persist_chat_turn`` 写入聊天历史表（即"外置存储"），
+   checkpoint 只需要足够后续轮次理解引用的上下文；同时清空本轮的 ``seen_tool_hashes``
+   （下一轮的输入状态会重置它）。
+2. 每个 thread 只保留最新的 CHECKPOINT_KEEP_LAST 个 checkpoint（以及它们引用的
+   blob / writes），由后台任务按批扫描清理；请求路径上不执行 DELETE，避免每轮都占用
+   业务连接池、也不破坏 tiered 模式下"突发期间不读写 Postgres"。
+3. 后台任务每轮统计 checkpoint 三表按 thread 汇总的字节数，供 ``checkpoint_metrics``
+   与管理端健康接口读取。
+"""
+
+import asyncio
+import json
+import logging
+import random
+import statistics
+import time
+from typing import Any
+
+from langchain_core.messages import BaseMessage, ToolMessage
+from sqlalchemy import text
+
+from app.core.infra.config import settings
+
+logger = logging.getLogger(__name__)
+
+_COMPACTED_MARK = "…[已压缩，完整内容见聊天记录]"
+
+# 后台清理任务跨进程互斥（pg_try_advisory_xact_lock 的键）
+_PRUNE_LOCK_KEY = 0x43505255  # "CPRU"
+
+_PRUNE_SQL = text(
+    """
+    WITH ranked AS (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, checkpoint,
+               row_number() OVER (
+                   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+               ) AS rn
+        FROM checkpoints
+        WHERE thread_id = ANY(:threads)
+    ),
+    doomed AS (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, checkpoint FROM ranked WHERE rn > :keep
+    ),
+    doomed_versions AS (
+        SELECT d.thread_id, d.checkpoint_ns, v.key AS channel, v.value AS version
+        FROM doomed d, jsonb_each_text(d.checkpoint -> 'channel_versions') v
+        EXCEPT
+        SELECT r.thread_id, r.checkpoint_ns, v.key, v.value
+        FROM ranked r, jsonb_each_text(r.checkpoint -> 'channel_versions') v
+        WHERE r.rn <= :keep
+    ),
+    del_blobs AS (
+        DELETE FROM checkpoint_blobs b USING doomed_versions dv
+        WHERE b.thread_id = dv.thread_id AND b.checkpoint_ns = dv.checkpoint_ns
+          AND b.channel = dv.channel AND b.version = dv.version
+        RETURNING 1
+    ),
+    del_writes AS (
+        DELETE FROM checkpoint_writes w USING doomed d
+        WHERE w.thread_id = d.thread_id AND w.checkpoint_ns = d.checkpoint_ns
+          AND w.checkpoint_id = d.checkpoint_id
+        RETURNING 1
+    ),
+    del_checkpoints AS (
+        DELETE FROM checkpoints c USING doomed d
+        WHERE c.thread_id = d.thread_id AND c.checkpoint_ns = d.checkpoint_ns
+          AND c.checkpoint_id = d.checkpoint_id
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM del_checkpoints) AS checkpoints,
+           (SELECT count(*) FROM del_blobs) AS blobs,
+           (SELECT count(*) FROM del_writes) AS writes
+    """
+)
+
+_STORAGE_SQL = text(
+    """
+    SELECT thread_id, sum(bytes)::bigint AS bytes FROM (
+        SELECT thread_id, pg_column_size(checkpoint) + pg_column_size(metadata) AS bytes
+        FROM checkpoints
+        UNION ALL
+        SELECT thread_id, coalesce(pg_column_size(blob), 0) FROM checkpoint_blobs
+        UNION ALL
+        SELECT thread_id, coalesce(pg_column_size(blob), 0) FROM checkpoint_writes
+    ) t
+    GROUP BY thread_id
+    """
+)
+
+_metrics: dict[str, Any] = {
+    "compacted_messages_total": 0,
+    "compacted_chars_saved_total": 0,
+    "pruned_checkpoints_total": 0,
+    "pruned_blobs_total": 0,
+    "pruned_writes_total": 0,
+    "last_sweep": None,
+    "storage": None,
+}
+_sweeper: asyncio.Task | None = None
+
+
+# ──────────────────────────────────────────────────────────────────────
+# 工具结果压缩
+# ──────────────────────────────────────────────────────────────────────
+
+
+def _shrink(content: str, max_chars: int) -> str:
+    """JSON 结果列表按条均分正文预算，保留引用元数据；其他内容直接截断。"""
+    try:
+        results = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        results = None
+    if isinstance(results, list) and all(isinstance(r, dict) for r in results):
+        budget = max(max_chars // max(len(results), 1), 1)
+        for result in results:
+            body = result.get("content")
+            if isinstance(body, str) and len(body) > budget:
+                result["content"] = body[:budget] + _COMPACTED_MARK
+        return json.dumps(results, ensure_ascii=False)
+    return content[:max_chars] + _COMPACTED_MARK
+
+
+def compact_tool_messages(messages: list[BaseMessage], max_chars: int) -> list[ToolMessage]:
+    """返回需要替换的 ToolMessage（同 id，``add_messages`` 按 id 覆盖原消息）。
+
+    已压缩过的（``additional_kwargs.compacted``）与不超预算的消息不返回。
+    """
+    replacements: list[ToolMessage] = []
+    for msg in messages:
+        if (
+            not isinstance(msg, ToolMessage)
+            or not msg.id
+            or not isinstance(msg.content, str)
+            or len(msg.content) <= max_chars
+            or msg.additional_kwargs.get("compacted")
+        ):
+            continue
+        replacements.append(
+            msg.model_copy(
+                update={
+                    "content": _shrink(msg.content, max_chars),
+                    "additional_kwargs": {**msg.additional_kwargs, "compacted": True},
+                }
+            )
+        )
+    return replacements
+
+
+async def compact_thread(graph: Any, config: dict) -> None:
+    """轮次结束后压缩 thread 最新状态中的工具结果；失败只记日志。
+
+    ``config`` 需已注入本请求的 checkpointer（``with_checkpointer``）。以
+    ``as_node="summarize_conversation"`` 写入：该节点之后即 END，不会触发新的路由。
+    """
+    max_chars = settings.CHECKPOINT_TOOL_RESULT_MAX_CHARS
+    try:
+        if max_chars > 0:
+            state = await graph.aget_state(config)
+            values = state.values or {}
+            replacements = compact_tool_messages(values.get("messages") or [], max_chars)
+            if replacements or values.get("seen_tool_hashes"):
+                await graph.aupdate_state(
+                    config,
+                    {"messages": replacements, "seen_tool_hashes": []},
+                    as_node="summarize_conversation",
+                )
+                before = {m.id: len(m.content) for m in values["messages"] if m.id}
+                _metrics["compacted_messages_total"] += len(replacements)
+                _metrics["compacted_chars_saved_total"] += sum(
+                    before[r.id] - len(r.content) for r in replacements
+                )
+    except Exception as e:
+        logger.warning(f"⚠️ [Checkpoint] Compaction failed: {e}")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# 旧 checkpoint 清理
+# ──────────────────────────────────────────────────────────────────────
+
+
+async def prune_checkpoints(thread_ids: list[str], keep_last: int | None = None) -> dict:
+    """删除这些 thread 中最新 ``keep_last`` 个之外的 checkpoint 及其 writes / blob。
+
+    blob 只删除"被删除的 checkpoint 引用、且不被保留的 checkpoint 引用"的版本：
+    并发写入中的新 checkpoint 先写 blob 后写 checkpoint 行，其新版本不会被误删。
+    """
+    from app.db.database import AsyncSessionLocal
+
+    keep = max(keep_last if keep_last is not None else settings.CHECKPOINT_KEEP_LAST, 1)
+    if not thread_ids:
+        return {"checkpoints": 0, "blobs": 0, "writes": 0}
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(_PRUNE_SQL, {"threads": thread_ids, "keep": keep})).one()
+        await db.commit()
+    result = {"checkpoints": row.checkpoints, "blobs": row.blobs, "writes": row.writes}
+    _metrics["pruned_checkpoints_total"] += row.checkpoints
+    _metrics["pruned_blobs_total"] += row.blobs
+    _metrics["pruned_writes_total"] += row.writes
+    return result
+
+
+async def sweep_once() -> dict | None:
+    """清理所有超出保留数的 thread 并刷新存储指标；其他进程正在执行时返回 None。"""
+    from app.db.database import AsyncSessionLocal
+
+    start = time.monotonic()
+    keep = max(settings.CHECKPOINT_KEEP_LAST, 1)
+    totals = {"threads": 0, "checkpoints": 0, "blobs": 0, "writes": 0}
+    async with AsyncSessionLocal() as db:
+        locked = (
+            await db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _PRUNE_LOCK_KEY}
+            )
+        ).scalar()
+        if not locked:
+            return None
+        while settings.CHECKPOINT_KEEP_LAST > 0:
+            threads = (
+                (
+                    await db.execute(
+                        text(
+                            "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                            "HAVING count(*) > :keep LIMIT :batch"
+                        ),
+                        {"keep": keep, "batch": settings.CHECKPOINT_PRUNE_BATCH_THREADS},
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not threads:
+                break
+            deleted = await prune_checkpoints(list(threads), keep)
+            totals["threads"] += len(threads)
+            for k, v in deleted.items():
+                totals[k] += v
+            if len(threads) < settings.CHECKPOINT_PRUNE_BATCH_THREADS:
+                break
+        _metrics["storage"] = await _storage_stats(db)
+        await db.commit()  # 释放 advisory lock
+
+    totals["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+    totals["at"] = time.time()
+    _metrics["last_sweep"] = totals
+    logger.info(
+        f"🧹 [Checkpoint] Sweep | threads={totals['threads']} | "
+        f"checkpoints={totals['checkpoints']} | blobs={totals['blobs']} | "
+        f"elapsed={totals['elapsed_ms']}ms"
+    )
+    return totals
+
+
+async def _storage_stats(db: Any) -> dict[str, Any]:
+    rows = (await db.execute(_STORAGE_SQL)).all()
+    sizes = sorted(r.bytes for r in rows)
+    if not sizes:
+        return {"threads": 0, "total_bytes": 0}
+    return {
+        "threads": len(sizes),
+        "total_bytes": sum(sizes),
+        "bytes_per_thread_avg": int(statistics.mean(sizes)),
+        "bytes_per_thread_p50": sizes[len(sizes) // 2],
+        "bytes_per_thread_p95": sizes[min(int(len(sizes) * 0.95), len(sizes) - 1)],
+        "bytes_per_thread_max": sizes[-1],
+        # 只给体积：thread_id 跨租户，不对外暴露
+        "top_thread_bytes": sizes[-5:][::-1],
+    }
+
+
+def checkpoint_metrics() -> dict[str, Any]:
+    return dict(_metrics)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# 后台任务
+# ──────────────────────────────────────────────────────────────────────
+
+
+async def _sweep_loop(interval: float) -> None:
+    # 随机错开首次执行，多 worker 同时启动时不扎堆抢锁
+    await asyncio.sleep(random.uniform(0, min(interval, 60.0)))
+    while True:
+        try:
+            await sweep_once()
+        except Exception as e:
+            logger.warning(f"⚠️ [Checkpoint] Sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_checkpoint_sweeper() -> None:
+    global _sweeper
+    interval = settings.CHECKPOINT_PRUNE_INTERVAL_SECONDS
+    if interval <= 0 or (_sweeper is not None and not _sweeper.done()):
+        return
+    _sweeper = asyncio.create_task(_sweep_loop(interval), name="checkpoint-sweeper")
+    logger.info(f"✅ [Checkpoint] Sweeper started (every {interval:.0f}s)")
+
+
+async def stop_checkpoint_sweeper() -> None:
+    global _sweeper
+    if _sweeper is None:
+        return
+    _sweeper.cancel()
+    try:
+        await _sweeper
+    except asyncio.CancelledError:
+        pass
+    _sweeper = None
+
+
+__all__ = [
+    "checkpoint_metrics",
+    "compact_thread",
+    "compact_tool_messages",
+    "prune_checkpoints",
+    "start_checkpoint_sweeper",
+    "stop_checkpoint_sweeper",
+    "sweep_once",
+]
@@ -19,6 +19,7 @@
 4. 自动对话摘要 (长期记忆)
 """
 
+import asyncio
 import hashlib
 import json
 import logging
@@ -43,6 +44,7 @@ from app.core.ai.prompts import (
     SUMMARIZE_PROMPT,
     SYSTEM_PROMPT,
 )
+from app.core.ai.providers.embedding_cache import normalize_text
 from app.core.common.ai_logging import log_process_step_card
 from app.core.infra.config import settings
 from app.schemas.document import VectorRetrieveFilter
@@ -77,71 +79,85 @@ async def search_knowledge_base(
         JSON 格式的字符串，包含搜索结果列表。
         每个结果包含 'content' (内容摘录) 和 'metadata' (包含 title, document_id 等)。
     """
-    site_id = config.get("configurable", {}).get("site_id")
-    tenant_id = config.get("configurable", {}).get("tenant_id")
-
     # source_offset 由 graph state 维护，避免每次工具调用 O(n) 扫描历史消息
     offset = int(state.get("source_offset", 0) or 0)
 
-    logger.debug(
-        f"🔧 [Tool] search_knowledge_base: query='{query}', site_id={site_id}, offset={offset}"
-    )
+    logger.debug(f"🔧 [Tool] search_knowledge_base: query='{query}', offset={offset}")
 
     try:
-        from app.core.infra.tenant import temporary_tenant_context
+        retrieved_docs = await _retrieve(query, config)
+    except Exception as e:
+        return _retrieval_error_message(e)
+    return _render_results(retrieved_docs, offset)[0]
+
+
+async def _retrieve(
+    query: str, config: RunnableConfig, query_vector: list[float] | None = None
+) -> list:
+    """按 config 中的站点 / 租户执行一次 RAG 检索（召回 + 重排）。"""
+    site_id = config.get("configurable", {}).get("site_id")
+    tenant_id = config.get("configurable", {}).get("tenant_id")
+
+    from app.core.infra.tenant import temporary_tenant_context
+
+    with temporary_tenant_context(tenant_id):
+        return await RAGService.retrieve(
+            query=query,
+            k=settings.RAG_RECALL_K,
+            filter=VectorRetrieveFilter(
+                site_id=int(site_id) if site_id else None,
+                tenant_id=int(tenant_id) if tenant_id else None,
+            ),
+            enable_rerank=settings.RAG_ENABLE_RERANK,
+            rerank_k=settings.RAG_RERANK_TOP_K,
+            query_vector=query_vector,
+        )
 
-        with temporary_tenant_context(tenant_id):
-            retrieved_docs = await RAGService.retrieve(
-                query=query,
-                k=settings.RAG_RECALL_K,
-                filter=VectorRetrieveFilter(
-                    site_id=int(site_id) if site_id else None,
-                    tenant_id=int(tenant_id) if tenant_id else None,
-                ),
-                enable_rerank=settings.RAG_ENABLE_RERANK,
-                rerank_k=settings.RAG_RERANK_TOP_K,
-            )
-
-        if not retrieved_docs:
-            return NO_RESULTS_MESSAGE
-
-        # 将同一文档的多个片段合并，避免 LLM 接收割裂上下文
-        merged_docs_map: dict = {}
-        ordered_ids: list = []
-        for doc in retrieved_docs:
-            doc_id = doc.document_id
-            if doc_id not in merged_docs_map:
-                ordered_ids.append(doc_id)
-                merged_docs_map[doc_id] = {
-                    "title": doc.document_title,
-                    "contents": [doc.content],
-                    "score": doc.score,
-                    "metadata": doc.metadata,
-                }
-            else:
-                merged_docs_map[doc_id]["contents"].append(doc.content)
-
-        results = []
-        for i, doc_id in enumerate(ordered_ids):
-            data = merged_docs_map[doc_id]
-            results.append(
-                {
-                    "source_index": offset + i + 1,
+
+def _render_results(retrieved_docs: list, offset: int) -> tuple[str, int]:
+    """检索结果 → 工具输出 JSON，返回 (内容, 文档数)；source_index 从 offset + 1 起编号。"""
+    if not retrieved_docs:
+        return NO_RESULTS_MESSAGE, 0
+
+    # 将同一文档的多个片段合并，避免 LLM 接收割裂上下文
+    merged_docs_map: dict = {}
+    ordered_ids: list = []
+    for doc in retrieved_docs:
+        doc_id = doc.document_id
+        if doc_id not in merged_docs_map:
+            ordered_ids.append(doc_id)
+            merged_docs_map[doc_id] = {
+                "title": doc.document_title,
+                "contents": [doc.content],
+                "score": doc.score,
+                "metadata": doc.metadata,
+            }
+        else:
+            merged_docs_map[doc_id]["contents"].append(doc.content)
+
+    results = []
+    for i, doc_id in enumerate(ordered_ids):
+        data = merged_docs_map[doc_id]
+        results.append(
+            {
+                "source_index": offset + i + 1,
+                "title": data["title"],
+                "content": "\n\n[...]\n\n".join(data["contents"]),
+                "metadata": {
+                    "document_id": doc_id,
                     "title": data["title"],
-                    "content": "\n\n[...]\n\n".join(data["contents"]),
-                    "metadata": {
-                        "document_id": doc_id,
-                        "title": data["title"],
-                        "score": data["score"],
-                        "site_id": data["metadata"].get("site_id"),
-                        **data["metadata"],
-                    },
-                }
-            )
-
-        return json.dumps(results, ensure_ascii=False)
-
-    except RAGRetrievalError as e:
+                    "score": data["score"],
+                    "site_id": data["metadata"].get("site_id"),
+                    **data["metadata"],
+                },
+            }
+        )
+
+    return json.dumps(results, ensure_ascii=False), len(results)
+
+
+def _retrieval_error_message(e: BaseException) -> str:
+    if isinstance(e, RAGRetrievalError):
         # 系统级失败（向量库/Embedding/Reranker 不可用）——与"召回为空"区分，
         # 返回专用提示语，agent 应停止重试并向用户致歉
         logger.warning(f"⚠️ [Tool] RAG retrieval unavailable: {e}")
@@ -150,14 +166,87 @@ async def search_knowledge_base(
             "请基于已有上下文如实回答用户，并建议稍后重试或联系管理员；"
             "不要换关键词重复尝试本工具。"
         )
-    except Exception as e:
-        logger.error(f"❌ [Tool] Knowledge base search failed: {e}", exc_info=True)
-        return "[系统提示] 检索发生未知异常。请基于已有上下文如实回答用户；不要重复调用本工具。"
+    logger.error(f"❌ [Tool] Knowledge base search failed: {e}", exc_info=e)
+    return "[系统提示] 检索发生未知异常。请基于已有上下文如实回答用户；不要重复调用本工具。"
 
 
 tools = [search_knowledge_base]
 
 
+# =============================================================================
+# 步级工具执行器（同一条 AI 消息里的多路检索）
+# =============================================================================
+
+
+def _normalize_query(query: str) -> str:
+    return normalize_text(query).casefold()
+
+
+async def _execute_search_step(
+    tool_calls: list[dict], state: ChatGraphState, config: RunnableConfig
+) -> list[ToolMessage]:
+    """同一步的多个 search_knowledge_base 调用：归一化后相同的查询只检索一次，
+    不同查询一次批量 embedding 后并发检索（AGENT_TOOL_CONCURRENCY 限流），
+    结果按 tool_call 顺序回填；source_index 按去重后的查询顺序连续编号。
+    """
+    groups: dict[str, str] = {}  # 归一化查询 -> 首次出现的原查询
+    for call in tool_calls:
+        groups.setdefault(_normalize_query(call["args"]["query"]), call["args"]["query"])
+    queries = list(groups.values())
+
+    vectors: list[list[float] | None] = [None] * len(queries)
+    try:
+        from app.core.infra.tenant import temporary_tenant_context
+        from app.core.vector import VectorStoreManager
+
+        with temporary_tenant_context(config.get("configurable", {}).get("tenant_id")):
+            vector_store = await VectorStoreManager.get_instance()
+            vectors = await vector_store.embed_queries(queries, purpose="执行语义检索 (Recall)")
+    except Exception as e:
+        # 批量 embedding 失败时各查询回退为单独 embedding，错误由 retrieve 统一上报
+        logger.warning(f"⚠️ [Tool] Batch query embedding failed, embedding per query: {e}")
+
+    semaphore = asyncio.Semaphore(settings.AGENT_TOOL_CONCURRENCY)
+
+    async def run(query: str, vector: list[float] | None) -> list:
+        async with semaphore:
+            return await _retrieve(query, config, vector)
+
+    outcomes = await asyncio.gather(
+        *(run(q, v) for q, v in zip(queries, vectors, strict=True)), return_exceptions=True
+    )
+
+    offset = int(state.get("source_offset", 0) or 0)
+    contents: dict[str, str] = {}
+    for key, outcome in zip(groups, outcomes, strict=True):
+        if isinstance(outcome, BaseException):
+            contents[key] = _retrieval_error_message(outcome)
+        else:
+            contents[key], count = _render_results(outcome, offset)
+            offset += count
+
+    logger.debug(
+        f"🔧 [Tool] search step: {len(tool_calls)} calls -> {len(queries)} distinct queries"
+    )
+    return [
+        ToolMessage(
+            content=contents[_normalize_query(call["args"]["query"])],
+            name=call["name"],
+            tool_call_id=call["id"],
+        )
+        for call in tool_calls
+    ]
+
+
+def _is_search_step(tool_calls: list[dict]) -> bool:
+    """多路调用且全部是参数合法的 search_knowledge_base（其余情况交给 ToolNode）。"""
+    return len(tool_calls) > 1 and all(
+        call.get("name") == search_knowledge_base.name
+        and isinstance((call.get("args") or {}).get("query"), str)
+        for call in tool_calls
+    )
+
+
 # =============================================================================
 # 节点函数（模块级，显式依赖，可独立单元测试）
 # =============================================================================
@@ -266,35 +355,42 @@ async def _tools_wrapper_node(
             "consecutive_empty_count": consecutive_empty,
         }
 
-    result = await tool_node.ainvoke(state, config)
+    tool_calls = getattr(state["messages"][-1], "tool_calls", None) or []
+    if _is_search_step(tool_calls):
+        result = {"messages": await _execute_search_step(tool_calls, state, config)}
+    else:
+        result = await tool_node.ainvoke(state, config)
     result["iteration_count"] = current_count + 1
 
-    # 解析最后一条 ToolMessage：判定空结果 / 计数新增文档 / 哈希查重
-    is_empty_result = False
-    duplicate_tool_result = False
+    # 解析本步的 ToolMessage（同一查询回填的相同内容只算一次）：
+    # 判定空结果 / 计数新增文档 / 哈希查重
+    contents = list(dict.fromkeys(getattr(m, "content", "") for m in result.get("messages") or []))
+    contents = [c for c in contents if c] or [""]
+    empty_results = 0
+    new_results = 0
     docs_added = 0
 
-    last_tool_msg = (result.get("messages") or [None])[-1]
-    content = getattr(last_tool_msg, "content", "") if last_tool_msg else ""
-
-    if content == NO_RESULTS_MESSAGE:
-        is_empty_result = True
-    elif content:
-        try:
-            parsed = json.loads(content)
-            if isinstance(parsed, list):
-                docs_added = len(parsed)
-                if docs_added == 0:
-                    is_empty_result = True
-        except (json.JSONDecodeError, TypeError):
-            pass
-
-    if content:
-        content_hash = hashlib.md5(content.encode("utf-8")).hexdigest()
-        if content_hash in seen_hashes:
-            duplicate_tool_result = True
-        else:
-            seen_hashes.append(content_hash)
+    for content in contents:
+        if content == NO_RESULTS_MESSAGE:
+            empty_results += 1
+        elif content:
+            try:
+                parsed = json.loads(content)
+                if isinstance(parsed, list):
+                    docs_added += len(parsed)
+                    if not parsed:
+                        empty_results += 1
+            except (json.JSONDecodeError, TypeError):
+                pass
+
+        if content:
+            content_hash = hashlib.md5(content.encode("utf-8")).hexdigest()
+            if content_hash not in seen_hashes:
+                seen_hashes.append(content_hash)
+                new_results += 1
+
+    is_empty_result = empty_results == len(contents)
+    duplicate_tool_result = contents != [""] and new_results == 0
 
     if duplicate_tool_result:
         logger.warning("⚠️ [Graph] Duplicate tool output detected, forcing convergence.")
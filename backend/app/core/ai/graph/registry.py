@@ -0,0 +1,79 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""编译后 Agent 图的进程内注册表
+
+``create_agent_graph`` 每次都要 ``bind_tools``、构造 ``ToolNode`` 并 ``compile()``。
+这里按 (chat 配置指纹, 模型, temperature) —— 与 ``ChatProvider`` 缓存 ChatOpenAI 实例
+的键一致 —— 只编译一次（不带 checkpointer），LRU 淘汰。
+
+每请求的 checkpointer 经 ``configurable`` 注入（LangGraph 对子图借用 checkpointer
+用的同一个键），运行、``aget_state``、``aupdate_state`` 都按它读写；图本身不持有请求级
+对象，可被并发请求共享。
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any
+
+from langchain_openai import ChatOpenAI
+from langgraph.constants import CONFIG_KEY_CHECKPOINTER
+
+from app.core.infra.config import settings
+
+logger = logging.getLogger(__name__)
+
+GraphKey = tuple[str, str, float]
+
+# key -> (构建时的 ChatOpenAI 实例, 编译后的图)
+_graphs: OrderedDict[GraphKey, tuple[ChatOpenAI, Any]] = OrderedDict()
+
+
+def get_agent_graph(config_hash: str, llm: ChatOpenAI) -> Any:
+    """取 (或编译并登记) ``llm`` 对应的图。
+
+    ChatProvider 在 ``force`` 刷新时会为同一个键重建实例，这里同时比对实例身份，
+    实例变了就重新编译，避免继续使用旧凭证的绑定模型。
+    """
+    # 延迟导入：logic → app.services → chat.service 会回头导入本模块
+    from .logic import create_agent_graph
+
+    key: GraphKey = (config_hash, llm.model_name, llm.temperature)
+    entry = _graphs.get(key)
+    if entry is not None and entry[0] is llm:
+        _graphs.move_to_end(key)
+        return entry[1]
+
+    graph = create_agent_graph(model=llm)
+    _graphs[key] = (llm, graph)
+    _graphs.move_to_end(key)
+    while len(_graphs) > settings.AGENT_GRAPH_CACHE_SIZE:
+        _graphs.popitem(last=False)
+    logger.debug(f"🧩 [Graph] Compiled agent graph | model={key[1]} | cached={len(_graphs)}")
+    return graph
+
+
+def with_checkpointer(config: dict, checkpointer: Any) -> dict:
+    """返回注入了本请求 checkpointer 的 config 副本（不修改传入的 config）。"""
+    return {
+        **config,
+        "configurable": {**config.get("configurable", {}), CONFIG_KEY_CHECKPOINTER: checkpointer},
+    }
+
+
+def clear() -> None:
+    _graphs.clear()
+
+
+__all__ = ["clear", "get_agent_graph", "with_checkpointer"]
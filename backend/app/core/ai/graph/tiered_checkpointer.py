@@ -0,0 +1,508 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""分层 Checkpointer：活跃会话在 Redis（热层），异步回写 Postgres（冷层）
+
+- 读：热层有该 thread 时直接返回；否则从冷层加载，并把最新 checkpoint 预热进热层。
+- 写：``aput`` / ``aput_writes`` 只写热层（每个 thread 一个 Redis hash，带 TTL），
+  同时把 thread 记入脏集合（zset，score 为最后写入时间）。
+- 回写：``flush`` 只把每个 namespace 的最新 checkpoint 及其 pending writes 写入冷层，
+  一轮对话中的中间 checkpoint 被合并掉。轮次结束时由 ChatService 触发，后台任务定期
+  回写空闲的脏 thread（含进程崩溃后遗留的）。
+
+崩溃一致性：hash 内 ``rev`` 每次写入自增，回写完成后记录 ``flushed_rev``；只有回写期间
+没有新写入（WATCH 校验 ``rev`` 未变）才移出脏集合，否则留待下次回写。冷层写入是幂等
+upsert，回写中途崩溃后重做即可。脏 hash 不设过期（写入时 PERSIST），回写成功后才恢复
+TTL，冷层长时间不可用也不会因过期丢轮次；只有 Redis 本身丢数据时才会丢失尚未回写的轮次。
+
+值用长度前缀编码保存 serde 的 ``(type, bytes)``，不使用 pickle，Redis 中的数据不会被当作代码执行。
+
+hash 字段布局（``\\x1f`` 分隔）：``latest|ns`` → 最新 checkpoint id；``c|ns|id`` →
+checkpoint + metadata + parent id；``b|ns|channel|version`` → channel 值；
+``w|ns|id|task_id|idx`` → pending write。热层每个 namespace 只保留最近几个 checkpoint。
+"""
+
+import logging
+import time
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+_SEP = "\x1f"
+_EMPTY = ("empty", b"")
+
+
+def _field(*parts: Any) -> str:
+    return _SEP.join(str(p) for p in parts)
+
+
+def _pack(*parts: str | bytes) -> bytes:
+    """每段 4 字节大端长度 + 内容。"""
+    out = bytearray()
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        out += len(data).to_bytes(4, "big") + data
+    return bytes(out)
+
+
+def _unpack(raw: bytes) -> list[bytes]:
+    parts, pos = [], 0
+    while pos < len(raw):
+        size = int.from_bytes(raw[pos : pos + 4], "big")
+        parts.append(raw[pos + 4 : pos + 4 + size])
+        pos += 4 + size
+    return parts
+
+
+def _pack_checkpoint(
+    typed_checkpoint: tuple[str, bytes], typed_metadata: tuple[str, bytes], parent_id: str | None
+) -> bytes:
+    return _pack(*typed_checkpoint, *typed_metadata, parent_id or "")
+
+
+def _unpack_checkpoint(
+    raw: bytes,
+) -> tuple[tuple[str, bytes], tuple[str, bytes], str | None]:
+    c_type, c_data, m_type, m_data, parent = _unpack(raw)
+    return (c_type.decode(), c_data), (m_type.decode(), m_data), parent.decode() or None
+
+
+def _pack_typed(typed: tuple[str, bytes]) -> bytes:
+    return _pack(*typed)
+
+
+def _unpack_typed(raw: bytes) -> tuple[str, bytes]:
+    type_, data = _unpack(raw)
+    return type_.decode(), data
+
+
+class TieredCheckpointer(BaseCheckpointSaver[str]):
+    """Redis 热层 + 任意冷层 saver（生产为 AsyncPostgresSaver）。
+
+    Args:
+        redis:     ``redis.asyncio.Redis``（``decode_responses=False``）。
+        cold:      冷层 saver；序列化器与版本号生成沿用它的，回写时格式一致。
+        ttl:       热层 hash 的过期秒数，每次读写续期。
+        prefix:    Redis 键前缀。
+        hot_keep:  热层每个 namespace 保留的 checkpoint 数。
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        cold: BaseCheckpointSaver,
+        *,
+        ttl: int = 3600,
+        prefix: str = "",
+        hot_keep: int = 3,
+    ) -> None:
+        super().__init__(serde=cold.serde)
+        self._redis = redis
+        self._cold = cold
+        self._ttl = ttl
+        self._prefix = f"{prefix}ckpt:"
+        self._dirty_key = f"{prefix}ckpt-dirty"
+        self._hot_keep = max(hot_keep, 2)
+
+    def _key(self, thread_id: str) -> str:
+        return f"{self._prefix}{thread_id}"
+
+    async def _fields(self, thread_id: str) -> dict[str, bytes]:
+        raw = await self._redis.hgetall(self._key(thread_id))
+        return {k.decode() if isinstance(k, bytes) else k: v for k, v in raw.items()}
+
+    # ──────────────────────────────────────────────────────────────────────
+    # 热层读取
+    # ──────────────────────────────────────────────────────────────────────
+
+    def _ordered_writes(
+        self, fields: dict[str, bytes], ns: str, checkpoint_id: str
+    ) -> list[tuple[str, int, str, tuple[str, bytes], str]]:
+        """(task_id, idx, channel, typed value, task_path)，按执行顺序排序。"""
+        prefix = _field("w", ns, checkpoint_id, "")
+        writes = []
+        for name, raw in fields.items():
+            if name.startswith(prefix):
+                task_id, idx = name[len(prefix) :].rsplit(_SEP, 1)
+                channel, w_type, w_data, task_path = _unpack(raw)
+                writes.append(
+                    (
+                        task_id,
+                        int(idx),
+                        channel.decode(),
+                        (w_type.decode(), w_data),
+                        task_path.decode(),
+                    )
+                )
+        writes.sort(key=lambda w: writes_sort_key(w[4], w[0], w[1]))
+        return writes
+
+    def _hot_tuple(
+        self, fields: dict[str, bytes], thread_id: str, ns: str, checkpoint_id: str | None
+    ) -> CheckpointTuple | None:
+        if checkpoint_id is None:
+            latest = fields.get(_field("latest", ns))
+            if latest is None:
+                return None
+            checkpoint_id = latest.decode()
+        saved = fields.get(_field("c", ns, checkpoint_id))
+        if saved is None:
+            return None
+        typed_checkpoint, typed_metadata, parent_id = _unpack_checkpoint(saved)
+        checkpoint: Checkpoint = self.serde.loads_typed(typed_checkpoint)
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = fields.get(_field("b", ns, channel, version))
+            if blob is None:
+                continue
+            typed = _unpack_typed(blob)
+            if typed[0] != "empty":
+                channel_values[channel] = self.serde.loads_typed(typed)
+        writes = self._ordered_writes(fields, ns, checkpoint_id)
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed(typed_metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[(w[0], w[2], self.serde.loads_typed(w[3])) for w in writes],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        fields = await self._fields(thread_id)
+        if fields:
+            hot = self._hot_tuple(fields, thread_id, ns, checkpoint_id)
+            if hot is not None:
+                if self._is_clean(fields):
+                    await self._redis.expire(self._key(thread_id), self._ttl)
+                return hot
+
+        cold = await self._cold.aget_tuple(config)
+        if cold is not None and checkpoint_id is None and _field("latest", ns) not in fields:
+            await self._warm(thread_id, ns, cold, expire=self._is_clean(fields))
+        return cold
+
+    @staticmethod
+    def _is_clean(fields: dict[str, bytes]) -> bool:
+        """已全部回写（或为空）的 hash 才续期；脏 hash 不设过期。"""
+        return fields.get("rev") == fields.get("flushed_rev")
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """热层的 checkpoint 在前（新到旧），再接冷层中热层没有的。"""
+        seen: set[str] = set()
+        if config is not None:
+            thread_id = config["configurable"]["thread_id"]
+            ns = config["configurable"].get("checkpoint_ns")
+            fields = await self._fields(thread_id)
+            before_id = get_checkpoint_id(before) if before else None
+            hot = []
+            for name in fields:
+                kind, *rest = name.split(_SEP)
+                if kind != "c" or (ns is not None and rest[0] != ns):
+                    continue
+                if before_id and rest[1] >= before_id:
+                    continue
+                hot.append((rest[1], rest[0]))
+            for checkpoint_id, hot_ns in sorted(hot, reverse=True):
+                tup = self._hot_tuple(fields, thread_id, hot_ns, checkpoint_id)
+                if tup is None or (
+                    filter and any(tup.metadata.get(k) != v for k, v in filter.items())
+                ):
+                    continue
+                if limit is not None and len(seen) >= limit:
+                    return
+                seen.add(checkpoint_id)
+                yield tup
+
+        async for tup in self._cold.alist(config, filter=filter, before=before, limit=limit):
+            if tup.config["configurable"]["checkpoint_id"] in seen:
+                continue
+            if limit is not None and len(seen) >= limit:
+                return
+            seen.add(tup.config["configurable"]["checkpoint_id"])
+            yield tup
+
+    # ──────────────────────────────────────────────────────────────────────
+    # 热层写入
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def _commit(
+        self, thread_id: str, mapping: dict[str, bytes], nx: dict[str, bytes]
+    ) -> None:
+        key = self._key(thread_id)
+        pipe = self._redis.pipeline(transaction=True)
+        if mapping:
+            pipe.hset(key, mapping=mapping)
+        for name, value in nx.items():
+            pipe.hsetnx(key, name, value)
+        pipe.hincrby(key, "rev", 1)
+        # 未回写前不过期，回写成功后由 flush 恢复 TTL
+        pipe.persist(key)
+        pipe.zadd(self._dirty_key, {thread_id: time.time()})
+        await pipe.execute()
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_copy = checkpoint.copy()
+        values: dict[str, Any] = checkpoint_copy.pop("channel_values")  # type: ignore[misc]
+        mapping = {
+            _field("b", ns, channel, version): _pack_typed(
+                self.serde.dumps_typed(values[channel]) if channel in values else _EMPTY
+            )
+            for channel, version in new_versions.items()
+        }
+        mapping[_field("c", ns, checkpoint["id"])] = _pack_checkpoint(
+            self.serde.dumps_typed(checkpoint_copy),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            config["configurable"].get("checkpoint_id"),
+        )
+        mapping[_field("latest", ns)] = checkpoint["id"].encode()
+        await self._commit(thread_id, mapping, {})
+        await self._trim(thread_id, ns)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        mapping: dict[str, bytes] = {}
+        nx: dict[str, bytes] = {}
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            name = _field("w", ns, checkpoint_id, task_id, write_idx)
+            payload = _pack(channel, *self.serde.dumps_typed(value), task_path)
+            # 与其他 saver 一致：普通写入不覆盖已有的，特殊 channel（负 idx）覆盖
+            (nx if write_idx >= 0 else mapping)[name] = payload
+        await self._commit(thread_id, mapping, nx)
+
+    async def _trim(self, thread_id: str, ns: str) -> None:
+        """热层只保留最近 hot_keep 个 checkpoint，删除其余的及其 writes / 不再引用的 blob。"""
+        key = self._key(thread_id)
+        names = [n.decode() if isinstance(n, bytes) else n for n in await self._redis.hkeys(key)]
+        checkpoint_prefix = _field("c", ns, "")
+        ids = sorted(n[len(checkpoint_prefix) :] for n in names if n.startswith(checkpoint_prefix))
+        if len(ids) <= self._hot_keep:
+            return
+        doomed, kept = set(ids[: -self._hot_keep]), ids[-self._hot_keep :]
+        referenced = set()
+        for raw in await self._redis.hmget(key, [_field("c", ns, i) for i in kept]):
+            if raw is not None:
+                checkpoint = self.serde.loads_typed(_unpack_checkpoint(raw)[0])
+                referenced.update(
+                    _field("b", ns, c, v) for c, v in checkpoint["channel_versions"].items()
+                )
+        # 只删除快照中已存在的字段：并发 aput 的新 blob 与其 checkpoint 同一事务写入，
+        # 不在快照里；它沿用的旧版本 blob 被最新的保留 checkpoint 引用，也不会被删
+        blob_prefix = _field("b", ns, "")
+        stale = [
+            n
+            for n in names
+            if (n.startswith(blob_prefix) and n not in referenced)
+            or (n.startswith(checkpoint_prefix) and n[len(checkpoint_prefix) :] in doomed)
+            or (n.startswith(_field("w", ns, "")) and n.split(_SEP)[2] in doomed)
+        ]
+        if stale:
+            await self._redis.hdel(key, *stale)
+
+    async def _warm(
+        self, thread_id: str, ns: str, tup: CheckpointTuple, *, expire: bool = True
+    ) -> None:
+        """把冷层加载的最新 checkpoint 写入热层（视为已回写，不标脏；hash 已脏时不设过期）。"""
+        checkpoint = tup.checkpoint
+        values = checkpoint["channel_values"]
+        mapping = {
+            _field("b", ns, channel, version): _pack_typed(
+                self.serde.dumps_typed(values[channel]) if channel in values else _EMPTY
+            )
+            for channel, version in checkpoint["channel_versions"].items()
+        }
+        stored = {k: v for k, v in checkpoint.items() if k != "channel_values"}
+        parent = tup.parent_config["configurable"]["checkpoint_id"] if tup.parent_config else None
+        mapping[_field("c", ns, checkpoint["id"])] = _pack_checkpoint(
+            self.serde.dumps_typed(stored), self.serde.dumps_typed(tup.metadata), parent
+        )
+        for idx, (task_id, channel, value) in enumerate(tup.pending_writes or []):
+            mapping[
+                _field("w", ns, checkpoint["id"], task_id, WRITES_IDX_MAP.get(channel, idx))
+            ] = _pack(channel, *self.serde.dumps_typed(value), "")
+        key = self._key(thread_id)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hset(key, mapping=mapping)
+        # 预热与并发写入竞争时不覆盖更新的 latest
+        pipe.hsetnx(key, _field("latest", ns), checkpoint["id"].encode())
+        if expire:
+            pipe.expire(key, self._ttl)
+        await pipe.execute()
+
+    # ──────────────────────────────────────────────────────────────────────
+    # 回写冷层
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def flush(self, thread_id: str) -> bool:
+        """把 thread 每个 namespace 的最新 checkpoint 回写冷层；返回是否已移出脏集合。"""
+        key = self._key(thread_id)
+        fields = await self._fields(thread_id)
+        if not fields:
+            if await self._redis.zrem(self._dirty_key, thread_id):
+                # 脏 hash 不会过期，缺失说明 Redis 丢了数据（重启 / 淘汰 / 被外部删除）
+                logger.error(
+                    f"❌ [Checkpointer] Hot state of dirty thread {thread_id} is missing; "
+                    "unflushed turns are lost"
+                )
+                return False
+            return True
+        rev = int(fields.get("rev", b"0"))
+        if rev != int(fields.get("flushed_rev", b"-1")):
+            latest_prefix = _field("latest", "")
+            for name, checkpoint_id in fields.items():
+                if name.startswith(latest_prefix):
+                    await self._flush_checkpoint(
+                        fields, thread_id, name[len(latest_prefix) :], checkpoint_id.decode()
+                    )
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = int(await pipe.hget(key, "rev") or 0)
+                pipe.multi()
+                pipe.hset(key, "flushed_rev", rev)
+                if current == rev:
+                    pipe.zrem(self._dirty_key, thread_id)
+                    pipe.expire(key, self._ttl)
+                await pipe.execute()
+                return current == rev
+            except WatchError:
+                return False
+
+    async def _flush_checkpoint(
+        self, fields: dict[str, bytes], thread_id: str, ns: str, checkpoint_id: str
+    ) -> None:
+        tup = self._hot_tuple(fields, thread_id, ns, checkpoint_id)
+        if tup is None:
+            return
+        configurable = {"thread_id": thread_id, "checkpoint_ns": ns}
+        if tup.parent_config:
+            configurable["checkpoint_id"] = tup.parent_config["configurable"]["checkpoint_id"]
+        await self._cold.aput(
+            {"configurable": configurable},
+            tup.checkpoint,
+            tup.metadata,
+            tup.checkpoint["channel_versions"],
+        )
+        by_task: dict[tuple[str, str], list[tuple[str, Any]]] = {}
+        for task_id, _, channel, typed, task_path in self._ordered_writes(
+            fields, ns, checkpoint_id
+        ):
+            by_task.setdefault((task_id, task_path), []).append(
+                (channel, self.serde.loads_typed(typed))
+            )
+        for (task_id, task_path), writes in by_task.items():
+            await self._cold.aput_writes(
+                {"configurable": {**configurable, "checkpoint_id": checkpoint_id}},
+                writes,
+                task_id,
+                task_path,
+            )
+
+    async def flush_dirty(self, min_idle: float = 0.0) -> int:
+        """回写最后写入早于 ``min_idle`` 秒前的脏 thread，返回回写的数量。"""
+        threads = await self._redis.zrangebyscore(self._dirty_key, "-inf", time.time() - min_idle)
+        for thread_id in threads:
+            await self.flush(thread_id.decode() if isinstance(thread_id, bytes) else thread_id)
+        return len(threads)
+
+    async def dirty_count(self) -> int:
+        return await self._redis.zcard(self._dirty_key)
+
+    # ──────────────────────────────────────────────────────────────────────
+    # 其他
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def adelete_hot(self, thread_ids: Sequence[str]) -> None:
+        """只删除热层副本（冷层由调用方自行清理），避免之后被回写复活。"""
+        if not thread_ids:
+            return
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(*(self._key(t) for t in thread_ids))
+        pipe.zrem(self._dirty_key, *thread_ids)
+        await pipe.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.adelete_hot([thread_id])
+        await self._cold.adelete_thread(thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        return self._cold.get_next_version(current, channel)
+
+
+__all__ = ["TieredCheckpointer"]
@@ -17,7 +17,7 @@ from app.core.ai.providers.base import BaseAIProvider, Resolved
 from app.core.ai.providers.chat import ChatProvider, chat_provider
 from app.core.ai.providers.embedding import EmbeddingProvider, embedding_provider
 from app.core.ai.providers.openai_embeddings import OpenAICompatibleEmbeddings
-from app.core.ai.providers.reranker import Reranker, reranker, resolve_rerank_url
+from app.core.ai.providers.reranker import LOCAL_PROVIDER, Reranker, reranker, resolve_rerank_url
 
 __all__ = [
     "BaseAIProvider",
@@ -26,6 +26,7 @@ __all__ = [
     "chat_provider",
     "EmbeddingProvider",
     "embedding_provider",
+    "LOCAL_PROVIDER",
     "Reranker",
     "reranker",
     "resolve_rerank_url",
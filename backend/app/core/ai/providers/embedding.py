@@ -29,7 +29,11 @@ logger = logging.getLogger(__name__)
 
 
 class EmbeddingProvider(BaseAIProvider[OpenAICompatibleEmbeddings]):
-    """OpenAI-compatible embeddings provider。"""
+    """OpenAI-compatible embeddings provider。
+
+    ``pin`` override（``{model, dimension, hash}``）：蓝绿重建切换前，在线存储仍是旧向量
+    空间，沿用当前凭证按锁定的 model / dimension 另建实例（缓存键同时包含两份指纹）。
+    """
 
     section_name = "embedding"
 
@@ -40,26 +44,47 @@ class EmbeddingProvider(BaseAIProvider[OpenAICompatibleEmbeddings]):
         resolved_id = tenant_id if tenant_id is not None else get_current_tenant()
         return await configuration_service.get_embedding_config(tenant_id=resolved_id, force=force)
 
-    def _signal_extras(self, conf: dict[str, Any], **override: Any) -> dict[str, Any]:
+    def _cache_key(self, conf: dict[str, Any], *, pin: dict[str, Any] | None = None) -> str:
+        key = super()._cache_key(conf)
+        return f"{key}_pin_{pin['hash']}" if pin else key
+
+    def _signal_extras(
+        self, conf: dict[str, Any], *, pin: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
         # Dimension 保留原始类型（int 或 None）：下游 vector schema init 需要 int，
         # 日志打印自然 stringify。不把 None 改写成 "auto" 是为了避免在数值上下文
         # 触发 ``int("auto")`` 这种错误。
         return {
             **super()._signal_extras(conf),
-            "Dimension": conf.get("dimension"),
+            "Dimension": (pin or conf).get("dimension"),
         }
 
     async def _build_instance(
-        self, conf: dict[str, Any], **override: Any
+        self, conf: dict[str, Any], *, pin: dict[str, Any] | None = None
     ) -> OpenAICompatibleEmbeddings:
+        from app.core.ai.providers.embedding_cache import get_embedding_cache
         from app.core.infra.config import settings
 
+        if pin:
+            conf = {
+                **conf,
+                "model": pin["model"],
+                "dimension": pin["dimension"],
+                "_hash": pin["hash"],
+            }
+
+        model = conf.get("model", "N/A")
         return OpenAICompatibleEmbeddings(
-            model=conf.get("model", "N/A"),
+            model=model,
             api_key=conf.get("api_key"),
             base_url=conf.get("base_url"),
             embedding_batch_size=settings.AI_EMBEDDING_BATCH_SIZE,
             batch_concurrency=settings.AI_EMBEDDING_BATCH_CONCURRENCY,
+            # 配置指纹进入缓存键：换模型 / 维度 / base_url 后旧向量自动失效
+            cache=get_embedding_cache() if settings.AI_EMBEDDING_CACHE_ENABLED else None,
+            cache_namespace=f"{model}:{conf.get('_hash', '')}",
+            dimensions=conf.get("dimension"),
+            matryoshka=bool(conf.get("matryoshka")),
         )
 
 
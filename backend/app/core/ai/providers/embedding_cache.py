@@ -0,0 +1,154 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Embedding 结果缓存 —— 进程内 LRU + Redis 两级。
+
+键：``emb:{model}:{config_hash}:{sha256(规范化文本)}``。embedding 配置变更（换模型 /
+维度 / base_url）后 ``config_hash`` 随之变化，旧键自然不再命中，无需显式清理；
+Redis 层依靠 TTL 回收，进程内层依靠 LRU 淘汰。
+
+值统一存 float32 原始 bytes（1024 维约 4KB），而不是 pickle 的 ``list[float]``：
+体积约为后者的 1/5，进程内层也按 bytes 保存，命中时再解码。
+"""
+
+import hashlib
+import logging
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC + 折叠空白；只影响缓存键，发给上游的仍是原文。"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def encode_vector(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def decode_vector(raw: bytes) -> list[float]:
+    arr = array("f")
+    arr.frombytes(raw)
+    return arr.tolist()
+
+
+class EmbeddingCache:
+    """两级 embedding 缓存：进程内 LRU 命中最快，Redis 层在 API / worker 进程间共享。
+
+    REDIS 未启用时只有进程内层（全局 InMemoryCache 容量太小，不拿来存向量）。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: int = 7 * 24 * 3600) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lru: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode()).hexdigest()
+        return f"emb:{namespace}:{digest}"
+
+    def _shared(self) -> Any | None:
+        from app.core.infra.cache import RedisCache, get_cache
+
+        cache = get_cache()
+        return cache if isinstance(cache, RedisCache) else None
+
+    def _remember(self, key: str, raw: bytes) -> None:
+        if self.max_size <= 0:
+            return
+        self._lru[key] = raw
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> list[list[float] | None]:
+        """按键批量读取；未命中项为 None。Redis 命中会回填进程内层。"""
+        result: list[list[float] | None] = [None] * len(keys)
+        pending: list[int] = []
+        for i, key in enumerate(keys):
+            raw = self._lru.get(key)
+            if raw is None:
+                pending.append(i)
+                continue
+            self._lru.move_to_end(key)
+            self._memory_hits += 1
+            result[i] = decode_vector(raw)
+
+        shared = self._shared() if pending else None
+        if shared is not None:
+            raws = await shared.mget_bytes([keys[i] for i in pending])
+            still_pending = []
+            for i, raw in zip(pending, raws, strict=True):
+                if raw:
+                    self._redis_hits += 1
+                    self._remember(keys[i], raw)
+                    result[i] = decode_vector(raw)
+                else:
+                    still_pending.append(i)
+            pending = still_pending
+
+        self._misses += len(pending)
+        return result
+
+    async def set_many(self, items: dict[str, list[float]]) -> None:
+        encoded = {key: encode_vector(vector) for key, vector in items.items()}
+        for key, raw in encoded.items():
+            self._remember(key, raw)
+        shared = self._shared()
+        if shared is not None:
+            await shared.mset_bytes(encoded, ttl=self.ttl)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> dict[str, Any]:
+        hits = self._memory_hits + self._redis_hits
+        total = hits + self._misses
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "memory_hits": self._memory_hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+            "hit_rate": f"{(hits / total * 100):.2f}%" if total > 0 else "0%",
+        }
+
+
+_embedding_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """进程级单例；容量 / TTL 取自 AI_EMBEDDING_CACHE_SIZE / AI_EMBEDDING_CACHE_TTL。"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        from app.core.infra.config import settings
+
+        _embedding_cache = EmbeddingCache(
+            max_size=settings.AI_EMBEDDING_CACHE_SIZE, ttl=settings.AI_EMBEDDING_CACHE_TTL
+        )
+    return _embedding_cache
+
+
+__all__ = ["EmbeddingCache", "get_embedding_cache", "normalize_text"]
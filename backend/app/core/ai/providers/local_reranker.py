@@ -0,0 +1,162 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""本地 cross-encoder 重排 —— rerank 配置 ``provider="local"`` 时由 ``Reranker`` 调用。
+
+``model`` 字段两种写法：
+- HuggingFace 模型名或本地目录（如 ``BAAI/bge-reranker-base``）：走
+  ``sentence_transformers.CrossEncoder``，需 ``pip install sentence-transformers``
+- 含 ``model.onnx`` + ``tokenizer.json`` 的目录：走 onnxruntime CPU 推理，
+  需 ``pip install onnxruntime tokenizers``；logits 经 sigmoid 映射到 0~1
+
+两者都是可选依赖，只在首次使用时导入。模型按 model 名在进程内缓存（worker / API
+进程各加载一份）。推理按 RERANK_LOCAL_BATCH_SIZE 分批；RERANK_LOCAL_EXECUTION=thread
+时在专用线程池中执行，不阻塞事件循环。
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# (query, passages) -> 每个 passage 的相关性分数（同序）
+ScoreFn = Callable[[str, list[str]], list[float]]
+
+_models: dict[str, ScoreFn] = {}
+_load_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _require(module: str, package: str):
+    import importlib
+
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise RuntimeError(
+            f"本地 rerank 需要可选依赖 {package}，请执行: pip install {package}"
+        ) from e
+
+
+def _load_cross_encoder(model: str, max_length: int, batch_size: int) -> ScoreFn:
+    st = _require("sentence_transformers", "sentence-transformers")
+    encoder = st.CrossEncoder(model, max_length=max_length, device="cpu")
+
+    def score(query: str, passages: list[str]) -> list[float]:
+        pairs = [(query, p) for p in passages]
+        scores = encoder.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+        return [float(s) for s in scores]
+
+    return score
+
+
+def _load_onnx(model_dir: str, max_length: int, batch_size: int) -> ScoreFn:
+    ort = _require("onnxruntime", "onnxruntime")
+    tokenizers = _require("tokenizers", "tokenizers")
+    np = _require("numpy", "numpy")
+
+    tokenizer = tokenizers.Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=max_length)
+    tokenizer.enable_padding()
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1  # 并行度由外层线程池控制
+    session = ort.InferenceSession(
+        os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+    )
+    input_names = {i.name for i in session.get_inputs()}
+
+    def score(query: str, passages: list[str]) -> list[float]:
+        out: list[float] = []
+        for start in range(0, len(passages), batch_size):
+            batch = tokenizer.encode_batch(
+                [(query, p) for p in passages[start : start + batch_size]]
+            )
+            feeds = {
+                "input_ids": np.array([e.ids for e in batch], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in batch], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in batch], dtype=np.int64),
+            }
+            logits = session.run(None, {k: v for k, v in feeds.items() if k in input_names})[0]
+            out.extend(
+                1.0 / (1.0 + math.exp(-float(row[0]))) for row in logits.reshape(len(batch), -1)
+            )
+        return out
+
+    return score
+
+
+def _get_model(model: str) -> ScoreFn:
+    from app.core.infra.config import settings
+
+    fn = _models.get(model)
+    if fn is not None:
+        return fn
+    with _load_lock:
+        fn = _models.get(model)
+        if fn is None:
+            is_onnx = os.path.isfile(os.path.join(model, "model.onnx"))
+            loader = _load_onnx if is_onnx else _load_cross_encoder
+            fn = loader(model, settings.RERANK_LOCAL_MAX_LENGTH, settings.RERANK_LOCAL_BATCH_SIZE)
+            _models[model] = fn
+            logger.info(
+                f"📦 [RERANK   ] Local model loaded | {'onnx' if is_onnx else 'cross-encoder'}: {model}"
+            )
+    return fn
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    from app.core.infra.config import settings
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RERANK_LOCAL_THREADS, thread_name_prefix="local-rerank"
+        )
+    return _executor
+
+
+def _score_sync(model: str, query: str, passages: list[str]) -> list[float]:
+    return _get_model(model)(query, passages)
+
+
+async def score(model: str, query: str, passages: list[str]) -> list[float]:
+    """对 (query, passage) 对打分，返回与 passages 同序的分数。
+
+    首次调用会加载模型（同样在线程池里执行）；依赖缺失时抛 RuntimeError。
+    """
+    from app.core.infra.config import settings
+
+    if not passages:
+        return []
+    if settings.RERANK_LOCAL_EXECUTION == "inline":
+        return _score_sync(model, query, passages)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _score_sync, model, query, passages)
+
+
+def shutdown() -> None:
+    """释放线程池与已加载模型（应用关闭时由 ``Reranker.aclose`` 调用）。"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    _models.clear()
+
+
+__all__ = ["score", "shutdown"]
@@ -19,9 +19,12 @@
 
 import asyncio
 import logging
+import math
 
 from langchain_core.embeddings import Embeddings
-from openai import AsyncOpenAI, AuthenticationError
+from openai import AsyncOpenAI, AuthenticationError, BadRequestError, UnprocessableEntityError
+
+from app.core.ai.providers.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,14 @@ class OpenAICompatibleEmbeddings(Embeddings):
     reasoning 开关（如 ``enable_thinking``），对 embedding 协议无意义；若误透传
     到此处，部分严格的 provider 会以 400 拒绝请求。embedding 配置层的
     ``extra_body`` 字段不再被消费。
+
+    ``cache`` 非空时先查 embedding 缓存，只把未命中的文本发给上游；
+    ``cache_namespace`` 由 provider 以 ``{model}:{config_hash}`` 填充，配置变更即失效。
+
+    ``dimensions`` 非空时作为 OpenAI 标准的 ``dimensions`` 请求参数发送（text-embedding-3、
+    bge-m3 等 Matryoshka 模型据此返回更短的向量），返回长度与之不符一律报错。只有配置声明
+    ``matryoshka=True`` 时：上游拒绝该参数（400 / 422）改为不带参数重发（此后本实例不再
+    发送），返回更长的向量取前缀并重新单位化。非 Matryoshka 模型的前缀不是有效向量。
     """
 
     def __init__(
@@ -44,8 +55,17 @@ class OpenAICompatibleEmbeddings(Embeddings):
         timeout: float = 60.0,
         embedding_batch_size: int = 10,
         batch_concurrency: int = 5,
+        cache: EmbeddingCache | None = None,
+        cache_namespace: str = "",
+        dimensions: int | None = None,
+        matryoshka: bool = False,
     ):
         self.model = model
+        self.dimensions = dimensions
+        self.matryoshka = matryoshka
+        self._send_dimensions = dimensions is not None
+        self.cache = cache
+        self.cache_namespace = cache_namespace or model
         self.embedding_batch_size = embedding_batch_size
         self.batch_concurrency = max(1, batch_concurrency)
         self.client = AsyncOpenAI(
@@ -56,39 +76,97 @@ class OpenAICompatibleEmbeddings(Embeddings):
         )
 
     async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
-        """批量异步嵌入。
+        """批量异步嵌入（先查缓存，同批内重复文本只请求一次）。
 
-        按 ``embedding_batch_size`` 切片为 N 个 batch，用 ``Semaphore`` 限流并行
-        发送（默认并发 ``batch_concurrency=5``）。返回顺序与 ``texts`` 输入顺序
-        一致（``asyncio.gather`` 保序）。
+        未命中部分按 ``embedding_batch_size`` 切片为 N 个 batch，用 ``Semaphore``
+        限流并行发送（默认并发 ``batch_concurrency=5``）。返回顺序与 ``texts``
+        输入顺序一致。
         """
         if not texts:
             return []
+        if self.cache is None:
+            return await self._embed_texts(texts)
+
+        keys = [self.cache.make_key(self.cache_namespace, t) for t in texts]
+        vectors = await self.cache.get_many(keys)
+        missing: dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors, strict=True):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            fresh = dict(zip(missing, await self._embed_texts(list(missing.values())), strict=True))
+            await self.cache.set_many(fresh)
+            vectors = [v if v is not None else fresh[k] for k, v in zip(keys, vectors, strict=True)]
+        return vectors
+
+    async def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """直接请求上游（不经缓存）。"""
 
         batch_size = self.embedding_batch_size
         sem = asyncio.Semaphore(self.batch_concurrency)
 
         async def _embed_batch(batch: list[str]) -> list[list[float]]:
             async with sem:
-                try:
-                    response = await self.client.embeddings.create(model=self.model, input=batch)
-                    return [item.embedding for item in response.data]
-                except AuthenticationError:
-                    self._log_auth_error()
-                    raise
+                return await self._create(batch)
 
         batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
         results = await asyncio.gather(*(_embed_batch(b) for b in batches))
         return [vec for batch_result in results for vec in batch_result]
 
     async def aembed_query(self, text: str) -> list[float]:
-        """异步嵌入单个查询。"""
+        """异步嵌入单个查询（agent 多轮 / 多用户的重复查询直接命中缓存）。"""
+        if self.cache is not None:
+            key = self.cache.make_key(self.cache_namespace, text)
+            (cached,) = await self.cache.get_many([key])
+            if cached is not None:
+                return cached
+            vector = await self._embed_query(text)
+            await self.cache.set_many({key: vector})
+            return vector
+        return await self._embed_query(text)
+
+    async def _embed_query(self, text: str) -> list[float]:
+        return (await self._create(text))[0]
+
+    async def _create(self, texts: str | list[str]) -> list[list[float]]:
+        """一次 ``/embeddings`` 请求；处理 dimensions 参数协商与返回长度校验。"""
         try:
-            response = await self.client.embeddings.create(model=self.model, input=text)
-            return response.data[0].embedding
+            if not self._send_dimensions:
+                response = await self.client.embeddings.create(model=self.model, input=texts)
+            else:
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.model, input=texts, dimensions=self.dimensions
+                    )
+                except (BadRequestError, UnprocessableEntityError) as e:
+                    if not self.matryoshka:
+                        raise ValueError(
+                            f"Embedding 服务不接受 dimensions 参数 ({self.model}): {e}；"
+                            "请清空维度配置重新探测，或确认模型支持 Matryoshka 截断后开启该选项"
+                        ) from e
+                    response = await self.client.embeddings.create(model=self.model, input=texts)
+                    self._send_dimensions = False
+                    logger.warning(
+                        f"⚠️ Embedding 服务不接受 dimensions 参数 ({self.model})，"
+                        f"改为本地截断到 {self.dimensions} 维: {e}"
+                    )
         except AuthenticationError:
             self._log_auth_error()
             raise
+        return [self._fit(item.embedding) for item in response.data]
+
+    def _fit(self, vector: list[float]) -> list[float]:
+        """校验返回长度；仅 Matryoshka 模型在更长时取前缀并重新单位化。"""
+        if self.dimensions is None or len(vector) == self.dimensions:
+            return vector
+        if len(vector) < self.dimensions or not self.matryoshka:
+            raise ValueError(
+                f"Embedding 维度不符: 模型 {self.model} 返回 {len(vector)} 维，"
+                f"配置为 {self.dimensions} 维，请重新探测维度"
+            )
+        head = vector[: self.dimensions]
+        norm = math.sqrt(sum(x * x for x in head)) or 1.0
+        return [x / norm for x in head]
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """同步嵌入多个文档。"""
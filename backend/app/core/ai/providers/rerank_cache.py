@@ -0,0 +1,74 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rerank 分数缓存 —— 按 (查询, chunk, rerank 配置) 缓存单对相关性分数。
+
+相近查询的召回集高度重合，热门 chunk 会被反复打分；命中缓存的候选不再发给上游，
+只对新候选打分后与缓存分数合并排序。
+
+键：``rrk:{namespace}:{sha256(规范化查询)}:{chunk 指纹}``。namespace 由调用方拼入
+provider / 配置 hash / 截断预算，任一变化旧键即不再命中；chunk 指纹优先用
+metadata 中的 ``content_hash``（内容变了即变），缺失时对 passage 原文求 hash。
+值为 8 字节 double，走全局缓存的 ``mget_bytes`` / ``mset_bytes``（Redis 下一次往返）。
+"""
+
+import hashlib
+import logging
+import struct
+
+from app.core.ai.providers.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_SCORE = struct.Struct("<d")
+
+
+def chunk_fingerprint(doc: dict, passage: str) -> str:
+    content_hash = (doc.get("metadata") or {}).get("content_hash")
+    return content_hash or hashlib.sha256(passage.encode()).hexdigest()[:32]
+
+
+def make_keys(namespace: str, query: str, fingerprints: list[str]) -> list[str]:
+    query_hash = hashlib.sha256(normalize_text(query).encode()).hexdigest()[:32]
+    return [f"rrk:{namespace}:{query_hash}:{fp}" for fp in fingerprints]
+
+
+async def get_many(keys: list[str]) -> list[float | None]:
+    """批量读取分数，未命中 / 读取失败为 None。"""
+    from app.core.infra.cache import get_cache
+
+    try:
+        raws = await get_cache().mget_bytes(keys)
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK   ] 分数缓存读取失败: {e}")
+        return [None] * len(keys)
+    return [_SCORE.unpack(raw)[0] if raw else None for raw in raws]
+
+
+async def set_many(scores: dict[str, float]) -> None:
+    from app.core.infra.cache import get_cache
+    from app.core.infra.config import settings
+
+    if not scores:
+        return
+    try:
+        await get_cache().mset_bytes(
+            {key: _SCORE.pack(score) for key, score in scores.items()},
+            ttl=settings.RERANK_SCORE_CACHE_TTL,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK   ] 分数缓存写入失败: {e}")
+
+
+__all__ = ["chunk_fingerprint", "get_many", "make_keys", "set_many"]
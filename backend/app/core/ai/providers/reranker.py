@@ -37,6 +37,10 @@ locking 缓存、HIT/MISS 日志、Resolved 元数据返回；不同点：
   调用，真正复用的资源是 ``self._client`` 这一根常驻 httpx 客户端，独立于
   按指纹分桶的配置缓存。
 - 暴露两个 public 入口：``is_enabled``（探测，静默）与 ``rerank``（真实调用）。
+
+租户把 rerank 配置的 ``provider`` 设为 ``"local"`` 时不发 HTTP 请求，改为在当前
+进程内用 cross-encoder / ONNX 模型打分（``local_reranker``），``model`` 填模型名
+或本地目录；返回的 ``(docs, meta)`` 契约不变。
 """
 
 import logging
@@ -45,6 +49,7 @@ from typing import Any
 
 import httpx
 
+from app.core.ai.providers import rerank_cache
 from app.core.ai.providers.base import BaseAIProvider
 
 logger = logging.getLogger(__name__)
@@ -55,6 +60,10 @@ logger = logging.getLogger(__name__)
 # 暴露是因为这是稀有 escape hatch，不值得污染 ModelConfig）。
 _DEFAULT_RERANK_PATH = "/rerank"
 
+# rerank 配置 ``provider`` 取该值时在进程内跑 cross-encoder（见 ``local_reranker``），
+# 其余取值一律按 Cohere 风格 HTTP API 调用
+LOCAL_PROVIDER = "local"
+
 
 def resolve_rerank_url(base_url: str, endpoint_path: str | None) -> str:
     """组装最终请求 URL —— Reranker / admin 连通性测试共用。
@@ -83,6 +92,17 @@ def resolve_rerank_url(base_url: str, endpoint_path: str | None) -> str:
     return base if base.endswith(path) else f"{base}{path}"
 
 
+def _truncate(passage: str) -> str:
+    """按 RERANK_PASSAGE_MAX_CHARS 截断候选正文（0 = 不截断）。
+
+    cross-encoder 只看前 max_length 个 token，超出部分上游照样计费 / 传输却不影响分数。
+    """
+    from app.core.infra.config import settings
+
+    limit = settings.RERANK_PASSAGE_MAX_CHARS
+    return passage[:limit] if limit and len(passage) > limit else passage
+
+
 class Reranker(BaseAIProvider[dict[str, Any]]):
     """Rerank provider。
 
@@ -107,11 +127,16 @@ class Reranker(BaseAIProvider[dict[str, Any]]):
 
         return await configuration_service.get_rerank_config(tenant_id=tenant_id, force=force)
 
+    def _cache_key(self, conf: dict[str, Any], **override: Any) -> str:
+        # 配置指纹不含 provider：同一 model 在远端 / 本地之间切换时也要重建快照
+        return f"{conf.get('provider')}:{conf.get('_hash') or ''}"
+
     async def _build_instance(self, conf: dict[str, Any], **override: Any) -> dict[str, Any]:
         # 缓存配置快照；``extra_body`` 在 CatWiki 中是 chat 专属字段，rerank
         # 协议无对应语义，故不读取。``endpoint_path`` 若 conf 中未设则为 None，
         # 由 ``resolve_rerank_url`` 走默认 ``/rerank``。
         return {
+            "provider": conf.get("provider"),
             "api_key": conf.get("api_key"),
             "base_url": conf.get("base_url"),
             "model": conf.get("model"),
@@ -159,44 +184,18 @@ class Reranker(BaseAIProvider[dict[str, Any]]):
 
         try:
             start_time = time.time()
-            api_key = inst["api_key"]
-            base_url = inst["base_url"]
-            model = inst["model"]
-
-            # 按行业惯例构造 /v1/rerank payload（Cohere / Voyage / Jina 通用 schema）
-            payload = {
-                "model": model,
-                "query": query,
-                "documents": [doc["content"] for doc in documents],
-                "top_n": top_n,
-            }
-
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
-
-            client = self._get_http_client()
-            url = resolve_rerank_url(base_url, inst.get("endpoint_path"))
-
             logger.debug(
-                f"♻️  [RERANK   ] Reranking | Model: {model} | Hash: {resolved.hash[:8]} | Input: {len(documents)}"
+                f"♻️  [RERANK   ] Reranking | Provider: {inst.get('provider')} | "
+                f"Model: {inst['model']} | Hash: {resolved.hash[:8]} | Input: {len(documents)}"
             )
 
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result_data = response.json()
+            passages = [_truncate(doc["content"]) for doc in documents]
+            ranked = await self._score_cached(
+                inst, resolved.hash, query, documents, passages, top_n
+            )
 
-            results = result_data.get("results", [])
             reranked_docs: list[dict] = []
-            for item in results:
-                idx = item["index"]
-                # 用 `in` 判断而非 `or`——relevance_score=0.0 是合法低分，
-                # `or` 会错误地回落到备用字段
-                score = (
-                    item["relevance_score"] if "relevance_score" in item else item.get("score", 0.0)
-                )
-
+            for idx, score in ranked:
                 if idx < len(documents):
                     doc = documents[idx].copy()
                     doc["original_score"] = doc.get("score")
@@ -216,6 +215,97 @@ class Reranker(BaseAIProvider[dict[str, Any]]):
             logger.error(f"❌ [Reranker] 重排序失败: {e}")
             return documents[:top_n], meta
 
+    async def _score(
+        self, inst: dict[str, Any], query: str, passages: list[str], top_n: int
+    ) -> list[tuple[int, float]]:
+        if inst.get("provider") == LOCAL_PROVIDER:
+            return await self._score_local(inst, query, passages, top_n)
+        return await self._score_http(inst, query, passages, top_n)
+
+    async def _score_cached(
+        self,
+        inst: dict[str, Any],
+        config_hash: str,
+        query: str,
+        documents: list[dict],
+        passages: list[str],
+        top_n: int,
+    ) -> list[tuple[int, float]]:
+        """先查分数缓存，只把未命中的候选发给上游；合并后按分数排序取 top_n。"""
+        from app.core.infra.config import settings
+
+        if not settings.RERANK_SCORE_CACHE_ENABLED:
+            return await self._score(inst, query, passages, top_n)
+
+        namespace = f"{inst.get('provider')}:{config_hash}:{settings.RERANK_PASSAGE_MAX_CHARS}"
+        keys = rerank_cache.make_keys(
+            namespace,
+            query,
+            [
+                rerank_cache.chunk_fingerprint(d, p)
+                for d, p in zip(documents, passages, strict=True)
+            ],
+        )
+        scores = await rerank_cache.get_many(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            # 需要全部新候选的分数才能与缓存分数合并排序，top_n 取未命中数
+            fresh = await self._score(inst, query, [passages[i] for i in missing], len(missing))
+            for local_idx, score in fresh:
+                if local_idx < len(missing):
+                    scores[missing[local_idx]] = score
+            await rerank_cache.set_many(
+                {keys[missing[i]]: score for i, score in fresh if i < len(missing)}
+            )
+        logger.debug(
+            f"[RERANK   ] Score cache | Hit: {len(documents) - len(missing)} | Sent: {len(missing)}"
+        )
+        ranked = [(i, score) for i, score in enumerate(scores) if score is not None]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:top_n]
+
+    async def _score_http(
+        self, inst: dict[str, Any], query: str, passages: list[str], top_n: int
+    ) -> list[tuple[int, float]]:
+        """远端 rerank API：返回服务端已排好序的 ``(index, score)``。"""
+        # 按行业惯例构造 /v1/rerank payload（Cohere / Voyage / Jina 通用 schema）
+        payload = {
+            "model": inst["model"],
+            "query": query,
+            "documents": passages,
+            "top_n": top_n,
+        }
+
+        headers = {
+            "Authorization": f"Bearer {inst['api_key']}",
+            "Content-Type": "application/json",
+        }
+
+        client = self._get_http_client()
+        url = resolve_rerank_url(inst["base_url"], inst.get("endpoint_path"))
+
+        response = await client.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+        result_data = response.json()
+
+        ranked: list[tuple[int, float]] = []
+        for item in result_data.get("results", []):
+            # 用 `in` 判断而非 `or`——relevance_score=0.0 是合法低分，
+            # `or` 会错误地回落到备用字段
+            score = item["relevance_score"] if "relevance_score" in item else item.get("score", 0.0)
+            ranked.append((item["index"], score))
+        return ranked
+
+    async def _score_local(
+        self, inst: dict[str, Any], query: str, passages: list[str], top_n: int
+    ) -> list[tuple[int, float]]:
+        """进程内 cross-encoder：对全部候选打分后本地排序取 top_n。"""
+        from app.core.ai.providers import local_reranker
+
+        scores = await local_reranker.score(inst["model"], query, passages)
+        ranked = sorted(enumerate(scores), key=lambda item: item[1], reverse=True)
+        return ranked[:top_n]
+
     # ──────────────────────────────────────────────────────────────────────
     # 资源生命周期
     # ──────────────────────────────────────────────────────────────────────
@@ -237,6 +327,9 @@ class Reranker(BaseAIProvider[dict[str, Any]]):
         if self._client is not None and not self._client.is_closed:
             await self._client.aclose()
         self._client = None
+        from app.core.ai.providers import local_reranker
+
+        local_reranker.shutdown()
         await super().aclose()
 
 
@@ -244,4 +337,4 @@ class Reranker(BaseAIProvider[dict[str, Any]]):
 reranker = Reranker()
 
 
-__all__ = ["Reranker", "reranker", "resolve_rerank_url"]
+__all__ = ["LOCAL_PROVIDER", "Reranker", "reranker", "resolve_rerank_url"]
@@ -119,6 +119,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "auth.user_not_found": "用户不存在",
         "auth.user_disabled": "用户已被禁用",
         "auth.demo_mode": "当前处于演示模式，暂不支持此操作",
+        "auth.platform_admin_required": "仅平台管理员可执行此操作",
         # ========== 系统配置相关 ==========
         "config.not_found": "配置 {key} 不存在",
         "config.connect_failed": "连接失败: {error}",
@@ -254,6 +255,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "auth.user_not_found": "User not found",
         "auth.user_disabled": "User is disabled",
         "auth.demo_mode": "This operation is not supported in demo mode",
+        "auth.platform_admin_required": "Only platform administrators can perform this operation",
         # ========== System config ==========
         "config.not_found": "Configuration {key} not found",
         "config.connect_failed": "Connection failed: {error}",
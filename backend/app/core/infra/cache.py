@@ -88,6 +88,15 @@ class BaseCache(ABC):
             await self.set(key, result, ttl=ttl)
             return result
 
+    async def mget_bytes(self, keys: list[str]) -> list[bytes | None]:
+        """批量读取原始 bytes 值（不经 pickle），缺失项为 None。"""
+        return [await self.get(key) for key in keys]
+
+    async def mset_bytes(self, mapping: dict[str, bytes], ttl: int | None = None) -> None:
+        """批量写入原始 bytes 值（不经 pickle）。"""
+        for key, value in mapping.items():
+            await self.set(key, value, ttl=ttl)
+
     @abstractmethod
     async def delete(self, key: str) -> None:
         """删除缓存值"""
@@ -236,6 +245,27 @@ class RedisCache(BaseCache):
         except Exception as e:
             logger.error(f"Redis set failed [{key}]: {e}")
 
+    async def mget_bytes(self, keys: list[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        try:
+            return await self.client.mget([self._get_full_key(k) for k in keys])
+        except Exception as e:
+            logger.error(f"Redis mget failed [{len(keys)} keys]: {e}")
+            return [None] * len(keys)
+
+    async def mset_bytes(self, mapping: dict[str, bytes], ttl: int | None = None) -> None:
+        if not mapping:
+            return
+        ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(self._get_full_key(key), value, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis mset failed [{len(mapping)} keys]: {e}")
+
     async def delete(self, key: str) -> None:
         try:
             await self.client.delete(self._get_full_key(key))
@@ -15,7 +15,7 @@
 import os
 import tomllib
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 from urllib.parse import quote_plus
 
 from pydantic import Field, computed_field, field_validator
@@ -68,6 +68,16 @@ class Settings(BaseSettings):
     DB_MAX_OVERFLOW: int = Field(default=20, ge=0, le=200)
     DB_POOL_TIMEOUT: int = Field(default=30, ge=1)
     DB_POOL_RECYCLE: int = Field(default=3600, ge=300)
+    # LangGraph checkpointer 独立的 psycopg 连接池（与上面的 SQLAlchemy 池分开计数）
+    CHECKPOINTER_POOL_MIN_SIZE: int = Field(
+        default=2, ge=0, le=100, description="Checkpointer 连接池常驻连接数"
+    )
+    CHECKPOINTER_POOL_MAX_SIZE: int = Field(
+        default=10, ge=1, le=200, description="Checkpointer 连接池最大连接数"
+    )
+    CHECKPOINTER_POOL_TIMEOUT: float = Field(
+        default=30.0, ge=1, description="Checkpointer 取连接的最长等待秒数"
+    )
 
     # Redis 配置（缓存/分布式锁）
     # 默认开启，与 .env.example / docker-compose.dev.yml 拉起的 redis 服务对齐。
@@ -83,6 +93,17 @@ class Settings(BaseSettings):
     WORKER_MAX_TRIES: int = Field(default=3, ge=1, description="任务失败重试次数")
     WORKER_JOB_TIMEOUT: int = Field(default=600, ge=1, description="单任务超时秒数")
     WORKER_MAX_JOBS: int = Field(default=10, ge=1, description="单进程并发任务数")
+    VECTOR_REINDEX_JOB_TIMEOUT: int = Field(
+        default=86400, ge=60, description="向量蓝绿重建任务超时秒数（全库回填耗时较长）"
+    )
+    VECTOR_REINDEX_BATCH_DOCS: int = Field(
+        default=20, ge=1, description="向量重建每批回填的文档数（每批后保存断点）"
+    )
+    VECTOR_REINDEX_THROTTLE_SECONDS: float = Field(
+        default=0.5,
+        ge=0,
+        description="向量重建批次间的休眠秒数，限制对 embedding 服务与数据库的压力",
+    )
 
     @computed_field
     @property
@@ -180,6 +201,10 @@ class Settings(BaseSettings):
     AI_EMBEDDING_API_BASE: str | None = Field(default=None)
     AI_EMBEDDING_MODEL: str | None = Field(default=None)
     AI_EMBEDDING_DIMENSION: int | None = Field(default=None)
+    AI_EMBEDDING_MATRYOSHKA: bool = Field(
+        default=False,
+        description="Embedding 模型支持 Matryoshka 截断：上游不接受 dimensions 参数时允许本地取前缀",
+    )
     AI_EMBEDDING_BATCH_SIZE: int = Field(
         default=10,
         ge=1,
@@ -192,10 +217,48 @@ class Settings(BaseSettings):
         le=32,
         description="批量 embedding 时同时在飞的 batch 数；提供商若有 QPS 限制需要相应下调",
     )
+    AI_EMBEDDING_CACHE_ENABLED: bool = Field(
+        default=True, description="是否缓存 embedding 结果（进程内 LRU + Redis 两级）"
+    )
+    AI_EMBEDDING_CACHE_SIZE: int = Field(
+        default=10000, ge=0, le=1_000_000, description="进程内 LRU 层最多缓存的向量条数"
+    )
+    AI_EMBEDDING_CACHE_TTL: int = Field(
+        default=7 * 24 * 3600, ge=60, description="Redis 层向量缓存的过期秒数"
+    )
 
     AI_RERANK_API_KEY: str | None = Field(default=None)
     AI_RERANK_API_BASE: str | None = Field(default=None)
     AI_RERANK_MODEL: str | None = Field(default=None)
+    RERANK_PASSAGE_MAX_CHARS: int = Field(
+        default=2000,
+        ge=0,
+        le=100_000,
+        description="发给 rerank 的单个候选正文最大字符数，超出截断（0 = 不截断）",
+    )
+    RERANK_SCORE_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否按 (查询, chunk, rerank 配置) 缓存重排分数，已打分的候选不再发给上游",
+    )
+    RERANK_SCORE_CACHE_TTL: int = Field(
+        default=3600, ge=60, le=7 * 24 * 3600, description="重排分数缓存的过期秒数"
+    )
+    RERANK_LOCAL_EXECUTION: Literal["thread", "inline"] = Field(
+        default="thread",
+        description="本地 rerank（provider=local）推理方式：thread=专用线程池，不阻塞事件循环；inline=在事件循环中直接执行",
+    )
+    RERANK_LOCAL_THREADS: int = Field(
+        default=2, ge=1, le=32, description="本地 rerank 专用线程池大小"
+    )
+    RERANK_LOCAL_BATCH_SIZE: int = Field(
+        default=16, ge=1, le=256, description="本地 rerank 单批推理的 (query, passage) 对数"
+    )
+    RERANK_LOCAL_MAX_LENGTH: int = Field(
+        default=512,
+        ge=64,
+        le=8192,
+        description="本地 rerank 的 (query, passage) 最大 token 数，超出截断",
+    )
 
     # Agent 配置
     AGENT_MAX_ITERATIONS: int = Field(
@@ -222,12 +285,82 @@ class Settings(BaseSettings):
         le=20,
         description="摘要后保留的最近消息条数（配合 AGENT_SUMMARY_TRIGGER_MSG_COUNT 使用）",
     )
+    AGENT_TOOL_CONCURRENCY: int = Field(
+        default=4,
+        ge=1,
+        le=32,
+        description="同一步多路检索调用的并发上限（相同查询先合并，不同查询批量 embedding 后并发检索）",
+    )
+    AGENT_GRAPH_CACHE_SIZE: int = Field(
+        default=32,
+        ge=1,
+        le=1024,
+        description="进程内缓存的已编译 Agent 图数量（按 chat 配置指纹 / 模型 / temperature，LRU 淘汰）",
+    )
+    CHECKPOINT_TOOL_RESULT_MAX_CHARS: int = Field(
+        default=2000,
+        ge=0,
+        description=(
+            "轮次结束后 checkpoint 中每条工具结果保留的正文字符数（超出截断，引用元数据保留，"
+            "完整结果在聊天记录表）；0=不压缩"
+        ),
+    )
+    CHECKPOINT_KEEP_LAST: int = Field(
+        default=3,
+        ge=0,
+        description="每个会话 thread 保留的最新 checkpoint 数，更早的连同 blob / writes 删除；0=全部保留",
+    )
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS: float = Field(
+        default=3600.0,
+        ge=0,
+        description="后台 checkpoint 清理与存储统计的间隔秒数；0=关闭后台任务（不再清理旧 checkpoint）",
+    )
+    CHECKPOINT_PRUNE_BATCH_THREADS: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="后台清理每批处理的 thread 数",
+    )
+    CHECKPOINTER_BACKEND: Literal["postgres", "tiered"] = Field(
+        default="postgres",
+        description=(
+            "会话状态存储：postgres=直接读写 Postgres；tiered=活跃会话放 Redis 热层，"
+            "轮次结束及后台定期合并回写 Postgres（需 REDIS_ENABLED 且配置 REDIS_URL）"
+        ),
+    )
+    CHECKPOINT_REDIS_TTL_SECONDS: int = Field(
+        default=3600,
+        ge=60,
+        description="tiered 模式下热层会话的过期秒数，每次读写续期；过期后从 Postgres 加载",
+    )
+    CHECKPOINT_WRITEBACK_INTERVAL_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="tiered 模式下后台回写间隔秒数，回写空闲超过该时长仍未回写的会话（如进程崩溃遗留）",
+    )
     CHAT_STREAM_TIMEOUT_SECONDS: float = Field(
         default=120.0,
         ge=10.0,
         le=600.0,
         description="单次流式对话的超时秒数，超时后向客户端发送超时提示并结束流",
     )
+    CHAT_ANSWER_CACHE_THRESHOLD: float = Field(
+        default=0.95,
+        ge=0.5,
+        le=1.0,
+        description="语义答案缓存的命中阈值（问题向量余弦相似度）；仅对开启 answer_cache_enabled 的站点生效",
+    )
+    CHAT_ANSWER_CACHE_TTL: int = Field(
+        default=24 * 3600,
+        ge=60,
+        description="语义答案缓存条目的过期秒数；引用文档变更时提前失效",
+    )
+    CHAT_ANSWER_CACHE_MAX_ENTRIES: int = Field(
+        default=200,
+        ge=1,
+        le=5000,
+        description="每个站点最多保留的缓存问答条数（超出淘汰最旧的）",
+    )
     # RAG 检索配置
     RAG_RECALL_K: int = Field(
         default=50,
@@ -257,6 +390,16 @@ class Settings(BaseSettings):
         le=200,
         description="全局召回硬上限，保护性能",
     )
+    RAG_RESULT_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否缓存检索结果（召回 + 草稿过滤 + 重排后的最终列表），命中时跳过全部检索步骤",
+    )
+    RAG_RESULT_CACHE_TTL: int = Field(
+        default=300,
+        ge=1,
+        le=3600,
+        description="检索结果缓存的过期秒数；站点内文档向量化 / 发布状态变更 / 删除时会提前失效",
+    )
 
     # 文档解析服务配置 (DocProcessor)
     DOCLING_NAME: str = Field(default="Docling")
@@ -288,6 +431,102 @@ class Settings(BaseSettings):
         pattern="^(postgres|elasticsearch)$",
         description="向量存储引擎类型：postgres | elasticsearch",
     )
+    VECTOR_INGEST_MAX_IN_FLIGHT: int = Field(
+        default=2,
+        ge=1,
+        description="向量写入流水线中已 embedding 待写入的最大批次数（限制大文档写入的内存占用）",
+    )
+    VECTOR_SCAN_PAGE_SIZE: int = Field(
+        default=500,
+        ge=1,
+        le=10000,
+        description="按 metadata 流式读取 chunk 时每页条数（PG 服务端游标 / ES PIT + search_after）",
+    )
+
+    # PGVector ANN 索引配置（仅 VECTOR_STORE_TYPE=postgres 时生效）
+    PG_VECTOR_INDEX_TYPE: str = Field(
+        default="hnsw",
+        pattern="^(hnsw|ivfflat|none)$",
+        description="embedding 列 ANN 索引类型：hnsw | ivfflat | none（none=精确扫描）",
+    )
+    PG_HNSW_M: int = Field(default=16, ge=2, le=100, description="HNSW 每层最大连接数")
+    PG_HNSW_EF_CONSTRUCTION: int = Field(
+        default=64, ge=4, le=1000, description="HNSW 建图候选列表大小，越大召回越高、建索引越慢"
+    )
+    PG_HNSW_EF_SEARCH: int = Field(
+        default=100,
+        ge=1,
+        le=1000,
+        description="HNSW 查询候选列表大小（查询时取 max(ef_search, k)）",
+    )
+    PG_IVFFLAT_LISTS: int = Field(
+        default=100, ge=1, le=32768, description="IVFFlat 聚类中心数，建议约 rows/1000"
+    )
+    PG_IVFFLAT_PROBES: int = Field(
+        default=10, ge=1, le=32768, description="IVFFlat 查询探测的聚类数，越大召回越高"
+    )
+    PG_VECTOR_PRECISION: Literal["full", "halfvec", "binary"] = Field(
+        default="full",
+        description=(
+            "ANN 索引精度：full（vector）| halfvec（半精度，索引约减半）| binary（二值量化，"
+            "索引约 1/32，需 pgvector>=0.7）。embedding 列始终保存原始向量，量化模式下先按"
+            "量化距离取候选再按原始向量重排；修改后调用索引重建生效"
+        ),
+    )
+    PG_VECTOR_RESCORE_OVERSAMPLE: int = Field(
+        default=4,
+        ge=1,
+        le=100,
+        description="量化索引的候选倍数：先取 k × 该值个候选，再按原始向量距离截断为 k",
+    )
+    PG_VECTOR_PREFIX_DIMENSION: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Matryoshka 前缀维度：>0 时 ANN 索引只建在 embedding 的前 N 维上（粗排），候选再按"
+            "完整向量重排；仅适用于支持截断的 embedding 模型。0=关闭。修改后需重建索引"
+        ),
+    )
+    PG_BULK_COPY_THRESHOLD: int = Field(
+        default=1000,
+        ge=0,
+        description="单次写入块数达到该值时改用 COPY 批量导入（0=仅显式指定时使用）",
+    )
+    PG_BULK_COPY_BATCH_SIZE: int = Field(
+        default=1000,
+        ge=1,
+        description="COPY 批量导入每个事务写入的块数",
+    )
+    PG_HYBRID_SEARCH: bool = Field(
+        default=True, description="PG 检索是否启用全文（tsvector）+ 向量混合召回"
+    )
+    PG_TEXT_SEARCH_CONFIG: str = Field(
+        default="auto",
+        pattern="^[a-z_][a-z0-9_]*$",
+        description=(
+            "全文检索分词配置：auto（依次探测 jiebacfg / zhparser / chinese，均无则 simple）"
+            "或指定 pg_ts_config 名称；仅在首次创建 tsvector 列时生效"
+        ),
+    )
+    PG_HYBRID_FUSION: str = Field(
+        default="rrf",
+        pattern="^(rrf|weighted)$",
+        description="混合召回融合方式：rrf（排名倒数融合）| weighted（加权分数）",
+    )
+    PG_HYBRID_VECTOR_WEIGHT: float = Field(
+        default=0.7,
+        ge=0.0,
+        le=1.0,
+        description="weighted 融合时向量相似度的权重，全文得分权重为 1 - 该值",
+    )
+    PG_VECTOR_PARTITION_MODE: str = Field(
+        default="none",
+        pattern="^(none|tenant|tenant_site)$",
+        description=(
+            "向量表分区方式：none | tenant（按 tenant_id LIST 分区）| tenant_site"
+            "（再按 site_id 子分区）；仅对新建表生效，已有表用 scripts/migrate_vector_partitions.py 迁移"
+        ),
+    )
 
     # Elasticsearch 连接配置
     ES_URL: str = Field(default="http://localhost:9200", description="Elasticsearch 服务地址")
@@ -296,6 +535,68 @@ class Settings(BaseSettings):
     ES_API_KEY: str | None = Field(default=None, description="ES API Key 认证（优先于 Basic Auth）")
     ES_CA_CERTS: str | None = Field(default=None, description="ES TLS CA 证书路径")
     ES_VERIFY_CERTS: bool = Field(default=True, description="是否验证 ES TLS 证书")
+    ES_VECTOR_INDEX_TYPE: Literal["default", "hnsw", "int8_hnsw", "int4_hnsw", "bbq_hnsw"] = Field(
+        default="default",
+        description=(
+            "dense_vector 的 index_options.type：default 使用 ES 版本默认值；int8 / int4 / "
+            "bbq 为量化 HNSW（bbq 需 ES 8.18+ 且维度 >= 64）。只对新建索引生效，"
+            "已有索引通过蓝绿重建切换"
+        ),
+    )
+    ES_VECTOR_RESCORE_OVERSAMPLE: float = Field(
+        default=0,
+        ge=0,
+        description="kNN 量化候选按原始向量重排的过采样倍数（rescore_vector，需 ES 8.18+；0=关闭）",
+    )
+    ES_VECTOR_PREFIX_DIMENSION: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Matryoshka 前缀维度：>0 时新建索引额外写入 vector_prefix（前 N 维）并只对其建 HNSW，"
+            "kNN 粗排后按完整向量 rescore。只对新建索引生效"
+        ),
+    )
+    ES_VECTOR_PREFIX_OVERSAMPLE: int = Field(
+        default=4,
+        ge=1,
+        le=100,
+        description="前缀粗排的候选倍数：先取 k × 该值个候选，再按完整向量重排",
+    )
+
+    # Elasticsearch 弹性策略（读 / 写分开重试；熔断器在同一进程内共享）
+    ES_READ_BUDGET_SECONDS: float = Field(
+        default=2.0,
+        gt=0,
+        description="检索类读请求（knn / bm25 / msearch / mget）含重试的总耗时预算（秒）",
+    )
+    ES_WRITE_RETRY_BASE_DELAY: float = Field(
+        default=1.0, gt=0, description="写请求（bulk / *_by_query）重试的初始退避（秒）"
+    )
+    ES_HEDGE_READS: bool = Field(
+        default=False,
+        description=(
+            "读请求对冲：超过近期 p95 耗时仍未返回时再发一份请求（经连接池落到另一节点），"
+            "取先返回者；ES_URL 配置多个节点时才有意义"
+        ),
+    )
+    ES_BREAKER_WINDOW_SECONDS: float = Field(
+        default=30.0, gt=0, description="熔断器统计错误率 / 慢调用率的滑动窗口（秒）"
+    )
+    ES_BREAKER_MIN_CALLS: int = Field(
+        default=20, ge=1, description="窗口内调用数达到该值才评估是否熔断"
+    )
+    ES_BREAKER_FAILURE_RATE: float = Field(
+        default=0.5, gt=0, le=1, description="窗口内错误率达到该值即熔断"
+    )
+    ES_BREAKER_SLOW_CALL_SECONDS: float = Field(
+        default=1.5, gt=0, description="读请求耗时超过该值计为慢调用"
+    )
+    ES_BREAKER_SLOW_CALL_RATE: float = Field(
+        default=0.8, gt=0, le=1, description="窗口内慢调用率达到该值即熔断"
+    )
+    ES_BREAKER_RECOVERY_SECONDS: float = Field(
+        default=30.0, gt=0, description="熔断后多久进入半开状态放行一个探测请求（秒）"
+    )
 
     # 文件上传配置
     UPLOAD_MAX_SIZE: int = Field(
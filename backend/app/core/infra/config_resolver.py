@@ -82,6 +82,9 @@ class ConfigResolver:
             "dimension": config.get("dimension"),
             "extra_body": config.get("extra_body"),
         }
+        # 只在开启时计入：不改变既有配置的指纹（embedding 缓存 / chunk hash 不失效）
+        if config.get("matryoshka"):
+            identity_parts["matryoshka"] = True
         identity_str = json.dumps(identity_parts, sort_keys=True)
         return hashlib.md5(identity_str.encode()).hexdigest()
 
@@ -264,6 +267,10 @@ class ConfigResolver:
         if not enabled and section not in ["chat", "embedding"]:
             return
 
+        # 本地 rerank 在进程内推理，不需要 API Key
+        if section == "rerank" and config.get("provider") == "local":
+            return
+
         if mode == "custom" and not api_key:
             type_display = {
                 "chat": "模型对话",
@@ -0,0 +1,230 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Postgres 连接池统一统计
+
+一个 API 进程最多有三个独立的 Postgres 连接池：
+1. ``app``: 业务 SQLAlchemy 引擎（db/database.py）
+2. ``vector``: pgvector 驱动自己的 SQLAlchemy 引擎（PostgresDriver._init_engine）
+3. ``checkpointer``: LangGraph checkpointer 的 psycopg 连接池
+
+两类池都通过子类在"取连接"处计时（SQLAlchemy 的 ``_do_get`` / psycopg 的 ``getconn``），
+记录正在等待的请求数与等待耗时直方图；``pool_stats()`` 汇总各池占用与单进程连接上限，
+供 admin system-info 对照 ``max_connections`` 规划 worker 数。
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from typing import Any
+
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.infra.config import settings
+
+# 等待耗时直方图桶上界（毫秒），最后一个桶为 +Inf
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """单个连接池的取连接等待统计"""
+
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.acquired = 0
+        self.failures = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def begin(self) -> float:
+        self.waiting += 1
+        return time.perf_counter()
+
+    def end(self, start: float, ok: bool) -> None:
+        self.waiting -= 1
+        wait_ms = (time.perf_counter() - start) * 1000
+        if not ok:
+            self.failures += 1
+            return
+        self.acquired += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.buckets[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def stats(self) -> dict[str, Any]:
+        labels = [f"le_{b}ms" for b in WAIT_BUCKETS_MS] + ["le_inf"]
+        return {
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "failures": self.failures,
+            "avg_wait_ms": round(self.total_wait_ms / self.acquired, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "wait_histogram": dict(zip(labels, self.buckets, strict=True)),
+        }
+
+
+# name -> (等待统计, 返回 {max, in_use, ...} 的占用快照函数)
+_pools: dict[str, tuple[PoolMetrics, Callable[[], dict[str, int]]]] = {}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# SQLAlchemy 引擎
+# ──────────────────────────────────────────────────────────────────────
+
+
+class MeteredAsyncPool(AsyncAdaptedQueuePool):
+    """在 ``_do_get`` 处计时的 QueuePool，经 ``create_async_engine(poolclass=...)`` 使用。"""
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        start, ok = self.metrics.begin(), False
+        try:
+            entry = super()._do_get()
+            ok = True
+            return entry
+        finally:
+            self.metrics.end(start, ok)
+
+    def recreate(self):
+        # engine.dispose() 会重建池，统计沿用
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def register_engine(name: str, engine: AsyncEngine) -> None:
+    """登记 SQLAlchemy 引擎（需以 ``poolclass=MeteredAsyncPool`` 创建才有等待统计）。"""
+    metrics = PoolMetrics()
+    pool = engine.sync_engine.pool
+    if isinstance(pool, MeteredAsyncPool):
+        pool.metrics = metrics
+
+    def usage() -> dict[str, int]:
+        current = engine.sync_engine.pool  # dispose 后是新池
+        return {
+            "max": current.size() + max(current._max_overflow, 0),
+            "open": current.checkedin() + current.checkedout(),
+            "in_use": current.checkedout(),
+            "idle": current.checkedin(),
+        }
+
+    _pools[name] = (metrics, usage)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# psycopg 连接池
+# ──────────────────────────────────────────────────────────────────────
+
+
+class MeteredConnectionPool(AsyncConnectionPool):
+    """在 ``getconn`` 处计时的 psycopg 连接池（``pool.connection()`` 也经过它）。"""
+
+    metrics: PoolMetrics | None = None
+
+    async def getconn(self, timeout: float | None = None):
+        if self.metrics is None:
+            return await super().getconn(timeout)
+        start, ok = self.metrics.begin(), False
+        try:
+            conn = await super().getconn(timeout)
+            ok = True
+            return conn
+        finally:
+            self.metrics.end(start, ok)
+
+
+def register_psycopg_pool(name: str, pool: AsyncConnectionPool) -> None:
+    metrics = PoolMetrics()
+    if isinstance(pool, MeteredConnectionPool):
+        pool.metrics = metrics
+
+    def usage() -> dict[str, int]:
+        stats = pool.get_stats()
+        size, available = stats.get("pool_size", 0), stats.get("pool_available", 0)
+        return {
+            "max": pool.max_size,
+            "open": size,
+            "in_use": size - available,
+            "idle": available,
+        }
+
+    _pools[name] = (metrics, usage)
+
+
+def unregister_pool(name: str) -> None:
+    _pools.pop(name, None)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# 汇总
+# ──────────────────────────────────────────────────────────────────────
+
+
+def pool_stats() -> dict[str, Any]:
+    """各池占用 + 等待统计，以及本进程的连接上限合计。"""
+    pools = {name: {**usage(), **metrics.stats()} for name, (metrics, usage) in _pools.items()}
+    return {
+        "pools": pools,
+        "process_max_connections": sum(p["max"] for p in pools.values()),
+        "process_open_connections": sum(p["open"] for p in pools.values()),
+        "process_in_use": sum(p["in_use"] for p in pools.values()),
+        "process_waiting": sum(p["waiting"] for p in pools.values()),
+    }
+
+
+def configured_limits() -> dict[str, int]:
+    """按配置计算各池连接上限（vector 引擎懒加载，未创建时也计入）。"""
+    sqlalchemy_max = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    limits = {"app": sqlalchemy_max}
+    if settings.VECTOR_STORE_TYPE == "postgres":
+        limits["vector"] = sqlalchemy_max
+    # 与 init_checkpointer_pool 一致：min > max 时池按 min 打开
+    limits["checkpointer"] = max(
+        settings.CHECKPOINTER_POOL_MAX_SIZE, settings.CHECKPOINTER_POOL_MIN_SIZE
+    )
+    return limits
+
+
+def connection_budget(server_max_connections: int, reserved_connections: int = 0) -> dict[str, Any]:
+    """按本进程连接上限估算 ``max_connections`` 能容纳的 worker 数。"""
+    limits = configured_limits()
+    per_process = sum(limits.values())
+    available = max(server_max_connections - reserved_connections, 0)
+    return {
+        "server_max_connections": server_max_connections,
+        "reserved_connections": reserved_connections,
+        "per_process_limits": limits,
+        "per_process_max": per_process,
+        "max_workers": available // per_process if per_process else 0,
+    }
+
+
+__all__ = [
+    "MeteredAsyncPool",
+    "MeteredConnectionPool",
+    "PoolMetrics",
+    "configured_limits",
+    "connection_budget",
+    "pool_stats",
+    "register_engine",
+    "register_psycopg_pool",
+    "unregister_pool",
+]
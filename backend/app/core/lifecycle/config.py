@@ -84,6 +84,7 @@ async def sync_ai_config_to_db():
                 "api_key": settings.AI_EMBEDDING_API_KEY or "",
                 "base_url": settings.AI_EMBEDDING_API_BASE or "",
                 "dimension": settings.AI_EMBEDDING_DIMENSION,
+                "matryoshka": settings.AI_EMBEDDING_MATRYOSHKA,
                 "mode": "custom",
             },
             "rerank": {
@@ -59,6 +59,16 @@ class LifecycleManager:
         except Exception as e:
             logger.warning(f"⚠️ [Lifecycle] Checkpointer table setup failed: {e}")
 
+        # 3.5 后台 checkpoint 清理（CHECKPOINT_PRUNE_INTERVAL_SECONDS=0 时不启动）
+        from app.core.ai.graph.compaction import start_checkpoint_sweeper
+
+        start_checkpoint_sweeper()
+
+        # 3.6 Redis 热层后台回写（仅 CHECKPOINTER_BACKEND=tiered）
+        from app.core.ai.graph.checkpointer import start_checkpoint_writeback
+
+        start_checkpoint_writeback()
+
         # 4. 初始化核心管理器
         # VectorStore 现在采用懒加载策略，首次检索时自动初始化
         pass
@@ -108,10 +118,18 @@ class LifecycleManager:
         # 2. 关闭向量存储管理器
         await close_vector_store()
 
-        # 3. 关闭 Checkpointer 连接池
+        # 3. 停止 checkpoint 清理任务并关闭 Checkpointer 连接池
+        from app.core.ai.graph.compaction import stop_checkpoint_sweeper
+
+        await stop_checkpoint_sweeper()
         try:
-            from app.core.ai.graph.checkpointer import close_checkpointer_pool
+            from app.core.ai.graph.checkpointer import (
+                close_checkpointer_pool,
+                stop_checkpoint_writeback,
+            )
 
+            # 先把热层未回写的会话写回 Postgres，再关闭连接池
+            await stop_checkpoint_writeback()
             await close_checkpointer_pool()
         except Exception as e:
             logger.warning(f"⚠️ [Lifecycle] Checkpointer pool close failed: {e}")
@@ -19,6 +19,7 @@ from arq import func
 from app.core.infra.config import settings
 from app.core.queue.redis import redis_settings
 from app.worker.document_tasks import process_import_parsing, process_vectorize
+from app.worker.vector_tasks import process_vector_reindex
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +51,12 @@ class WorkerSettings:
     functions = [
         func(process_import_parsing, name="process_import_parsing"),
         func(process_vectorize, name="process_vectorize"),
+        # 全库回填耗时远超普通任务；中断后由 task.result 中的断点续跑
+        func(
+            process_vector_reindex,
+            name="process_vector_reindex",
+            timeout=settings.VECTOR_REINDEX_JOB_TIMEOUT,
+        ),
     ]
     redis_settings = redis_settings
     on_startup = startup
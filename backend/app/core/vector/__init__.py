@@ -3,7 +3,7 @@
 # Licensed under the CatWiki Open Source License (Modified Apache 2.0);
 # you may not use this file except in compliance with the License.
 
-from app.core.vector.driver.base import DriverSearchResult, VectorChunk
+from app.core.vector.driver.base import DriverSearchResult, SearchOptions, VectorChunk
 from app.core.vector.exceptions import (
     VectorStoreAuthError,
     VectorStoreBulkWriteError,
@@ -34,6 +34,7 @@ __all__ = [
     "close_vector_store",
     "VectorChunk",
     "DriverSearchResult",
+    "SearchOptions",
     "VectorStoreError",
     "VectorStoreConnectionError",
     "VectorStoreAuthError",
@@ -5,15 +5,32 @@
 
 """向量存储驱动抽象接口 — 纯存储，不参与 embedding 配置解析"""
 
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Awaitable, Callable
 from typing import Any, TypedDict
 
 from langchain_core.documents import Document as LangChainDocument
 
+logger = logging.getLogger(__name__)
+
+# 检索过滤条件（search 的 metadata_filter）：值为标量时按相等匹配；值为 list 时匹配其中
+# 任一值，list 中的 None 表示"该字段缺失"（如尚未回填 status 的旧 chunk）
 ALLOWED_FILTER_KEYS: frozenset[str] = frozenset(
-    ["source", "id", "site_id", "collection_id", "tenant_id", "chunk_index"]
+    ["source", "id", "site_id", "collection_id", "tenant_id", "chunk_index", "status"]
 )
 
+# chunk 身份字段：由切分 / 向量化决定，不允许经 metadata patch 改写
+IMMUTABLE_METADATA_KEYS: frozenset[str] = frozenset(["id", "chunk_index", "content_hash"])
+
+
+def check_metadata_patch(patch: dict[str, Any]) -> None:
+    """校验 metadata patch 的键：禁止改写身份字段，键名须为普通标识符。"""
+    for key in patch:
+        if key in IMMUTABLE_METADATA_KEYS or not key.isidentifier():
+            raise ValueError(f"Metadata key cannot be patched: {key!r}")
+
 
 class VectorChunk(TypedDict):
     id: str
@@ -27,6 +44,99 @@ class DriverSearchResult(TypedDict):
     score_comparable: bool  # True=余弦相似度可与阈值比; False=排名得分无绝对意义
 
 
+class SearchOptions(TypedDict, total=False):
+    """单次查询的 ANN 调优参数；未给出的键使用引擎侧配置默认值。"""
+
+    ef_search: int  # PG HNSW: hnsw.ef_search
+    probes: int  # PG IVFFlat: ivfflat.probes
+    num_candidates: int  # ES kNN: num_candidates
+
+
+class PrecomputedQuery:
+    """把已算好的查询向量包装成 ``aembed_query`` 接口，让 ``search`` 跳过 embedding。"""
+
+    def __init__(self, vector: list[float]):
+        self._vector = vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self._vector
+
+
+async def embed_missing(
+    documents: list[LangChainDocument],
+    embeddings: Any,
+    vectors: list[list[float] | None] | None = None,
+) -> list[list[float]]:
+    """Embed only documents without a precomputed vector (None / missing entry)."""
+    if vectors is None:
+        return await embeddings.aembed_documents([doc.page_content for doc in documents])
+    todo = [i for i, vector in enumerate(vectors) if vector is None]
+    result = list(vectors)
+    if todo:
+        fresh = await embeddings.aembed_documents([documents[i].page_content for i in todo])
+        for i, vector in zip(todo, fresh, strict=True):
+            result[i] = vector
+    return result
+
+
+# 写入回调：(文档, ID, 向量) -> 写入失败的 ID 列表
+BatchWriter = Callable[
+    [list[LangChainDocument], list[str], list[list[float]]], Awaitable[list[str]]
+]
+
+_PIPELINE_DONE = object()
+
+
+async def run_ingest_pipeline(
+    documents: list[LangChainDocument],
+    ids: list[str],
+    embeddings: Any,
+    write_batch: BatchWriter,
+    batch_size: int = 100,
+    vectors: list[list[float] | None] | None = None,
+    max_in_flight: int | None = None,
+) -> list[str]:
+    """有界生产者 / 消费者写入流水线，返回写入失败的 ID。
+
+    生产者逐批 embedding，消费者逐批写库：第 N 批写入时第 N+1 批已在 embedding。
+    队列上限 max_in_flight（默认 VECTOR_INGEST_MAX_IN_FLIGHT）限制已 embedding 未写入的批次，
+    超大文档的向量内存占用因此与总块数无关。embedding 异常直接抛出并终止流水线；
+    write_batch 自行处理可恢复的写入错误并返回失败 ID，抛出的异常同样终止流水线。
+    """
+    if max_in_flight is None:
+        from app.core.infra.config import settings
+
+        max_in_flight = settings.VECTOR_INGEST_MAX_IN_FLIGHT
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_in_flight))
+
+    async def produce() -> None:
+        try:
+            for i in range(0, len(documents), batch_size):
+                batch_docs = documents[i : i + batch_size]
+                batch_vectors = await embed_missing(
+                    batch_docs, embeddings, vectors[i : i + batch_size] if vectors else None
+                )
+                await queue.put((batch_docs, ids[i : i + batch_size], batch_vectors))
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_PIPELINE_DONE)
+
+    failed_ids: list[str] = []
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not _PIPELINE_DONE:
+            if isinstance(item, Exception):
+                raise item
+            failed_ids.extend(await write_batch(*item))
+    finally:
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+    return failed_ids
+
+
 class VectorDriver(ABC):
     @abstractmethod
     async def ensure_schema(self, dimension: int) -> None:
@@ -39,7 +149,13 @@ class VectorDriver(ABC):
         ids: list[str],
         embeddings: Any,
         batch_size: int = 100,
-    ) -> list[str]: ...
+        vectors: list[list[float] | None] | None = None,
+        bulk: bool | None = None,
+    ) -> list[str]:
+        """写入 / 覆盖文档；vectors 中给出的向量直接复用，仅对 None 项调用 embedding。
+
+        bulk 选择驱动的批量导入路径（如 PG 的 COPY）；None 时由驱动按数据量自动决定。
+        """
 
     @abstractmethod
     async def search(
@@ -48,8 +164,26 @@ class VectorDriver(ABC):
         embeddings: Any,
         k: int,
         metadata_filter: dict | None,
+        options: SearchOptions | None = None,
     ) -> list[DriverSearchResult]: ...
 
+    async def search_many(
+        self,
+        queries: list[str],
+        query_vectors: list[list[float]],
+        k: int,
+        metadata_filter: dict | None,
+        options: SearchOptions | None = None,
+    ) -> list[list[DriverSearchResult]]:
+        """多个查询共用一次往返检索，结果与 queries 一一对应。
+
+        query_vectors 由调用方批量预先计算。默认实现：逐条调用 ``search``。
+        """
+        return [
+            await self.search(query, PrecomputedQuery(vector), k, metadata_filter, options)
+            for query, vector in zip(queries, query_vectors, strict=True)
+        ]
+
     @abstractmethod
     async def delete_by_ids(self, ids: list[str]) -> None: ...
 
@@ -57,10 +191,74 @@ class VectorDriver(ABC):
     async def delete_by_filter(self, key: str, value: str | int) -> None: ...
 
     @abstractmethod
-    async def get_by_filter(self, key: str, value: str | int) -> list[VectorChunk]: ...
+    def iter_by_filter(
+        self, key: str, value: str | int, page_size: int | None = None
+    ) -> AsyncIterator[VectorChunk]:
+        """按 chunk_index 顺序流式读取匹配的 chunk，每次只从后端取一页（不设总量上限）。
+
+        page_size 缺省为 VECTOR_SCAN_PAGE_SIZE。错误直接抛出。
+        """
+
+    async def get_by_filter(self, key: str, value: str | int) -> list[VectorChunk]:
+        """一次性读取全部匹配 chunk；读取失败记录日志并返回空列表。"""
+        try:
+            return [chunk async for chunk in self.iter_by_filter(key, value)]
+        except Exception as e:
+            logger.error(f"[{type(self).__name__}] get_by_filter failed: {e}", exc_info=True)
+            return []
+
+    @abstractmethod
+    async def update_metadata_by_filter(
+        self, key: str, value: str | int, patch: dict[str, Any]
+    ) -> int:
+        """把 patch 浅合并进匹配 chunk 的 metadata（正文 / 向量不动），返回更新的 chunk 数。
+
+        用于标题 / 摘要 / 标签 / 分类 / 发布状态等变更，不触发重新向量化。
+        """
+
+    async def get_vectors(self, ids: list[str]) -> dict[str, list[float]]:
+        """按 ID 取已存储的向量（用于增量向量化复用）。默认实现：不支持，返回空。"""
+        return {}
 
     @abstractmethod
     async def ping(self) -> bool: ...
 
+    async def index_status(self, recall_sample: int = 0) -> dict[str, Any]:
+        """返回 ANN 索引状态；recall_sample>0 时抽样估算 recall@k。默认实现：不受管。"""
+        return {"managed": False}
+
+    async def rebuild_index(self) -> dict[str, Any]:
+        """在线重建 ANN 索引（不阻塞读写）。默认实现：不支持。"""
+        raise NotImplementedError(f"{type(self).__name__} does not support index rebuild")
+
+    # ── 蓝绿重建（影子表 / 影子索引）──────────────────────────────────────
+    # 影子存储与在线存储共享连接，由在线驱动持有；调用方不要 close() 影子驱动。
+
+    async def storage_generation(self) -> str | None:
+        """在线存储的身份标识（PG 表 OID / ES 别名指向的物理索引）；切换后随之变化。"""
+        return None
+
+    async def get_embedding_pins(self) -> dict[str, dict[str, Any]]:
+        """在线存储记录的各租户向量空间 ``{租户: {model, dimension, hash}}``。默认实现：不记录。"""
+        return {}
+
+    async def set_embedding_pins(self, pins: dict[str, dict[str, Any]]) -> None:
+        """覆盖写入向量空间记录；随存储一起切换（PG 表注释 / ES 索引 ``_meta``）。"""
+
+    async def open_shadow(self, dimension: int) -> "VectorDriver":
+        """创建（或续用同维度的）影子存储并返回指向它的驱动。默认实现：不支持。"""
+        raise NotImplementedError(f"{type(self).__name__} does not support blue/green re-index")
+
+    async def get_shadow(self) -> "VectorDriver | None":
+        """返回进行中的影子存储；没有时为 None。"""
+        return None
+
+    async def promote_shadow(self) -> dict[str, Any]:
+        """原子地把影子存储切换为在线存储；旧存储保留到下一次重建。"""
+        raise NotImplementedError(f"{type(self).__name__} does not support blue/green re-index")
+
+    async def drop_shadow(self) -> None:
+        """放弃进行中的重建，删除影子存储。"""
+
     @abstractmethod
     async def close(self) -> None: ...
@@ -7,7 +7,8 @@
 
 索引策略：单一索引 catwiki_documents，依靠 metadata.tenant_id 实现逻辑隔离。
 搜索策略：KNN + BM25 并行查询，Python 侧 RRF 合并（Basic License 兼容）。
-弹性策略：所有 ES 操作经由 CircuitBreaker + retry_on_transient 保护。
+弹性策略：所有 ES 操作经由共享 CircuitBreaker + retry_on_transient 保护；读请求快速重试、
+          有总耗时预算并可对冲，写请求慢退避。
 
 重要约束：
 - flattened 类型将所有 metadata 叶子值以 keyword string 存储，_build_es_filter
@@ -19,7 +20,9 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import re
 import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from typing import TYPE_CHECKING, Any
 
 from langchain_core.documents import Document as LangChainDocument
@@ -27,16 +30,20 @@ from langchain_core.documents import Document as LangChainDocument
 from app.core.vector.driver.base import (
     ALLOWED_FILTER_KEYS,
     DriverSearchResult,
+    SearchOptions,
     VectorChunk,
     VectorDriver,
+    check_metadata_patch,
+    run_ingest_pipeline,
 )
 from app.core.vector.exceptions import (
     VectorStoreBulkWriteError,
     VectorStoreConnectionError,
     VectorStoreDimensionError,
+    VectorStoreError,
     VectorStoreSchemaError,
 )
-from app.core.vector.retry import CircuitBreaker, RetryPolicy, retry_on_transient
+from app.core.vector.retry import RetryPolicy, get_circuit_breaker, hedged, retry_on_transient
 
 if TYPE_CHECKING:
     from elasticsearch import AsyncElasticsearch
@@ -46,16 +53,16 @@ logger = logging.getLogger(__name__)
 _RRF_K = 60  # RRF ranking constant — higher values average scores more, typically 60
 _TOP_LEVEL_FIELDS: frozenset[str] = frozenset({"chunk_index", "summary", "tags"})
 
-# Retry policy for ES: also retry on 429 (rate limit) and 503 (shard not ready)
-_ES_RETRY_POLICY = RetryPolicy(
-    max_attempts=4,
-    retryable_http_statuses=frozenset({429, 503}),
-    base_delay=5.0,
-    max_delay=30.0,
-    backoff_factor=2.0,
-    jitter=True,
+# update_by_query 脚本：summary / tags 是顶层全文字段，其余键写入 flattened metadata
+_METADATA_PATCH_SCRIPT = (
+    "if (ctx._source.metadata == null) { ctx._source.metadata = [:]; } "
+    "for (e in params.meta.entrySet()) { ctx._source.metadata[e.getKey()] = e.getValue(); } "
+    "for (e in params.top.entrySet()) { ctx._source[e.getKey()] = e.getValue(); }"
 )
 
+_RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+_BREAKER_NAME = "ESVectorStore"
+
 
 class ElasticsearchDriver(VectorDriver):
     """Pure-storage Elasticsearch driver.
@@ -63,6 +70,8 @@ class ElasticsearchDriver(VectorDriver):
     Args:
         index_name: ES index name (default: catwiki_documents).
         es_client:  Inject a pre-built AsyncElasticsearch for testing; production leaves None.
+        index_type: dense_vector ``index_options.type`` for indices this driver creates
+                    (default: ES_VECTOR_INDEX_TYPE).
     """
 
     def __init__(
@@ -70,11 +79,17 @@ class ElasticsearchDriver(VectorDriver):
         index_name: str = "catwiki_documents",
         *,
         es_client: AsyncElasticsearch | None = None,
+        index_type: str | None = None,
     ) -> None:
         self.index_name = index_name
+        self._index_type = index_type
         self._es_client: AsyncElasticsearch | None = es_client
         self._lock = asyncio.Lock()
-        self._circuit_breaker = CircuitBreaker(name="ESVectorStore")
+        # vector_prefix 字段的维度（Matryoshka 前缀粗排），读到映射前为 None，0 表示没有
+        self._prefix_dims: int | None = None
+        self._init_resilience()
+        # 蓝绿重建中的影子索引驱动（共享 client）
+        self._shadow: ElasticsearchDriver | None = None
 
     # ──────────────────────────────────────────────────────────────────────
     # Client initialisation
@@ -85,7 +100,8 @@ class ElasticsearchDriver(VectorDriver):
 
         from app.core.infra.config import settings
 
-        kwargs: dict[str, Any] = {"hosts": [settings.ES_URL]}
+        hosts = [h.strip() for h in settings.ES_URL.split(",") if h.strip()]
+        kwargs: dict[str, Any] = {"hosts": hosts}
 
         if settings.ES_API_KEY:
             kwargs["api_key"] = settings.ES_API_KEY
@@ -112,11 +128,92 @@ class ElasticsearchDriver(VectorDriver):
                 except Exception as e:
                     raise VectorStoreConnectionError(f"ES client init failed: {e}") from e
 
+    def _init_resilience(self) -> None:
+        """读 / 写重试策略与熔断器；熔断器按名称进程内共享（在线与影子索引同一个 ES）。"""
+        from app.core.infra.config import settings
+
+        # 读：检索在请求路径上，几十毫秒起步快速重试，整体不超过预算
+        self._read_policy = RetryPolicy(
+            max_attempts=3,
+            retryable_http_statuses=_RETRYABLE_STATUSES,
+            base_delay=0.05,
+            max_delay=0.5,
+            budget=settings.ES_READ_BUDGET_SECONDS,
+        )
+        # 写：后台向量化，给集群留出恢复时间
+        self._write_policy = RetryPolicy(
+            max_attempts=4,
+            retryable_http_statuses=_RETRYABLE_STATUSES,
+            base_delay=settings.ES_WRITE_RETRY_BASE_DELAY,
+            max_delay=30.0,
+        )
+        self._circuit_breaker = get_circuit_breaker(
+            _BREAKER_NAME,
+            window=settings.ES_BREAKER_WINDOW_SECONDS,
+            min_calls=settings.ES_BREAKER_MIN_CALLS,
+            failure_rate=settings.ES_BREAKER_FAILURE_RATE,
+            slow_call_rate=settings.ES_BREAKER_SLOW_CALL_RATE,
+            recovery_timeout=settings.ES_BREAKER_RECOVERY_SECONDS,
+        )
+
+    async def _read(
+        self, coro_factory: Callable[[], Awaitable[Any]], operation: str, *, hedge: bool = True
+    ) -> Any:
+        """读请求：快速重试 + 耗时预算，计入慢调用统计；开启对冲时超过 p95 再发一份。
+
+        ``hedge=False`` 用于会在服务端创建资源的请求（如 open_point_in_time）：对冲落选的
+        那份结果被丢弃或中途取消，其资源无人释放。
+        """
+        from app.core.infra.config import settings
+
+        hedge_delay = (
+            self._circuit_breaker.latency_quantile(0.95)
+            if settings.ES_HEDGE_READS and hedge
+            else None
+        )
+        return await self._circuit_breaker.call(
+            lambda: retry_on_transient(
+                lambda: hedged(coro_factory, hedge_delay),
+                policy=self._read_policy,
+                operation=operation,
+            ),
+            operation=operation,
+            slow_call_threshold=settings.ES_BREAKER_SLOW_CALL_SECONDS,
+        )
+
+    async def _write(self, coro_factory: Callable[[], Awaitable[Any]], operation: str) -> Any:
+        """写请求：指数退避重试；耗时与数据量相关，不计入慢调用。"""
+        return await self._circuit_breaker.call(
+            lambda: retry_on_transient(
+                coro_factory, policy=self._write_policy, operation=operation
+            ),
+            operation=operation,
+        )
+
     # ──────────────────────────────────────────────────────────────────────
     # Index maintenance
     # ──────────────────────────────────────────────────────────────────────
 
     async def _create_index(self, dimension: int) -> None:
+        from app.core.infra.config import settings
+
+        vector_mapping: dict[str, Any] = {
+            "type": "dense_vector",
+            "dims": dimension,
+            "index": True,
+            "similarity": "cosine",
+        }
+        index_type = self._index_type or settings.ES_VECTOR_INDEX_TYPE
+        if index_type != "default":
+            vector_mapping["index_options"] = {"type": index_type}
+        prefix = settings.ES_VECTOR_PREFIX_DIMENSION
+        extra_properties: dict[str, Any] = {}
+        if 0 < prefix < dimension:
+            # HNSW 只建在前缀上；完整向量不建图，只存 doc values 供 rescore 精确打分
+            extra_properties["vector_prefix"] = {**vector_mapping, "dims": prefix}
+            vector_mapping = {"type": "dense_vector", "dims": dimension, "index": False}
+        else:
+            prefix = 0
         try:
             await self._es_client.indices.create(
                 index=self.index_name,
@@ -144,18 +241,18 @@ class ElasticsearchDriver(VectorDriver):
                             "analyzer": "ik_max_word",
                             "search_analyzer": "ik_smart",
                         },
-                        "vector": {
-                            "type": "dense_vector",
-                            "dims": dimension,
-                            "index": True,
-                            "similarity": "cosine",
-                        },
+                        "vector": vector_mapping,
+                        **extra_properties,
                         "chunk_index": {"type": "integer"},
                         "metadata": {"type": "flattened"},
                     }
                 },
             )
-            logger.info(f"[ES] Index created: {self.index_name} (dim={dimension})")
+            self._prefix_dims = prefix
+            logger.info(
+                f"[ES] Index created: {self.index_name} (dim={dimension}, "
+                f"index_type={index_type}, prefix={prefix or '-'})"
+            )
         except Exception as e:
             if "resource_already_exists_exception" in str(e).lower():
                 return
@@ -164,14 +261,17 @@ class ElasticsearchDriver(VectorDriver):
     async def _check_index_dimension(self, expected_dim: int) -> None:
         try:
             mapping = await self._es_client.indices.get_mapping(index=self.index_name)
-            props = mapping[self.index_name]["mappings"].get("properties", {})
+            # index_name 可能是别名（蓝绿切换后），响应按物理索引名分组
+            props = next(iter(mapping.values()))["mappings"].get("properties", {})
+            self._prefix_dims = props.get("vector_prefix", {}).get("dims", 0)
             actual_dim = props.get("vector", {}).get("dims")
             if actual_dim is None:
                 return
             if actual_dim != expected_dim:
                 raise VectorStoreDimensionError(
                     f"ES dimension mismatch: index '{self.index_name}' has {actual_dim}, "
-                    f"config requires {expected_dim}. Fix: DELETE /{self.index_name}"
+                    f"config requires {expected_dim}. "
+                    f"Fix: run a blue/green re-index (POST /admin/v1/vector-index:reindex)"
                 )
             logger.debug(f"[ES] Dimension check passed: {actual_dim}")
         except VectorStoreDimensionError:
@@ -193,6 +293,18 @@ class ElasticsearchDriver(VectorDriver):
         except Exception as e:
             logger.warning(f"[ES] Shard wait timed out, proceeding anyway: {e}")
 
+    async def _load_prefix_dims(self) -> int:
+        """vector_prefix 的维度；ensure_schema 未运行过（如 get_shadow 取得的驱动）时读映射。"""
+        if self._prefix_dims is None:
+            try:
+                mapping = await self._es_client.indices.get_mapping(index=self.index_name)
+                props = next(iter(mapping.values()))["mappings"].get("properties", {})
+                self._prefix_dims = props.get("vector_prefix", {}).get("dims", 0)
+            except Exception as e:
+                logger.debug(f"[ES] get_mapping failed, assuming no vector_prefix: {e}")
+                return 0
+        return self._prefix_dims
+
     # ──────────────────────────────────────────────────────────────────────
     # Schema entry point (VectorDriver interface)
     # ──────────────────────────────────────────────────────────────────────
@@ -227,10 +339,18 @@ class ElasticsearchDriver(VectorDriver):
                 raise ValueError(f"Disallowed filter key: {k!r}")
         clauses = []
         for k, v in criteria.items():
-            if k == "chunk_index":
-                clauses.append({"term": {"chunk_index": v}})
-            else:
-                clauses.append({"term": {f"metadata.{k}": str(v)}})
+            field = "chunk_index" if k == "chunk_index" else f"metadata.{k}"
+            if not isinstance(v, list):
+                clauses.append({"term": {field: v if k == "chunk_index" else str(v)}})
+                continue
+            # 任一值匹配；None 表示字段缺失
+            should: list[dict] = []
+            values = [x if k == "chunk_index" else str(x) for x in v if x is not None]
+            if values:
+                should.append({"terms": {field: values}})
+            if None in v:
+                should.append({"bool": {"must_not": {"exists": {"field": field}}}})
+            clauses.append({"bool": {"should": should, "minimum_should_match": 1}})
         return clauses
 
     # ──────────────────────────────────────────────────────────────────────
@@ -243,18 +363,24 @@ class ElasticsearchDriver(VectorDriver):
         ids: list[str],
         embeddings: Any,
         batch_size: int = 100,
+        vectors: list[list[float] | None] | None = None,
+        bulk: bool | None = None,
     ) -> list[str]:
+        # bulk 无需区分：ES 写入本身即走 _bulk API
         await self._ensure_client()
         start_time = time.time()
         total = len(documents)
+        prefix = await self._load_prefix_dims()
 
-        for i in range(0, total, batch_size):
-            batch_docs = documents[i : i + batch_size]
-            batch_ids = ids[i : i + batch_size]
-            vectors = await embeddings.aembed_documents([doc.page_content for doc in batch_docs])
+        batches = (total + batch_size - 1) // batch_size
+        stored = 0
 
+        async def write_batch(
+            batch_docs: list[LangChainDocument], batch_ids: list[str], batch_vectors: list
+        ) -> list[str]:
+            nonlocal stored
             operations = []
-            for doc, doc_id, vector in zip(batch_docs, batch_ids, vectors):
+            for doc, doc_id, vector in zip(batch_docs, batch_ids, batch_vectors):
                 chunk_index = doc.metadata.get("chunk_index")
                 summary = doc.metadata.get("summary") or ""
                 tags = doc.metadata.get("tags") or ""
@@ -267,32 +393,34 @@ class ElasticsearchDriver(VectorDriver):
                         k: v for k, v in doc.metadata.items() if k not in _TOP_LEVEL_FIELDS
                     },
                 }
+                if prefix:
+                    es_doc["vector_prefix"] = vector[:prefix]
                 if chunk_index is not None:
                     es_doc["chunk_index"] = int(chunk_index)
                 operations.append({"index": {"_index": self.index_name, "_id": doc_id}})
                 operations.append(es_doc)
 
-            resp = await self._circuit_breaker.call(
-                lambda ops=operations: retry_on_transient(
-                    lambda: self._es_client.bulk(operations=ops, refresh=False),
-                    policy=_ES_RETRY_POLICY,
-                    operation="bulk_index",
-                ),
-                operation="bulk_index",
+            resp = await self._write(
+                lambda: self._es_client.bulk(operations=operations, refresh=False),
+                "bulk_index",
             )
+            stored += 1
+            logger.debug(f"[ES] Stored batch {stored}/{batches}")
+            if not resp.get("errors"):
+                return []
+            return [
+                batch_ids[idx]
+                for idx, item in enumerate(resp.get("items", []))
+                if item.get("index", {}).get("error")
+            ]
 
-            if resp.get("errors"):
-                failed_ids = [
-                    batch_ids[idx]
-                    for idx, item in enumerate(resp.get("items", []))
-                    if item.get("index", {}).get("error")
-                ]
-                raise VectorStoreBulkWriteError(
-                    f"ES bulk write failed ({len(failed_ids)} docs)",
-                    failed_ids=failed_ids,
-                )
-            logger.debug(
-                f"[ES] Stored batch {i // batch_size + 1}/{(total + batch_size - 1) // batch_size}"
+        failed_ids = await run_ingest_pipeline(
+            documents, ids, embeddings, write_batch, batch_size=batch_size, vectors=vectors
+        )
+        if failed_ids:
+            raise VectorStoreBulkWriteError(
+                f"ES bulk write failed ({len(failed_ids)} docs)",
+                failed_ids=failed_ids,
             )
 
         logger.info(f"[ES] Stored {total} documents in {time.time() - start_time:.3f}s")
@@ -304,57 +432,27 @@ class ElasticsearchDriver(VectorDriver):
         embeddings: Any,
         k: int,
         metadata_filter: dict | None,
+        options: SearchOptions | None = None,
     ) -> list[DriverSearchResult]:
         """KNN + BM25 parallel search with Python-side RRF merge.
 
         If BM25 fails, degrades gracefully to KNN-only. KNN failure is fatal.
         score=1.0 is a sentinel — not a cosine similarity; score_comparable=False.
+        ``options["num_candidates"]`` overrides the per-shard HNSW candidate count.
         """
         await self._ensure_client()
+        await self._load_prefix_dims()
         query_vector = await embeddings.aembed_query(query)
-        es_filter = self._build_es_filter(metadata_filter) if metadata_filter else []
-        fetch_k = min(k * 3, 100)
-
-        knn_params: dict = {
-            "field": "vector",
-            "query_vector": query_vector,
-            "k": fetch_k,
-            "num_candidates": min(fetch_k * 10, 10000),
-        }
-        if es_filter:
-            knn_params["filter"] = {"bool": {"filter": es_filter}}
-
-        multi_match: dict = {
-            "multi_match": {
-                "query": query,
-                "fields": ["text^1.0", "summary^1.5", "tags^1.2"],
-                "type": "best_fields",
-            }
-        }
-        bm25_query: dict = (
-            {"bool": {"must": multi_match, "filter": es_filter}} if es_filter else multi_match
-        )
+        knn_body, bm25_body = self._search_bodies(query, query_vector, k, metadata_filter, options)
 
         knn_resp, bm25_resp = await asyncio.gather(
-            self._circuit_breaker.call(
-                lambda: retry_on_transient(
-                    lambda: self._es_client.search(
-                        index=self.index_name, knn=knn_params, size=fetch_k
-                    ),
-                    policy=_ES_RETRY_POLICY,
-                    operation="knn_search",
-                ),
-                operation="knn_search",
+            self._read(
+                lambda: self._es_client.search(index=self.index_name, **knn_body),
+                "knn_search",
             ),
-            self._circuit_breaker.call(
-                lambda: retry_on_transient(
-                    lambda: self._es_client.search(
-                        index=self.index_name, query=bm25_query, size=fetch_k
-                    ),
-                    policy=_ES_RETRY_POLICY,
-                    operation="bm25_search",
-                ),
-                operation="bm25_search",
+            self._read(
+                lambda: self._es_client.search(index=self.index_name, **bm25_body),
+                "bm25_search",
             ),
             return_exceptions=True,
         )
@@ -368,44 +466,133 @@ class ElasticsearchDriver(VectorDriver):
         else:
             bm25_hits = bm25_resp["hits"]["hits"]
 
-        # Python-level RRF: accumulate 1/(K + rank + 1) per source
-        scores: dict[str, float] = {}
-        hit_cache: dict[str, dict] = {}
-        for source_hits in (knn_resp["hits"]["hits"], bm25_hits):
-            for rank, hit in enumerate(source_hits):
-                doc_id = hit["_id"]
-                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (_RRF_K + rank + 1)
-                hit_cache.setdefault(doc_id, hit)
-
-        top_ids = sorted(scores, key=lambda x: scores[x], reverse=True)[:k]
-        results: list[DriverSearchResult] = []
-        for doc_id in top_ids:
-            src = hit_cache[doc_id]["_source"]
-            results.append(
-                {
-                    "doc": LangChainDocument(
-                        page_content=src.get("text", ""),
-                        metadata=src.get("metadata", {}),
-                    ),
-                    "score": 1.0,
-                    "score_comparable": False,
-                }
-            )
-
+        results = _rrf_fuse(knn_resp["hits"]["hits"], bm25_hits, k)
         logger.info(f"[ES] Found {len(results)} chunks (Python RRF)")
         return results
 
+    async def search_many(
+        self,
+        queries: list[str],
+        query_vectors: list[list[float]],
+        k: int,
+        metadata_filter: dict | None,
+        options: SearchOptions | None = None,
+    ) -> list[list[DriverSearchResult]]:
+        """所有查询的 KNN + BM25 请求合并为一次 ``msearch``，逐查询 RRF 合并。
+
+        降级语义与 ``search`` 相同：某个查询的 BM25 子请求失败只退化为 KNN-only，
+        KNN 子请求失败则整体报错。
+        """
+        await self._ensure_client()
+        if not queries:
+            return []
+        await self._load_prefix_dims()
+        searches: list[dict] = []
+        for query, vector in zip(queries, query_vectors, strict=True):
+            for body in self._search_bodies(query, vector, k, metadata_filter, options):
+                searches.extend(({}, body))
+
+        resp = await self._read(
+            lambda: self._es_client.msearch(index=self.index_name, searches=searches),
+            "msearch",
+        )
+
+        responses = resp["responses"]
+        results: list[list[DriverSearchResult]] = []
+        for i in range(len(queries)):
+            knn_resp, bm25_resp = responses[2 * i], responses[2 * i + 1]
+            if "error" in knn_resp:
+                raise VectorStoreError(f"ES msearch knn failed: {knn_resp['error']}")
+            if "error" in bm25_resp:
+                logger.warning(f"[ES] BM25 failed, falling back to KNN-only: {bm25_resp['error']}")
+                bm25_hits: list[dict] = []
+            else:
+                bm25_hits = bm25_resp["hits"]["hits"]
+            results.append(_rrf_fuse(knn_resp["hits"]["hits"], bm25_hits, k))
+
+        logger.info(
+            f"[ES] Batched search: {len(queries)} queries, "
+            f"{sum(len(r) for r in results)} chunks (Python RRF)"
+        )
+        return results
+
+    def _search_bodies(
+        self,
+        query: str,
+        query_vector: list[float],
+        k: int,
+        metadata_filter: dict | None,
+        options: SearchOptions | None,
+    ) -> tuple[dict, dict]:
+        """单个查询的 (KNN, BM25) 请求体，``search`` 与 ``msearch`` 共用。
+
+        索引带 vector_prefix 时 KNN 为两阶段：knn 查询在前缀 HNSW 上取
+        fetch_k × ES_VECTOR_PREFIX_OVERSAMPLE 个候选，再由 rescore 按完整向量的余弦重排。
+        """
+        from app.core.infra.config import settings
+
+        es_filter = self._build_es_filter(metadata_filter) if metadata_filter else []
+        fetch_k = min(k * 3, 100)
+        prefix = self._prefix_dims or 0
+        window = min(fetch_k * settings.ES_VECTOR_PREFIX_OVERSAMPLE, 10000) if prefix else fetch_k
+
+        knn_params: dict = {
+            "field": "vector_prefix" if prefix else "vector",
+            "query_vector": query_vector[:prefix] if prefix else query_vector,
+            "k": window,
+            "num_candidates": min(
+                max((options or {}).get("num_candidates", window * 10), window), 10000
+            ),
+        }
+        if es_filter:
+            knn_params["filter"] = {"bool": {"filter": es_filter}}
+        if settings.ES_VECTOR_RESCORE_OVERSAMPLE > 0:
+            # 量化索引的候选按原始向量重新打分
+            knn_params["rescore_vector"] = {"oversample": settings.ES_VECTOR_RESCORE_OVERSAMPLE}
+        if prefix:
+            # rescore 只作用于 query 阶段命中，前缀 kNN 须以 knn 查询子句（而非顶层 knn）发出
+            knn_body: dict = {
+                "query": {"knn": knn_params},
+                "rescore": {
+                    "window_size": window,
+                    "query": {
+                        "rescore_query": {
+                            "script_score": {
+                                "query": {"match_all": {}},
+                                "script": {
+                                    "source": "cosineSimilarity(params.qv, 'vector') + 1.0",
+                                    "params": {"qv": query_vector},
+                                },
+                            }
+                        },
+                        "query_weight": 0,
+                        "rescore_query_weight": 1,
+                    },
+                },
+                "size": fetch_k,
+            }
+        else:
+            knn_body = {"knn": knn_params, "size": fetch_k}
+
+        multi_match: dict = {
+            "multi_match": {
+                "query": query,
+                "fields": ["text^1.0", "summary^1.5", "tags^1.2"],
+                "type": "best_fields",
+            }
+        }
+        bm25_query: dict = (
+            {"bool": {"must": multi_match, "filter": es_filter}} if es_filter else multi_match
+        )
+        return knn_body, {"query": bm25_query, "size": fetch_k}
+
     async def delete_by_ids(self, ids: list[str]) -> None:
         await self._ensure_client()
         logger.info(f"[ES] Deleting {len(ids)} documents by ID")
         operations = [{"delete": {"_index": self.index_name, "_id": doc_id}} for doc_id in ids]
-        resp = await self._circuit_breaker.call(
-            lambda ops=operations: retry_on_transient(
-                lambda: self._es_client.bulk(operations=ops, refresh=False),
-                policy=_ES_RETRY_POLICY,
-                operation="bulk_delete",
-            ),
-            operation="bulk_delete",
+        resp = await self._write(
+            lambda: self._es_client.bulk(operations=operations, refresh=False),
+            "bulk_delete",
         )
         if resp.get("errors"):
             failed_ids = [
@@ -424,51 +611,295 @@ class ElasticsearchDriver(VectorDriver):
         await self._ensure_client()
         logger.info(f"[ES] Deleting by metadata: {key}={value}")
         filter_clauses = self._build_es_filter({key: value})
-        resp = await self._circuit_breaker.call(
-            lambda fc=filter_clauses: retry_on_transient(
-                lambda: self._es_client.delete_by_query(
-                    index=self.index_name,
-                    query={"bool": {"filter": fc}},
-                    conflicts="proceed",
-                    wait_for_completion=True,
-                    timeout="60s",
-                ),
-                policy=_ES_RETRY_POLICY,
-                operation="delete_by_query",
+        resp = await self._write(
+            lambda: self._es_client.delete_by_query(
+                index=self.index_name,
+                query={"bool": {"filter": filter_clauses}},
+                conflicts="proceed",
+                wait_for_completion=True,
+                timeout="60s",
             ),
-            operation="delete_by_query",
+            "delete_by_query",
         )
         logger.info(f"[ES] Deleted {resp.get('deleted', 0)} docs with {key}={value}")
 
-    async def get_by_filter(self, key: str, value: str | int) -> list[VectorChunk]:
+    async def update_metadata_by_filter(
+        self, key: str, value: str | int, patch: dict[str, Any]
+    ) -> int:
+        check_metadata_patch(patch)
+        if not patch:
+            return 0
+        await self._ensure_client()
+        filter_clauses = self._build_es_filter({key: value})
+        top = {k: v for k, v in patch.items() if k in _TOP_LEVEL_FIELDS}
+        meta = {k: v for k, v in patch.items() if k not in _TOP_LEVEL_FIELDS}
+        resp = await self._write(
+            lambda: self._es_client.update_by_query(
+                index=self.index_name,
+                query={"bool": {"filter": filter_clauses}},
+                script={
+                    "lang": "painless",
+                    "source": _METADATA_PATCH_SCRIPT,
+                    "params": {"meta": meta, "top": top},
+                },
+                conflicts="proceed",
+                refresh=True,
+                wait_for_completion=True,
+                timeout="60s",
+            ),
+            "update_by_query",
+        )
+        updated = resp.get("updated", 0)
+        logger.info(f"[ES] Metadata patched for {key}={value}: {sorted(patch)} ({updated} docs)")
+        return updated
+
+    async def get_vectors(self, ids: list[str]) -> dict[str, list[float]]:
+        if not ids:
+            return {}
         await self._ensure_client()
+        resp = await self._read(
+            lambda: self._es_client.mget(
+                index=self.index_name, ids=ids, source_includes=["vector"]
+            ),
+            "mget_vectors",
+        )
+        return {
+            doc["_id"]: doc["_source"]["vector"]
+            for doc in resp["docs"]
+            if doc.get("found") and "vector" in doc.get("_source", {})
+        }
+
+    async def iter_by_filter(
+        self, key: str, value: str | int, page_size: int | None = None
+    ) -> AsyncIterator[VectorChunk]:
+        """point-in-time + search_after 分页读取：不受 10000 条窗口限制，翻页期间视图一致。"""
+        from app.core.infra.config import settings
+
+        await self._ensure_client()
+        page_size = page_size or settings.VECTOR_SCAN_PAGE_SIZE
+        filter_clauses = self._build_es_filter({key: value})
+        pit = await self._read(
+            lambda: self._es_client.open_point_in_time(index=self.index_name, keep_alive="1m"),
+            "open_pit",
+            hedge=False,
+        )
+        pit_id = pit["id"]
+        search_after: list | None = None
         try:
-            filter_clauses = self._build_es_filter({key: value})
-            resp = await self._circuit_breaker.call(
-                lambda fc=filter_clauses: retry_on_transient(
+            while True:
+                resp = await self._read(
                     lambda: self._es_client.search(
-                        index=self.index_name,
-                        query={"bool": {"filter": fc}},
-                        sort=[{"chunk_index": {"order": "asc"}}],
-                        size=10000,
+                        pit={"id": pit_id, "keep_alive": "1m"},
+                        query={"bool": {"filter": filter_clauses}},
+                        sort=[{"chunk_index": {"order": "asc"}}, {"_shard_doc": "asc"}],
+                        size=page_size,
+                        search_after=search_after,
+                        track_total_hits=False,
                     ),
-                    policy=_ES_RETRY_POLICY,
-                    operation="get_by_filter",
-                ),
-                operation="get_by_filter",
+                    "scan_by_filter",
+                )
+                pit_id = resp.get("pit_id", pit_id)
+                hits = resp["hits"]["hits"]
+                for hit in hits:
+                    yield {
+                        "id": hit["_id"],
+                        "content": hit["_source"].get("text", ""),
+                        "metadata": hit["_source"].get("metadata", {}),
+                    }
+                if len(hits) < page_size:
+                    break
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await self._es_client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.debug(f"[ES] close_point_in_time failed (expires by keep_alive): {e}")
+
+    async def index_status(self, recall_sample: int = 0) -> dict[str, Any]:
+        """ES 的 dense_vector 默认即 HNSW 索引，由 ES 自行维护；这里回报映射、体积与可选 recall 抽样。"""
+        from app.core.infra.config import settings
+
+        await self._ensure_client()
+        mapping = await self._es_client.indices.get_mapping(index=self.index_name)
+        physical, index_mapping = next(iter(mapping.items()))
+        vector_mapping = index_mapping["mappings"].get("properties", {}).get("vector", {})
+        stats = await self._es_client.indices.stats(index=self.index_name, metric="docs,store")
+        primaries = stats["indices"][physical]["primaries"]
+        status: dict[str, Any] = {
+            "managed": False,
+            "index": self.index_name,
+            "physical_index": physical,
+            "dimension": vector_mapping.get("dims"),
+            "index_options": vector_mapping.get("index_options", {"type": "default"}),
+            "configured_type": settings.ES_VECTOR_INDEX_TYPE,
+            "rescore_oversample": settings.ES_VECTOR_RESCORE_OVERSAMPLE,
+            "prefix_dimension": index_mapping["mappings"]
+            .get("properties", {})
+            .get("vector_prefix", {})
+            .get("dims"),
+            "docs_count": primaries["docs"]["count"],
+            "size_bytes": primaries["store"]["size_in_bytes"],
+            "circuit_breaker": self._circuit_breaker.snapshot(),
+        }
+        if recall_sample > 0:
+            status["recall"] = await self._estimate_recall(recall_sample)
+        return status
+
+    async def _estimate_recall(self, sample_size: int, k: int = 10) -> dict[str, Any]:
+        """recall@k of the kNN path vs. an exact script_score scan, stored vectors as probes."""
+        resp = await self._es_client.search(
+            index=self.index_name,
+            query={"function_score": {"random_score": {}}},
+            size=sample_size,
+            source_includes=["vector"],
+        )
+        probes = [hit["_source"]["vector"] for hit in resp["hits"]["hits"]]
+        if not probes:
+            return {"k": k, "samples": 0, "recall": None}
+
+        await self._load_prefix_dims()
+        total = 0.0
+        for vector in probes:
+            knn_body, _ = self._search_bodies("", vector, k, None, None)
+            body = {**knn_body, "size": k}
+            if "knn" in body:
+                body["knn"] = {**body["knn"], "k": k}
+            ann = await self._es_client.search(index=self.index_name, **body, source=False)
+            exact = await self._es_client.search(
+                index=self.index_name,
+                query={
+                    "script_score": {
+                        "query": {"match_all": {}},
+                        "script": {
+                            "source": "cosineSimilarity(params.qv, 'vector') + 1.0",
+                            "params": {"qv": vector},
+                        },
+                    }
+                },
+                size=k,
+                source=False,
             )
-            hits = resp["hits"]["hits"]
-            return [
-                {
-                    "id": hit["_id"],
-                    "content": hit["_source"].get("text", ""),
-                    "metadata": hit["_source"].get("metadata", {}),
-                }
-                for hit in hits
-            ]
-        except Exception as e:
-            logger.error(f"[ES] get_by_filter failed: {e}", exc_info=True)
-            return []
+            exact_ids = {hit["_id"] for hit in exact["hits"]["hits"]}
+            if exact_ids:
+                ann_ids = {hit["_id"] for hit in ann["hits"]["hits"]}
+                total += len(ann_ids & exact_ids) / len(exact_ids)
+
+        return {"k": k, "samples": len(probes), "recall": round(total / len(probes), 4)}
+
+    # ──────────────────────────────────────────────────────────────────────
+    # Blue/green re-index (generation indices behind an alias)
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def _live_index(self) -> str | None:
+        """index_name 当前指向的物理索引：别名取其目标，旧部署的实体索引即自身。"""
+        if await self._es_client.indices.exists_alias(name=self.index_name):
+            resp = await self._es_client.indices.get_alias(name=self.index_name)
+            return next(iter(resp))
+        if await self._es_client.indices.exists(index=self.index_name):
+            return self.index_name
+        return None
+
+    async def _generations(self) -> dict[int, str]:
+        """所有 ``{index_name}_g{N}`` 物理索引，按代号索引。"""
+        resp = await self._es_client.indices.get(
+            index=f"{self.index_name}_g*", allow_no_indices=True, expand_wildcards="open"
+        )
+        pattern = re.compile(rf"^{re.escape(self.index_name)}_g(\d+)$")
+        return {int(m.group(1)): name for name in resp if (m := pattern.match(name))}
+
+    def _bind_shadow(self, name: str) -> ElasticsearchDriver:
+        if self._shadow is None or self._shadow.index_name != name:
+            self._shadow = ElasticsearchDriver(name, es_client=self._es_client)
+        return self._shadow
+
+    async def _find_shadow(self) -> tuple[str | None, str | None, dict[int, str]]:
+        """(在线物理索引, 影子索引, 全部代) —— 影子是比在线代号更新的那一代。"""
+        live = await self._live_index()
+        generations = await self._generations()
+        live_gen = next((g for g, name in generations.items() if name == live), 0)
+        newer = [g for g in generations if g > live_gen]
+        return live, generations[max(newer)] if newer else None, generations
+
+    async def storage_generation(self) -> str | None:
+        await self._ensure_client()
+        return await self._live_index()
+
+    async def get_embedding_pins(self) -> dict[str, dict[str, Any]]:
+        await self._ensure_client()
+        live = await self._live_index()
+        if live is None:
+            return {}
+        mapping = await self._es_client.indices.get_mapping(index=live)
+        return mapping[live]["mappings"].get("_meta", {}).get("embedding_pins", {})
+
+    async def set_embedding_pins(self, pins: dict[str, dict[str, Any]]) -> None:
+        """Store the pins in the physical index ``_meta``, so the alias switch carries them."""
+        await self._ensure_client()
+        live = await self._live_index()
+        if live is not None:
+            await self._es_client.indices.put_mapping(index=live, meta={"embedding_pins": pins})
+
+    async def open_shadow(self, dimension: int) -> ElasticsearchDriver:
+        """Create the next ``{index_name}_g{N}`` index (or resume one with the same dimension).
+
+        Generations that are neither live nor the shadow (left from earlier re-indexes) are
+        deleted here.
+        """
+        await self._ensure_client()
+        live, shadow, generations = await self._find_shadow()
+        for name in generations.values():
+            if name not in (live, shadow):
+                await self._es_client.indices.delete(index=name)
+                logger.info(f"[ES] Deleted old generation index {name}")
+        if shadow is not None:
+            mapping = await self._es_client.indices.get_mapping(index=shadow)
+            dims = mapping[shadow]["mappings"].get("properties", {}).get("vector", {}).get("dims")
+            if dims != dimension:
+                logger.info(f"[ES] Deleting stale shadow index {shadow} (dim={dims})")
+                await self._es_client.indices.delete(index=shadow)
+                shadow = None
+        if shadow is None:
+            shadow = f"{self.index_name}_g{max(generations, default=0) + 1}"
+        driver = self._bind_shadow(shadow)
+        await driver.ensure_schema(dimension)
+        return driver
+
+    async def get_shadow(self) -> ElasticsearchDriver | None:
+        await self._ensure_client()
+        _, shadow, _ = await self._find_shadow()
+        return self._bind_shadow(shadow) if shadow else None
+
+    async def promote_shadow(self) -> dict[str, Any]:
+        """Point the ``index_name`` alias at the shadow in a single ``_aliases`` call.
+
+        The first switch from a plain index (pre-alias deployments) has to delete that index in
+        the same call, because an alias cannot share its name; later switches keep the previous
+        generation until the next re-index.
+        """
+        await self._ensure_client()
+        live, shadow, _ = await self._find_shadow()
+        if shadow is None:
+            raise VectorStoreSchemaError(f"No shadow index for {self.index_name} to promote")
+        await self._es_client.indices.refresh(index=shadow)
+        actions: list[dict] = []
+        if live == self.index_name:
+            logger.warning(f"[ES] Replacing plain index {live} with alias -> {shadow}")
+            actions.append({"remove_index": {"index": live}})
+        elif live is not None:
+            actions.append({"remove": {"index": live, "alias": self.index_name}})
+        actions.append({"add": {"index": shadow, "alias": self.index_name}})
+        await self._es_client.indices.update_aliases(actions=actions)
+        self._shadow = None
+        logger.info(f"[ES] Promoted {shadow} as {self.index_name} (previous: {live})")
+        previous = live if live != self.index_name else None
+        return {"index": self.index_name, "physical_index": shadow, "previous_index": previous}
+
+    async def drop_shadow(self) -> None:
+        await self._ensure_client()
+        _, shadow, _ = await self._find_shadow()
+        if shadow is not None:
+            await self._es_client.indices.delete(index=shadow)
+        self._shadow = None
 
     async def ping(self) -> bool:
         try:
@@ -487,4 +918,32 @@ class ElasticsearchDriver(VectorDriver):
         if self._es_client:
             await self._es_client.close()
             self._es_client = None
+            self._shadow = None
             logger.info("[ES] Connection closed")
+
+
+def _rrf_fuse(knn_hits: list[dict], bm25_hits: list[dict], k: int) -> list[DriverSearchResult]:
+    """Python-level RRF: accumulate 1/(K + rank + 1) per source, keep the top k."""
+    scores: dict[str, float] = {}
+    hit_cache: dict[str, dict] = {}
+    for source_hits in (knn_hits, bm25_hits):
+        for rank, hit in enumerate(source_hits):
+            doc_id = hit["_id"]
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (_RRF_K + rank + 1)
+            hit_cache.setdefault(doc_id, hit)
+
+    top_ids = sorted(scores, key=lambda x: scores[x], reverse=True)[:k]
+    results: list[DriverSearchResult] = []
+    for doc_id in top_ids:
+        src = hit_cache[doc_id]["_source"]
+        results.append(
+            {
+                "doc": LangChainDocument(
+                    page_content=src.get("text", ""),
+                    metadata=src.get("metadata", {}),
+                ),
+                "score": 1.0,
+                "score_comparable": False,
+            }
+        )
+    return results
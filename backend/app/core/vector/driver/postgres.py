@@ -6,22 +6,30 @@
 """PostgreSQL 向量存储驱动（基于 langchain-postgres）"""
 
 import asyncio
+import functools
+import json
 import logging
-from collections import OrderedDict
+import re
+import time
+from collections.abc import AsyncIterator, Callable
 from typing import Any
 from urllib.parse import quote_plus
 
 from langchain_core.documents import Document as LangChainDocument
-from langchain_postgres import PGEngine, PGVectorStore
+from langchain_postgres import PGEngine
 from langchain_postgres.v2.engine import Column
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
+from app.core.infra.pool_metrics import MeteredAsyncPool, register_engine, unregister_pool
 from app.core.vector.driver.base import (
     ALLOWED_FILTER_KEYS,
     DriverSearchResult,
+    SearchOptions,
     VectorChunk,
     VectorDriver,
+    check_metadata_patch,
+    run_ingest_pipeline,
 )
 from app.core.vector.exceptions import (
     VectorStoreBulkWriteError,
@@ -32,8 +40,6 @@ from app.core.vector.exceptions import (
 
 logger = logging.getLogger(__name__)
 
-_STORE_CACHE_MAX = 5  # max PGVectorStore instances kept in LRU cache
-
 # Metadata columns promoted to top-level table columns (indexed for fast filtering)
 _PROMOTED_METADATA_COLUMNS = [
     Column(name="source", data_type="TEXT", nullable=True),
@@ -43,9 +49,44 @@ _PROMOTED_METADATA_COLUMNS = [
     Column(name="tenant_id", data_type="INTEGER", nullable=True),
     Column(name="summary", data_type="TEXT", nullable=True),
     Column(name="tags", data_type="TEXT", nullable=True),
+    Column(name="status", data_type="TEXT", nullable=True),
 ]
 _PROMOTED_COLUMN_NAMES = [col.name for col in _PROMOTED_METADATA_COLUMNS]
 
+# 写入列顺序（executemany 参数 / COPY 记录共用）
+_WRITE_COLUMNS = ["langchain_id", "content", "embedding", *_PROMOTED_COLUMN_NAMES]
+_WRITE_COLUMNS.append("langchain_metadata")
+
+# COPY 批量写入的会话级临时表（ON COMMIT DROP，每个事务独立）
+_COPY_STAGE_TABLE = "_vector_copy_stage"
+
+# pgvector 的 HNSW / IVFFlat 可索引的最大维度（按 PG_VECTOR_PRECISION；配置了前缀维度时
+# 按前缀计），超出只能精确扫描
+_ANN_MAX_DIMENSION: dict[str, int] = {"full": 2000, "halfvec": 4000, "binary": 64000}
+
+# 量化精度 -> (索引 opclass, 量化后的距离运算符)
+_PRECISION_OPS: dict[str, tuple[str, str]] = {
+    "full": ("vector_cosine_ops", "<=>"),
+    "halfvec": ("halfvec_cosine_ops", "<=>"),
+    "binary": ("bit_hamming_ops", "<~>"),
+}
+
+# PG_VECTOR_PARTITION_MODE -> 分区键（自顶向下）；分区表的主键必须包含全部分区键
+_PARTITION_KEYS: dict[str, list[str]] = {
+    "none": [],
+    "tenant": ["tenant_id"],
+    "tenant_site": ["tenant_id", "site_id"],
+}
+
+# 由驱动创建的 btree 索引列（迁移时需要随表一起改名）
+_BTREE_INDEX_COLUMNS = ["id", "site_id", "collection_id", "tenant_id"]
+
+# PG_TEXT_SEARCH_CONFIG=auto 时按顺序探测的中文分词配置（pg_jieba / zhparser），均无则 simple
+_TS_CONFIG_CANDIDATES = ["jiebacfg", "zhparser", "chinese"]
+# ts_rank_cd 权重 {D, C, B, A}：content=C、tags=B、summary=A，对齐 ES 的字段 boost
+_TS_RANK_WEIGHTS = "{0.1, 1.0, 1.2, 1.5}"
+_RRF_K = 60  # RRF ranking constant, same as the ES driver
+
 
 class PostgresDriver(VectorDriver):
     """Pure-storage PostgreSQL driver.
@@ -67,8 +108,17 @@ class PostgresDriver(VectorDriver):
             PGEngine.from_engine(engine=sa_engine) if sa_engine else None
         )
         self._lock = asyncio.Lock()
-        # id(embeddings) -> PGVectorStore, LRU-capped at _STORE_CACHE_MAX
-        self._stores: OrderedDict[int, PGVectorStore] = OrderedDict()
+        # 实际表的分区键（ensure_schema 时从 catalog 读取），为空表示普通表
+        self._partition_keys: list[str] = []
+        # 已确认存在的叶子分区 (tenant_id, site_id | None)，避免每批写入都执行 DDL
+        self._known_partitions: set[tuple[int, int | None]] = set()
+        # content_tsv 列使用的分词配置；None 表示全文列 / GIN 索引尚未就绪，只走向量检索
+        self._ts_config: str | None = None
+        # 串行化 ANN 索引的创建 / 重建，避免并发 CREATE INDEX CONCURRENTLY 互相等待
+        self._index_lock = asyncio.Lock()
+        self._index_task: asyncio.Task | None = None
+        # 蓝绿重建中的影子表驱动（共享 engine）
+        self._shadow: PostgresDriver | None = None
 
     # ──────────────────────────────────────────────────────────────────────
     # Engine initialisation
@@ -85,6 +135,7 @@ class PostgresDriver(VectorDriver):
         )
         self._sa_engine = create_async_engine(
             conn_str,
+            poolclass=MeteredAsyncPool,
             pool_size=settings.DB_POOL_SIZE,
             max_overflow=settings.DB_MAX_OVERFLOW,
             pool_timeout=settings.DB_POOL_TIMEOUT,
@@ -94,6 +145,7 @@ class PostgresDriver(VectorDriver):
             echo=False,
             future=True,
         )
+        register_engine("vector", self._sa_engine)
         self._pg_engine = PGEngine.from_engine(engine=self._sa_engine)
 
     async def _ensure_engine(self) -> None:
@@ -120,46 +172,583 @@ class PostgresDriver(VectorDriver):
             return result.fetchone() is not None
 
     async def _create_table(self, dimension: int) -> None:
-        logger.info(f"[PG] Creating vector table: {self.collection_name} (dim={dimension})")
-        await self._pg_engine.ainit_vectorstore_table(
-            table_name=self.collection_name,
-            vector_size=dimension,
-            metadata_columns=_PROMOTED_METADATA_COLUMNS,
+        from app.core.infra.config import settings
+
+        mode = settings.PG_VECTOR_PARTITION_MODE
+        logger.info(
+            f"[PG] Creating vector table: {self.collection_name} (dim={dimension}, partition={mode})"
         )
+        if mode == "none":
+            await self._pg_engine.ainit_vectorstore_table(
+                table_name=self.collection_name,
+                vector_size=dimension,
+                metadata_columns=_PROMOTED_METADATA_COLUMNS,
+            )
+            return
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(
+                text(_partitioned_table_ddl(self.collection_name, dimension, _PARTITION_KEYS[mode]))
+            )
+
+    async def _ensure_promoted_columns(self) -> None:
+        """Add promoted columns introduced after the table was created (e.g. ``status``).
 
-    async def _create_indexes(self) -> None:
-        target_cols = ["id", "site_id", "collection_id", "tenant_id"]
+        Nullable ADD COLUMN is a catalog-only change; existing rows read NULL until rewritten.
+        """
+        async with self._sa_engine.connect() as conn:
+            existing = set(
+                (
+                    await conn.execute(
+                        text(
+                            "SELECT column_name FROM information_schema.columns "
+                            "WHERE table_name = :table AND table_schema = 'public'"
+                        ),
+                        {"table": self.collection_name},
+                    )
+                ).scalars()
+            )
+            missing = [c for c in _PROMOTED_METADATA_COLUMNS if c.name not in existing]
+            for col in missing:
+                await conn.execute(
+                    text(
+                        f"ALTER TABLE {self.collection_name} "
+                        f"ADD COLUMN IF NOT EXISTS {col.name} {col.data_type}"
+                    )
+                )
+                logger.info(f"[PG] Added promoted column {col.name} to {self.collection_name}")
+            if missing:
+                await conn.commit()
+
+    async def _create_indexes(self, table: str | None = None) -> None:
+        table = table or self.collection_name
         async with self._sa_engine.connect() as conn:
             autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
-            for col in target_cols:
-                index_name = f"idx_{self.collection_name}_{col}"
+            for col in _BTREE_INDEX_COLUMNS:
+                index_name = f"idx_{table}_{col}"
                 await autocommit.execute(
+                    text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({col})")
+                )
+        logger.info(f"[PG] Indexes created for {table}")
+
+    # ──────────────────────────────────────────────────────────────────────
+    # Partitions (PG_VECTOR_PARTITION_MODE)
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def _detect_layout(self) -> None:
+        """Read the partition keys of the existing table; the driver follows the real layout.
+
+        Partition keys are the non-``langchain_id`` primary key columns of a partitioned table,
+        so a table created as ``tenant`` keeps behaving as such even if the setting changes.
+        """
+        sql = text(
+            "SELECT c.relkind, a.attname "
+            "FROM pg_class c "
+            "LEFT JOIN pg_index i ON i.indrelid = c.oid AND i.indisprimary "
+            "LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = ANY(i.indkey) "
+            "WHERE c.oid = CAST(:table AS regclass)"
+        )
+        async with self._sa_engine.connect() as conn:
+            rows = (await conn.execute(sql, {"table": self.collection_name})).fetchall()
+        pk_columns = {row.attname for row in rows}
+        partitioned = bool(rows) and rows[0].relkind == "p"
+        keys = [c for c in _PARTITION_KEYS["tenant_site"] if c in pk_columns] if partitioned else []
+        # 表可能已被迁移 / 蓝绿切换整体替换，分区缓存一并作废
+        self._known_partitions.clear()
+        self._partition_keys = keys
+
+    async def _ensure_partitions(self, rows: list[dict[str, Any]]) -> None:
+        """Create the leaf partitions a batch writes into (no DEFAULT partition by design).
+
+        Rows without tenant_id / site_id are left alone and fail on the NOT NULL partition key.
+        """
+        if not self._partition_keys:
+            return
+        by_site = "site_id" in self._partition_keys
+        wanted = {
+            (int(r["tenant_id"]), int(r["site_id"]) if by_site else None)
+            for r in rows
+            if r.get("tenant_id") is not None and (not by_site or r.get("site_id") is not None)
+        }
+        missing = wanted - self._known_partitions
+        if not missing:
+            return
+
+        async with self._sa_engine.connect() as conn:
+            autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for tenant_id, site_id in sorted(missing, key=lambda p: (p[0], p[1] or 0)):
+                for name, ddl in _partition_ddls(
+                    self.collection_name, self._partition_keys, tenant_id, site_id
+                ):
+                    try:
+                        await autocommit.execute(text(ddl))
+                    except Exception:
+                        # 多 worker 同时建同一分区时 IF NOT EXISTS 仍可能撞上 catalog 唯一约束
+                        exists = (
+                            await autocommit.execute(
+                                text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+                            )
+                        ).scalar()
+                        if not exists:
+                            raise
+                self._known_partitions.add((tenant_id, site_id))
+                logger.info(
+                    f"[PG] Partition ready: {_partition_name(self.collection_name, tenant_id, site_id)}"
+                )
+
+    async def _get_partitions(self) -> list[Any]:
+        """Every partition below the root, with row estimate and whether it has a valid ANN index."""
+        sql = text(
+            "SELECT c.relname AS name, p.level, p.isleaf AS is_leaf, "
+            "pg_get_expr(c.relpartbound, c.oid) AS bound, "
+            "GREATEST(c.reltuples, 0)::bigint AS rows_estimate, "
+            "EXISTS ("
+            "  SELECT 1 FROM pg_index i "
+            "  JOIN pg_class ic ON ic.oid = i.indexrelid "
+            "  JOIN pg_am am ON am.oid = ic.relam "
+            "  WHERE i.indrelid = c.oid AND i.indisvalid AND am.amname IN ('hnsw', 'ivfflat')"
+            ") AS ann_index "
+            "FROM pg_partition_tree(CAST(:table AS regclass)) p "
+            "JOIN pg_class c ON c.oid = p.relid "
+            "WHERE p.level > 0 ORDER BY p.level, c.relname"
+        )
+        async with self._sa_engine.connect() as conn:
+            return list((await conn.execute(sql, {"table": self.collection_name})).fetchall())
+
+    # ──────────────────────────────────────────────────────────────────────
+    # ANN index (HNSW / IVFFlat on embedding)
+    # ──────────────────────────────────────────────────────────────────────
+
+    @property
+    def _vector_index_name(self) -> str:
+        return f"idx_{self.collection_name}_embedding"
+
+    def _vector_index_ddl(
+        self,
+        index_name: str,
+        *,
+        concurrently: bool,
+        table: str | None = None,
+        only: bool = False,
+        dimension: int | None = None,
+    ) -> str | None:
+        """Build CREATE INDEX for the configured ANN method; None when PG_VECTOR_INDEX_TYPE=none.
+
+        ``table`` targets a single partition; ``only`` creates a partitioned-table index
+        without recursing into partitions (ON ONLY). With PG_VECTOR_PRECISION other than
+        ``full`` or a PG_VECTOR_PREFIX_DIMENSION, the index is an expression index on the
+        (prefix of the) quantized embedding, which needs ``dimension``.
+        """
+        from app.core.infra.config import settings
+
+        method = settings.PG_VECTOR_INDEX_TYPE
+        if method == "hnsw":
+            options = (
+                f"m = {settings.PG_HNSW_M}, ef_construction = {settings.PG_HNSW_EF_CONSTRUCTION}"
+            )
+        elif method == "ivfflat":
+            options = f"lists = {settings.PG_IVFFLAT_LISTS}"
+        else:
+            return None
+        opclass = _PRECISION_OPS[settings.PG_VECTOR_PRECISION][0]
+        if not _two_stage():
+            key = f"embedding {opclass}"
+        else:
+            if dimension is None:
+                raise ValueError("dimension is required for a quantized / prefix ANN index")
+            key = f"({_ann_expr('embedding', dimension)}) {opclass}"
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} "
+            f"ON {'ONLY ' if only else ''}{table or self.collection_name} "
+            f"USING {method} ({key}) "
+            f"WITH ({options})"
+        )
+
+    async def _get_table_dimension(self) -> int | None:
+        sql = text(
+            "SELECT format_type(atttypid, atttypmod) AS type_def "
+            "FROM pg_attribute "
+            "WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'"
+        )
+        async with self._sa_engine.connect() as conn:
+            result = await conn.execute(sql, {"table": self.collection_name})
+            row = result.fetchone()
+        if not row or not row.type_def or "vector(" not in row.type_def:
+            return None
+        return int(row.type_def.split("(")[1].split(")")[0])
+
+    async def _get_vector_indexes(self) -> list[Any]:
+        sql = text(
+            "SELECT c.relname AS name, am.amname AS method, i.indisvalid AS valid, "
+            "pg_get_indexdef(i.indexrelid) AS definition, "
+            "pg_relation_size(i.indexrelid) AS size_bytes, "
+            "COALESCE(s.idx_scan, 0) AS scans "
+            "FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_am am ON am.oid = c.relam "
+            "LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid "
+            "WHERE i.indrelid = CAST(:table AS regclass) AND am.amname IN ('hnsw', 'ivfflat')"
+        )
+        async with self._sa_engine.connect() as conn:
+            result = await conn.execute(sql, {"table": self.collection_name})
+            return list(result.fetchall())
+
+    async def _get_ann_index_bytes(self, index_name: str | None = None) -> int | None:
+        """ANN 索引总体积（分区表为各分区索引之和）；索引不存在时为 None。"""
+        async with self._sa_engine.connect() as conn:
+            return (
+                await conn.execute(
                     text(
-                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {self.collection_name} ({col})"
-                    )
+                        "SELECT sum(pg_relation_size(relid))::bigint "
+                        "FROM pg_partition_tree(to_regclass(:index))"
+                    ),
+                    {"index": index_name or self._vector_index_name},
                 )
-        logger.info(f"[PG] Indexes created for {self.collection_name}")
+            ).scalar()
 
-    async def _check_table_dimension(self, expected_dim: int) -> None:
-        try:
-            sql = text(
-                "SELECT format_type(atttypid, atttypmod) AS type_def "
-                "FROM pg_attribute "
-                "WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'"
+    async def _get_index_build_progress(self) -> dict[str, Any] | None:
+        async with self._sa_engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        "SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total "
+                        "FROM pg_stat_progress_create_index "
+                        "WHERE relid IN ("
+                        "  SELECT relid FROM pg_partition_tree(CAST(:table AS regclass))"
+                        ")"
+                    ),
+                    {"table": self.collection_name},
+                )
+            ).fetchone()
+        return dict(row._mapping) if row else None
+
+    async def _create_vector_index(self, dimension: int, *, concurrently: bool) -> None:
+        """Create the ANN index if missing; an INVALID leftover from a failed build is replaced."""
+        if not _ann_indexable(dimension):
+            logger.warning(
+                f"[PG] dim={dimension} exceeds pgvector ANN limit ({_ann_max_dimension()}), "
+                f"{self.collection_name} will use exact scan"
             )
+            return
+        ddl = self._vector_index_ddl(
+            self._vector_index_name, concurrently=concurrently, dimension=dimension
+        )
+        if ddl is None:
+            return
+
+        existing = {row.name: row for row in await self._get_vector_indexes()}
+        current = existing.get(self._vector_index_name)
+        if current is not None and current.valid:
+            return
+        # 另一个进程（多 worker 部署）正在构建时 indisvalid 同样为 false，不能当残骸删掉
+        if current is not None and await self._get_index_build_progress() is not None:
+            logger.info(f"[PG] ANN index {self._vector_index_name} is being built elsewhere")
+            return
+
+        start = time.time()
+        if self._partition_keys and concurrently:
+            # 分区表上 INVALID 的父索引只表示尚有分区未挂载，续建即可，无需删除
+            await self._build_partitioned_index(self._vector_index_name, dimension=dimension)
+            logger.info(
+                f"[PG] ANN index ready: {self._vector_index_name} "
+                f"({time.time() - start:.1f}s, per-partition)"
+            )
+            return
+        async with self._sa_engine.connect() as conn:
+            autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if current is not None:
+                logger.warning(f"[PG] Dropping invalid ANN index {self._vector_index_name}")
+                await autocommit.execute(
+                    text(f"DROP INDEX CONCURRENTLY IF EXISTS {self._vector_index_name}")
+                )
+            await autocommit.execute(text(ddl))
+        logger.info(
+            f"[PG] ANN index ready: {self._vector_index_name} "
+            f"({time.time() - start:.1f}s, concurrently={concurrently})"
+        )
+
+    def _schedule_index_builds(self, dimension: int) -> None:
+        """Build the ANN index and full-text leg for an existing table in the background.
+
+        Large tables can take minutes to index; blocking ensure_schema would stall the
+        first request after deploy. Reads keep working (exact scan, vector-only) until
+        the builds end.
+        """
+        if self._index_task is not None and not self._index_task.done():
+            return
+
+        async def _run() -> None:
+            try:
+                async with self._index_lock:
+                    await self._create_vector_index(dimension, concurrently=True)
+            except Exception as e:
+                logger.error(f"[PG] Background ANN index build failed: {e}", exc_info=True)
+            try:
+                async with self._index_lock:
+                    await self._ensure_fulltext()
+            except Exception as e:
+                logger.error(f"[PG] Background full-text setup failed: {e}", exc_info=True)
+
+        self._index_task = asyncio.create_task(_run())
+
+    async def _build_partitioned_index(
+        self,
+        index_name: str,
+        ddl: Callable[..., str | None] | None = None,
+        *,
+        dimension: int | None = None,
+    ) -> None:
+        """Online index for a partitioned table: one index per leaf partition.
+
+        CREATE INDEX CONCURRENTLY is not supported on partitioned tables, so the parent
+        index is created ON ONLY (invalid until complete), each leaf is indexed CONCURRENTLY
+        and attached. Resumable: partitions already covered by the parent index are skipped.
+        ``ddl`` has the signature of ``_vector_index_ddl`` (the default, built for ``dimension``).
+        """
+        ddl_for = ddl or functools.partial(self._vector_index_ddl, dimension=dimension)
+        async with self._sa_engine.connect() as conn:
+            autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await autocommit.execute(text(ddl_for(index_name, concurrently=False, only=True)))
+            tree = (
+                await autocommit.execute(
+                    text(
+                        "SELECT c.relname AS name, pc.relname AS parent, p.isleaf AS is_leaf "
+                        "FROM pg_partition_tree(CAST(:table AS regclass)) p "
+                        "JOIN pg_class c ON c.oid = p.relid "
+                        "JOIN pg_class pc ON pc.oid = p.parentrelid "
+                        "WHERE p.level > 0 ORDER BY p.level, c.relname"
+                    ),
+                    {"table": self.collection_name},
+                )
+            ).fetchall()
+            # 已挂在父索引下的分区 -> 其索引名（CREATE TABLE ... PARTITION OF 会自动建好）
+            covered = {
+                row.table_name: row.index_name
+                for row in (
+                    await autocommit.execute(
+                        text(
+                            "SELECT t.relname AS table_name, ic.relname AS index_name "
+                            "FROM pg_partition_tree(CAST(:index AS regclass)) p "
+                            "JOIN pg_index i ON i.indexrelid = p.relid "
+                            "JOIN pg_class ic ON ic.oid = i.indexrelid "
+                            "JOIN pg_class t ON t.oid = i.indrelid "
+                            "WHERE p.level > 0"
+                        ),
+                        {"index": index_name},
+                    )
+                ).fetchall()
+            }
+
+            index_of = {self.collection_name: index_name}
+            for row in tree:
+                if row.name in covered:
+                    index_of[row.name] = covered[row.name]
+                    continue
+                child_index = _partition_index_name(row.name, index_name, self.collection_name)
+                index_of[row.name] = child_index
+                if row.is_leaf:
+                    # 未挂载的同名索引只可能是上次中断留下的残骸
+                    await autocommit.execute(
+                        text(f"DROP INDEX CONCURRENTLY IF EXISTS {child_index}")
+                    )
+                    create = ddl_for(child_index, concurrently=True, table=row.name)
+                else:
+                    create = ddl_for(child_index, concurrently=False, table=row.name, only=True)
+                await autocommit.execute(text(create))
+                await autocommit.execute(
+                    text(f"ALTER INDEX {index_of[row.parent]} ATTACH PARTITION {child_index}")
+                )
+
+    async def rebuild_index(self) -> dict[str, Any]:
+        """Online rebuild: build a fresh index CONCURRENTLY, then swap it in by name.
+
+        Picks up changed PG_HNSW_* / PG_IVFFLAT_* / PG_VECTOR_INDEX_TYPE / PG_VECTOR_PRECISION /
+        PG_VECTOR_PREFIX_DIMENSION settings and
+        compacts bloat from deletes. Reads and writes are never blocked; the old index
+        serves queries until the new one is valid.
+        """
+        await _ensure_engine_guard(self)
+        await self._detect_layout()
+        dimension = await self._get_table_dimension()
+        if dimension is None:
+            raise VectorStoreSchemaError(f"Table {self.collection_name} has no embedding column")
+
+        name = self._vector_index_name
+        tmp_name = f"{name}_rebuild"
+        async with self._index_lock:
+            start = time.time()
+            if self._partition_keys:
+                await self._rebuild_partitioned_index(dimension)
+                duration = time.time() - start
+                logger.info(f"[PG] ANN index rebuilt: {name} ({duration:.1f}s, per-partition)")
+                return {"index": name, "duration": round(duration, 3)}
             async with self._sa_engine.connect() as conn:
-                result = await conn.execute(sql, {"table": self.collection_name})
-                row = result.fetchone()
+                autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+                ddl = self._vector_index_ddl(tmp_name, concurrently=True, dimension=dimension)
+                if ddl is not None and _ann_indexable(dimension):
+                    await autocommit.execute(text(ddl))
+                    await autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    await autocommit.execute(text(f"ALTER INDEX {tmp_name} RENAME TO {name}"))
+                else:
+                    await autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            duration = time.time() - start
+
+        logger.info(f"[PG] ANN index rebuilt: {name} ({duration:.1f}s)")
+        return {"index": name, "duration": round(duration, 3)}
+
+    async def _rebuild_partitioned_index(self, dimension: int) -> None:
+        """Build ``*_rebuild`` partition by partition, then swap names.
 
-            if not row or not row.type_def or "vector(" not in row.type_def:
+        Partitioned indexes cannot be dropped CONCURRENTLY: the final DROP INDEX takes a
+        short ACCESS EXCLUSIVE lock on each partition, the builds themselves never block.
+        """
+        name = self._vector_index_name
+        tmp_name = f"{name}_rebuild"
+        async with self._sa_engine.connect() as conn:
+            autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await autocommit.execute(text(f"DROP INDEX IF EXISTS {tmp_name}"))
+            if self._vector_index_ddl(
+                tmp_name, concurrently=False, dimension=dimension
+            ) is None or not _ann_indexable(dimension):
+                await autocommit.execute(text(f"DROP INDEX IF EXISTS {name}"))
                 return
 
-            actual_dim = int(row.type_def.split("(")[1].split(")")[0])
+        await self._build_partitioned_index(tmp_name, dimension=dimension)
+
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            await conn.execute(text(f"ALTER INDEX {tmp_name} RENAME TO {name}"))
+            children = (
+                await conn.execute(
+                    text(
+                        "SELECT c.relname FROM pg_partition_tree(CAST(:index AS regclass)) p "
+                        "JOIN pg_class c ON c.oid = p.relid "
+                        "WHERE p.level > 0 AND c.relname LIKE '%\\_rebuild'"
+                    ),
+                    {"index": name},
+                )
+            ).scalars()
+            for child in list(children):
+                await conn.execute(
+                    text(f"ALTER INDEX {child} RENAME TO {child.removesuffix('_rebuild')}")
+                )
+
+    async def index_status(self, recall_sample: int = 0) -> dict[str, Any]:
+        from app.core.infra.config import settings
+
+        await _ensure_engine_guard(self)
+        await self._detect_layout()
+        await self._detect_fulltext()
+        indexes = await self._get_vector_indexes()
+        async with self._sa_engine.connect() as conn:
+            rows_estimate = (
+                await conn.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:t AS regclass)"),
+                    {"t": self.collection_name},
+                )
+            ).scalar()
+
+        status: dict[str, Any] = {
+            "managed": True,
+            "table": self.collection_name,
+            "configured_type": settings.PG_VECTOR_INDEX_TYPE,
+            "precision": settings.PG_VECTOR_PRECISION,
+            "prefix_dimension": settings.PG_VECTOR_PREFIX_DIMENSION or None,
+            "rescore_oversample": settings.PG_VECTOR_RESCORE_OVERSAMPLE,
+            "dimension": await self._get_table_dimension(),
+            "ann_index_bytes": await self._get_ann_index_bytes(),
+            "rows_estimate": max(int(rows_estimate or 0), 0),
+            "indexes": [
+                {
+                    "name": row.name,
+                    "method": row.method,
+                    "valid": row.valid,
+                    "size_bytes": row.size_bytes,
+                    "scans": row.scans,
+                    "definition": row.definition,
+                }
+                for row in indexes
+            ],
+            "build_in_progress": await self._get_index_build_progress(),
+            "query_options": {
+                "ef_search": settings.PG_HNSW_EF_SEARCH,
+                "probes": settings.PG_IVFFLAT_PROBES,
+            },
+            "fulltext": {
+                "enabled": settings.PG_HYBRID_SEARCH,
+                "ready": self._ts_config is not None,
+                "config": self._ts_config,
+                "fusion": settings.PG_HYBRID_FUSION,
+            },
+        }
+        if self._partition_keys:
+            partitions = await self._get_partitions()
+            leaves = [row for row in partitions if row.is_leaf]
+            status["partition_keys"] = self._partition_keys
+            status["rows_estimate"] = sum(row.rows_estimate for row in leaves)
+            status["partitions"] = [
+                {
+                    "name": row.name,
+                    "bound": row.bound,
+                    "rows_estimate": row.rows_estimate,
+                    "ann_index": row.ann_index,
+                }
+                for row in leaves
+            ]
+        if recall_sample > 0:
+            status["recall"] = await self._estimate_recall(recall_sample)
+        return status
+
+    async def _estimate_recall(self, sample_size: int, k: int = 10) -> dict[str, Any]:
+        """recall@k of the ANN path vs. exact scan, using stored embeddings as probe queries."""
+        async with self._sa_engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    f"SELECT embedding::text AS v FROM {self.collection_name} "
+                    f"WHERE langchain_id IN ("
+                    f"  SELECT langchain_id FROM {self.collection_name} ORDER BY random() LIMIT :n"
+                    f")"
+                ),
+                {"n": sample_size},
+            )
+            probes = [row.v for row in result.fetchall()]
+
+        if not probes:
+            return {"k": k, "samples": 0, "recall": None}
+
+        # ANN 路径与线上检索一致（量化精度下含候选重排）；精确结果始终按原始向量全表扫描
+        dimension = await self._get_table_dimension()
+        ann_sql = text(
+            self._nearest_sql("langchain_id", "", "CAST(:qv AS vector)", ":k", dimension)
+        )
+        exact_sql = text(self._nearest_sql("langchain_id", "", "CAST(:qv AS vector)", ":k"))
+        total = 0.0
+        for vector_literal in probes:
+            async with self._sa_engine.begin() as conn:
+                await self._apply_query_options(conn, k, None)
+                ann = {r[0] for r in (await conn.execute(ann_sql, {"qv": vector_literal, "k": k}))}
+            async with self._sa_engine.begin() as conn:
+                await conn.execute(text("SET LOCAL enable_indexscan = off"))
+                await conn.execute(text("SET LOCAL enable_bitmapscan = off"))
+                exact = {
+                    r[0] for r in (await conn.execute(exact_sql, {"qv": vector_literal, "k": k}))
+                }
+            if exact:
+                total += len(ann & exact) / len(exact)
+
+        return {"k": k, "samples": len(probes), "recall": round(total / len(probes), 4)}
+
+    async def _check_table_dimension(self, expected_dim: int) -> None:
+        try:
+            actual_dim = await self._get_table_dimension()
+            if actual_dim is None:
+                return
             if actual_dim != expected_dim:
                 raise VectorStoreDimensionError(
                     f"Dimension mismatch: table '{self.collection_name}' has {actual_dim}, "
                     f"config requires {expected_dim}. "
-                    f"Fix: DROP TABLE {self.collection_name};"
+                    f"Fix: run a blue/green re-index (POST /admin/v1/vector-index:reindex)"
                 )
             logger.debug(f"[PG] Dimension check passed: {actual_dim}")
         except VectorStoreDimensionError:
@@ -171,38 +760,204 @@ class PostgresDriver(VectorDriver):
 
     async def ensure_schema(self, dimension: int) -> None:
         """Create table + indexes if absent; validate dimension if table already exists."""
+        from app.core.infra.config import settings
+
         await _ensure_engine_guard(self)
         try:
             if not await self._table_exists():
                 await self._create_table(dimension)
+                await self._detect_layout()
                 await self._create_indexes()
+                # 空表建 ANN / GIN 索引是瞬时的，直接同步创建
+                await self._create_vector_index(dimension, concurrently=False)
+                await self._ensure_fulltext()
             else:
                 await self._check_table_dimension(dimension)
+                await self._ensure_promoted_columns()
+                await self._detect_layout()
+                if settings.PG_VECTOR_PARTITION_MODE != "none" and not self._partition_keys:
+                    logger.warning(
+                        f"[PG] PG_VECTOR_PARTITION_MODE={settings.PG_VECTOR_PARTITION_MODE} "
+                        f"but {self.collection_name} is not partitioned; "
+                        f"run scripts/migrate_vector_partitions.py to migrate"
+                    )
+                await self._detect_fulltext()
+                self._schedule_index_builds(dimension)
         except (VectorStoreDimensionError, VectorStoreSchemaError):
             raise
         except Exception as e:
             raise VectorStoreSchemaError(f"PG schema setup failed: {e}") from e
 
     # ──────────────────────────────────────────────────────────────────────
-    # PGVectorStore cache (LRU by id(embeddings))
+    # Full-text leg (generated tsvector + GIN)
+    # ──────────────────────────────────────────────────────────────────────
+
+    @property
+    def _fulltext_index_name(self) -> str:
+        return f"idx_{self.collection_name}_content_tsv"
+
+    def _fulltext_index_ddl(
+        self,
+        index_name: str,
+        *,
+        concurrently: bool,
+        table: str | None = None,
+        only: bool = False,
+    ) -> str:
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} "
+            f"ON {'ONLY ' if only else ''}{table or self.collection_name} USING gin (content_tsv)"
+        )
+
+    async def _resolve_ts_config(self) -> str:
+        from app.core.infra.config import settings
+
+        if settings.PG_TEXT_SEARCH_CONFIG != "auto":
+            return settings.PG_TEXT_SEARCH_CONFIG
+        async with self._sa_engine.connect() as conn:
+            available = set(
+                (
+                    await conn.execute(
+                        text("SELECT cfgname FROM pg_ts_config WHERE cfgname = ANY(:names)"),
+                        {"names": _TS_CONFIG_CANDIDATES},
+                    )
+                ).scalars()
+            )
+        return next((name for name in _TS_CONFIG_CANDIDATES if name in available), "simple")
+
+    async def _detect_fulltext(self) -> None:
+        """Read the text search config baked into content_tsv; None when the leg isn't ready.
+
+        The column's config (not the setting) drives query parsing, otherwise tokens from
+        to_tsvector and to_tsquery would not match. An invalid GIN index also counts as not ready.
+        """
+        sql = text(
+            "SELECT pg_get_expr(d.adbin, d.adrelid) AS expr, ("
+            "  SELECT i.indisvalid FROM pg_index i "
+            "  WHERE i.indexrelid = to_regclass(:index)"
+            ") AS index_valid "
+            "FROM pg_attribute a "
+            "JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum "
+            "WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = 'content_tsv' "
+            "AND NOT a.attisdropped"
+        )
+        async with self._sa_engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    sql, {"table": self.collection_name, "index": self._fulltext_index_name}
+                )
+            ).fetchone()
+        match = re.search(r"to_tsvector\('(\w+)'::regconfig", row.expr) if row else None
+        self._ts_config = match.group(1) if match and row.index_valid else None
+
+    async def _ensure_fulltext(self) -> None:
+        """Add the generated ``content_tsv`` column and its GIN index if missing.
+
+        Adding a STORED generated column rewrites the table under an ACCESS EXCLUSIVE lock,
+        which is instant for new tables but blocks reads for a while on large existing ones.
+        """
+        from app.core.infra.config import settings
+
+        if not settings.PG_HYBRID_SEARCH:
+            return
+        await self._detect_fulltext()
+        if self._ts_config is not None:
+            return
+
+        start = time.time()
+        async with self._sa_engine.connect() as conn:
+            has_column = (
+                await conn.execute(
+                    text(
+                        "SELECT 1 FROM pg_attribute WHERE attrelid = CAST(:table AS regclass) "
+                        "AND attname = 'content_tsv' AND NOT attisdropped"
+                    ),
+                    {"table": self.collection_name},
+                )
+            ).fetchone() is not None
+        if not has_column:
+            config = await self._resolve_ts_config()
+            logger.info(f"[PG] Adding content_tsv ({config}) to {self.collection_name}")
+            async with self._sa_engine.begin() as conn:
+                await conn.execute(text(_fulltext_column_ddl(self.collection_name, config)))
+
+        if self._partition_keys:
+            await self._build_partitioned_index(self._fulltext_index_name, self._fulltext_index_ddl)
+        else:
+            async with self._sa_engine.connect() as conn:
+                autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                valid = (
+                    await autocommit.execute(
+                        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:i)"),
+                        {"i": self._fulltext_index_name},
+                    )
+                ).scalar()
+                if valid is False and await self._get_index_build_progress() is not None:
+                    logger.info(f"[PG] {self._fulltext_index_name} is being built elsewhere")
+                    return
+                if valid is False:
+                    await autocommit.execute(
+                        text(f"DROP INDEX CONCURRENTLY IF EXISTS {self._fulltext_index_name}")
+                    )
+                await autocommit.execute(
+                    text(self._fulltext_index_ddl(self._fulltext_index_name, concurrently=True))
+                )
+        await self._detect_fulltext()
+        logger.info(
+            f"[PG] Full-text leg ready: {self.collection_name} "
+            f"(config={self._ts_config}, {time.time() - start:.1f}s)"
+        )
+
+    # ──────────────────────────────────────────────────────────────────────
+    # Write path
     # ──────────────────────────────────────────────────────────────────────
 
-    async def _get_or_create_store(self, embeddings: Any) -> PGVectorStore:
-        key = id(embeddings)
-        if key in self._stores:
-            self._stores.move_to_end(key)
-            return self._stores[key]
+    def _upsert_sql(self, source: str | None = None) -> str:
+        """Upsert matching langchain's row layout; conflict target follows the PK.
+
+        source=None 时为逐行 VALUES（executemany）；否则从该暂存表 INSERT ... SELECT。
+        """
+        if source is None:
+            values = [
+                "CAST(:langchain_id AS uuid)",
+                ":content",
+                "CAST(:embedding AS vector)",
+                *(f":{col}" for col in _PROMOTED_COLUMN_NAMES),
+                "CAST(:langchain_metadata AS json)",
+            ]
+            body = f"VALUES ({', '.join(values)})"
+        else:
+            selected = ["embedding::vector" if c == "embedding" else c for c in _WRITE_COLUMNS]
+            body = f"SELECT {', '.join(selected)} FROM {source}"
+        conflict = ["langchain_id", *self._partition_keys]
+        updates = [f"{col} = EXCLUDED.{col}" for col in _WRITE_COLUMNS if col not in conflict]
+        return (
+            f"INSERT INTO {self.collection_name} ({', '.join(_WRITE_COLUMNS)}) {body} "
+            f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {', '.join(updates)}"
+        )
+
+    async def _write_batch(self, rows: list[dict[str, Any]]) -> None:
+        await self._ensure_partitions(rows)
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(self._upsert_sql()), rows)
+
+    async def _copy_batch(self, rows: list[dict[str, Any]]) -> None:
+        """COPY 批量写入：二进制 COPY 进临时暂存表，再一条 INSERT ... SELECT 合并进主表。
 
-        store = await PGVectorStore.create(
-            engine=self._pg_engine,
-            table_name=self.collection_name,
-            embedding_service=embeddings,
-            metadata_columns=_PROMOTED_COLUMN_NAMES,
+        暂存表的 embedding 为 real[]（asyncpg 原生二进制编码，无需为 vector 类型注册 codec），
+        合并时再 ``::vector``。同一批内重复 ID 保留最后一条，避免 ON CONFLICT 同一行更新两次。
+        """
+        await self._ensure_partitions(rows)
+        records = list(
+            {row["langchain_id"]: tuple(row[c] for c in _WRITE_COLUMNS) for row in rows}.values()
         )
-        self._stores[key] = store
-        if len(self._stores) > _STORE_CACHE_MAX:
-            self._stores.popitem(last=False)
-        return store
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(_copy_stage_ddl(_COPY_STAGE_TABLE)))
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                _COPY_STAGE_TABLE, records=records, columns=_WRITE_COLUMNS
+            )
+            await conn.execute(text(self._upsert_sql(source=_COPY_STAGE_TABLE)))
 
     # ──────────────────────────────────────────────────────────────────────
     # VectorDriver operations
@@ -214,39 +969,56 @@ class PostgresDriver(VectorDriver):
         ids: list[str],
         embeddings: Any,
         batch_size: int = 100,
+        vectors: list[list[float] | None] | None = None,
+        bulk: bool | None = None,
     ) -> list[str]:
+        from app.core.infra.config import settings
+
         await _ensure_engine_guard(self)
-        vectors = await embeddings.aembed_documents([doc.page_content for doc in documents])
-        store = await self._get_or_create_store(embeddings)
         total = len(documents)
-        failed_ids: list[str] = []
+        if bulk is None:
+            threshold = settings.PG_BULK_COPY_THRESHOLD
+            bulk = threshold > 0 and total >= threshold
+        if bulk:
+            # COPY 的收益随批次增大，批次放大到 PG_BULK_COPY_BATCH_SIZE
+            batch_size = max(batch_size, settings.PG_BULK_COPY_BATCH_SIZE)
+        write = self._copy_batch if bulk else self._write_batch
+        batches = (total + batch_size - 1) // batch_size
+        stored = 0
 
-        for i in range(0, total, batch_size):
-            batch_docs = documents[i : i + batch_size]
-            batch_ids = ids[i : i + batch_size]
-            batch_vectors = vectors[i : i + batch_size]
+        async def write_batch(
+            batch_docs: list[LangChainDocument], batch_ids: list[str], batch_vectors: list
+        ) -> list[str]:
+            nonlocal stored
+            rows = [
+                _document_row(doc, doc_id, vector, literal=not bulk)
+                for doc, doc_id, vector in zip(batch_docs, batch_ids, batch_vectors)
+            ]
             try:
-                await store.aadd_embeddings(
-                    texts=[doc.page_content for doc in batch_docs],
-                    embeddings=batch_vectors,
-                    metadatas=[doc.metadata for doc in batch_docs],
-                    ids=batch_ids,
-                )
-                logger.debug(
-                    f"[PG] Stored batch {i // batch_size + 1}/"
-                    f"{(total + batch_size - 1) // batch_size}"
-                )
+                try:
+                    await write(rows)
+                except Exception as e:
+                    # 表可能已被迁移脚本切换为分区表（或反之）：重新探测布局后重试一次
+                    logger.warning(f"[PG] Batch write failed, re-detecting table layout: {e}")
+                    await self._detect_layout()
+                    await write(rows)
             except Exception as e:
                 logger.error(f"[PG] Batch write failed: {e}", exc_info=True)
-                failed_ids.extend(batch_ids)
+                return batch_ids
+            stored += 1
+            logger.debug(f"[PG] Stored batch {stored}/{batches}")
+            return []
 
+        failed_ids = await run_ingest_pipeline(
+            documents, ids, embeddings, write_batch, batch_size=batch_size, vectors=vectors
+        )
         if failed_ids:
             raise VectorStoreBulkWriteError(
                 f"PG bulk write failed for {len(failed_ids)} documents",
                 failed_ids=failed_ids,
             )
 
-        logger.info(f"[PG] Stored {total} documents")
+        logger.info(f"[PG] Stored {total} documents{' via COPY' if bulk else ''}")
         return ids
 
     async def search(
@@ -255,20 +1027,182 @@ class PostgresDriver(VectorDriver):
         embeddings: Any,
         k: int,
         metadata_filter: dict | None,
+        options: SearchOptions | None = None,
     ) -> list[DriverSearchResult]:
+        from app.core.infra.config import settings
+
         await _ensure_engine_guard(self)
         query_vector = await embeddings.aembed_query(query)
-        store = await self._get_or_create_store(embeddings)
-        results = await store.asimilarity_search_with_score_by_vector(
-            embedding=query_vector,
-            k=k,
-            filter=metadata_filter,
-        )
-        # pgvector returns cosine distance (0=identical), convert to similarity
-        return [
-            {"doc": doc, "score": 1.0 - distance, "score_comparable": True}
-            for doc, distance in results
-        ]
+        hybrid = settings.PG_HYBRID_SEARCH and self._ts_config is not None
+        where_sql, params = self._build_filter_sql(metadata_filter)
+        params.update({"qv": _vector_literal(query_vector), "qt": query, "k": k})
+        dimension = len(query_vector)
+        if hybrid:
+            sql = self._hybrid_sql(where_sql, params, "CAST(:qv AS vector)", ":qt", k, dimension)
+        else:
+            sql = self._vector_sql(where_sql, "CAST(:qv AS vector)", dimension)
+        async with self._sa_engine.begin() as conn:
+            await self._apply_query_options(conn, params.get("fetch_k", k), options)
+            rows = (await conn.execute(text(sql), params)).fetchall()
+
+        if hybrid:
+            logger.debug(f"[PG] Found {len(rows)} chunks (hybrid {settings.PG_HYBRID_FUSION})")
+        return [_row_to_result(row, hybrid) for row in rows]
+
+    async def search_many(
+        self,
+        queries: list[str],
+        query_vectors: list[list[float]],
+        k: int,
+        metadata_filter: dict | None,
+        options: SearchOptions | None = None,
+    ) -> list[list[DriverSearchResult]]:
+        """一条语句检索全部查询：unnest 出 (序号, 向量, 文本)，每个查询 LATERAL 执行
+        与 ``search`` 相同的单查询 SQL（仍走 ANN 索引），按序号拆回各自结果。"""
+        from app.core.infra.config import settings
+
+        await _ensure_engine_guard(self)
+        if not queries:
+            return []
+        hybrid = settings.PG_HYBRID_SEARCH and self._ts_config is not None
+        where_sql, params = self._build_filter_sql(metadata_filter)
+        params.update(
+            {
+                "qvs": [_vector_literal(v) for v in query_vectors],
+                "qts": list(queries),
+                "k": k,
+            }
+        )
+        vector_expr = "CAST(q.q_vec AS vector)"
+        dimension = len(query_vectors[0])
+        if hybrid:
+            inner = self._hybrid_sql(where_sql, params, vector_expr, "q.q_text", k, dimension)
+        else:
+            inner = self._vector_sql(where_sql, vector_expr, dimension)
+        sql = text(
+            f"SELECT q.q_ord, r.* "
+            f"FROM unnest(CAST(:qvs AS text[]), CAST(:qts AS text[])) "
+            f"WITH ORDINALITY AS q(q_vec, q_text, q_ord) "
+            f"CROSS JOIN LATERAL ({inner}) r "
+            f"ORDER BY q.q_ord, {'r.score DESC' if hybrid else 'r.distance'}"
+        )
+        async with self._sa_engine.begin() as conn:
+            await self._apply_query_options(conn, params.get("fetch_k", k), options)
+            rows = (await conn.execute(sql, params)).fetchall()
+
+        results: list[list[DriverSearchResult]] = [[] for _ in queries]
+        for row in rows:
+            results[row.q_ord - 1].append(_row_to_result(row, hybrid))
+        logger.debug(f"[PG] Batched search: {len(queries)} queries, {len(rows)} chunks")
+        return results
+
+    def _nearest_sql(
+        self,
+        columns: str,
+        where_sql: str,
+        query_vector: str,
+        limit: str,
+        dimension: int | None = None,
+        table: str | None = None,
+    ) -> str:
+        """最近邻子查询：输出 columns + distance（原始向量的余弦距离），按距离升序取 limit 行。
+
+        两阶段：PG_VECTOR_PRECISION 为 halfvec / binary 或配置了 PG_VECTOR_PREFIX_DIMENSION 时，
+        ORDER BY 改用（前缀 + 量化后的）粗排表达式命中对应的表达式索引，先取
+        limit × PG_VECTOR_RESCORE_OVERSAMPLE 个候选，再按完整原始向量的距离重排截断。
+        """
+        from app.core.infra.config import settings
+
+        t = table or self.collection_name
+        distance = f"embedding <=> {query_vector}"
+        if dimension is None or not _two_stage():
+            return (
+                f"SELECT {columns}, {distance} AS distance FROM {t} {where_sql} "
+                f"ORDER BY {distance} LIMIT {limit}"
+            )
+        coarse_distance = (
+            f"{_ann_expr('embedding', dimension)} "
+            f"{_PRECISION_OPS[settings.PG_VECTOR_PRECISION][1]} "
+            f"{_ann_expr(query_vector, dimension)}"
+        )
+        return (
+            f"SELECT * FROM ("
+            f"SELECT {columns}, {distance} AS distance FROM {t} {where_sql} "
+            f"ORDER BY {coarse_distance} "
+            f"LIMIT {limit} * {settings.PG_VECTOR_RESCORE_OVERSAMPLE}"
+            f") candidates ORDER BY distance LIMIT {limit}"
+        )
+
+    def _vector_sql(self, where_sql: str, query_vector: str, dimension: int | None = None) -> str:
+        """纯向量检索 SQL；query_vector 为 SQL 表达式（绑定参数或 LATERAL 外层列）。"""
+        return self._nearest_sql(
+            f"langchain_id, content, langchain_metadata, {', '.join(_PROMOTED_COLUMN_NAMES)}",
+            where_sql,
+            query_vector,
+            ":k",
+            dimension,
+        )
+
+    def _hybrid_sql(
+        self,
+        where_sql: str,
+        params: dict,
+        query_vector: str,
+        query_text: str,
+        k: int,
+        dimension: int | None = None,
+    ) -> str:
+        """Vector + full-text legs fused in a single statement.
+
+        Each leg fetches min(k*3, 100) candidates under the same filter; PG_HYBRID_FUSION
+        picks RRF (ranks, like the ES driver) or a weighted sum of cosine similarity and
+        max-normalised ts_rank_cd. Query terms are OR-ed so one matching keyword is enough.
+        score is a fusion score, not a cosine similarity: score_comparable=False.
+        Written with derived tables (no CTE) so it can run as a LATERAL subquery.
+        """
+        from app.core.infra.config import settings
+
+        params.update(
+            {
+                "fetch_k": min(k * 3, 100),
+                "rrf_k": _RRF_K,
+                "w": settings.PG_HYBRID_VECTOR_WEIGHT,
+            }
+        )
+        tsquery = (
+            f"replace(plainto_tsquery('{self._ts_config}', {query_text})::text, ' & ', ' | ')"
+            f"::tsquery"
+        )
+        if settings.PG_HYBRID_FUSION == "weighted":
+            score = (
+                "CAST(:w AS float8) * COALESCE(v.similarity, 0) + "
+                "(1 - CAST(:w AS float8)) * COALESCE(kw.kw_score / NULLIF(kw.kw_max, 0), 0)"
+            )
+        else:
+            score = "COALESCE(1.0 / (:rrf_k + v.rank), 0) + COALESCE(1.0 / (:rrf_k + kw.rank), 0)"
+        t = self.collection_name
+        return (
+            f"SELECT langchain_id, content, langchain_metadata, "
+            f"{', '.join(_PROMOTED_COLUMN_NAMES)}, fused.score "
+            f"FROM ("
+            f"  SELECT langchain_id, {score} AS score FROM ("
+            f"    SELECT langchain_id, 1 - distance AS similarity, "
+            f"    row_number() OVER (ORDER BY distance) AS rank FROM ("
+            f"      {self._nearest_sql('langchain_id', where_sql, query_vector, ':fetch_k', dimension)}"
+            f"    ) nn"
+            f"  ) v FULL OUTER JOIN ("
+            f"    SELECT langchain_id, kw_score, max(kw_score) OVER () AS kw_max, "
+            f"    row_number() OVER (ORDER BY kw_score DESC) AS rank FROM ("
+            f"      SELECT langchain_id, "
+            f"      ts_rank_cd('{_TS_RANK_WEIGHTS}'::float4[], content_tsv, {tsquery}) AS kw_score "
+            f"      FROM {t} {f'{where_sql} AND' if where_sql else 'WHERE'} content_tsv @@ {tsquery} "
+            f"      ORDER BY kw_score DESC LIMIT :fetch_k"
+            f"    ) ft"
+            f"  ) kw USING (langchain_id) "
+            f"  ORDER BY score DESC LIMIT :k"
+            f") fused JOIN {t} USING (langchain_id) {where_sql} "
+            f"ORDER BY fused.score DESC"
+        )
 
     async def delete_by_ids(self, ids: list[str]) -> None:
         await _ensure_engine_guard(self)
@@ -293,30 +1227,86 @@ class PostgresDriver(VectorDriver):
             await conn.commit()
         logger.info(f"[PG] Deleted documents with {key}={value}")
 
-    async def get_by_filter(self, key: str, value: str | int) -> list[VectorChunk]:
+    async def update_metadata_by_filter(
+        self, key: str, value: str | int, patch: dict[str, Any]
+    ) -> int:
+        """One UPDATE: promoted keys set their columns, the rest merge into the JSON column.
+
+        A partition key in the patch (site change) moves rows across partitions; the target
+        partition is created first, so the patch must then carry both tenant_id and site_id.
+        """
+        check_metadata_patch(patch)
+        if not patch:
+            return 0
         await _ensure_engine_guard(self)
-        try:
-            where_clause = self._build_where_clause(key)
-            sql = text(
-                f"SELECT langchain_id, content, langchain_metadata "
-                f"FROM {self.collection_name} "
-                f"WHERE {where_clause} "
-                f"ORDER BY (langchain_metadata->>'chunk_index')::int ASC NULLS LAST"
+        where_clause = self._build_where_clause(key)
+        params: dict[str, Any] = {"value": value}
+        assignments: list[str] = []
+        for col in _PROMOTED_COLUMN_NAMES:
+            if col in patch:
+                assignments.append(f"{col} = :p_{col}")
+                params[f"p_{col}"] = patch[col]
+        extra = {k: v for k, v in patch.items() if k not in _PROMOTED_COLUMN_NAMES}
+        if extra:
+            assignments.append(
+                "langchain_metadata = (COALESCE(langchain_metadata::jsonb, '{}'::jsonb) "
+                "|| CAST(:patch AS jsonb))::json"
             )
-            async with self._sa_engine.connect() as conn:
-                result = await conn.execute(sql, {"value": value})
-                rows = result.fetchall()
-            return [
-                {
-                    "id": str(row.langchain_id),
-                    "content": row.content,
-                    "metadata": row.langchain_metadata,
-                }
-                for row in rows
-            ]
-        except Exception as e:
-            logger.error(f"[PG] get_by_filter failed: {e}", exc_info=True)
-            return []
+            params["patch"] = json.dumps(extra, ensure_ascii=False, default=str)
+        if any(col in patch for col in self._partition_keys):
+            await self._ensure_partitions([patch])
+
+        async with self._sa_engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    f"UPDATE {self.collection_name} SET {', '.join(assignments)} "
+                    f"WHERE {where_clause}"
+                ),
+                params,
+            )
+            await conn.commit()
+        logger.info(
+            f"[PG] Metadata patched for {key}={value}: {sorted(patch)} ({result.rowcount} rows)"
+        )
+        return result.rowcount
+
+    async def iter_by_filter(
+        self, key: str, value: str | int, page_size: int | None = None
+    ) -> AsyncIterator[VectorChunk]:
+        """服务端游标分页读取，进程内最多持有一页行。"""
+        from app.core.infra.config import settings
+
+        await _ensure_engine_guard(self)
+        page_size = page_size or settings.VECTOR_SCAN_PAGE_SIZE
+        where_clause = self._build_where_clause(key)
+        sql = text(
+            f"SELECT langchain_id, content, langchain_metadata "
+            f"FROM {self.collection_name} "
+            f"WHERE {where_clause} "
+            f"ORDER BY (langchain_metadata->>'chunk_index')::int ASC NULLS LAST"
+        )
+        async with self._sa_engine.connect() as conn:
+            result = await conn.stream(sql.execution_options(yield_per=page_size), {"value": value})
+            async for rows in result.partitions():
+                for row in rows:
+                    yield {
+                        "id": str(row.langchain_id),
+                        "content": row.content,
+                        "metadata": row.langchain_metadata,
+                    }
+
+    async def get_vectors(self, ids: list[str]) -> dict[str, list[float]]:
+        if not ids:
+            return {}
+        await _ensure_engine_guard(self)
+        sql = text(
+            f"SELECT langchain_id::text AS id, embedding::text AS vector "
+            f"FROM {self.collection_name} WHERE langchain_id = ANY(CAST(:ids AS uuid[]))"
+        )
+        async with self._sa_engine.connect() as conn:
+            rows = (await conn.execute(sql, {"ids": ids})).fetchall()
+        # pgvector 文本格式 "[0.1,0.2,...]" 即合法 JSON 数组
+        return {row.id: json.loads(row.vector) for row in rows}
 
     async def ping(self) -> bool:
         try:
@@ -329,28 +1319,552 @@ class PostgresDriver(VectorDriver):
             return False
 
     async def close(self) -> None:
+        if self._index_task is not None and not self._index_task.done():
+            self._index_task.cancel()
         if self._sa_engine:
             await self._sa_engine.dispose()
+            unregister_pool("vector")
             self._sa_engine = None
             self._pg_engine = None
-            self._stores.clear()
+            self._known_partitions.clear()
+            self._shadow = None
             logger.info("[PG] Connection closed")
 
+    # ──────────────────────────────────────────────────────────────────────
+    # Migration (plain table -> partitioned)
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def migrate_to_partitioned(
+        self,
+        mode: str,
+        on_progress: Callable[[int, int, str], None] | None = None,
+    ) -> dict[str, Any]:
+        """Copy the plain vector table into a partitioned one and swap them by name.
+
+        1. ``{table}_partitioned`` is created with the same dimension plus one partition per
+           (tenant_id[, site_id]) present, and filled partition by partition
+           (INSERT ... SELECT ... ON CONFLICT DO NOTHING, so a rerun resumes).
+        2. btree + ANN indexes are built on the staging table while the old one keeps serving.
+        3. Under an EXCLUSIVE lock (reads still allowed) rows added / deleted meanwhile are
+           replayed and both tables are renamed; the old one stays as ``{table}_legacy``.
+
+        In-place updates of already-copied chunks are not replayed — pause the worker while
+        migrating. Rows without the partition keys cannot be placed and are skipped.
+        """
+        keys = _PARTITION_KEYS.get(mode)
+        if not keys:
+            raise ValueError(f"Unsupported partition mode: {mode!r}")
+        await _ensure_engine_guard(self)
+        await self._detect_layout()
+        table = self.collection_name
+        if self._partition_keys:
+            return {"table": table, "migrated": False, "partition_keys": self._partition_keys}
+
+        dimension = await self._get_table_dimension()
+        if dimension is None:
+            raise VectorStoreSchemaError(f"Table {table} has no embedding column")
+        staging, legacy = f"{table}_partitioned", f"{table}_legacy"
+        columns = ", ".join(
+            ["langchain_id", "content", "embedding", *_PROMOTED_COLUMN_NAMES, "langchain_metadata"]
+        )
+        has_keys = " AND ".join(f"{key} IS NOT NULL" for key in keys)
+
+        async with self._sa_engine.begin() as conn:
+            if (await conn.execute(text(f"SELECT to_regclass('{legacy}')"))).scalar():
+                raise VectorStoreSchemaError(
+                    f"{legacy} exists from a previous migration, drop it first"
+                )
+            if not (await conn.execute(text(f"SELECT to_regclass('{staging}')"))).scalar():
+                await conn.execute(text(_partitioned_table_ddl(staging, dimension, keys)))
+            await self._detect_fulltext()
+            if self._ts_config is not None:
+                await conn.execute(text(_fulltext_column_ddl(staging, self._ts_config)))
+            groups = await self._create_staging_partitions(conn, staging, keys, has_keys)
+            skipped = (
+                await conn.execute(text(f"SELECT count(*) FROM {table} WHERE NOT ({has_keys})"))
+            ).scalar()
+
+        copied = 0
+        for done, group in enumerate(groups, start=1):
+            where = " AND ".join(f"{key} = :{key}" for key in keys)
+            async with self._sa_engine.begin() as conn:
+                result = await conn.execute(
+                    text(
+                        f"INSERT INTO {staging} ({columns}) "
+                        f"SELECT {columns} FROM {table} WHERE {where} ON CONFLICT DO NOTHING"
+                    ),
+                    dict(zip(keys, group, strict=True)),
+                )
+            copied += max(result.rowcount, 0)
+            if on_progress:
+                on_progress(done, len(groups), _partition_name(table, *group))
+
+        await self._create_indexes(staging)
+        if _ann_indexable(dimension):
+            ddl = self._vector_index_ddl(
+                f"idx_{staging}_embedding", concurrently=False, table=staging, dimension=dimension
+            )
+            if ddl is not None:
+                async with self._sa_engine.begin() as conn:
+                    await conn.execute(text(ddl))
+        if self._ts_config is not None:
+            async with self._sa_engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        self._fulltext_index_ddl(
+                            f"idx_{staging}_content_tsv", concurrently=False, table=staging
+                        )
+                    )
+                )
+
+        index_suffixes = [*_BTREE_INDEX_COLUMNS, "embedding", "content_tsv"]
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(f"LOCK TABLE {table} IN EXCLUSIVE MODE"))
+            await self._create_staging_partitions(conn, staging, keys, has_keys)
+            delta = (
+                await conn.execute(
+                    text(
+                        f"INSERT INTO {staging} ({columns}) "
+                        f"SELECT {columns} FROM {table} WHERE {has_keys} ON CONFLICT DO NOTHING"
+                    )
+                )
+            ).rowcount
+            deleted = (
+                await conn.execute(
+                    text(
+                        f"DELETE FROM {staging} s WHERE NOT EXISTS "
+                        f"(SELECT 1 FROM {table} o WHERE o.langchain_id = s.langchain_id)"
+                    )
+                )
+            ).rowcount
+            for old_name, new_name in ((table, legacy), (staging, table)):
+                await conn.execute(text(f"ALTER TABLE {old_name} RENAME TO {new_name}"))
+                await conn.execute(
+                    text(
+                        f"ALTER TABLE {new_name} RENAME CONSTRAINT {old_name}_pkey TO {new_name}_pkey"
+                    )
+                )
+                for suffix in index_suffixes:
+                    await conn.execute(
+                        text(
+                            f"ALTER INDEX IF EXISTS idx_{old_name}_{suffix} "
+                            f"RENAME TO idx_{new_name}_{suffix}"
+                        )
+                    )
+
+        await self._detect_layout()
+        await self._detect_fulltext()
+        logger.info(
+            f"[PG] Migrated {table} to partitioned ({mode}): copied={copied}, delta={delta}, "
+            f"deleted={deleted}, skipped={skipped}"
+        )
+        return {
+            "table": table,
+            "migrated": True,
+            "partition_keys": self._partition_keys,
+            "partitions": len(groups),
+            "copied": copied,
+            "delta": max(delta, 0),
+            "deleted": max(deleted, 0),
+            "skipped": skipped,
+            "legacy_table": legacy,
+        }
+
+    async def _create_staging_partitions(
+        self, conn: Any, staging: str, keys: list[str], has_keys: str
+    ) -> list[tuple[int, ...]]:
+        groups = [
+            tuple(row)
+            for row in (
+                await conn.execute(
+                    text(
+                        f"SELECT DISTINCT {', '.join(keys)} FROM {self.collection_name} "
+                        f"WHERE {has_keys} ORDER BY {', '.join(keys)}"
+                    )
+                )
+            ).fetchall()
+        ]
+        for group in groups:
+            tenant_id, site_id = group[0], group[1] if len(group) > 1 else None
+            for _, ddl in _partition_ddls(
+                self.collection_name, keys, tenant_id, site_id, parent=staging
+            ):
+                await conn.execute(text(ddl))
+        return groups
+
+    # ──────────────────────────────────────────────────────────────────────
+    # Blue/green re-index (shadow table + rename swap)
+    # ──────────────────────────────────────────────────────────────────────
+
+    @property
+    def _shadow_table(self) -> str:
+        return f"{self.collection_name}_shadow"
+
+    @property
+    def _previous_table(self) -> str:
+        return f"{self.collection_name}_prev"
+
+    def _shadow_driver(self) -> "PostgresDriver":
+        if self._shadow is None:
+            self._shadow = PostgresDriver(self._shadow_table, sa_engine=self._sa_engine)
+        return self._shadow
+
+    async def storage_generation(self) -> str | None:
+        await _ensure_engine_guard(self)
+        async with self._sa_engine.connect() as conn:
+            oid = (
+                await conn.execute(
+                    text("SELECT CAST(to_regclass(:table) AS oid)"), {"table": self.collection_name}
+                )
+            ).scalar()
+        return str(oid) if oid else None
+
+    async def get_embedding_pins(self) -> dict[str, dict[str, Any]]:
+        await _ensure_engine_guard(self)
+        async with self._sa_engine.connect() as conn:
+            comment = (
+                await conn.execute(
+                    text("SELECT obj_description(to_regclass(:table), 'pg_class')"),
+                    {"table": self.collection_name},
+                )
+            ).scalar()
+        try:
+            meta = json.loads(comment) if comment else {}
+        except ValueError:
+            return {}  # 人工写入的非 JSON 注释
+        return meta.get("embedding_pins", {}) if isinstance(meta, dict) else {}
+
+    async def set_embedding_pins(self, pins: dict[str, dict[str, Any]]) -> None:
+        """Store the pins as the table comment, so the rename swap carries them along."""
+        await _ensure_engine_guard(self)
+        literal = json.dumps({"embedding_pins": pins}).replace("'", "''")
+        async with self._sa_engine.begin() as conn:
+            # COMMENT 不接受绑定参数；走 exec_driver_sql 避免模型名中的 ":xxx" 被当作参数
+            await conn.exec_driver_sql(f"COMMENT ON TABLE {self.collection_name} IS '{literal}'")
+
+    async def open_shadow(self, dimension: int) -> "PostgresDriver":
+        """Create ``{table}_shadow`` (layout from current settings) or resume an existing one.
+
+        A leftover shadow with another dimension is dropped; ``{table}_prev`` from the previous
+        re-index is dropped here to free space before the backfill.
+        """
+        await _ensure_engine_guard(self)
+        shadow = self._shadow_driver()
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {self._previous_table}"))
+        if await shadow._table_exists() and await shadow._get_table_dimension() != dimension:
+            logger.info(f"[PG] Dropping stale shadow table {shadow.collection_name}")
+            async with self._sa_engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE {shadow.collection_name}"))
+        await shadow.ensure_schema(dimension)
+        return shadow
+
+    async def get_shadow(self) -> "PostgresDriver | None":
+        await _ensure_engine_guard(self)
+        shadow = self._shadow_driver()
+        if not await shadow._table_exists():
+            return None
+        if not shadow._partition_keys:
+            await shadow._detect_layout()
+        return shadow
+
+    async def promote_shadow(self) -> dict[str, Any]:
+        """Swap the shadow in by renaming both table trees in one transaction.
+
+        Every table / partition / index whose name carries the table prefix is renamed along,
+        so ``{table}`` afterwards looks exactly like a table this driver created. The old tree
+        is kept as ``{table}_prev`` until the next re-index.
+        """
+        await _ensure_engine_guard(self)
+        table, shadow, previous = self.collection_name, self._shadow_table, self._previous_table
+        async with self._sa_engine.begin() as conn:
+            if not (await conn.execute(text(f"SELECT to_regclass('{shadow}')"))).scalar():
+                raise VectorStoreSchemaError(f"No shadow table {shadow} to promote")
+            await conn.execute(text(f"DROP TABLE IF EXISTS {previous}"))
+            await conn.execute(text(f"LOCK TABLE {table}, {shadow} IN ACCESS EXCLUSIVE MODE"))
+            await _rename_table_tree(conn, table, previous)
+            await _rename_table_tree(conn, shadow, table)
+
+        self._shadow = None
+        await self._detect_layout()
+        await self._detect_fulltext()
+        dimension = await self._get_table_dimension()
+        logger.info(f"[PG] Promoted {shadow} -> {table} (dim={dimension}), old kept as {previous}")
+        return {"table": table, "dimension": dimension, "previous_table": previous}
+
+    async def drop_shadow(self) -> None:
+        await _ensure_engine_guard(self)
+        async with self._sa_engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {self._shadow_table}"))
+        self._shadow = None
+
     # ──────────────────────────────────────────────────────────────────────
     # Internal helpers
     # ──────────────────────────────────────────────────────────────────────
 
-    def _build_where_clause(self, key: str) -> str:
-        """Map a metadata key to a safe SQL WHERE fragment.
+    def _filter_column(self, key: str) -> str:
+        """Map a metadata key to a safe SQL column expression.
 
-        Promoted columns use direct column comparison; others route through JSONB path.
+        Promoted columns are referenced directly; others route through JSONB path.
         Only ALLOWED_FILTER_KEYS are permitted to prevent injection.
         """
         if key in _PROMOTED_COLUMN_NAMES:
-            return f"{key} = :value"
+            return key
         if key not in ALLOWED_FILTER_KEYS:
             raise ValueError(f"Disallowed metadata key: {key!r}")
-        return f"langchain_metadata->>'{key}' = :value"
+        return f"langchain_metadata->>'{key}'"
+
+    def _build_where_clause(self, key: str, param: str = "value") -> str:
+        """Map a metadata key to a safe ``column = :param`` WHERE fragment."""
+        return f"{self._filter_column(key)} = :{param}"
+
+    def _build_filter_sql(self, metadata_filter: dict | None) -> tuple[str, dict[str, Any]]:
+        """Equality filter dict -> ``WHERE a AND b`` + bind params (JSONB path values as text)."""
+        if not metadata_filter:
+            return "", {}
+        clauses: list[str] = []
+        params: dict[str, Any] = {}
+        for i, (key, value) in enumerate(metadata_filter.items()):
+            param = f"f{i}"
+            if not isinstance(value, list):
+                clauses.append(self._build_where_clause(key, param))
+                params[param] = value if key in _PROMOTED_COLUMN_NAMES else str(value)
+                continue
+            # 任一值匹配；None 表示字段缺失
+            column = self._filter_column(key)
+            values = [v for v in value if v is not None]
+            parts = [f"{column} = ANY(:{param})"] if values else []
+            if None in value:
+                parts.append(f"{column} IS NULL")
+            clauses.append("(" + " OR ".join(parts or ["FALSE"]) + ")")
+            params[param] = values if key in _PROMOTED_COLUMN_NAMES else [str(v) for v in values]
+        return "WHERE " + " AND ".join(clauses), params
+
+    async def _apply_query_options(self, conn: Any, k: int, options: SearchOptions | None) -> None:
+        """SET LOCAL the ANN search knobs for the current transaction.
+
+        hnsw.ef_search below k silently truncates results, so it is raised to at least k
+        (the oversampled candidate count in two-stage mode).
+        """
+        from app.core.infra.config import settings
+
+        options = options or {}
+        method = settings.PG_VECTOR_INDEX_TYPE
+        if _two_stage():
+            k *= settings.PG_VECTOR_RESCORE_OVERSAMPLE
+        if method == "hnsw":
+            ef_search = max(options.get("ef_search", settings.PG_HNSW_EF_SEARCH), k)
+            await conn.execute(
+                text("SELECT set_config('hnsw.ef_search', :v, true)"), {"v": str(ef_search)}
+            )
+        elif method == "ivfflat":
+            probes = options.get("probes", settings.PG_IVFFLAT_PROBES)
+            await conn.execute(
+                text("SELECT set_config('ivfflat.probes', :v, true)"), {"v": str(probes)}
+            )
+
+
+def _row_to_result(row: Any, hybrid: bool) -> DriverSearchResult:
+    if hybrid:
+        return {"doc": _row_to_document(row), "score": float(row.score), "score_comparable": False}
+    # pgvector returns cosine distance (0=identical), convert to similarity
+    return {"doc": _row_to_document(row), "score": 1.0 - row.distance, "score_comparable": True}
+
+
+def _ann_max_dimension() -> int:
+    from app.core.infra.config import settings
+
+    return _ANN_MAX_DIMENSION[settings.PG_VECTOR_PRECISION]
+
+
+def _prefix_dimension(dimension: int) -> int | None:
+    """生效的 Matryoshka 前缀维度；未配置或不短于完整维度时为 None。"""
+    from app.core.infra.config import settings
+
+    prefix = settings.PG_VECTOR_PREFIX_DIMENSION
+    return prefix if 0 < prefix < dimension else None
+
+
+def _two_stage() -> bool:
+    """ANN 是否走"粗排表达式索引 + 原始向量重排"。"""
+    from app.core.infra.config import settings
+
+    return settings.PG_VECTOR_PRECISION != "full" or settings.PG_VECTOR_PREFIX_DIMENSION > 0
+
+
+def _ann_indexable(dimension: int) -> bool:
+    return (_prefix_dimension(dimension) or dimension) <= _ann_max_dimension()
+
+
+def _ann_expr(expr: str, dimension: int) -> str:
+    """vector 表达式的粗排形式：可选取前缀（subvector），再按精度量化。
+
+    索引表达式与查询 ORDER BY 必须一致才能命中索引。余弦 / 汉明距离与向量模长无关，
+    前缀无需重新单位化。
+    """
+    from app.core.infra.config import settings
+
+    precision = settings.PG_VECTOR_PRECISION
+    prefix = _prefix_dimension(dimension)
+    if prefix:
+        expr, dimension = f"subvector({expr}, 1, {prefix})", prefix
+        if precision == "full":
+            return f"({expr})::vector({prefix})"
+    if precision == "halfvec":
+        return f"({expr})::halfvec({dimension})"
+    if precision == "binary":
+        return f"binary_quantize({expr})::bit({dimension})"
+    return expr
+
+
+def _vector_literal(vector: list[float]) -> str:
+    """pgvector text input format: ``[0.1,0.2,...]``."""
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+def _document_row(
+    doc: LangChainDocument, doc_id: str, vector: list[float], *, literal: bool = True
+) -> dict[str, Any]:
+    """Bind params for one row; promoted keys become columns, the rest goes to the JSON column.
+
+    literal=False 时 embedding 保持 list[float]（COPY 路径按 real[] 二进制编码）。
+    """
+    metadata = doc.metadata or {}
+    row: dict[str, Any] = {
+        "langchain_id": doc_id,
+        "content": doc.page_content,
+        "embedding": _vector_literal(vector) if literal else vector,
+    }
+    for col in _PROMOTED_COLUMN_NAMES:
+        row[col] = metadata.get(col)
+    row["langchain_metadata"] = json.dumps(
+        {k: v for k, v in metadata.items() if k not in _PROMOTED_COLUMN_NAMES}
+    )
+    return row
+
+
+def _partitioned_table_ddl(table: str, dimension: int, partition_keys: list[str]) -> str:
+    """Same columns as langchain's ainit_vectorstore_table, LIST-partitioned by tenant_id.
+
+    Partition keys must be part of every unique constraint, so they join the primary key
+    and become NOT NULL.
+    """
+    columns = [
+        "langchain_id UUID NOT NULL",
+        "content TEXT NOT NULL",
+        f"embedding vector({dimension}) NOT NULL",
+    ]
+    for col in _PROMOTED_METADATA_COLUMNS:
+        not_null = " NOT NULL" if col.name in partition_keys else ""
+        columns.append(f"{col.name} {col.data_type}{not_null}")
+    columns.append("langchain_metadata JSON")
+    columns.append(f"PRIMARY KEY (langchain_id, {', '.join(partition_keys)})")
+    return f"CREATE TABLE {table} ({', '.join(columns)}) PARTITION BY LIST ({partition_keys[0]})"
+
+
+def _copy_stage_ddl(stage: str) -> str:
+    """COPY 暂存临时表：与写入列一致，embedding 用 real[]，事务提交即删除。"""
+    columns = ["langchain_id UUID", "content TEXT", "embedding REAL[]"]
+    columns += [f"{col.name} {col.data_type}" for col in _PROMOTED_METADATA_COLUMNS]
+    columns.append("langchain_metadata JSON")
+    return f"CREATE TEMP TABLE {stage} ({', '.join(columns)}) ON COMMIT DROP"
+
+
+def _fulltext_column_ddl(table: str, config: str) -> str:
+    """Generated tsvector over summary (A) / tags (B) / content (C) with a fixed regconfig."""
+    fields = [("summary", "A"), ("tags", "B"), ("content", "C")]
+    expr = " || ".join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({col}, '')), '{weight}')"
+        for col, weight in fields
+    )
+    return (
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+        f"GENERATED ALWAYS AS ({expr}) STORED"
+    )
+
+
+def _partition_name(table: str, tenant_id: int, site_id: int | None = None) -> str:
+    name = f"{table}_t{int(tenant_id)}"
+    return name if site_id is None else f"{name}_s{int(site_id)}"
+
+
+def _renamed(name: str, old: str, new: str) -> str | None:
+    """Apply a table rename to a relation name (``{old}...`` / ``idx_{old}...``); None = unrelated."""
+    for head in ("", "idx_"):
+        prefix = f"{head}{old}"
+        if name == prefix or name.startswith(f"{prefix}_"):
+            return f"{head}{new}{name[len(prefix) :]}"
+    return None
+
+
+async def _rename_table_tree(conn: Any, old: str, new: str) -> None:
+    """Rename a table, its partitions and all their indexes (pkey constraints follow the index)."""
+    rows = (
+        await conn.execute(
+            text(
+                "SELECT c.relname, c.relkind FROM pg_partition_tree(CAST(:t AS regclass)) p "
+                "JOIN pg_class c ON c.oid = p.relid "
+                "UNION ALL "
+                "SELECT ic.relname, ic.relkind FROM pg_partition_tree(CAST(:t AS regclass)) p "
+                "JOIN pg_index i ON i.indrelid = p.relid "
+                "JOIN pg_class ic ON ic.oid = i.indexrelid"
+            ),
+            {"t": old},
+        )
+    ).fetchall()
+    for relname, relkind in rows:
+        target = _renamed(relname, old, new)
+        if target is None:
+            continue
+        kind = "INDEX" if relkind in ("i", "I") else "TABLE"
+        await conn.execute(text(f"ALTER {kind} {relname} RENAME TO {target}"))
+
+
+def _partition_ddls(
+    table: str,
+    partition_keys: list[str],
+    tenant_id: int,
+    site_id: int | None,
+    parent: str | None = None,
+) -> list[tuple[str, str]]:
+    """(name, DDL) pairs creating the tenant partition and, for tenant_site, its site leaf.
+
+    Names always derive from ``table``; ``parent`` lets the migration attach them to the
+    staging table so they keep their final names after the swap.
+    """
+    tenant_part = _partition_name(table, tenant_id)
+    by_site = "site_id" in partition_keys
+    ddls = [
+        (
+            tenant_part,
+            f"CREATE TABLE IF NOT EXISTS {tenant_part} PARTITION OF {parent or table} "
+            f"FOR VALUES IN ({int(tenant_id)})"
+            + (" PARTITION BY LIST (site_id)" if by_site else ""),
+        )
+    ]
+    if by_site:
+        site_part = _partition_name(table, tenant_id, site_id)
+        ddls.append(
+            (
+                site_part,
+                f"CREATE TABLE IF NOT EXISTS {site_part} PARTITION OF {tenant_part} "
+                f"FOR VALUES IN ({int(site_id)})",
+            )
+        )
+    return ddls
+
+
+def _partition_index_name(partition: str, index_name: str, table: str) -> str:
+    """idx_{table}_embedding[_rebuild] -> {partition}_embedding[_rebuild]."""
+    return f"{partition}_{index_name.removeprefix(f'idx_{table}_')}"
+
+
+def _row_to_document(row: Any) -> LangChainDocument:
+    """Rebuild a LangChain Document the same way PGVectorStore does (JSON + promoted columns)."""
+    metadata = dict(row.langchain_metadata or {})
+    for col in _PROMOTED_COLUMN_NAMES:
+        metadata[col] = getattr(row, col)
+    return LangChainDocument(page_content=row.content, metadata=metadata, id=str(row.langchain_id))
 
 
 async def _ensure_engine_guard(driver: PostgresDriver) -> None:
@@ -7,17 +7,50 @@
 
 import asyncio
 import logging
-from typing import TypedDict
+import time
+from collections.abc import AsyncIterator
+from dataclasses import replace
+from typing import Any, TypedDict
 
 from langchain_core.documents import Document as LangChainDocument
 
 from app.core.ai.providers.base import Resolved
 from app.core.ai.providers.embedding import EmbeddingProvider
 from app.core.ai.providers.openai_embeddings import OpenAICompatibleEmbeddings
-from app.core.vector.driver.base import DriverSearchResult, VectorChunk, VectorDriver
+from app.core.infra.tenant import get_current_tenant
+from app.core.vector.driver.base import (
+    DriverSearchResult,
+    PrecomputedQuery,
+    SearchOptions,
+    VectorChunk,
+    VectorDriver,
+)
 
 logger = logging.getLogger(__name__)
 
+# 影子存储 / 在线存储代号的探测间隔：跨进程感知重建开始与切换完成的最大延迟
+_STORAGE_CHECK_INTERVAL = 10.0
+
+
+def _embedding_space(resolved: Resolved) -> tuple[str, Any]:
+    """模型 + 维度决定向量空间；只换 api_key / base_url 时已有向量仍然可用。"""
+    return resolved.model, resolved.extra.get("Dimension")
+
+
+def _pin_of(resolved: Resolved) -> dict[str, Any]:
+    """写入存储的向量空间记录（不含凭证）。"""
+    return {
+        "model": resolved.model,
+        "dimension": resolved.extra.get("Dimension"),
+        "hash": resolved.hash,
+    }
+
+
+def _pin_key(tenant_id: int | None) -> str:
+    """与 EmbeddingProvider 相同的租户解析：未显式传入时取当前租户上下文。"""
+    resolved_id = tenant_id if tenant_id is not None else get_current_tenant()
+    return "platform" if resolved_id is None else str(resolved_id)
+
 
 class VectorSearchResult(TypedDict):
     doc: LangChainDocument
@@ -44,6 +77,13 @@ class VectorStoreManager:
         self._schema_initialized: set[str] = set()
         # 最近一次 _get_ready 的解析结果，供观测层读取（替代之前的 ContextVar）
         self._last_embedding: Resolved[OpenAICompatibleEmbeddings] | None = None
+        # 蓝绿重建：在线存储记录的各租户向量空间（driver.get_embedding_pins，随存储切换）。
+        # embedding 换模型 / 维度后，切换前所有进程（含新启动的）都按它读写，旧向量只能用旧模型查询
+        self._pins: dict[str, dict[str, Any]] | None = None
+        self._generation: str | None = None
+        self._shadow: VectorDriver | None = None
+        self._storage_checked_at = 0.0
+        self._pending_warned: set[str] = set()
 
     # ──────────────────────────────────────────────────────────────────────
     # Internal: resolve embeddings + ensure schema
@@ -54,22 +94,88 @@ class VectorStoreManager:
         tenant_id: int | None = None,
         force: bool = False,
         purpose: str | None = None,
+        emit_signal: bool = True,
     ) -> Resolved[OpenAICompatibleEmbeddings]:
-        resolved = await self._provider.resolve(tenant_id, force=force, purpose=purpose)
-        self._last_embedding = resolved
+        resolved = await self._provider.resolve(
+            tenant_id, force=force, purpose=purpose, emit_signal=emit_signal
+        )
+        await self._refresh_storage_state()
+        pin = (self._pins or {}).get(_pin_key(tenant_id))
+        if pin is not None and (pin["model"], pin["dimension"]) != _embedding_space(resolved):
+            # 在线存储仍是旧向量空间：继续用旧 embedding，新配置只用于影子存储回填
+            if resolved.hash not in self._pending_warned:
+                self._pending_warned.add(resolved.hash)
+                logger.warning(
+                    f"[VectorStore] embedding {resolved.model} differs from the live store "
+                    f"({pin['model']}); serving with the old model until a re-index is promoted"
+                )
+            live = await self._provider.resolve(tenant_id, force=force, emit_signal=False, pin=pin)
+            live = replace(live, model=pin["model"], hash=pin["hash"])
+            self._last_embedding = live
+            return live
 
+        self._last_embedding = resolved
         conf_hash = resolved.hash
         if conf_hash not in self._schema_initialized:
             async with self._lock:
                 if conf_hash not in self._schema_initialized:
                     # Dimension 在 EmbeddingProvider 的 signal_extras 中以 int 或 None 暴露
-                    raw_dim = resolved.extra.get("Dimension")
-                    dimension = int(raw_dim) if isinstance(raw_dim, int) else 1024
-                    await self._driver.ensure_schema(dimension)
+                    await self._driver.ensure_schema(_dimension_of(resolved))
                     self._schema_initialized.add(conf_hash)
-
+                    if pin is None:
+                        await self._save_pin(self._driver, _pin_key(tenant_id), resolved)
         return resolved
 
+    async def _refresh_storage_state(self) -> None:
+        """按间隔刷新在线存储代号、向量空间记录与影子存储（跨进程感知重建开始 / 切换完成）。"""
+        now = time.monotonic()
+        if now - self._storage_checked_at < _STORAGE_CHECK_INTERVAL:
+            return
+        self._storage_checked_at = now
+        try:
+            generation = await self._driver.storage_generation()
+            if self._generation is not None and generation != self._generation:
+                # 在线存储已被切换：按新存储的记录重新校验 schema
+                self._schema_initialized.clear()
+            self._generation = generation
+            self._pins = await self._driver.get_embedding_pins()
+            self._shadow = await self._driver.get_shadow()
+        except Exception as e:
+            logger.warning(f"[VectorStore] storage state check failed: {e}")
+
+    async def _save_pin(self, driver: VectorDriver, key: str, resolved: Resolved) -> None:
+        """存储尚无该租户记录时写入（首次使用 / 新切换上线的存储），已有记录不覆盖。"""
+        try:
+            pins = await driver.get_embedding_pins()
+            if key not in pins:
+                pins[key] = _pin_of(resolved)
+                await driver.set_embedding_pins(pins)
+            if driver is self._driver:
+                self._pins = pins
+        except Exception as e:
+            logger.warning(f"[VectorStore] failed to record embedding pin: {e}")
+
+    async def _mirror(self, operation: str, source: Resolved | None = None, **kwargs: Any) -> None:
+        """重建期间把在线写入同步到影子存储（尽力而为，失败只记日志）。"""
+        await self._refresh_storage_state()
+        shadow = self._shadow
+        if shadow is None:
+            return
+        try:
+            if operation == "add":
+                target = await self.target_embedding(source.tenant_id if source else None)
+                if source is None or _embedding_space(target) != _embedding_space(source):
+                    kwargs["vectors"] = None  # 旧空间的向量不能写进新空间
+                await shadow.add_documents(embeddings=target.instance, **kwargs)
+            elif operation == "delete_ids":
+                await shadow.delete_by_ids(**kwargs)
+            elif operation == "update_metadata":
+                await shadow.update_metadata_by_filter(**kwargs)
+            else:
+                await shadow.delete_by_filter(**kwargs)
+        except Exception as e:
+            logger.warning(f"[VectorStore] shadow mirror ({operation}) failed: {e}")
+
     # ──────────────────────────────────────────────────────────────────────
     # Public interface
     # ──────────────────────────────────────────────────────────────────────
@@ -79,11 +185,27 @@ class VectorStoreManager:
         documents: list[LangChainDocument],
         ids: list[str],
         storage_batch_size: int = 100,
+        vectors: list[list[float] | None] | None = None,
+        bulk: bool | None = None,
     ) -> list[str]:
+        """写入文档；``vectors`` 中非 None 的项直接复用已有向量，不再调用 embedding。
+
+        ``bulk=True`` 强制走批量导入路径（重建索引任务使用），None 时按数据量自动选择。
+        """
         resolved = await self._get_ready()
-        return await self._driver.add_documents(
-            documents, ids, resolved.instance, storage_batch_size
+        stored = await self._driver.add_documents(
+            documents, ids, resolved.instance, storage_batch_size, vectors, bulk=bulk
         )
+        await self._mirror(
+            "add",
+            resolved,
+            documents=documents,
+            ids=ids,
+            batch_size=storage_batch_size,
+            vectors=vectors,
+            bulk=bulk,
+        )
+        return stored
 
     async def search(
         self,
@@ -91,31 +213,162 @@ class VectorStoreManager:
         k: int = 5,
         metadata_filter: dict | None = None,
         purpose: str | None = None,
+        options: SearchOptions | None = None,
+        query_vector: list[float] | None = None,
     ) -> list[VectorSearchResult]:
-        resolved = await self._get_ready(purpose=purpose)
+        """语义检索。``query_vector`` 为 ``embed_query`` 预先算好的向量时不再重复 embedding。"""
+        if query_vector is None:
+            embeddings = (await self._get_ready(purpose=purpose)).instance
+        else:
+            # usage signal 已由 embed_query 记录
+            await self._get_ready(emit_signal=False)
+            embeddings = PrecomputedQuery(query_vector)
         raw: list[DriverSearchResult] = await self._driver.search(
-            query, resolved.instance, k, metadata_filter
+            query, embeddings, k, metadata_filter, options
         )
         return [
             {"doc": r["doc"], "score": r["score"], "score_comparable": r["score_comparable"]}
             for r in raw
         ]
 
+    async def embed_query(self, query: str, purpose: str | None = None) -> list[float]:
+        """单独计算查询向量，便于调用方把 embedding 与其他准备工作并发执行。"""
+        resolved = await self._get_ready(purpose=purpose)
+        return await resolved.instance.aembed_query(query)
+
+    async def embed_queries(
+        self, queries: list[str], purpose: str | None = None
+    ) -> list[list[float]]:
+        """一次调用计算多个查询向量（同一步的多路 tool call），顺序与 queries 一致。"""
+        if not queries:
+            return []
+        resolved = await self._get_ready(purpose=purpose)
+        return await resolved.instance.aembed_documents(list(queries))
+
+    async def search_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        metadata_filter: dict | None = None,
+        purpose: str | None = None,
+        options: SearchOptions | None = None,
+    ) -> list[list[VectorSearchResult]]:
+        """批量检索（多路 tool call / 查询改写的多个变体），结果顺序与 queries 一致。
+
+        全部查询一次 ``aembed_documents`` 向量化，驱动侧一次往返（PG LATERAL / ES msearch）。
+        """
+        if not queries:
+            return []
+        resolved = await self._get_ready(purpose=purpose)
+        query_vectors = await resolved.instance.aembed_documents(list(queries))
+        raw: list[list[DriverSearchResult]] = await self._driver.search_many(
+            list(queries), query_vectors, k, metadata_filter, options
+        )
+        return [
+            [
+                {"doc": r["doc"], "score": r["score"], "score_comparable": r["score_comparable"]}
+                for r in results
+            ]
+            for results in raw
+        ]
+
     async def delete_documents(self, ids: list[str]) -> None:
         await self._get_ready()
         await self._driver.delete_by_ids(ids)
+        await self._mirror("delete_ids", ids=ids)
 
     async def delete_by_metadata(self, key: str, value: str | int) -> None:
         await self._get_ready()
         await self._driver.delete_by_filter(key, value)
+        await self._mirror("delete_filter", key=key, value=value)
+
+    async def update_metadata_by_filter(
+        self, key: str, value: str | int, patch: dict[str, Any]
+    ) -> int:
+        """只改写匹配 chunk 的 metadata（标题 / 分类 / 发布状态等），不调用 embedding。"""
+        await self._get_ready()
+        updated = await self._driver.update_metadata_by_filter(key, value, patch)
+        await self._mirror("update_metadata", key=key, value=value, patch=patch)
+        return updated
 
     async def get_chunks_by_metadata(self, key: str, value: str | int) -> list[VectorChunk]:
         await self._get_ready()
         return await self._driver.get_by_filter(key, value)
 
+    async def iter_chunks_by_metadata(
+        self, key: str, value: str | int, page_size: int | None = None
+    ) -> AsyncIterator[VectorChunk]:
+        """按 chunk_index 顺序分页流式读取（大文档 / 导出用），读取失败直接抛出。"""
+        await self._get_ready()
+        async for chunk in self._driver.iter_by_filter(key, value, page_size):
+            yield chunk
+
+    async def get_vectors(self, ids: list[str]) -> dict[str, list[float]]:
+        await self._get_ready()
+        return await self._driver.get_vectors(ids)
+
     async def ping(self) -> bool:
         return await self._driver.ping()
 
+    async def index_status(self, recall_sample: int = 0) -> dict:
+        """ANN 索引状态（类型 / 有效性 / 体积 / 可选 recall 抽样），供管理端展示。"""
+        await self._get_ready()
+        return {"backend": self.vector_backend, **await self._driver.index_status(recall_sample)}
+
+    async def rebuild_index(self) -> dict:
+        """在线重建 ANN 索引；不支持的引擎抛 NotImplementedError。"""
+        await self._get_ready()
+        return await self._driver.rebuild_index()
+
+    # ──────────────────────────────────────────────────────────────────────
+    # Blue/green re-index
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def open_reindex(
+        self, tenant_id: int | None = None
+    ) -> tuple[VectorDriver, Resolved[OpenAICompatibleEmbeddings]]:
+        """按当前 embedding 配置创建（或续用）影子存储，返回 (影子驱动, 目标配置)。
+
+        在线存储不受影响，其向量空间记录此前没有时在这里补写，之后启动的进程据此
+        继续用旧配置服务；影子存储记录目标配置，切换后随之上线。此后本进程的写入
+        同步到影子，其他进程最迟 ``_STORAGE_CHECK_INTERVAL`` 秒后跟进。
+        """
+        await self._get_ready(tenant_id, emit_signal=False)
+        target = await self._provider.resolve(tenant_id, force=True)
+        shadow = await self._driver.open_shadow(_dimension_of(target))
+        await self._save_pin(shadow, _pin_key(tenant_id), target)
+        self._shadow = shadow
+        return shadow, target
+
+    async def active_embedding(
+        self, tenant_id: int | None = None
+    ) -> Resolved[OpenAICompatibleEmbeddings]:
+        """在线存储当前使用的 embedding 配置（重建期间为锁定的旧配置）。
+
+        探测调用，不打 usage signal；用于按 embedding hash 生成缓存键等场景。
+        """
+        return await self._get_ready(tenant_id, emit_signal=False)
+
+    async def target_embedding(
+        self, tenant_id: int | None = None
+    ) -> Resolved[OpenAICompatibleEmbeddings]:
+        """当前保存的 embedding 配置（不受重建期间在线存储的旧配置锁定影响）。"""
+        return await self._provider.resolve(tenant_id)
+
+    async def promote_reindex(self) -> dict:
+        """原子切换影子存储为在线存储，并让后续请求改用新 embedding 配置。"""
+        result = await self._driver.promote_shadow()
+        async with self._lock:
+            self._pins = None
+            self._schema_initialized.clear()
+            self._shadow = None
+            self._storage_checked_at = 0.0
+        return result
+
+    async def abort_reindex(self) -> None:
+        await self._driver.drop_shadow()
+        self._shadow = None
+
     async def close(self) -> None:
         await self._driver.close()
         await self._provider.aclose()
@@ -146,3 +399,8 @@ class VectorStoreManager:
         :mod:`app.core.vector` 包级 shim 提供，不在本类上定义。
         """
         return self._last_embedding
+
+
+def _dimension_of(resolved: Resolved) -> int:
+    raw_dim = resolved.extra.get("Dimension")
+    return int(raw_dim) if isinstance(raw_dim, int) else 1024
@@ -3,10 +3,11 @@
 # Licensed under the CatWiki Open Source License (Modified Apache 2.0);
 # you may not use this file except in compliance with the License.
 
-"""重试策略与熔断器
+"""重试策略、对冲请求与熔断器
 
-retry_on_transient: 对瞬时错误（网络抖动、服务限流）执行指数退避重试。
-CircuitBreaker:      防止雪崩，连续失败达到阈值后快速失败直至恢复窗口过期。
+retry_on_transient: 对瞬时错误（网络抖动、服务限流）执行指数退避重试，可设总耗时预算。
+hedged:             首个请求超过给定延迟仍未返回时再发一个副本，取先成功者。
+CircuitBreaker:      滑动窗口内按错误率 / 慢调用率熔断；半开状态只放行一个探测请求。
 """
 
 from __future__ import annotations
@@ -15,6 +16,7 @@ import asyncio
 import logging
 import random
 import time
+from collections import deque
 from collections.abc import Callable, Coroutine
 from dataclasses import dataclass, field
 from typing import Any, TypeVar
@@ -34,6 +36,8 @@ class RetryPolicy:
     max_delay: float = 30.0
     backoff_factor: float = 2.0
     jitter: bool = True
+    # 总耗时预算（秒）：下一次退避后会超出预算时不再重试，直接抛出最后一次错误
+    budget: float | None = None
 
 
 DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -51,6 +55,7 @@ async def retry_on_transient(  # noqa: UP047
     Non-retryable HTTP statuses (e.g. 401, 403) are re-raised immediately.
     """
     last_exc: BaseException | None = None
+    started = time.monotonic()
     for attempt in range(policy.max_attempts):
         try:
             return await coro_factory()
@@ -68,6 +73,8 @@ async def retry_on_transient(  # noqa: UP047
             delay = min(policy.base_delay * (policy.backoff_factor**attempt), policy.max_delay)
             if policy.jitter:
                 delay *= random.uniform(0.5, 1.0)
+            if policy.budget is not None and time.monotonic() - started + delay > policy.budget:
+                break
 
             logger.warning(
                 f"[Retry] {operation} failed (attempt {attempt + 1}/{policy.max_attempts}), "
@@ -78,52 +85,216 @@ async def retry_on_transient(  # noqa: UP047
     raise last_exc  # type: ignore[misc]
 
 
+async def hedged(  # noqa: UP047
+    coro_factory: Callable[[], Coroutine[Any, Any, _T]],
+    delay: float | None,
+) -> _T:
+    """对冲请求：首个请求 ``delay`` 秒内未返回时再发一个副本，返回先成功的结果。
+
+    副本经客户端的连接池轮询落到另一节点；两者都失败时抛出后失败者的异常。
+    ``delay`` 为 None 时等价于直接 await。
+    """
+    if delay is None:
+        return await coro_factory()
+    first = asyncio.ensure_future(coro_factory())
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.add(asyncio.ensure_future(coro_factory()))
+        error: BaseException | None = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _counts_as_failure(exc: BaseException) -> bool:
+    """只有服务端 / 网络类错误计入熔断；4xx（查询写错、无权限）不代表服务不可用。"""
+    status: int | None = getattr(getattr(exc, "meta", None), "status", None)
+    return status is None or status == 429 or status >= 500
+
+
 class CircuitBreaker:
-    """Half-open circuit breaker for protecting external service calls."""
+    """滑动窗口熔断器（closed → open → half-open → closed）。
+
+    - closed：记录最近 ``window`` 秒内的调用结果；调用数达到 ``min_calls`` 且错误率
+      ≥ ``failure_rate`` 或慢调用率 ≥ ``slow_call_rate`` 时打开
+    - open：快速失败，``recovery_timeout`` 秒后进入 half-open
+    - half-open：只放行一个探测请求，其余调用继续快速失败；探测成功则关闭并清空窗口，
+      失败则重新打开
+
+    慢调用只统计 ``call(..., slow_call_threshold=...)`` 给出阈值的调用（读路径）。
+    """
 
     def __init__(
         self,
-        failure_threshold: int = 5,
-        recovery_timeout: float = 30.0,
         name: str = "CircuitBreaker",
+        *,
+        window: float = 30.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 0.8,
+        recovery_timeout: float = 30.0,
     ) -> None:
-        self._failure_threshold = failure_threshold
-        self._recovery_timeout = recovery_timeout
         self._name = name
-        self._failure_count: int = 0
-        self._is_open: bool = False
-        self._opened_at: float = 0.0
+        self._window = window
+        self._min_calls = min_calls
+        self._failure_rate = failure_rate
+        self._slow_call_rate = slow_call_rate
+        self._recovery_timeout = recovery_timeout
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        # (时间戳, 是否失败, 是否慢调用)；成功调用的耗时另存，用于对冲延迟的分位数
+        self._calls: deque[tuple[float, bool, bool]] = deque()
+        self._latencies: deque[tuple[float, float]] = deque()
+        self._opened_total = 0
+        self._rejected_total = 0
 
-    async def call(
-        self,
-        coro_factory: Callable[[], Coroutine[Any, Any, _T]],
-        operation: str = "operation",
-    ) -> _T:
-        if self._is_open:
+    # ── 状态 ────────────────────────────────────────────────────────────
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self._window
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+        while self._latencies and self._latencies[0][0] < horizon:
+            self._latencies.popleft()
+
+    def _open(self, reason: str) -> None:
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._opened_total += 1
+        logger.error(f"[{self._name}] Circuit opened: {reason}")
+
+    def _record(self, failed: bool, slow: bool, latency: float | None) -> None:
+        now = time.monotonic()
+        self._calls.append((now, failed, slow))
+        if latency is not None:
+            self._latencies.append((now, latency))
+        self._prune(now)
+        total = len(self._calls)
+        if self._state != "closed" or total < self._min_calls:
+            return
+        failures = sum(1 for _, f, _ in self._calls if f)
+        slow_calls = sum(1 for _, _, s in self._calls if s)
+        if failures / total >= self._failure_rate:
+            self._open(f"error rate {failures}/{total} in {self._window:.0f}s")
+        elif slow_calls / total >= self._slow_call_rate:
+            self._open(f"slow-call rate {slow_calls}/{total} in {self._window:.0f}s")
+
+    def latency_quantile(self, q: float, min_samples: int = 20) -> float | None:
+        """窗口内成功调用耗时的分位数；样本不足时返回 None。"""
+        self._prune(time.monotonic())
+        if len(self._latencies) < min_samples:
+            return None
+        ordered = sorted(latency for _, latency in self._latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> dict[str, Any]:
+        """熔断器指标（管理端 / 健康检查展示）。"""
+        self._prune(time.monotonic())
+        total = len(self._calls)
+        p95 = self.latency_quantile(0.95, min_samples=1)
+        return {
+            "state": self._state,
+            "window_calls": total,
+            "failure_rate": round(sum(1 for _, f, _ in self._calls if f) / total, 3)
+            if total
+            else 0.0,
+            "slow_call_rate": round(sum(1 for _, _, s in self._calls if s) / total, 3)
+            if total
+            else 0.0,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "opened_total": self._opened_total,
+            "rejected_total": self._rejected_total,
+        }
+
+    # ── 调用 ────────────────────────────────────────────────────────────
+
+    def _admit(self, operation: str) -> bool:
+        """放行当前调用；返回是否为 half-open 探测。拒绝时抛 VectorStoreConnectionError。"""
+        if self._state == "open":
             elapsed = time.monotonic() - self._opened_at
             if elapsed < self._recovery_timeout:
+                self._rejected_total += 1
                 raise VectorStoreConnectionError(
                     f"[{self._name}] Circuit open — {self._recovery_timeout - elapsed:.1f}s "
                     f"until recovery attempt ({operation})"
                 )
-            # Recovery window expired: go half-open (reset and allow one attempt)
-            logger.info(
-                f"[{self._name}] Circuit half-open, allowing recovery attempt ({operation})"
-            )
-            self._is_open = False
-            self._failure_count = 0
+            self._state = "half_open"
+        if self._state == "half_open":
+            if self._probe_in_flight:
+                self._rejected_total += 1
+                raise VectorStoreConnectionError(
+                    f"[{self._name}] Circuit half-open, probe in flight ({operation})"
+                )
+            self._probe_in_flight = True
+            logger.info(f"[{self._name}] Circuit half-open, sending probe ({operation})")
+            return True
+        return False
 
+    async def call(
+        self,
+        coro_factory: Callable[[], Coroutine[Any, Any, _T]],
+        operation: str = "operation",
+        *,
+        slow_call_threshold: float | None = None,
+    ) -> _T:
+        probe = self._admit(operation)
+        started = time.monotonic()
         try:
             result = await coro_factory()
-            self._failure_count = 0
-            return result
         except Exception as exc:
-            self._failure_count += 1
-            if self._failure_count >= self._failure_threshold:
-                self._is_open = True
-                self._opened_at = time.monotonic()
-                logger.error(
-                    f"[{self._name}] Circuit opened after {self._failure_count} failures "
-                    f"({operation}): {exc}"
-                )
+            failed = _counts_as_failure(exc)
+            if probe:
+                self._probe_in_flight = False
+                if failed:
+                    self._open(f"probe failed ({operation}): {exc}")
+                else:
+                    self._close()
+            elif failed:
+                self._record(failed=True, slow=False, latency=None)
             raise
+        except BaseException:
+            # 取消（客户端断开 / 对冲落败）不代表服务状态
+            if probe:
+                self._probe_in_flight = False
+                self._state = "open"
+                self._opened_at = time.monotonic() - self._recovery_timeout
+            raise
+        latency = time.monotonic() - started
+        if probe:
+            self._probe_in_flight = False
+            self._close()
+        slow = slow_call_threshold is not None and latency > slow_call_threshold
+        self._record(
+            failed=False, slow=slow, latency=latency if slow_call_threshold is not None else None
+        )
+        return result
+
+    def _close(self) -> None:
+        self._state = "closed"
+        self._calls.clear()
+        logger.info(f"[{self._name}] Circuit closed")
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str, **options: Any) -> CircuitBreaker:
+    """进程内按名称共享的熔断器：同一后端的所有驱动实例（在线 + 影子）共用一个窗口。"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def circuit_breaker_metrics() -> dict[str, dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
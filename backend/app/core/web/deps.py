@@ -26,12 +26,12 @@ from app.core.common.auth import decode_access_token
 from app.core.common.i18n import _
 from app.core.infra.config import settings
 from app.core.infra.rustfs import RustFSService, get_rustfs_service
-from app.core.web.exceptions import NotFoundException, UnauthorizedException
+from app.core.web.exceptions import ForbiddenException, NotFoundException, UnauthorizedException
 from app.crud import crud_site
 from app.crud.user import crud_user
 from app.db.database import get_db
 from app.models.site import Site
-from app.models.user import User, UserStatus
+from app.models.user import User, UserRole, UserStatus
 
 logger = logging.getLogger(__name__)
 
@@ -268,6 +268,18 @@ async def get_current_user_with_tenant(
     return current_user
 
 
+async def get_current_platform_admin(
+    current_user: User = Depends(get_current_user_with_tenant),
+) -> User:
+    """
+    平台管理员依赖：跨租户 / 作用于共享存储的操作（向量存储重建、全局索引维护等）。
+    租户管理员与站点管理员一律拒绝。
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise ForbiddenException(detail=_("auth.platform_admin_required"))
+    return current_user
+
+
 async def is_demo_tenant(
     request: Request,
     tenant_id: int | None = Depends(get_effective_tenant_id),
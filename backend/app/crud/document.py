@@ -398,6 +398,30 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
             await db.commit()
         return result.rowcount
 
+    async def get_vectorized_batch(
+        self,
+        db: AsyncSession,
+        *,
+        after_id: int,
+        limit: int,
+        vectorized_since: datetime | None = None,
+    ) -> list[Document]:
+        """按 ID 顺序取已完成向量化的文档（游标分页，供向量重建回填）"""
+        stmt = select(Document).where(
+            Document.vector_status == VectorStatus.COMPLETED, Document.id > after_id
+        )
+        if vectorized_since is not None:
+            stmt = stmt.where(Document.vectorized_at >= vectorized_since)
+        result = await db.execute(stmt.order_by(Document.id).limit(limit))
+        return list(result.scalars().all())
+
+    async def count_vectorized(self, db: AsyncSession) -> int:
+        """统计已完成向量化的文档数"""
+        result = await db.execute(
+            select(func.count(Document.id)).where(Document.vector_status == VectorStatus.COMPLETED)
+        )
+        return result.scalar_one()
+
     async def get_published_ids(self, db: AsyncSession, *, ids: set[int]) -> set[int]:
         """给定一批文档 ID，返回其中状态为 published 的子集"""
         from app.models.document import DocumentStatus
@@ -412,5 +436,17 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
         )
         return {row[0] for row in result.fetchall()}
 
+    async def get_published_ids_by_site(self, db: AsyncSession, *, site_id: int) -> set[int]:
+        """站点内全部 published 文档的 ID"""
+        from app.models.document import DocumentStatus
+
+        result = await db.execute(
+            select(Document.id).where(
+                Document.site_id == site_id,
+                Document.status == DocumentStatus.PUBLISHED,
+            )
+        )
+        return {row[0] for row in result.fetchall()}
+
 
 crud_document = CRUDDocument(Document)
@@ -59,6 +59,12 @@ class CRUDTask(CRUDBase[Task, TaskCreate, TaskSchema]):
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    async def get_latest_by_type(self, db: AsyncSession, *, task_type: str) -> Task | None:
+        """获取指定类型最近创建的任务"""
+        stmt = select(Task).filter(Task.task_type == task_type).order_by(Task.id.desc()).limit(1)
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
     async def update_status(
         self,
         db: AsyncSession,
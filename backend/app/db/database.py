@@ -21,6 +21,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from starlette.exceptions import HTTPException
 
 from app.core.infra.config import settings
+from app.core.infra.pool_metrics import MeteredAsyncPool, register_engine
 from app.core.web.exceptions import CatWikiError
 from app.db.events import register_core_db_events
 
@@ -29,6 +30,7 @@ logger = logging.getLogger(__name__)
 # 创建异步数据库引擎
 engine = create_async_engine(
     settings.DATABASE_URL,
+    poolclass=MeteredAsyncPool,  # 取连接等待统计（见 core/infra/pool_metrics.py）
     pool_pre_ping=True,  # 连接前检查连接是否有效
     pool_size=settings.DB_POOL_SIZE,  # 连接池大小
     max_overflow=settings.DB_MAX_OVERFLOW,  # 最大溢出连接数
@@ -37,6 +39,7 @@ engine = create_async_engine(
     echo=settings.DB_ECHO,  # 是否输出 SQL 日志
     connect_args={"ssl": False},  # 禁用 SSL 连接（解决 Docker 网络中的 conn lost 问题）
 )
+register_engine("app", engine)
 
 # 创建异步会话工厂
 AsyncSessionLocal = async_sessionmaker(
@@ -47,6 +47,13 @@ class Site(BaseModel):
         server_default=text("false"),
         comment="是否在对话页展示 AI 性能统计（TTFB / 首字 / 总耗时 / 工具耗时 / Tokens）",
     )
+    answer_cache_enabled = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=text("false"),
+        comment="是否启用语义答案缓存（相似的单轮提问直接复用已生成的答案）",
+    )
 
     # 关系
     tenant = relationship(
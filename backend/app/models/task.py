@@ -33,6 +33,7 @@ class TaskType(str, enum.Enum):
 
     IMPORT_PARSING = "import_parsing"  # 文档导入解析
     VECTORIZE = "vectorize"  # 向量化处理
+    VECTOR_REINDEX = "vector_reindex"  # 向量存储蓝绿重建
 
 
 class Task(BaseModel):
@@ -41,6 +41,10 @@ class SiteBase(BaseModel):
         default=False,
         description="是否在对话页展示 AI 性能统计 trace",
     )
+    answer_cache_enabled: bool = Field(
+        default=False,
+        description="是否启用语义答案缓存",
+    )
 
 
 class SiteCreate(SiteBase):
@@ -67,6 +71,10 @@ class SiteUpdate(BaseModel):
         default=None,
         description="是否在对话页展示 AI 性能统计 trace",
     )
+    answer_cache_enabled: bool | None = Field(
+        default=None,
+        description="是否启用语义答案缓存",
+    )
 
     @field_validator("bot_config")
     @classmethod
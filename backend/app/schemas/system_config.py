@@ -43,6 +43,10 @@ class ModelConfig(BaseConfigModel):
     api_key: str = Field(..., description="API Key")
     base_url: str = Field(..., description="API Base URL")
     dimension: int | None = Field(default=None, description="Embedding 维度 (自动探测)")
+    matryoshka: bool = Field(
+        default=False,
+        description="Embedding 模型支持 Matryoshka 截断 (允许本地把更长的向量截到 dimension 维)",
+    )
     mode: Literal["custom", "platform"] = Field(
         default="custom", description="配置模式: custom=自定义, platform=使用平台资源"
     )
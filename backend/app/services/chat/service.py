@@ -28,8 +28,9 @@ from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, System
 from langchain_openai import ChatOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.ai.graph import create_agent_graph
-from app.core.ai.graph.checkpointer import get_checkpointer
+from app.core.ai.graph.checkpointer import get_checkpointer, write_back_thread
+from app.core.ai.graph.compaction import compact_thread
+from app.core.ai.graph.registry import get_agent_graph, with_checkpointer
 from app.core.ai.message_utils import (
     convert_tool_call_chunk_to_openai,
     extract_sources_from_messages,
@@ -75,6 +76,7 @@ from app.services.chat.responses import (
 )
 from app.services.chat.session import ChatSessionService, get_chat_session_service
 from app.services.chat.tasks import persist_chat_turn
+from app.services.rag import answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -133,6 +135,27 @@ def _slim_trace(timing: dict | None) -> dict | None:
     return slim
 
 
+def _last_turn(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """最后一条 HumanMessage 之后的消息（本轮的 tool calls / 工具结果 / 最终答案）。"""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i + 1 :]
+    return list(messages)
+
+
+def _single_turn_question(
+    thread_id: str | None, message: str | None, messages: list[ChatMessage] | None
+) -> str | None:
+    """新会话里只有一条用户消息时返回其内容；多轮 / 带 system 指令的请求不走答案缓存。"""
+    if thread_id:
+        return None
+    if messages:
+        if len(messages) != 1 or messages[0].role != "user":
+            return None
+        message = messages[0].content
+    return message.strip() if isinstance(message, str) and message.strip() else None
+
+
 def _log_rag_summary(stats: dict, model_name: str, turn_start_time: float) -> None:
     """打印 RAG Pipeline 汇总日志卡片，并清空 ContextVar。"""
     total_duration = time.time() - turn_start_time
@@ -156,6 +179,9 @@ def _log_rag_summary(stats: dict, model_name: str, turn_start_time: float) -> No
         if stats.get("threshold_applied")
         else "(threshold N/A, ranking order)"
     )
+    stage_info = (
+        " | ".join(f"{k} {v:.3f}s" for k, v in stats.get("stage_timings", {}).items()) or "N/A"
+    )
     logger.info(
         f"\n{'=' * 72}\n"
         f"📋 [RAG Pipeline Summary]{steps_info}\n"
@@ -170,6 +196,7 @@ def _log_rag_summary(stats: dict, model_name: str, turn_start_time: float) -> No
         f"   3️⃣  Chat      : {model_name}\n"
         f"{'─' * 72}\n"
         f"   ⏱️  Total Dur : {total_duration:.3f}s (Retrieval: {stats['retrieval_duration']:.3f}s)\n"
+        f"      Stages    : {stage_info}\n"
         f"{'=' * 72}"
     )
     rag_stats_var.set(None)
@@ -221,6 +248,8 @@ class ChatContext:
     initial_state: dict
     config: dict
     tenant_id: int | None
+    # chat 配置指纹，与模型 / temperature 一起作为编译图注册表的键
+    config_hash: str = ""
 
     @property
     def thread_id(self) -> str:
@@ -304,8 +333,12 @@ class ChatService:
         suppress_intermediate_tool_text: bool | None = None,
         emit_tool_status_text: bool = False,
         show_pipeline_trace: bool = False,
+        answer_probe: answer_cache.AnswerProbe | None = None,
     ) -> AsyncGenerator[ChatCompletionChunk | dict, None]:
-        """核心流式响应生成器 - 产出原始 Chunk 对象或状态 dict"""
+        """核心流式响应生成器 - 产出原始 Chunk 对象或状态 dict
+
+        answer_probe 非空表示语义答案缓存未命中：本轮答案落库后顺带写入缓存。
+        """
         rag_stats_var.set({})
 
         turn_start_time = time.time()
@@ -536,6 +569,14 @@ class ChatService:
                 trace=trace_snapshot,
                 tool_elapsed=tool_elapsed_for_persist,
             )
+            if answer_probe is not None:
+                background_tasks.add_task(
+                    answer_cache.remember,
+                    answer_probe,
+                    persistent_content,
+                    sources,
+                    _last_turn(final_messages),
+                )
 
             stats = rag_stats_var.get()
             if stats:
@@ -656,18 +697,20 @@ class ChatService:
         emit_tool_status_text: bool = False,
         show_pipeline_trace: bool = False,
         emit_usage: bool = False,
+        answer_probe: answer_cache.AnswerProbe | None = None,
     ) -> AsyncGenerator[ChatCompletionChunk | dict, None]:
         """创建图并驱动 generate_chat_chunks，两条 API 路径（completions / responses）共用。
 
         emit_usage=True 时在所有 chunk 之后追加 make_usage_chunk，供 Responses API 的
         stream_responses_api 注入 response.completed.usage；completions 路径不需要此行为。
         """
+        graph = get_agent_graph(ctx.config_hash, ctx.llm)
         async with get_checkpointer() as cp:
-            graph = create_agent_graph(checkpointer=cp, model=ctx.llm)
+            config = with_checkpointer(ctx.config, cp)
             async for chunk in self.generate_chat_chunks(
                 graph,
                 ctx.initial_state,
-                ctx.config,
+                config,
                 ctx.model_name,
                 ctx.thread_id,
                 background_tasks,
@@ -676,33 +719,127 @@ class ChatService:
                 suppress_intermediate_tool_text=suppress_intermediate_tool_text,
                 emit_tool_status_text=emit_tool_status_text,
                 show_pipeline_trace=show_pipeline_trace,
+                answer_probe=answer_probe,
             ):
                 yield chunk
             if emit_usage:
                 try:
-                    state = await graph.aget_state(ctx.config)
+                    state = await graph.aget_state(config)
                     final_msgs = (state.values or {}).get("messages") or []
                     usage = aggregate_usage_from_messages(final_msgs)
                     if usage is not None:
                         yield make_usage_chunk(usage)
                 except Exception as e:
                     logger.warning("流式 usage 聚合失败（已忽略）: %s", e)
+            # 正文与引用已全部发出；在本响应结束前压缩，避免与同会话下一轮并发写 checkpoint
+            await compact_thread(graph, config)
+        # tiered 模式下本轮的中间 checkpoint 只在 Redis，响应结束后合并回写一次
+        background_tasks.add_task(write_back_thread, ctx.thread_id)
 
     async def _invoke_graph_blocking(
         self,
         ctx: ChatContext,
         background_tasks: BackgroundTasks,
+        answer_probe: answer_cache.AnswerProbe | None = None,
     ) -> tuple[list[BaseMessage], str]:
         """非流式路径：执行图推理，落库，返回 (messages, content)。"""
+        graph = get_agent_graph(ctx.config_hash, ctx.llm)
         async with get_checkpointer() as cp:
-            graph = create_agent_graph(checkpointer=cp, model=ctx.llm)
-            result = await graph.ainvoke(ctx.initial_state, ctx.config)
+            config = with_checkpointer(ctx.config, cp)
+            result = await graph.ainvoke(ctx.initial_state, config)
+            await compact_thread(graph, config)
+        background_tasks.add_task(write_back_thread, ctx.thread_id)
         messages = result["messages"]
         last = messages[-1] if messages else AIMessage(content="")
         content = last.content if isinstance(last, BaseMessage) else ""
         background_tasks.add_task(persist_chat_turn, ctx.thread_id, messages, content)
+        if answer_probe is not None:
+            background_tasks.add_task(
+                answer_cache.remember,
+                answer_probe,
+                content,
+                extract_sources_from_messages(messages, from_last_turn=True),
+                _last_turn(messages),
+            )
         return messages, content
 
+    # ──────────────────────────────────────────────────────────────────────
+    # 语义答案缓存
+    # ──────────────────────────────────────────────────────────────────────
+
+    async def _probe_answer_cache(
+        self, ctx: ChatContext, site_id: int, question: str | None
+    ) -> tuple[answer_cache.AnswerProbe | None, answer_cache.CachedAnswer | None]:
+        """站点开启 answer_cache_enabled 且为单轮提问时查找缓存答案。
+
+        返回 (probe, hit)：命中时 hit 非空；未命中时 probe 交给本轮生成结束后写入缓存；
+        不适用或出错时两者皆为 None，走正常 Agent 流程。
+        """
+        if not question or not site_id:
+            return None, None
+        site_obj = await crud_site.get(self.db, id=site_id)
+        if site_obj is None or not getattr(site_obj, "answer_cache_enabled", False):
+            return None, None
+        try:
+            return await answer_cache.probe(ctx.tenant_id, site_id, question, ctx.model_name)
+        except Exception as e:
+            logger.warning(f"⚠️ [AnswerCache] 查找失败，按未命中处理: {e}")
+            return None, None
+
+    async def _commit_cached_turn(
+        self,
+        ctx: ChatContext,
+        cached: answer_cache.CachedAnswer,
+        background_tasks: BackgroundTasks,
+    ) -> list[BaseMessage]:
+        """把缓存答案当作本轮结果：写入 checkpoint（后续追问能看到这一轮）并落库。"""
+        messages = [*ctx.initial_state["messages"], *cached.messages]
+        try:
+            graph = get_agent_graph(ctx.config_hash, ctx.llm)
+            async with get_checkpointer() as cp:
+                await graph.aupdate_state(
+                    with_checkpointer(ctx.config, cp),
+                    {**ctx.initial_state, "messages": messages},
+                    as_node="agent",
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ [AnswerCache] 写入 checkpoint 失败: {e}")
+        background_tasks.add_task(write_back_thread, ctx.thread_id)
+        background_tasks.add_task(persist_chat_turn, ctx.thread_id, messages, cached.answer)
+        return messages
+
+    async def _generate_cached_chunks(
+        self,
+        ctx: ChatContext,
+        cached: answer_cache.CachedAnswer,
+        background_tasks: BackgroundTasks,
+        *,
+        include_internal_events: bool = True,
+    ) -> AsyncGenerator[ChatCompletionChunk | dict, None]:
+        """缓存命中的流式输出：与正常流程相同的 chunk 序列（正文分段 + sources + stop）。"""
+        chunk_id_prefix = f"chatcmpl-{uuid.uuid4()}"
+        try:
+            yield build_openai_chunk(
+                chunk_id=chunk_id_prefix, model_name=ctx.model_name, role="assistant"
+            )
+            mark_chat_timing("ttfb")
+            await self._commit_cached_turn(ctx, cached, background_tasks)
+            for piece in split_text_for_stream(cached.answer):
+                if not piece:
+                    continue
+                yield build_openai_chunk(
+                    chunk_id=chunk_id_prefix, model_name=ctx.model_name, content=piece
+                )
+                mark_chat_timing("first_token", overwrite=False)
+            if include_internal_events and cached.sources:
+                yield {"sources": cached.sources}
+            yield build_openai_chunk(
+                chunk_id=chunk_id_prefix, model_name=ctx.model_name, finish_reason="stop"
+            )
+        finally:
+            mark_chat_timing("total", overwrite=False)
+            emit_chat_timing_card(thread_id=ctx.thread_id)
+
     @staticmethod
     def _make_sse_response(generator: AsyncIterable[str]) -> StreamingResponse:
         """构造带标准流式响应头的 SSE StreamingResponse。"""
@@ -788,12 +925,13 @@ class ChatService:
             await ConfigResolver.log_ai_stack(tenant_id=tenant_id)
 
         # 5. 初始化 LLM (可能会触发详细的 Config Card 日志)
-        llm = await chat_provider.get_model(
+        resolved = await chat_provider.resolve(
             tenant_id=tenant_id,
-            model_name=model_name,
-            temperature=temperature,
             purpose="初始化推理引擎",
+            model=model_name,
+            temperature=temperature,
         )
+        llm = resolved.instance
 
         # 6. 持久化首条用户消息
         try:
@@ -827,7 +965,13 @@ class ChatService:
         }
 
         mark_chat_timing("init")
-        return ChatContext(llm=llm, initial_state=initial_state, config=config, tenant_id=tenant_id)
+        return ChatContext(
+            llm=llm,
+            initial_state=initial_state,
+            config=config,
+            tenant_id=tenant_id,
+            config_hash=resolved.hash,
+        )
 
     async def process_chat_request(
         self,
@@ -872,23 +1016,41 @@ class ChatService:
                 )
             raise
 
+        answer_probe, cached = await self._probe_answer_cache(
+            ctx,
+            site_id,
+            _single_turn_question(request.thread_id, request.message, request.messages),
+        )
+
         try:
             if request.stream:
-                return self._make_sse_response(
-                    self._stream_as_openai_sse(
-                        self._generate_graph_chunks(
-                            ctx,
-                            background_tasks,
-                            include_internal_events=include_internal_events,
-                            emit_openai_tool_chunks=emit_openai_tool_chunks,
-                            suppress_intermediate_tool_text=suppress_intermediate_tool_text,
-                            emit_tool_status_text=emit_tool_status_text,
-                            show_pipeline_trace=show_pipeline_trace,
-                        )
+                if cached is not None:
+                    chunks = self._generate_cached_chunks(
+                        ctx,
+                        cached,
+                        background_tasks,
+                        include_internal_events=include_internal_events,
                     )
-                )
+                else:
+                    chunks = self._generate_graph_chunks(
+                        ctx,
+                        background_tasks,
+                        include_internal_events=include_internal_events,
+                        emit_openai_tool_chunks=emit_openai_tool_chunks,
+                        suppress_intermediate_tool_text=suppress_intermediate_tool_text,
+                        emit_tool_status_text=emit_tool_status_text,
+                        show_pipeline_trace=show_pipeline_trace,
+                        answer_probe=answer_probe,
+                    )
+                return self._make_sse_response(self._stream_as_openai_sse(chunks))
 
-            messages, content = await self._invoke_graph_blocking(ctx, background_tasks)
+            if cached is not None:
+                await self._commit_cached_turn(ctx, cached, background_tasks)
+                content = cached.answer
+            else:
+                messages, content = await self._invoke_graph_blocking(
+                    ctx, background_tasks, answer_probe
+                )
             return ChatCompletionResponse(
                 id=f"chatcmpl-{uuid.uuid4()}",
                 object="chat.completion",
@@ -954,22 +1116,38 @@ class ChatService:
                 )
             raise
 
+        answer_probe, cached = await self._probe_answer_cache(
+            ctx,
+            site_id,
+            _single_turn_question(
+                request.previous_response_id,
+                message if messages is None else None,
+                None if messages is None else list(messages),
+            ),
+        )
+
         try:
             if request.stream:
-                return self._make_sse_response(
-                    stream_responses_api(
-                        ctx.thread_id,
-                        self._generate_graph_chunks(
-                            ctx,
-                            background_tasks,
-                            include_internal_events=True,
-                            show_pipeline_trace=show_pipeline_trace,
-                            emit_usage=True,
-                        ),
+                if cached is not None:
+                    chunks = self._generate_cached_chunks(ctx, cached, background_tasks)
+                else:
+                    chunks = self._generate_graph_chunks(
+                        ctx,
+                        background_tasks,
+                        include_internal_events=True,
+                        show_pipeline_trace=show_pipeline_trace,
+                        emit_usage=True,
+                        answer_probe=answer_probe,
                     )
-                )
+                return self._make_sse_response(stream_responses_api(ctx.thread_id, chunks))
 
-            messages, content = await self._invoke_graph_blocking(ctx, background_tasks)
+            if cached is not None:
+                messages = await self._commit_cached_turn(ctx, cached, background_tasks)
+                content = cached.answer
+            else:
+                messages, content = await self._invoke_graph_blocking(
+                    ctx, background_tasks, answer_probe
+                )
             return ResponsesAPIResponse(
                 id=ctx.thread_id,
                 model=ctx.model_name,
@@ -979,7 +1157,8 @@ class ChatService:
                         content=[ResponseOutputContent(text=content)],
                     )
                 ],
-                usage=aggregate_usage_from_messages(messages),
+                # 缓存命中没有调用模型；缓存消息里的 usage 属于原始那一轮，不计入
+                usage=None if cached is not None else aggregate_usage_from_messages(messages),
             )
         except Exception as e:
             logger.error(f"❌ [ChatService] Execution Error: {e}", exc_info=True)
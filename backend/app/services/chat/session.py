@@ -322,6 +322,10 @@ class ChatSessionService:
                     await self.db.execute(
                         text(f"DELETE FROM {table} WHERE thread_id = :tid"), {"tid": thread_id}
                     )
+                # tiered 模式下 Redis 热层也有副本，一并删除以免被回写复活
+                from app.core.ai.graph.checkpointer import delete_hot_threads
+
+                await delete_hot_threads([thread_id])
                 # 自动处理提交
                 logger.info(
                     f"🧹 [ChatSession] LangGraph checkpoints cleaned: thread_id={thread_id}"
@@ -370,6 +374,9 @@ class ChatSessionService:
                     text(f"DELETE FROM {table} WHERE thread_id = ANY(:tids)"),
                     {"tids": list(thread_ids)},
                 )
+            from app.core.ai.graph.checkpointer import delete_hot_threads
+
+            await delete_hot_threads(list(thread_ids))
         except Exception as e:
             logger.warning(f"⚠️ [ChatSession] Failed to bulk-delete checkpointer data: {e}")
 
@@ -14,6 +14,7 @@ DocumentService``），不要直接引用子模块。
 |---|---|
 | ``service``       | ``DocumentService`` —— CRUD + 导入流水线 + 向量化任务分发（DI）|
 | ``vectorization`` | 文档切分与向量入库（worker 直接调用）|
+| ``reindex``       | 向量存储蓝绿重建：影子回填 + 原子切换（worker 直接调用）|
 | ``enrichment``    | LLM 元数据增强（summary / tags 等衍生字段，无 DB 依赖）|
 """
 
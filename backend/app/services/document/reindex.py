@@ -0,0 +1,130 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+
+"""向量存储蓝绿重建 —— embedding 换模型 / 维度时零停机重建。
+
+流程（由 ``worker/vector_tasks.py`` 调用）：
+1. ``open_reindex`` 按当前 embedding 配置创建影子存储（PG 影子表 / ES 新一代索引），
+   在线存储继续用旧配置服务查询；此后所有进程的写入同步到影子。
+2. 按文档 ID 游标分批回填已完成向量化的文档，每批把断点写入 task.result，
+   任务中断后从断点续跑；批次间按 VECTOR_REINDEX_THROTTLE_SECONDS 限流。
+3. 补齐回填期间被重新向量化的文档，然后 ``promote_reindex`` 原子切换
+   （PG 表重命名 / ES 别名切换）。
+"""
+
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime
+from itertools import groupby
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.infra.tenant import temporary_tenant_context
+from app.core.vector import VectorStoreManager
+from app.core.vector.driver.base import VectorDriver
+from app.crud.document import crud_document
+from app.crud.task import crud_task
+from app.models.document import Document as DocumentModel
+from app.services.document.vectorization import build_document_chunks
+
+logger = logging.getLogger(__name__)
+
+
+async def _backfill(
+    vector_store, shadow: VectorDriver, documents: list[DocumentModel], *, replace: bool = False
+) -> int:
+    """把一批文档按各自租户的当前 embedding 配置写入影子存储，返回写入的 chunk 数。"""
+    written = 0
+    for tenant_id, group in groupby(documents, key=lambda d: d.tenant_id):
+        target = await vector_store.target_embedding(tenant_id)
+        chunks, ids = [], []
+        for document in group:
+            if replace:
+                await shadow.delete_by_filter("id", str(document.id))
+            if not document.content:
+                continue
+            doc_chunks, doc_ids = build_document_chunks(document, target.hash)
+            chunks.extend(doc_chunks)
+            ids.extend(doc_ids)
+        if chunks:
+            await shadow.add_documents(chunks, ids, target.instance, bulk=True)
+            written += len(chunks)
+    return written
+
+
+async def run_vector_reindex(db: AsyncSession, task_id: int) -> dict:
+    """执行（或续跑）一次蓝绿重建，返回切换结果。进度与断点写入 task 表。"""
+    from app.core.infra.config import settings
+    from app.services.task_service import TaskService
+
+    task = await crud_task.get(db, id=task_id)
+    state = dict(task.result or {})
+    resume_from = (task.payload or {}).get("resume_task_id")
+    if not state.get("started_at") and resume_from:
+        previous = await crud_task.get(db, id=resume_from)
+        state = dict(previous.result or {}) if previous else {}
+
+    started = time.time()
+    # 回填覆盖全部租户的文档：清空租户上下文，ORM 查询不注入 tenant 过滤
+    with temporary_tenant_context(None):
+        vector_store = await VectorStoreManager.get_instance()
+        shadow, target = await vector_store.open_reindex(tenant_id=task.tenant_id)
+        state.setdefault("started_at", datetime.now(UTC).isoformat())
+        state.setdefault("cursor", 0)
+        state.setdefault("documents", 0)
+        state.setdefault("chunks", 0)
+        state["model"] = target.model
+        total = max(await crud_document.count_vectorized(db), 1)
+        logger.info(
+            f"🔁 [Reindex] 开始回填影子存储 | 模型: {target.model} | "
+            f"断点: doc>{state['cursor']} | 文档总数: {total}"
+        )
+
+        while True:
+            documents = await crud_document.get_vectorized_batch(
+                db, after_id=state["cursor"], limit=settings.VECTOR_REINDEX_BATCH_DOCS
+            )
+            if not documents:
+                break
+            state["chunks"] += await _backfill(vector_store, shadow, documents)
+            state["cursor"] = documents[-1].id
+            state["documents"] += len(documents)
+            # 切换前进度最多到 99%，100% 由 complete 标记
+            progress = min(state["documents"] / total * 100, 99.0)
+            await TaskService.update_progress(db, task_id, progress, result=state)
+            if settings.VECTOR_REINDEX_THROTTLE_SECONDS:
+                await asyncio.sleep(settings.VECTOR_REINDEX_THROTTLE_SECONDS)
+
+        # 回填期间被重新向量化的文档：影子里可能是旧内容，删除后按最新内容重写
+        since = datetime.fromisoformat(state["started_at"])
+        cursor, refreshed = 0, 0
+        while True:
+            documents = await crud_document.get_vectorized_batch(
+                db,
+                after_id=cursor,
+                limit=settings.VECTOR_REINDEX_BATCH_DOCS,
+                vectorized_since=since,
+            )
+            if not documents:
+                break
+            await _backfill(vector_store, shadow, documents, replace=True)
+            cursor = documents[-1].id
+            refreshed += len(documents)
+
+        result = await vector_store.promote_reindex()
+
+    elapsed = time.time() - started
+    logger.info(
+        f"✅ [Reindex] 切换完成 | 文档: {state['documents']} (补齐 {refreshed}) | "
+        f"Chunks: {state['chunks']} | 本次耗时: {elapsed:.1f}s"
+    )
+    return {
+        **result,
+        "model": target.model,
+        "documents": state["documents"],
+        "chunks": state["chunks"],
+        "refreshed": refreshed,
+    }
@@ -38,7 +38,11 @@ from app.schemas.document import DocumentCreate
 from app.services.document.enrichment import enrich_document_with_llm
 from app.services.document.vectorization import (
     delete_document_vector,
+    document_metadata,
+    invalidate_document_caches,
     is_document_vectorizable,
+    metadata_patch,
+    patch_document_metadata,
 )
 from app.services.site_service import SiteService, get_site_service
 from app.services.system_config import SystemConfigService, get_system_config_service
@@ -314,7 +318,7 @@ class DocumentService:
         if not doc:
             raise NotFoundException(detail=_("doc.not_found", id=document_id))
 
-        on_commit(self.db, delete_document_vector, document_id)
+        on_commit(self.db, delete_document_vector, document_id, doc.tenant_id, doc.site_id)
         await crud_document.update(self.db, db_obj=doc, obj_in={"vector_status": VectorStatus.NONE})
         return await enrich_document_dict(doc, self.db, crud_collection)
 
@@ -327,7 +331,12 @@ class DocumentService:
 
         try:
             vector_store = await VectorStoreManager.get_instance()
-            return await vector_store.get_chunks_by_metadata(key="id", value=str(document_id))
+            return [
+                chunk
+                async for chunk in vector_store.iter_chunks_by_metadata(
+                    key="id", value=str(document_id)
+                )
+            ]
         except Exception as e:
             logger.error(f"Failed to get chunks for doc {document_id}: {e}")
             return []
@@ -429,33 +438,41 @@ class DocumentService:
 
     @transactional()
     async def update_document(self, document_id: int, document_in: any) -> dict:
-        """更新文档。若向量字段（content/title/summary/tags）变更则标记为 OUTDATED。"""
+        """更新文档。正文变更标记为 OUTDATED；其余检索字段变更直接改写 chunk metadata。"""
         document = await crud_document.get(self.db, id=document_id)
         if not document:
             raise NotFoundException(detail=_("doc.not_found", id=document_id))
 
         was_vectorized = document.vector_status == VectorStatus.COMPLETED
-        old_vector_fields = (
-            document.content,
-            document.title,
-            document.summary,
-            tuple(document.tags or []),
-        )
+        # 除 NONE 外的状态都可能仍有已索引的 chunk（如正文改过后的 OUTDATED）
+        has_chunks = document.vector_status != VectorStatus.NONE
+        old_content, old_metadata = document.content, document_metadata(document)
+        old_site_id = document.site_id
 
         document = await crud_document.update(self.db, db_obj=document, obj_in=document_in)
 
-        if was_vectorized:
-            new_vector_fields = (
-                document.content,
-                document.title,
-                document.summary,
-                tuple(document.tags or []),
-            )
-            if new_vector_fields != old_vector_fields:
-                # 向量相关字段变更 → 标记过期，由用户手动触发重新向量化
-                await crud_document.update_vector_status(
-                    self.db, document_id=document_id, status=VectorStatus.OUTDATED
+        # 标题 / 摘要 / 标签 / 分类 / 站点 / 发布状态只存在于 chunk metadata（embedding 只看正文）：
+        # 提交后原地改写已有 chunk，不重新向量化；先于下方的缓存失效回调执行
+        patch = metadata_patch(old_metadata, document_metadata(document))
+        if patch and has_chunks:
+            on_commit(self.db, patch_document_metadata, document_id, patch)
+
+        content_changed = document.content != old_content
+        if has_chunks and (patch or content_changed):
+            # 内容 / metadata 变更：提交后令相关站点的检索缓存与缓存答案失效
+            for site_id in {old_site_id, document.site_id}:
+                on_commit(
+                    self.db,
+                    invalidate_document_caches,
+                    document.tenant_id,
+                    site_id,
+                    document_id,
                 )
+        if was_vectorized and content_changed:
+            # 正文变更 → 标记过期，由用户手动触发重新向量化
+            await crud_document.update_vector_status(
+                self.db, document_id=document_id, status=VectorStatus.OUTDATED
+            )
 
         return await enrich_document_dict(document, self.db, crud_collection)
 
@@ -469,7 +486,7 @@ class DocumentService:
         site_id = doc.site_id
 
         # 注册 on_commit 回调：DB 删除成功后才清理向量
-        on_commit(self.db, delete_document_vector, document_id)
+        on_commit(self.db, delete_document_vector, document_id, doc.tenant_id, site_id)
 
         await crud_document.delete(self.db, id=document_id)
         await self.site_service.decrement_article_count(site_id=site_id)
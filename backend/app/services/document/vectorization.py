@@ -11,19 +11,22 @@
   ``dispatch_vectorization_tasks`` 内部委托到这里
 """
 
+import hashlib
 import logging
 import time
 import uuid
 
+from langchain_core.documents import Document as LangChainDocument
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.common.utils import NAMESPACE_CATWIKI
-from app.core.infra.tenant import temporary_tenant_context
+from app.core.infra.tenant import get_current_tenant, temporary_tenant_context
 from app.core.vector import VectorStoreManager
 from app.crud.document import crud_document
 from app.db.transaction import transactional
 from app.models.document import Document as DocumentModel
-from app.models.document import VectorStatus
+from app.models.document import DocumentStatus, VectorStatus
+from app.services.rag import answer_cache, result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +47,63 @@ def is_document_vectorizable(document: DocumentModel) -> bool:
     )
 
 
+def chunk_content_hash(content: str, embedding_hash: str) -> str:
+    """chunk 文本 + embedding 配置指纹的哈希；两者都不变时已存储的向量可直接复用。"""
+    return hashlib.sha256(f"{embedding_hash}\n{content}".encode()).hexdigest()
+
+
+def document_metadata(document: DocumentModel) -> dict:
+    """chunk 上的文档级 metadata（不含 chunk_index / content_hash）。
+
+    这些字段不参与 embedding，变更时经 ``patch_document_metadata`` 原地改写即可。
+    """
+    return {
+        "source": "document",
+        "id": str(document.id),
+        "title": document.title,
+        "summary": document.summary or "",
+        "tags": " ".join(document.tags or []),
+        "author": document.author,
+        "site_id": document.site_id,
+        "collection_id": document.collection_id,
+        "tenant_id": document.tenant_id,
+        "status": DocumentStatus(document.status).value,
+    }
+
+
+def metadata_patch(old: dict, new: dict) -> dict:
+    """两份 ``document_metadata`` 的差异；站点变化时附带 tenant_id（分区表据此定位新分区）。"""
+    patch = {k: v for k, v in new.items() if old.get(k) != v}
+    if "site_id" in patch:
+        patch["tenant_id"] = new["tenant_id"]
+    return patch
+
+
+def build_document_chunks(
+    document: DocumentModel, embedding_hash: str
+) -> tuple[list[LangChainDocument], list[str]]:
+    """把文档切分为带 metadata 的 chunk，返回 (chunks, 确定性 chunk ID)。
+
+    向量化与蓝绿重建回填共用，保证两条路径写出的 chunk ID / metadata 完全一致。
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    base_metadata = document_metadata(document)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=len
+    )
+    chunks = text_splitter.create_documents(texts=[document.content], metadatas=[base_metadata])
+
+    chunk_ids: list[str] = []
+    for i, chunk in enumerate(chunks):
+        chunk_id_str = f"{document.id}_chunk_{i}"
+        chunk_ids.append(str(uuid.uuid5(NAMESPACE_CATWIKI, chunk_id_str)))
+        chunk.metadata["id"] = str(document.id)
+        chunk.metadata["chunk_index"] = i
+        chunk.metadata["content_hash"] = chunk_content_hash(chunk.page_content, embedding_hash)
+    return chunks, chunk_ids
+
+
 @transactional()
 async def process_document_vectorization(db: AsyncSession, document_id: int) -> None:
     """执行单文档的向量化（文本切分 + 向量入库），由 worker 调用。
@@ -51,7 +111,8 @@ async def process_document_vectorization(db: AsyncSession, document_id: int) ->
     流程：
     1. 加载文档 → 检查状态必须为 PENDING
     2. 在租户上下文里校验 VectorStore 配置
-    3. 标记 PROCESSING → 切分文本 → 删旧向量 → 写新向量
+    3. 标记 PROCESSING → 切分文本 → 按 content_hash 复用未变 chunk 的向量，
+       只对新增 / 变更的 chunk 调用 embedding → 写入 → 删除已不存在的 chunk
     4. 标记 COMPLETED（异常时回滚状态 + 抛出供上游 Task 系统感知）
     """
     task_start_time = time.time()
@@ -71,7 +132,7 @@ async def process_document_vectorization(db: AsyncSession, document_id: int) ->
 
         with temporary_tenant_context(document.tenant_id):
             vector_store = await VectorStoreManager.get_instance()
-            await vector_store.validate_config(tenant_id=document.tenant_id)
+            resolved = await vector_store.validate_config(tenant_id=document.tenant_id)
 
             await crud_document.update_vector_status(
                 db, document_id=document_id, status=VectorStatus.PROCESSING
@@ -87,43 +148,47 @@ async def process_document_vectorization(db: AsyncSession, document_id: int) ->
                 )
                 return
 
-            base_metadata = {
-                "source": "document",
-                "id": str(document.id),
-                "title": document.title,
-                "summary": document.summary or "",
-                "tags": " ".join(document.tags or []),
-                "author": document.author,
-                "site_id": document.site_id,
-                "collection_id": document.collection_id,
-                "tenant_id": document.tenant_id,
-            }
-
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=200, length_function=len
-            )
-            chunks = text_splitter.create_documents(
-                texts=[document.content], metadatas=[base_metadata]
-            )
+            chunks, chunk_ids = build_document_chunks(document, resolved.hash)
 
             logger.info(
                 f"📄 文档 {document_id} (租户: {document.tenant_id}) 已切分为 {len(chunks)} 个片段"
             )
 
-            chunk_ids: list[str] = []
-            for i, chunk in enumerate(chunks):
-                chunk_id_str = f"{document.id}_chunk_{i}"
-                chunk_uuid = str(uuid.uuid5(NAMESPACE_CATWIKI, chunk_id_str))
-                chunk_ids.append(chunk_uuid)
-                chunk.metadata["id"] = str(document.id)
-                chunk.metadata["chunk_index"] = i
-
-            await vector_store.delete_by_metadata(key="id", value=str(document.id))
+            # content_hash -> 已存储 chunk ID；没有 hash 的历史 chunk 无法确认 embedding 配置，不复用
+            # 分页流式读取，只保留 ID 与 hash，大文档不会把全部旧正文载入内存
+            reusable: dict[str, str] = {}
+            existing_ids: set[str] = set()
+            try:
+                async for c in vector_store.iter_chunks_by_metadata(
+                    key="id", value=str(document.id)
+                ):
+                    existing_ids.add(c["id"])
+                    if content_hash := (c.get("metadata") or {}).get("content_hash"):
+                        reusable[content_hash] = c["id"]
+            except Exception as e:
+                logger.warning(f"⚠️ 读取文档 {document_id} 旧 chunk 失败，不复用向量: {e}")
+                reusable, existing_ids = {}, set()
+            if not existing_ids:
+                # 首次向量化（或读取旧 chunk 失败）：按原逻辑整体清理，避免遗留孤儿 chunk
+                await vector_store.delete_by_metadata(key="id", value=str(document.id))
+            source_ids = [reusable.get(c.metadata["content_hash"]) for c in chunks]
+            stored = await vector_store.get_vectors([sid for sid in source_ids if sid])
+            vectors = [stored.get(sid) if sid else None for sid in source_ids]
+            reused = sum(v is not None for v in vectors)
 
             if chunks:
-                await vector_store.add_documents(documents=chunks, ids=chunk_ids)
+                await vector_store.add_documents(documents=chunks, ids=chunk_ids, vectors=vectors)
+                # 写入期间文档 metadata 可能被修改（patch 回调可能早于本次写入）：按最新值补写
+                await db.refresh(document)
+                stale = metadata_patch(chunks[0].metadata, document_metadata(document))
+                if stale:
+                    await vector_store.update_metadata_by_filter("id", str(document.id), stale)
+
+            # 先写后删：检索期间不会出现文档整体缺失的窗口
+            stale_ids = existing_ids - set(chunk_ids)
+            if stale_ids:
+                await vector_store.delete_documents(list(stale_ids))
+            await invalidate_document_caches(document.tenant_id, document.site_id, document.id)
 
             await crud_document.update_vector_status(
                 db, document_id=document_id, status=VectorStatus.COMPLETED
@@ -131,7 +196,8 @@ async def process_document_vectorization(db: AsyncSession, document_id: int) ->
             total_elapsed = time.time() - task_start_time
             logger.info(
                 f"✨ [Task] 文档向量化完成! | ID: {document.id} | "
-                f"Chunks: {len(chunks)} | 总耗时: {total_elapsed:.3f}s"
+                f"Chunks: {len(chunks)} (复用 {reused}, 新嵌入 {len(chunks) - reused}, "
+                f"删除 {len(stale_ids)}) | 总耗时: {total_elapsed:.3f}s"
             )
 
     except Exception as e:
@@ -146,9 +212,12 @@ async def process_document_vectorization(db: AsyncSession, document_id: int) ->
         raise
 
 
-async def delete_document_vector(document_id: int) -> None:
+async def delete_document_vector(
+    document_id: int, tenant_id: int | None = None, site_id: int | None = None
+) -> None:
     """从 VectorStore 中删除文档的所有 chunk —— 用于 on_commit 回调和手动清除。
 
+    同时令检索结果缓存（未给出 site_id 时整个租户）与引用该文档的缓存答案失效。
     失败仅记 warning，不抛出（背景操作，不应阻断主流程）。
     """
     try:
@@ -157,3 +226,26 @@ async def delete_document_vector(document_id: int) -> None:
         logger.info(f"💾 已清理文档 {document_id} 的相关向量数据")
     except Exception as e:
         logger.warning(f"⚠️ 清理文档向量失败: {e}")
+    await invalidate_document_caches(
+        tenant_id if tenant_id is not None else get_current_tenant(), site_id, document_id
+    )
+
+
+async def patch_document_metadata(document_id: int, patch: dict) -> None:
+    """把文档级 metadata 变更写入其全部 chunk（不重新向量化）。失败仅记 warning。
+
+    写入失败时 chunk 保留旧值（检索仍按旧发布状态过滤），直到下次变更或重新向量化。
+    """
+    try:
+        vector_store = await VectorStoreManager.get_instance()
+        await vector_store.update_metadata_by_filter("id", str(document_id), patch)
+    except Exception as e:
+        logger.warning(f"⚠️ 同步文档 {document_id} 的向量 metadata 失败: {e}")
+
+
+async def invalidate_document_caches(
+    tenant_id: int | None, site_id: int | None, document_id: int
+) -> None:
+    """文档的检索可见内容变了：令检索结果缓存与引用它的语义缓存答案失效。"""
+    await result_cache.invalidate(tenant_id, site_id)
+    await answer_cache.forget_documents(tenant_id, site_id, {document_id})
@@ -54,6 +54,14 @@ class HealthService:
             status = "degraded"
             logger.error(f"健康检查: 缓存检查失败 - {e}")
 
+        # 外部服务熔断器（本进程视角）：任一处于打开状态即降级
+        from app.core.vector.retry import circuit_breaker_metrics
+
+        for name, metrics in circuit_breaker_metrics().items():
+            checks[f"breaker:{name}"] = metrics["state"]
+            if metrics["state"] != "closed":
+                status = "degraded"
+
         return {
             "status": status,
             "version": settings.VERSION,
@@ -0,0 +1,203 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""语义答案缓存 —— 站点内"换个说法的同一问题"直接复用已生成的答案，不再运行 Agent。
+
+每个站点一份小型向量索引，存在全局缓存（Redis / 进程内）的键 ``ans:{tenant}:{site}``
+里，条目只有 ``{entry_id, vector, embedding_hash, model, document_ids, at}``：单位化的
+问题向量（float32 bytes）+ 匹配条件 + 引用的文档 ID。条目数很少
+（CHAT_ANSWER_CACHE_MAX_ENTRIES），查找时线性扫描点积即可。问题原文、答案正文、引用来源
+与本轮 graph 消息（写 history / checkpoint 用）体积大，单独存在
+``ans:{tenant}:{site}:e:{entry_id}``，只在命中时读取。
+
+- 只缓存带引用的答案：没有引用任何文档的答案（寒暄、"未找到相关内容"）无法按文档失效
+- 引用的文档被重新向量化 / 发布状态变更 / 删除时 ``forget_documents`` 删除相关条目
+- 索引的"读-改-写"在站点级锁内进行，并发写入不会互相覆盖
+"""
+
+import logging
+import math
+import operator
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+from app.core.ai.providers.embedding_cache import decode_vector, encode_vector, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 索引读-改-写的锁超时（秒）；持锁期间只有两三次缓存往返
+_LOCK_TIMEOUT = 5
+
+
+@dataclass
+class AnswerProbe:
+    """一次查找的上下文；未命中时原样交给 ``remember`` 写入，避免重复 embedding。"""
+
+    tenant_id: int | None
+    site_id: int
+    question: str
+    model: str
+    embedding_hash: str
+    vector: list[float] = field(repr=False)
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    similarity: float
+    answer: str
+    sources: list[dict]
+    messages: list[BaseMessage]  # 本轮 HumanMessage 之后的全部消息（tool calls / 结果 / 答案）
+
+
+def _index_key(tenant_id: int | None, site_id: int) -> str:
+    return f"ans:{tenant_id}:{site_id}"
+
+
+def _entry_key(tenant_id: int | None, site_id: int, entry_id: str) -> str:
+    return f"{_index_key(tenant_id, site_id)}:e:{entry_id}"
+
+
+def _unit(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _alive(entries: list[dict], now: float) -> list[dict]:
+    from app.core.infra.config import settings
+
+    return [e for e in entries if now - e["at"] < settings.CHAT_ANSWER_CACHE_TTL]
+
+
+async def probe(
+    tenant_id: int | None, site_id: int, question: str, model: str
+) -> tuple[AnswerProbe, CachedAnswer | None]:
+    """embedding 问题并在站点索引中找最相似的已回答问题，超过阈值即命中。"""
+    from app.core.infra.cache import get_cache
+    from app.core.infra.config import settings
+    from app.core.vector import VectorStoreManager
+
+    vector_store = await VectorStoreManager.get_instance()
+    embedding = await vector_store.active_embedding(tenant_id=tenant_id)
+    vector = _unit(await embedding.instance.aembed_query(normalize_text(question)))
+    probe_ctx = AnswerProbe(tenant_id, site_id, question, model, embedding.hash, vector)
+
+    cache = get_cache()
+    entries = _alive(await cache.get(_index_key(tenant_id, site_id)) or [], time.time())
+    best, best_score = None, settings.CHAT_ANSWER_CACHE_THRESHOLD
+    for entry in entries:
+        if entry["embedding_hash"] != embedding.hash or entry["model"] != model:
+            continue
+        score = sum(map(operator.mul, vector, decode_vector(entry["vector"])))
+        if score >= best_score:
+            best, best_score = entry, score
+    if best is None:
+        return probe_ctx, None
+    payload = await cache.get(_entry_key(tenant_id, site_id, best["entry_id"]))
+    if payload is None:  # 正文已被淘汰 / 过期，按未命中处理
+        return probe_ctx, None
+
+    logger.info(
+        f"🎯 [AnswerCache] Hit | site={site_id} | sim={best_score:.3f} | "
+        f"'{question[:40]}' ≈ '{payload['question'][:40]}'"
+    )
+    return probe_ctx, CachedAnswer(
+        question=payload["question"],
+        similarity=best_score,
+        answer=payload["answer"],
+        sources=payload["sources"],
+        messages=messages_from_dict(payload["messages"]),
+    )
+
+
+async def remember(
+    probe_ctx: AnswerProbe, answer: str, sources: list[dict], messages: list[BaseMessage]
+) -> None:
+    """写入一条已回答的问题；没有引用来源的答案不缓存。失败仅记 warning。"""
+    from app.core.infra.cache import get_cache
+    from app.core.infra.config import settings
+
+    document_ids = sorted({int(s["documentId"]) for s in sources if s.get("documentId")})
+    if not answer or not document_ids:
+        return
+    tenant_id, site_id = probe_ctx.tenant_id, probe_ctx.site_id
+    try:
+        cache = get_cache()
+        key = _index_key(tenant_id, site_id)
+        entry_id, now = uuid.uuid4().hex, time.time()
+        # 先写正文：索引里出现的条目总能读到正文（除非已过期）
+        await cache.set(
+            _entry_key(tenant_id, site_id, entry_id),
+            {
+                "question": probe_ctx.question,
+                "answer": answer,
+                "sources": sources,
+                "messages": messages_to_dict(messages),
+            },
+            ttl=settings.CHAT_ANSWER_CACHE_TTL,
+        )
+        async with cache.lock(key, timeout=_LOCK_TIMEOUT):
+            entries = await cache.get(key) or []
+            entries.append(
+                {
+                    "entry_id": entry_id,
+                    "vector": encode_vector(probe_ctx.vector),
+                    "embedding_hash": probe_ctx.embedding_hash,
+                    "model": probe_ctx.model,
+                    "document_ids": document_ids,
+                    "at": now,
+                }
+            )
+            alive = _alive(entries, now)[-settings.CHAT_ANSWER_CACHE_MAX_ENTRIES :]
+            await cache.set(key, alive, ttl=settings.CHAT_ANSWER_CACHE_TTL)
+        kept = {e["entry_id"] for e in alive}
+        for entry in entries:
+            if entry["entry_id"] not in kept:
+                await cache.delete(_entry_key(tenant_id, site_id, entry["entry_id"]))
+    except Exception as e:
+        logger.warning(f"⚠️ [AnswerCache] 写入失败: {e}")
+
+
+async def forget_documents(
+    tenant_id: int | None, site_id: int | None, document_ids: set[int]
+) -> None:
+    """删除引用了这些文档的缓存答案。site_id 未知时无法定位索引，跳过（条目随 TTL 过期）。"""
+    from app.core.infra.cache import get_cache
+    from app.core.infra.config import settings
+
+    if not site_id or not document_ids:
+        return
+    try:
+        cache = get_cache()
+        key = _index_key(tenant_id, site_id)
+        async with cache.lock(key, timeout=_LOCK_TIMEOUT):
+            entries = await cache.get(key)
+            if not entries:
+                return
+            dropped = [e for e in entries if document_ids.intersection(e["document_ids"])]
+            if not dropped:
+                return
+            kept = [e for e in entries if e not in dropped]
+            await cache.set(key, kept, ttl=settings.CHAT_ANSWER_CACHE_TTL)
+        for entry in dropped:
+            await cache.delete(_entry_key(tenant_id, site_id, entry["entry_id"]))
+        logger.debug(f"[AnswerCache] Dropped {len(dropped)} entries | site={site_id}")
+    except Exception as e:
+        logger.warning(f"⚠️ [AnswerCache] 失效失败: {e}")
+
+
+__all__ = ["AnswerProbe", "CachedAnswer", "forget_documents", "probe", "remember"]
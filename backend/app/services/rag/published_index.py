@@ -0,0 +1,99 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""站点已发布文档 ID 集合 —— 检索草稿过滤不再每次查库。
+
+进程内按 (租户, 站点) 缓存一份 published 文档 ID 集合，附带加载时的站点版本
+（``result_cache.scope_version``）。文档发布 / 下线 / 向量化 / 删除时
+``invalidate_document_caches`` 会换新该站点版本，下次查找发现版本不符即重新加载。
+版本令牌在全局缓存中，Redis 下跨进程一致；另设最长寿命兜底进程内缓存的情形。
+
+chunk 自带 ``status`` 时检索已在向量查询内排除草稿，这里只检查尚未写入 status 的旧
+chunk（重新向量化或下次发布状态变更后即带上）。候选 metadata 中没有 site_id 的
+（非常规写入）回落为按 ID 查库。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from app.services.rag import result_cache
+
+logger = logging.getLogger(__name__)
+
+_MAX_SITES = 512
+_MAX_AGE = 60.0
+
+# (tenant_id, site_id) -> (站点版本, 加载时间, published ID 集合)
+_sites: OrderedDict[tuple[int | None, int], tuple[str, float, frozenset[int]]] = OrderedDict()
+
+
+async def published_ids(tenant_id: int | None, site_id: int) -> frozenset[int]:
+    from app.crud.document import crud_document
+    from app.db.database import AsyncSessionLocal
+
+    key = (tenant_id, site_id)
+    version = await result_cache.scope_version(tenant_id, site_id)
+    entry = _sites.get(key)
+    now = time.monotonic()
+    if entry is not None and entry[0] == version and now - entry[1] < _MAX_AGE:
+        _sites.move_to_end(key)
+        return entry[2]
+
+    async with AsyncSessionLocal() as db:
+        ids = frozenset(await crud_document.get_published_ids_by_site(db, site_id=site_id))
+    _sites[key] = (version, now, ids)
+    _sites.move_to_end(key)
+    while len(_sites) > _MAX_SITES:
+        _sites.popitem(last=False)
+    logger.debug(f"[RAG] Published index loaded | site={site_id} | docs={len(ids)}")
+    return ids
+
+
+async def filter_published(tenant_id: int | None, candidates: list[dict]) -> list[dict]:
+    """过滤掉草稿文档的候选，保持原顺序；带 status 的候选已由检索过滤，直接保留。"""
+    from app.crud.document import crud_document
+    from app.db.database import AsyncSessionLocal
+
+    legacy = [c for c in candidates if c["metadata"].get("status") is None]
+    if not legacy:
+        return candidates
+
+    site_ids = {c["metadata"].get("site_id") for c in legacy} - {None}
+    allowed: set[int] = set().union(
+        *await asyncio.gather(*(published_ids(tenant_id, int(s)) for s in site_ids))
+    )
+
+    orphans = {
+        c["document_id"]
+        for c in legacy
+        if c["metadata"].get("site_id") is None and c["document_id"]
+    }
+    if orphans:
+        async with AsyncSessionLocal() as db:
+            allowed |= await crud_document.get_published_ids(db, ids=orphans)
+
+    return [
+        c
+        for c in candidates
+        if c["metadata"].get("status") is not None or c["document_id"] in allowed
+    ]
+
+
+def clear() -> None:
+    _sites.clear()
+
+
+__all__ = ["clear", "filter_published", "published_ids"]
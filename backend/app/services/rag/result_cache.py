@@ -0,0 +1,126 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""检索结果缓存 —— ``RAGService.retrieve`` 的最终结果（召回 + 草稿过滤 + 重排之后）。
+
+键：``rag:res:{tenant}:{epoch}:{scope 版本}:{sha256(过滤条件 / 规范化查询 / embedding hash /
+rerank hash / k / 阈值)}``。embedding 或 rerank 配置变更后 hash 随之变化，旧键不再命中。
+
+精确失效靠"版本令牌"而不是按前缀删除：每个站点一个令牌，全局检索（不限站点）共用
+``all`` 令牌，租户另有一个 epoch 令牌。站点内文档被向量化 / 发布状态变更 / 删除时换新
+该站点令牌和 ``all`` 令牌；不知道站点时换 epoch，整个租户失效。令牌缺失（过期或被
+淘汰）时同样生成新值，旧结果不会因此复活。
+"""
+
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any
+
+from app.core.ai.providers.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_VERSION_TTL = 24 * 3600  # 令牌寿命远大于结果 TTL；过期等价于一次失效
+
+
+def _version_key(tenant_id: int | None, scope: str) -> str:
+    return f"rag:ver:{tenant_id}:{scope}"
+
+
+async def _token(cache: Any, tenant_id: int | None, scope: str) -> str:
+    key = _version_key(tenant_id, scope)
+    token = await cache.get(key)
+    if token is None:
+        token = uuid.uuid4().hex[:12]
+        await cache.set(key, token, ttl=_VERSION_TTL)
+    return token
+
+
+async def scope_version(tenant_id: int | None, site_id: int) -> str:
+    """站点当前的版本（epoch + 站点令牌）；站点内文档检索可见内容变化后随之改变。"""
+    from app.core.infra.cache import get_cache
+
+    cache = get_cache()
+    return f"{await _token(cache, tenant_id, 'epoch')}:{await _token(cache, tenant_id, f'site:{site_id}')}"
+
+
+async def make_key(
+    tenant_id: int | None,
+    metadata_filter: dict | None,
+    query: str,
+    *,
+    embedding_hash: str,
+    rerank_hash: str,
+    recall_k: int,
+    top_k: int,
+    threshold: float,
+) -> str:
+    """生成当前版本下的结果缓存键；任一版本令牌被换新后，旧键自然失效。"""
+    from app.core.infra.cache import get_cache
+
+    cache = get_cache()
+    site_id = (metadata_filter or {}).get("site_id")
+    epoch = await _token(cache, tenant_id, "epoch")
+    scope = await _token(cache, tenant_id, f"site:{site_id}" if site_id else "all")
+    fingerprint = json.dumps(
+        [
+            metadata_filter or {},
+            normalize_text(query),
+            embedding_hash,
+            rerank_hash,
+            recall_k,
+            top_k,
+            threshold,
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    digest = hashlib.sha256(fingerprint.encode()).hexdigest()
+    return f"rag:res:{tenant_id}:{epoch}:{scope}:{digest}"
+
+
+async def get(key: str) -> dict | None:
+    from app.core.infra.cache import get_cache
+
+    return await get_cache().get(key)
+
+
+async def put(key: str, value: dict) -> None:
+    from app.core.infra.cache import get_cache
+    from app.core.infra.config import settings
+
+    await get_cache().set(key, value, ttl=settings.RAG_RESULT_CACHE_TTL)
+
+
+async def invalidate(tenant_id: int | None, site_id: int | None = None) -> None:
+    """站点内文档的检索可见内容变了：令该站点及全局检索的缓存失效。
+
+    失败仅记 warning —— 结果最迟在 RAG_RESULT_CACHE_TTL 后过期。
+    """
+    from app.core.infra.cache import get_cache
+
+    cache = get_cache()
+    scopes = [f"site:{site_id}", "all"] if site_id else ["epoch"]
+    try:
+        for scope in scopes:
+            await cache.set(_version_key(tenant_id, scope), uuid.uuid4().hex[:12], ttl=_VERSION_TTL)
+        logger.debug(f"[RAG] Result cache invalidated | tenant={tenant_id} site={site_id}")
+    except Exception as e:
+        logger.warning(f"⚠️ [RAG] 检索结果缓存失效失败: {e}")
+
+
+__all__ = ["get", "invalidate", "make_key", "put", "scope_version"]
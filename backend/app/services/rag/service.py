@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
 import time
 
@@ -20,7 +21,9 @@ from app.core.common.ai_logging import rag_stats_var
 from app.core.infra.config import settings
 from app.core.vector import VectorStoreManager
 from app.core.vector.exceptions import VectorStoreError
+from app.models.document import DocumentStatus
 from app.schemas.document import VectorRetrieveFilter, VectorRetrieveResponse
+from app.services.rag import published_index, result_cache
 from app.services.rag.exceptions import RAGRetrievalError
 
 logger = logging.getLogger(__name__)
@@ -38,9 +41,12 @@ class RAGService:
         filter: VectorRetrieveFilter | None = None,
         enable_rerank: bool | None = None,
         rerank_k: int | None = None,
+        query_vector: list[float] | None = None,
     ) -> list[VectorRetrieveResponse]:
         """
         执行语义检索（包含 召回 + 重排序）
+
+        ``query_vector`` 由调用方预先算好时（如同一步多路查询批量 embedding）不再单独 embedding。
         """
         # 使用环境变量作为默认值
         # k = 召回深度（传入 RAG_RECALL_K），rerank_k = 重排后保留数量（传入 RAG_RERANK_TOP_K）
@@ -72,94 +78,78 @@ class RAGService:
                     filter_dict["source"] = filter.source
             if current_tenant_id is not None:
                 filter_dict["tenant_id"] = current_tenant_id
+            # 草稿在向量查询内直接排除；尚无 status 的旧 chunk 放行，召回后再按发布集合过滤
+            filter_dict["status"] = [DocumentStatus.PUBLISHED.value, None]
 
-            # 3. 确定重排序策略（探测调用，不打 usage signal；
-            #    真正的 rerank 执行时会由 rerank() 内部统一记录）
-            reranker_active = await reranker.is_enabled(tenant_id=current_tenant_id)
-            should_apply_rerank = settings.RAG_ENABLE_RERANK and reranker_active
-            if enable_rerank is not None:
-                should_apply_rerank = enable_rerank and reranker_active
-
-            # 4. 计算召回深度：重排时保证候选集至少为输出量的 2 倍，并守住全局上限
-            if should_apply_rerank:
-                recall_k = max(recall_top_k, final_top_k * 2)
-            else:
-                recall_k = recall_top_k
-            recall_k = min(recall_k, settings.RAG_RECALL_MAX)
-
-            # 5. 执行语义检索（接口引擎无关）
-            results = await vector_store.search(
-                query=query,
-                k=recall_k,
-                metadata_filter=filter_dict if filter_dict else None,
-                purpose="执行语义检索 (Recall)",
-            )
-
-            # 6. 转换候选集
-            # score_comparable=True（PG 余弦相似度）时应用阈值过滤；
-            # score_comparable=False（ES RRF 排名分）时跳过阈值过滤（逐结果决策）
-            candidate_list = []
-            scores_are_comparable = False
-            for item in results:
-                doc = item["doc"]
-                score = item["score"]
-                if item["score_comparable"]:
-                    scores_are_comparable = True
-                    if score < final_threshold:
-                        continue
-                candidate_list.append(
-                    {
-                        "content": doc.page_content,
-                        "score": score,
-                        "document_id": int(doc.metadata.get("id", 0)),
-                        "document_title": doc.metadata.get("title"),
-                        "metadata": doc.metadata,
-                        "original_score": score,
-                    }
+            # 3. 并发准备：查询 embedding 立即在后台开始；同时解析重排 / embedding 配置
+            #    （探测调用，不打 usage signal；真正的 rerank 执行时会由 rerank() 内部统一记录）
+            timings: dict[str, float] = {}
+            stage_start = time.time()
+            embed_task = asyncio.create_task(cls._query_vector(vector_store, query, query_vector))
+            try:
+                rerank_conf, embedding = await asyncio.gather(
+                    reranker.resolve(tenant_id=current_tenant_id, emit_signal=False),
+                    vector_store.active_embedding(tenant_id=current_tenant_id),
                 )
+                reranker_active = bool(rerank_conf.instance.get("enabled"))
+                should_apply_rerank = settings.RAG_ENABLE_RERANK and reranker_active
+                if enable_rerank is not None:
+                    should_apply_rerank = enable_rerank and reranker_active
 
-            # 6.5 过滤草稿文档：批量查询候选 ID 的发布状态
-            if candidate_list:
-                from app.crud.document import crud_document
-                from app.db.database import AsyncSessionLocal
+                # 4. 计算召回深度：重排时保证候选集至少为输出量的 2 倍，并守住全局上限
+                if should_apply_rerank:
+                    recall_k = max(recall_top_k, final_top_k * 2)
+                else:
+                    recall_k = recall_top_k
+                recall_k = min(recall_k, settings.RAG_RECALL_MAX)
 
-                candidate_doc_ids = {
-                    item["document_id"] for item in candidate_list if item["document_id"]
-                }
-                async with AsyncSessionLocal() as _db:
-                    published_ids = await crud_document.get_published_ids(
-                        _db, ids=candidate_doc_ids
+                # 5. 结果缓存：命中时跳过检索 / 草稿过滤 / 重排，并取消后台 embedding
+                cache_key: str | None = None
+                outcome: dict | None = None
+                if settings.RAG_RESULT_CACHE_ENABLED:
+                    cache_key = await result_cache.make_key(
+                        current_tenant_id,
+                        filter_dict,
+                        query,
+                        embedding_hash=embedding.hash,
+                        rerank_hash=rerank_conf.hash if should_apply_rerank else "",
+                        recall_k=recall_k,
+                        top_k=final_top_k,
+                        threshold=final_threshold,
                     )
-                before = len(candidate_list)
-                candidate_list = [
-                    item for item in candidate_list if item["document_id"] in published_ids
-                ]
-                if len(candidate_list) < before:
-                    logger.debug(f"[RAG] 已过滤草稿文档 {before - len(candidate_list)} 条")
-
-            # 7. 重排序（如果启用）
-            rerank_meta: dict | None = None
-            if should_apply_rerank and candidate_list:
-                final_list, rerank_meta = await reranker.rerank(
-                    query=query,
-                    documents=candidate_list,
-                    top_n=final_top_k,
+                    outcome = await result_cache.get(cache_key)
+                query_vector = await embed_task if outcome is None else None
+            finally:
+                if not embed_task.done():
+                    embed_task.cancel()
+                elif not embed_task.cancelled():
+                    embed_task.exception()  # 缓存命中时也取回异常，避免 "never retrieved" 警告
+            timings["prepare"] = time.time() - stage_start
+
+            cache_hit = outcome is not None
+            if outcome is None:
+                outcome = await cls._recall_and_rank(
+                    vector_store,
+                    query,
+                    query_vector=query_vector,
+                    recall_k=recall_k,
+                    final_top_k=final_top_k,
+                    threshold=final_threshold,
+                    filter_dict=filter_dict,
+                    apply_rerank=should_apply_rerank,
                     tenant_id=current_tenant_id,
-                    purpose="对召回结果进行精排 (Rerank)",
+                    timings=timings,
                 )
-            else:
-                # Sort by score only when scores have absolute meaning (PG cosine similarity).
-                # For ES RRF scores, preserve the already-ranked order from the driver.
-                if scores_are_comparable:
-                    candidate_list.sort(key=lambda x: x["score"], reverse=True)
-                final_list = candidate_list[:final_top_k]
+                if cache_key:
+                    await result_cache.put(cache_key, outcome)
 
             # 8. 转换为响应对象
-            response_objects = [VectorRetrieveResponse(**item) for item in final_list]
+            response_objects = [VectorRetrieveResponse(**item) for item in outcome["items"]]
 
             duration = time.time() - start_time
             logger.info(
-                f"✨ [RAG] Turn Done | Recall: {len(candidate_list)} -> Filtered: {len(final_list)} | {duration:.3f}s"
+                f"✨ [RAG] Turn Done{' (cached)' if cache_hit else ''} | "
+                f"Recall: {outcome['filtered']} -> Filtered: {len(response_objects)} | {duration:.3f}s"
             )
 
             # 9. 累计统计数据（供 chat_service 汇总日志使用）
@@ -167,10 +157,6 @@ class RAGService:
             embedding_model = last_emb.model if last_emb else "N/A"
             embedding_hash = last_emb.hash if last_emb else ""
             vector_backend = vector_store.vector_backend
-            # 直接复用 rerank() 返回的 meta，避免再次回配置服务（与 chat/embedding 对齐）
-            rerank_model_name = (
-                rerank_meta["model"] if rerank_meta and rerank_meta.get("model") else "disabled"
-            )
 
             stats = rag_stats_var.get()
             if stats is None:
@@ -178,6 +164,9 @@ class RAGService:
                 rag_stats_var.set(stats)
 
             stats["steps"] = stats.get("steps", 0) + 1
+            stage_timings = stats.setdefault("stage_timings", {})
+            for stage, elapsed in timings.items():
+                stage_timings[stage] = stage_timings.get(stage, 0.0) + elapsed
             queries = stats.get("queries", [])
             if query not in queries:
                 queries.append(query)
@@ -189,11 +178,12 @@ class RAGService:
                     "vector_backend": vector_backend,
                     "embedding_model": embedding_model,
                     "embedding_hash": embedding_hash,
-                    "recalled_count": stats.get("recalled_count", 0) + len(results),
-                    "filtered_count": stats.get("filtered_count", 0) + len(candidate_list),
+                    "recalled_count": stats.get("recalled_count", 0) + outcome["recalled"],
+                    "filtered_count": stats.get("filtered_count", 0) + outcome["filtered"],
                     "threshold": final_threshold,
-                    "threshold_applied": scores_are_comparable,
-                    "rerank_model": rerank_model_name,
+                    "threshold_applied": outcome["threshold_applied"],
+                    "rerank_model": outcome["rerank_model"],
+                    "cache_hits": stats.get("cache_hits", 0) + int(cache_hit),
                     "output_count": stats.get("output_count", 0) + len(response_objects),
                     "top_k": final_top_k,
                     "retrieval_duration": stats.get("retrieval_duration", 0.0) + duration,
@@ -216,3 +206,102 @@ class RAGService:
             else:
                 logger.error(f"❌ [Retrieve] 检索服务异常: {e}", exc_info=True)
             raise RAGRetrievalError(f"检索失败: {e}") from e
+
+    @staticmethod
+    async def _query_vector(
+        vector_store: VectorStoreManager, query: str, precomputed: list[float] | None
+    ) -> list[float]:
+        if precomputed is not None:
+            return precomputed
+        return await vector_store.embed_query(query, purpose="执行语义检索 (Recall)")
+
+    @classmethod
+    async def _recall_and_rank(
+        cls,
+        vector_store: VectorStoreManager,
+        query: str,
+        *,
+        query_vector: list[float],
+        recall_k: int,
+        final_top_k: int,
+        threshold: float,
+        filter_dict: dict,
+        apply_rerank: bool,
+        tenant_id: int | None,
+        timings: dict[str, float],
+    ) -> dict:
+        """召回 → 阈值 → 草稿过滤 → 重排，返回可缓存的结果（纯 dict，便于序列化）。
+
+        各阶段耗时写入 ``timings``（recall / filter / rerank）。
+        """
+        # 5. 执行语义检索（接口引擎无关；查询向量已由调用方并发算好）
+        stage_start = time.time()
+        results = await vector_store.search(
+            query=query,
+            k=recall_k,
+            metadata_filter=filter_dict if filter_dict else None,
+            query_vector=query_vector,
+        )
+        timings["recall"] = time.time() - stage_start
+
+        # 6. 转换候选集
+        # score_comparable=True（PG 纯向量余弦相似度）时应用阈值过滤；
+        # score_comparable=False（ES / PG 混合检索融合分）时跳过阈值过滤（逐结果决策）
+        candidate_list = []
+        scores_are_comparable = False
+        for item in results:
+            doc = item["doc"]
+            score = item["score"]
+            if item["score_comparable"]:
+                scores_are_comparable = True
+                if score < threshold:
+                    continue
+            candidate_list.append(
+                {
+                    "content": doc.page_content,
+                    "score": score,
+                    "document_id": int(doc.metadata.get("id", 0)),
+                    "document_title": doc.metadata.get("title"),
+                    "metadata": doc.metadata,
+                    "original_score": score,
+                }
+            )
+
+        # 6.5 兜底过滤草稿：仅针对尚未写入 status 的旧 chunk，按站点的 published ID 集合过滤
+        stage_start = time.time()
+        if candidate_list:
+            before = len(candidate_list)
+            candidate_list = await published_index.filter_published(tenant_id, candidate_list)
+            if len(candidate_list) < before:
+                logger.debug(f"[RAG] 已过滤草稿文档 {before - len(candidate_list)} 条")
+        timings["filter"] = time.time() - stage_start
+
+        # 7. 重排序（如果启用）
+        stage_start = time.time()
+        rerank_meta: dict | None = None
+        if apply_rerank and candidate_list:
+            final_list, rerank_meta = await reranker.rerank(
+                query=query,
+                documents=candidate_list,
+                top_n=final_top_k,
+                tenant_id=tenant_id,
+                purpose="对召回结果进行精排 (Rerank)",
+            )
+        else:
+            # Sort by score only when scores have absolute meaning (PG cosine similarity).
+            # For hybrid fusion scores (ES / PG), preserve the already-ranked order from the driver.
+            if scores_are_comparable:
+                candidate_list.sort(key=lambda x: x["score"], reverse=True)
+            final_list = candidate_list[:final_top_k]
+        timings["rerank"] = time.time() - stage_start
+
+        return {
+            "items": final_list,
+            "recalled": len(results),
+            "filtered": len(candidate_list),
+            "threshold_applied": scores_are_comparable,
+            # 直接复用 rerank() 返回的 meta，避免再次回配置服务（与 chat/embedding 对齐）
+            "rerank_model": (
+                rerank_meta["model"] if rerank_meta and rerank_meta.get("model") else "disabled"
+            ),
+        }
@@ -19,7 +19,7 @@ from typing import Any
 
 from openai import AsyncOpenAI
 
-from app.core.ai.providers import resolve_rerank_url
+from app.core.ai.providers import LOCAL_PROVIDER, resolve_rerank_url
 from app.core.common.i18n import _
 from app.core.common.masking import mask_sensitive_data
 from app.core.infra.config_resolver import MODEL_TYPES, SECTION_TO_KEY
@@ -237,6 +237,8 @@ class AIConfigMixin:
                 return await _test_chat_connection(api_key, base_url, model)
             if model_type == "embedding":
                 return await _test_embedding_connection(api_key, base_url, model)
+            if model_type == "rerank" and getattr(config, "provider", None) == LOCAL_PROVIDER:
+                return await _test_local_rerank(model)
             if model_type == "rerank":
                 return await _test_rerank_connection(
                     api_key, base_url, model, getattr(config, "endpoint_path", None)
@@ -289,3 +291,11 @@ async def _test_rerank_connection(
         if resp.status_code != 200:
             raise Exception(f"HTTP {resp.status_code}: {resp.text[:100]}")
         return {"status": "ok"}
+
+
+async def _test_local_rerank(model: str) -> dict:
+    """本地 rerank：加载模型（首次）并对一对样例打分。"""
+    from app.core.ai.providers import local_reranker
+
+    scores = await local_reranker.score(model, "Ping", ["Pong"])
+    return {"status": "ok", "details": f"Score: {scores[0]:.4f}"}
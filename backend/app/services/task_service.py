@@ -106,10 +106,12 @@ class TaskService:
 
     @classmethod
     @transactional()
-    async def update_progress(cls, db: AsyncSession, task_id: int, progress: float):
-        """更新任务进度"""
+    async def update_progress(
+        cls, db: AsyncSession, task_id: int, progress: float, result: dict | None = None
+    ):
+        """更新任务进度（可同时保存中间结果，如可续跑任务的断点）"""
         await crud_task.update_status(
-            db, task_id=task_id, status=TaskStatus.RUNNING, progress=progress
+            db, task_id=task_id, status=TaskStatus.RUNNING, progress=progress, result=result
         )
 
     @classmethod
@@ -0,0 +1,50 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+async def process_vector_reindex(ctx, task_id: int):
+    """向量存储蓝绿重建后台任务（影子回填 + 原子切换，可从断点续跑）
+
+    不包裹 @transactional：每批进度 / 断点由 TaskService.update_progress 独立提交。
+    """
+    from app.crud.task import crud_task
+    from app.models.task import TaskStatus
+    from app.services.document.reindex import run_vector_reindex
+    from app.services.task_service import TaskService
+
+    async with AsyncSessionLocal() as db:
+        task = await crud_task.get(db, id=task_id)
+        if not task:
+            logger.error(f"❌ [Job:{ctx['job_id']}] 任务 {task_id} 不存在")
+            return
+        if task.status == TaskStatus.COMPLETED.value:
+            return
+
+        logger.info(f"🔁 [Job:{ctx['job_id']}] 开始向量重建任务 {task_id}")
+        try:
+            result = await run_vector_reindex(db, task_id)
+            await TaskService.complete(db, task_id, result=result)
+            logger.info(f"✅ [Job:{ctx['job_id']}] 向量重建任务 {task_id} 完成")
+        except Exception as e:
+            logger.error(
+                f"❌ [Job:{ctx['job_id']}] 向量重建任务 {task_id} 失败: {e}", exc_info=True
+            )
+            await TaskService.fail(db, task_id, str(e))
+            raise e
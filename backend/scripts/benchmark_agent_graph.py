@@ -0,0 +1,79 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Agent 图每请求准备开销基准：每次编译 vs 注册表复用
+
+用法:
+    python -m scripts.benchmark_agent_graph [--requests 200]
+
+- 每次编译：旧路径，每个请求 ``create_agent_graph(checkpointer=cp, model=llm)``
+  （bind_tools + ToolNode + compile）。
+- 注册表：``get_agent_graph`` 命中缓存 + ``with_checkpointer`` 注入本请求 checkpointer。
+
+只测图准备本身，不调用 LLM、不连接数据库（InMemorySaver 代替 Postgres checkpointer）。
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.ai.graph import create_agent_graph, get_agent_graph, with_checkpointer
+
+
+def _measure(fn, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    print(
+        f"{label:<12}{statistics.mean(timings):>10.3f}{statistics.median(timings):>10.3f}{p95:>10.3f}"
+    )
+
+
+def main(requests: int) -> None:
+    llm = ChatOpenAI(model="benchmark", api_key="sk-benchmark", temperature=0.7)
+    config = {"configurable": {"thread_id": "bench", "site_id": 1, "tenant_id": 1}}
+
+    def compile_per_request():
+        create_agent_graph(checkpointer=InMemorySaver(), model=llm)
+
+    def registry_lookup():
+        get_agent_graph("bench", llm)
+        with_checkpointer(config, InMemorySaver())
+
+    registry_lookup()  # 预热：首次编译不计入
+    print(f"🔍 每请求图准备耗时（ms），{requests} 次")
+    print(f"{'路径':<12}{'mean':>10}{'p50':>10}{'p95':>10}")
+    before = _measure(compile_per_request, requests)
+    after = _measure(registry_lookup, requests)
+    _report("每次编译", before)
+    _report("注册表", after)
+    print(f"✅ 平均加速 {statistics.mean(before) / statistics.mean(after):.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-request agent graph setup")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    main(args.requests)
@@ -0,0 +1,166 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+向量量化基准：在本库真实语料上对比各精度的 recall@k 与索引内存
+
+用法:
+    python -m scripts.benchmark_vector_precision [--samples 50] [--k 10] [--types ...]
+
+- postgres（VECTOR_STORE_TYPE=postgres）：为每种 PG_VECTOR_PRECISION 在线上表旁建一个
+  ``*_bench_<精度>`` ANN 索引（CONCURRENTLY，不阻塞读写），用与线上检索相同的 SQL
+  （量化精度含候选重排）测 recall@k，报告索引体积后删除。线上检索只会用到表达式匹配
+  当前配置的索引，不受影响；建索引会占用 IO / CPU，建议在低峰期运行。
+- elasticsearch：把在线索引的前 --max-docs 条 reindex 到每种 index_options 的临时索引，
+  测 recall@k（kNN vs script_score 精确扫描）与磁盘体积，并按 ES 文档公式估算向量所需
+  堆外内存，结束后删除临时索引。
+
+recall 以随机抽样的已存向量作为查询；精确结果始终按原始 float 向量全量计算。
+"""
+
+import argparse
+import asyncio
+
+from app.core.infra.config import settings
+
+_PG_PRECISIONS = ["full", "halfvec", "binary"]
+_ES_TYPES = ["hnsw", "int8_hnsw", "int4_hnsw", "bbq_hnsw"]
+
+
+def _mb(size: int | None) -> str:
+    return "-" if size is None else f"{size / 1024 / 1024:.1f} MB"
+
+
+def _es_vector_ram(index_type: str, dims: int, count: int, m: int = 16) -> int:
+    """ES 文档给出的 HNSW 堆外内存估算：量化后的向量 + 图（4 × m 字节 / 向量）。"""
+    per_vector = {
+        "hnsw": 4 * dims,
+        "int8_hnsw": dims + 4,
+        "int4_hnsw": dims / 2 + 4,
+        "bbq_hnsw": dims / 8 + 14,
+    }[index_type]
+    return int(count * (per_vector + 4 * m))
+
+
+async def benchmark_postgres(types: list[str], samples: int, k: int) -> None:
+    from sqlalchemy import text
+
+    from app.core.vector.driver.postgres import PostgresDriver
+
+    driver = PostgresDriver()
+    configured = settings.PG_VECTOR_PRECISION
+    try:
+        status = await driver.index_status()
+        dimension, rows = status["dimension"], max(status["rows_estimate"], 1)
+        if dimension is None:
+            print(f"❌ 表 {driver.collection_name} 不存在或没有 embedding 列")
+            return
+        print(
+            f"🔍 {driver.collection_name}: {rows} 行, dim={dimension}, "
+            f"索引类型 {settings.PG_VECTOR_INDEX_TYPE}, recall@{k} 抽样 {samples}"
+        )
+        print(f"{'精度':<10}{'recall':>10}{'索引体积':>14}{'字节/向量':>12}")
+        concurrently = "" if driver._partition_keys else "CONCURRENTLY "
+        for precision in types:
+            settings.PG_VECTOR_PRECISION = precision
+            name = f"{driver._vector_index_name}_bench_{precision}"
+            # 上次中断留下的同名索引可能无效，先删除
+            async with driver._sa_engine.connect() as conn:
+                autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await autocommit.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
+            if driver._partition_keys:
+                await driver._build_partitioned_index(name, dimension=dimension)
+            else:
+                ddl = driver._vector_index_ddl(name, concurrently=True, dimension=dimension)
+                if ddl is None:
+                    print("⚠️ PG_VECTOR_INDEX_TYPE=none，没有可对比的 ANN 索引")
+                    return
+                async with driver._sa_engine.connect() as conn:
+                    autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await autocommit.execute(text(ddl))
+            try:
+                size = await driver._get_ann_index_bytes(name)
+                recall = (await driver._estimate_recall(samples, k))["recall"]
+                per_vector = f"{size / rows:.0f}" if size else "-"
+                print(f"{precision:<10}{recall!s:>10}{_mb(size):>14}{per_vector:>12}")
+            finally:
+                async with driver._sa_engine.connect() as conn:
+                    autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await autocommit.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
+    finally:
+        settings.PG_VECTOR_PRECISION = configured
+        await driver.close()
+
+
+async def benchmark_elasticsearch(types: list[str], samples: int, k: int, max_docs: int) -> None:
+    from app.core.vector.driver.elasticsearch import ElasticsearchDriver
+
+    live = ElasticsearchDriver()
+    try:
+        status = await live.index_status()
+        dimension = status["dimension"]
+        print(
+            f"🔍 {status['physical_index']}: {status['docs_count']} 条, dim={dimension}, "
+            f"取前 {max_docs} 条对比, recall@{k} 抽样 {samples}"
+        )
+        print(f"{'index_options':<14}{'recall':>10}{'磁盘体积':>14}{'向量内存(估)':>16}")
+        for index_type in types:
+            bench = ElasticsearchDriver(
+                f"{live.index_name}_bench_{index_type}",
+                es_client=live._es_client,
+                index_type=index_type,
+            )
+            try:
+                # 上次中断留下的同名临时索引
+                await live._es_client.indices.delete(
+                    index=bench.index_name, ignore_unavailable=True
+                )
+                await bench.ensure_schema(dimension)
+                await live._es_client.reindex(
+                    source={"index": live.index_name, "size": 500},
+                    dest={"index": bench.index_name},
+                    max_docs=max_docs,
+                    refresh=True,
+                    wait_for_completion=True,
+                )
+                result = await bench.index_status(recall_sample=samples)
+                ram = _es_vector_ram(index_type, dimension, result["docs_count"])
+                print(
+                    f"{index_type:<14}{result['recall']['recall']!s:>10}"
+                    f"{_mb(result['size_bytes']):>14}{_mb(ram):>16}"
+                )
+            except Exception as e:
+                print(f"{index_type:<14}❌ {e}")
+            finally:
+                await live._es_client.indices.delete(
+                    index=bench.index_name, ignore_unavailable=True
+                )
+    finally:
+        await live.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recall@k vs. memory per precision")
+    parser.add_argument("--samples", type=int, default=50, help="recall 抽样查询数")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", help="逗号分隔；默认全部精度 / index_options")
+    parser.add_argument("--max-docs", type=int, default=100_000, help="ES: 复制到临时索引的条数")
+    args = parser.parse_args()
+
+    if settings.VECTOR_STORE_TYPE == "elasticsearch":
+        es_types = args.types.split(",") if args.types else _ES_TYPES
+        asyncio.run(benchmark_elasticsearch(es_types, args.samples, args.k, args.max_docs))
+    else:
+        pg_types = args.types.split(",") if args.types else _PG_PRECISIONS
+        asyncio.run(benchmark_postgres(pg_types, args.samples, args.k))
@@ -0,0 +1,69 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+向量表分区迁移脚本：把已有的 pgvector 普通表迁移为按 tenant_id（/ site_id）LIST 分区的表
+
+用法:
+    python -m scripts.migrate_vector_partitions [--mode tenant|tenant_site]
+
+迁移期间请暂停向量化 worker；旧表保留为 <table>_legacy，确认无误后手动 DROP。
+"""
+
+import argparse
+import asyncio
+
+from app.core.infra.config import settings
+from app.core.vector.driver.postgres import PostgresDriver
+
+
+async def migrate(mode: str) -> None:
+    driver = PostgresDriver()
+    try:
+        print(f"🔍 开始迁移向量表 {driver.collection_name} -> 分区模式 {mode} ...")
+
+        def on_progress(done: int, total: int, partition: str) -> None:
+            print(f"⏳ [{done}/{total}] 已复制分区 {partition}")
+
+        result = await driver.migrate_to_partitioned(mode, on_progress=on_progress)
+        if not result["migrated"]:
+            print(
+                f"✅ {result['table']} 已是分区表 (分区键: {result['partition_keys']})，无需迁移。"
+            )
+            return
+
+        print(
+            f"🎉 迁移完成！分区 {result['partitions']} 个，复制 {result['copied']} 行，"
+            f"增量补齐 {result['delta']} 行，清理已删除 {result['deleted']} 行。"
+        )
+        if result["skipped"]:
+            print(f"⚠️ {result['skipped']} 行缺少 tenant_id / site_id，未迁移（仍保留在旧表中）。")
+        print(f"📦 旧表已保留为 {result['legacy_table']}，确认无误后可执行 DROP TABLE 释放空间。")
+        print(
+            f"👉 请在 .env 中设置 PG_VECTOR_PARTITION_MODE={mode}，运行中的服务会在下次写入时自动识别新表结构。"
+        )
+    finally:
+        await driver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the pgvector table to LIST partitions")
+    parser.add_argument(
+        "--mode",
+        choices=["tenant", "tenant_site"],
+        default=settings.PG_VECTOR_PARTITION_MODE
+        if settings.PG_VECTOR_PARTITION_MODE != "none"
+        else "tenant",
+    )
+    asyncio.run(migrate(parser.parse_args().mode))
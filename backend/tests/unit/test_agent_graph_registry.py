@@ -0,0 +1,70 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+编译图注册表：按键复用 / LRU 淘汰 / checkpointer 经 config 按请求注入（不调用 LLM）
+"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.ai.graph import registry
+from app.core.infra.config import settings
+
+
+def _llm(model: str = "m", temperature: float = 0.7) -> ChatOpenAI:
+    return ChatOpenAI(model=model, api_key="sk-test", temperature=temperature)
+
+
+@pytest.fixture(autouse=True)
+def _clear_registry():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def test_graph_compiled_once_per_key_and_evicted_lru(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_GRAPH_CACHE_SIZE", 2)
+    llm_a, llm_b, llm_c = _llm("a"), _llm("b"), _llm("c")
+
+    graph_a = registry.get_agent_graph("h", llm_a)
+    assert registry.get_agent_graph("h", llm_a) is graph_a
+    registry.get_agent_graph("h", llm_b)
+    registry.get_agent_graph("h", llm_a)  # a 变为最近使用
+    registry.get_agent_graph("h", llm_c)  # 淘汰 b
+
+    assert list(registry._graphs) == [("h", "a", 0.7), ("h", "c", 0.7)]
+    # provider 为同一键重建了实例（如 force 刷新）时重新编译
+    assert registry.get_agent_graph("h", _llm("a")) is not graph_a
+
+
+@pytest.mark.asyncio
+async def test_checkpointer_injected_per_request():
+    graph = registry.get_agent_graph("h", _llm())
+    saver_1, saver_2 = InMemorySaver(), InMemorySaver()
+    config = {"configurable": {"thread_id": "t1"}}
+
+    await graph.aupdate_state(
+        registry.with_checkpointer(config, saver_1),
+        {"messages": [HumanMessage(content="q", id="1"), AIMessage(content="a", id="2")]},
+        as_node="agent",
+    )
+
+    state_1 = await graph.aget_state(registry.with_checkpointer(config, saver_1))
+    state_2 = await graph.aget_state(registry.with_checkpointer(config, saver_2))
+    assert [m.content for m in state_1.values["messages"]] == ["q", "a"]
+    assert state_2.values == {}
+    assert "__pregel_checkpointer" not in config["configurable"]
@@ -0,0 +1,91 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+同一步多路 search_knowledge_base：相同查询合并、批量 embedding、并发限流、按 tool_call 回填
+"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from app.core.ai.graph import logic
+from app.core.infra.config import settings
+from app.core.vector import VectorStoreManager
+from app.schemas.document import VectorRetrieveResponse
+from app.services.rag import RAGService
+
+
+class _FakeStore:
+    def __init__(self):
+        self.batches = []
+
+    async def embed_queries(self, queries, purpose=None):
+        self.batches.append(list(queries))
+        return [[float(i)] for i in range(len(queries))]
+
+
+@pytest.mark.asyncio
+async def test_search_step_dedupes_batches_and_fans_back(monkeypatch):
+    store = _FakeStore()
+    retrieved = []
+    running = peak = 0
+
+    async def fake_retrieve(query, query_vector=None, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        retrieved.append((query, query_vector))
+        docs = 2 if query == "退款流程" else 1
+        return [
+            VectorRetrieveResponse(content=f"{query}-{i}", score=0.9, document_id=i + 1)
+            for i in range(docs)
+        ]
+
+    async def get_instance():
+        return store
+
+    monkeypatch.setattr(VectorStoreManager, "get_instance", get_instance)
+    monkeypatch.setattr(RAGService, "retrieve", fake_retrieve)
+    monkeypatch.setattr(settings, "AGENT_TOOL_CONCURRENCY", 1)
+
+    calls = [
+        {"name": "search_knowledge_base", "args": {"query": "退款流程"}, "id": "c1"},
+        {"name": "search_knowledge_base", "args": {"query": "发票"}, "id": "c2"},
+        {"name": "search_knowledge_base", "args": {"query": " 退款流程 "}, "id": "c3"},
+    ]
+    state = {"messages": [AIMessage(content="", tool_calls=calls)], "source_offset": 3}
+
+    result = await logic._tools_wrapper_node(
+        state,
+        {"configurable": {"site_id": 1, "tenant_id": 1}},
+        tool_node=ToolNode(logic.tools),
+        max_iterations=5,
+        max_consecutive_empty=2,
+    )
+
+    assert store.batches == [["退款流程", "发票"]]
+    assert retrieved == [("退款流程", [0.0]), ("发票", [1.0])] and peak == 1
+
+    messages = result["messages"]
+    assert [m.tool_call_id for m in messages] == ["c1", "c2", "c3"]
+    assert messages[0].content == messages[2].content
+    indexes = [[r["source_index"] for r in json.loads(m.content)] for m in messages]
+    assert indexes == [[4, 5], [6], [4, 5]]
+    assert result["source_offset"] == 6 and result["consecutive_empty_count"] == 0
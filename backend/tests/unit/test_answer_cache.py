@@ -0,0 +1,104 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+语义答案缓存：近似问题命中、模型隔离、按引用文档失效（进程内缓存 + 假 embedding）
+"""
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core.ai.providers.base import Resolved
+from app.core.infra import cache as cache_module
+from app.core.infra.cache import InMemoryCache
+from app.core.vector import VectorStoreManager
+from app.services.rag import answer_cache
+
+_VECTORS = {
+    "如何重置密码": [1.0, 0.0, 0.0],
+    "怎么重置密码": [0.99, 0.05, 0.0],
+    "如何注销账号": [0.0, 1.0, 0.0],
+}
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return _VECTORS[text]
+
+
+class FakeVectorStore:
+    async def active_embedding(self, tenant_id=None):
+        return Resolved(FakeEmbeddings(), "m", "emb-hash", tenant_id, {})
+
+
+@pytest.fixture(autouse=True)
+def fakes(monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache_instance", InMemoryCache())
+
+    async def get_instance():
+        return FakeVectorStore()
+
+    monkeypatch.setattr(VectorStoreManager, "get_instance", staticmethod(get_instance))
+
+
+async def _answer(question: str, document_id: int = 7) -> None:
+    probe, hit = await answer_cache.probe(1, 3, question, "gpt-4o")
+    assert hit is None
+    sources = [{"id": str(document_id), "documentId": document_id, "title": "FAQ"}]
+    await answer_cache.remember(probe, f"答案: {question}", sources, [AIMessage(content="x")])
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits_and_other_question_misses():
+    await _answer("如何重置密码")
+
+    _probe, hit = await answer_cache.probe(1, 3, "怎么重置密码", "gpt-4o")
+    assert hit is not None and hit.answer == "答案: 如何重置密码"
+    assert hit.sources[0]["documentId"] == 7
+    assert isinstance(hit.messages[0], AIMessage)
+
+    assert (await answer_cache.probe(1, 3, "如何注销账号", "gpt-4o"))[1] is None
+    assert (await answer_cache.probe(1, 3, "怎么重置密码", "other-model"))[1] is None
+    assert (await answer_cache.probe(1, 4, "怎么重置密码", "gpt-4o"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_cited_document_change_drops_entry():
+    await _answer("如何重置密码", document_id=7)
+    await answer_cache.forget_documents(1, 3, {8})
+    assert (await answer_cache.probe(1, 3, "怎么重置密码", "gpt-4o"))[1] is not None
+
+    await answer_cache.forget_documents(1, 3, {7})
+    assert (await answer_cache.probe(1, 3, "怎么重置密码", "gpt-4o"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_answers_without_sources_are_not_cached():
+    probe, _hit = await answer_cache.probe(1, 3, "如何重置密码", "gpt-4o")
+    await answer_cache.remember(probe, "没有找到相关内容", [], [])
+    assert (await answer_cache.probe(1, 3, "如何重置密码", "gpt-4o"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_index_holds_vectors_only_and_forget_drops_payload():
+    cache = cache_module.get_cache()
+    await _answer("如何重置密码", document_id=7)
+
+    (entry,) = await cache.get("ans:1:3")
+    assert set(entry) == {"entry_id", "vector", "embedding_hash", "model", "document_ids", "at"}
+    payload_key = f"ans:1:3:e:{entry['entry_id']}"
+    assert (await cache.get(payload_key))["answer"] == "答案: 如何重置密码"
+
+    await answer_cache.forget_documents(1, 3, {7})
+    assert await cache.get("ans:1:3") == [] and await cache.get(payload_key) is None
@@ -17,8 +17,14 @@ JWT 认证工具函数单元测试
 """
 
 from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
 
 from app.core.common.auth import create_access_token, decode_access_token, verify_token
+from app.core.web.deps import get_current_platform_admin
+from app.core.web.exceptions import ForbiddenException
+from app.models.user import UserRole
 
 
 class TestCreateAccessToken:
@@ -70,3 +76,16 @@ class TestVerifyToken:
             expires_delta=timedelta(seconds=-1),
         )
         assert verify_token(token) is False
+
+
+class TestPlatformAdmin:
+    @pytest.mark.asyncio
+    async def test_platform_admin_passes(self):
+        user = SimpleNamespace(role=UserRole.ADMIN)
+        assert await get_current_platform_admin(user) is user
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("role", [UserRole.TENANT_ADMIN, UserRole.SITE_ADMIN])
+    async def test_tenant_roles_rejected(self, role):
+        with pytest.raises(ForbiddenException):
+            await get_current_platform_admin(SimpleNamespace(role=role))
@@ -0,0 +1,92 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checkpoint 工具结果压缩（InMemorySaver，不连接数据库）
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.ai.graph import compaction, get_agent_graph, with_checkpointer
+from app.core.ai.graph.compaction import compact_thread, compact_tool_messages
+from app.core.ai.message_utils import extract_sources_from_messages
+from app.core.infra.config import settings
+
+
+def _tool_message(n_results: int, body: str, msg_id: str = "t1") -> ToolMessage:
+    results = [
+        {
+            "source_index": i + 1,
+            "title": f"doc{i}",
+            "content": body,
+            "metadata": {"document_id": i + 1, "title": f"doc{i}"},
+        }
+        for i in range(n_results)
+    ]
+    return ToolMessage(
+        content=json.dumps(results, ensure_ascii=False),
+        tool_call_id="call-1",
+        name="search_knowledge_base",
+        id=msg_id,
+    )
+
+
+def test_compaction_keeps_citation_metadata():
+    original = _tool_message(2, "x" * 1000)
+
+    (compacted,) = compact_tool_messages([HumanMessage(content="q", id="h"), original], 200)
+
+    assert compacted.id == original.id and compacted.additional_kwargs["compacted"]
+    results = json.loads(compacted.content)
+    assert [len(r["content"]) < 200 for r in results] == [True, True]
+    assert extract_sources_from_messages([compacted]) == extract_sources_from_messages([original])
+    # 已压缩 / 未超预算的消息不重复处理
+    assert compact_tool_messages([compacted, _tool_message(1, "short", "t2")], 200) == []
+
+
+@pytest.mark.asyncio
+async def test_compact_thread_rewrites_state(monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINT_TOOL_RESULT_MAX_CHARS", 100)
+    prune = AsyncMock()
+    monkeypatch.setattr(compaction, "prune_checkpoints", prune)
+    graph = get_agent_graph("h", ChatOpenAI(model="m", api_key="sk-test"))
+    config = with_checkpointer({"configurable": {"thread_id": "t"}}, InMemorySaver())
+    await graph.aupdate_state(
+        config,
+        {
+            "messages": [
+                HumanMessage(content="q", id="h"),
+                _tool_message(1, "y" * 500),
+                AIMessage(content="a", id="a"),
+            ],
+            "seen_tool_hashes": ["abc"],
+        },
+        as_node="summarize_conversation",
+    )
+
+    await compact_thread(graph, config)
+
+    state = await graph.aget_state(config)
+    messages = state.values["messages"]
+    assert [m.id for m in messages] == ["h", "t1", "a"]  # 原位替换，顺序不变
+    assert len(messages[1].content) < 300
+    assert state.values["seen_tool_hashes"] == []
+    assert state.next == ()
+    prune.assert_not_awaited()  # 旧 checkpoint 只由后台任务清理
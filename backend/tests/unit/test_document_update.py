@@ -0,0 +1,105 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+文档更新后的 chunk metadata 改写与检索 / 答案缓存失效（mock DB，不连接数据库）
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.document import DocumentStatus, VectorStatus
+from app.services.document import service as document_service
+from app.services.document.service import DocumentService
+from app.services.document.vectorization import (
+    invalidate_document_caches,
+    patch_document_metadata,
+)
+
+
+def _document(**overrides) -> SimpleNamespace:
+    fields = {
+        "id": 7,
+        "content": "正文",
+        "title": "标题",
+        "summary": "",
+        "tags": [],
+        "author": "a",
+        "site_id": 1,
+        "collection_id": 2,
+        "tenant_id": 3,
+        "status": DocumentStatus.PUBLISHED.value,
+        "vector_status": VectorStatus.COMPLETED,
+    }
+    return SimpleNamespace(**{**fields, **overrides})
+
+
+async def _update(monkeypatch, document: SimpleNamespace, changes: dict) -> list:
+    async def update(db, *, db_obj, obj_in):
+        for key, value in obj_in.items():
+            setattr(db_obj, key, value)
+        return db_obj
+
+    crud = MagicMock()
+    crud.get = AsyncMock(return_value=document)
+    crud.update = update
+    crud.update_vector_status = AsyncMock()
+    monkeypatch.setattr(document_service, "crud_document", crud)
+    monkeypatch.setattr(document_service, "enrich_document_dict", AsyncMock(return_value={}))
+
+    db = MagicMock()
+    db.info = {}
+    await DocumentService(db, MagicMock(), MagicMock()).update_document(document.id, changes)
+    return [(cb, args) for cb, args, _ in db.info.get("after_commit", [])]
+
+
+@pytest.mark.asyncio
+async def test_outdated_document_unpublish_invalidates_caches(monkeypatch):
+    # 正文改过（OUTDATED，chunk 仍在索引中）后再取消发布并移到另一个站点
+    document = _document(vector_status=VectorStatus.OUTDATED)
+
+    callbacks = await _update(
+        monkeypatch, document, {"status": DocumentStatus.DRAFT.value, "site_id": 5}
+    )
+
+    patches = [args for cb, args in callbacks if cb is patch_document_metadata]
+    assert patches == [(7, {"status": "draft", "site_id": 5, "tenant_id": 3})]
+    invalidated = {args for cb, args in callbacks if cb is invalidate_document_caches}
+    assert invalidated == {(3, 1, 7), (3, 5, 7)}
+
+
+@pytest.mark.asyncio
+async def test_unvectorized_document_skips_chunk_side_effects(monkeypatch):
+    document = _document(vector_status=VectorStatus.NONE)
+
+    assert await _update(monkeypatch, document, {"title": "新标题", "content": "新正文"}) == []
+
+
+@pytest.mark.asyncio
+async def test_outdated_document_unpublish_forgets_cached_answers(monkeypatch):
+    from app.services.document import vectorization
+
+    document = _document(vector_status=VectorStatus.OUTDATED)
+    callbacks = await _update(monkeypatch, document, {"status": DocumentStatus.DRAFT.value})
+
+    forget = AsyncMock()
+    monkeypatch.setattr(vectorization.answer_cache, "forget_documents", forget)
+    monkeypatch.setattr(vectorization.result_cache, "invalidate", AsyncMock())
+    for cb, args in callbacks:
+        if cb is invalidate_document_caches:
+            await cb(*args)
+
+    forget.assert_awaited_once_with(3, 1, {7})
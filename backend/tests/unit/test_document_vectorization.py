@@ -0,0 +1,175 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+增量向量化：按 content_hash 复用向量、先写后删、历史 chunk 重新嵌入、读取失败时整体清理
+（内存假 VectorStoreManager，不连接向量库 / 数据库）
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.vector import VectorStoreManager
+from app.models.document import DocumentStatus, VectorStatus
+from app.services.document import vectorization
+from app.services.document.vectorization import process_document_vectorization
+
+# 每段 600 字符、以空行分隔：切分器（chunk_size=1000, overlap=200）恰好一段一个 chunk
+A, B, C = "a" * 600, "b" * 600, "c" * 600
+
+
+class _FakeStore:
+    """按 chunk ID 存 (正文, metadata, 向量)；vectors 为 None 的 chunk 视为送去 embedding。"""
+
+    def __init__(self):
+        self.rows: dict[str, dict] = {}
+        self.embedded: list[str] = []
+        self.deleted: list[str] = []
+        self.deleted_by_metadata: list[tuple[str, str]] = []
+        self.fail_iter = False
+
+    async def validate_config(self, tenant_id=None):
+        return SimpleNamespace(hash="emb-1")
+
+    async def iter_chunks_by_metadata(self, key, value, page_size=None):
+        if self.fail_iter:
+            raise RuntimeError("vector store read failed")
+        for chunk_id, row in list(self.rows.items()):
+            if row["metadata"].get(key) == value:
+                yield {"id": chunk_id, "content": row["content"], "metadata": row["metadata"]}
+
+    async def delete_by_metadata(self, key, value):
+        self.deleted_by_metadata.append((key, value))
+        for chunk_id in [i for i, r in self.rows.items() if r["metadata"].get(key) == value]:
+            del self.rows[chunk_id]
+
+    async def get_vectors(self, ids):
+        return {i: self.rows[i]["vector"] for i in ids if i in self.rows}
+
+    async def add_documents(self, documents, ids, vectors=None):
+        for doc, chunk_id, vector in zip(documents, ids, vectors, strict=True):
+            if vector is None:
+                self.embedded.append(doc.page_content)
+                vector = [float(len(self.embedded))]
+            self.rows[chunk_id] = {
+                "content": doc.page_content,
+                "metadata": dict(doc.metadata),
+                "vector": vector,
+            }
+
+    async def update_metadata_by_filter(self, key, value, patch):
+        pass
+
+    async def delete_documents(self, ids):
+        self.deleted.extend(ids)
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+    def vectors_by_content(self) -> dict[str, list[float]]:
+        return {r["content"]: r["vector"] for r in self.rows.values()}
+
+
+@pytest.fixture
+def store(monkeypatch) -> _FakeStore:
+    fake = _FakeStore()
+
+    async def get_instance():
+        return fake
+
+    monkeypatch.setattr(VectorStoreManager, "get_instance", get_instance)
+    monkeypatch.setattr(vectorization, "invalidate_document_caches", AsyncMock())
+    return fake
+
+
+async def _vectorize(monkeypatch, content: str) -> None:
+    document = SimpleNamespace(
+        id=7,
+        content=content,
+        title="t",
+        summary="",
+        tags=[],
+        author="a",
+        site_id=1,
+        collection_id=2,
+        tenant_id=3,
+        status=DocumentStatus.PUBLISHED.value,
+        vector_status=VectorStatus.PENDING,
+    )
+    crud = MagicMock()
+    crud.get = AsyncMock(return_value=document)
+    crud.update_vector_status = AsyncMock()
+    monkeypatch.setattr(vectorization, "crud_document", crud)
+    db = MagicMock()
+    db.refresh = AsyncMock()
+
+    await process_document_vectorization(db, document.id)
+
+    assert crud.update_vector_status.await_args.kwargs["status"] == VectorStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_shifted_chunks_reuse_vectors_by_hash(monkeypatch, store):
+    await _vectorize(monkeypatch, f"{A}\n\n{B}")
+    assert store.embedded == [A, B] and store.deleted_by_metadata == [("id", "7")]
+    before = store.vectors_by_content()
+
+    # 开头插入一段：a / b 的 chunk_index 后移（chunk ID 变化），向量仍按 hash 复用
+    await _vectorize(monkeypatch, f"{C}\n\n{A}\n\n{B}")
+
+    assert store.embedded == [A, B, C]
+    after = store.vectors_by_content()
+    assert after[A] == before[A] and after[B] == before[B]
+    assert [r["metadata"]["chunk_index"] for r in store.rows.values()] == [0, 1, 2]
+    # 已有 chunk 时不再整体清理
+    assert store.deleted_by_metadata == [("id", "7")]
+
+
+@pytest.mark.asyncio
+async def test_removed_chunks_are_deleted_after_write(monkeypatch, store):
+    await _vectorize(monkeypatch, f"{A}\n\n{B}")
+    old_ids = set(store.rows)
+
+    await _vectorize(monkeypatch, B)
+
+    # b 移到 index 0 复用原向量，不再存在的 index 1 的 chunk 在写入后删除
+    assert store.embedded == [A, B]
+    assert len(store.rows) == 1 and store.vectors_by_content() == {B: [2.0]}
+    assert len(store.deleted) == 1 and set(store.deleted) == old_ids - set(store.rows)
+
+
+@pytest.mark.asyncio
+async def test_legacy_chunks_without_hash_are_reembedded(monkeypatch, store):
+    # 历史 chunk 没有 content_hash（无法确认 embedding 配置），且 ID 不在新 ID 集合中
+    store.rows["legacy-1"] = {"content": A, "metadata": {"id": "7"}, "vector": [99.0]}
+
+    await _vectorize(monkeypatch, A)
+
+    assert store.embedded == [A]
+    assert store.vectors_by_content() == {A: [1.0]}
+    assert store.deleted == ["legacy-1"] and store.deleted_by_metadata == []
+
+
+@pytest.mark.asyncio
+async def test_read_failure_falls_back_to_delete_all(monkeypatch, store):
+    await _vectorize(monkeypatch, f"{A}\n\n{B}")
+    store.fail_iter = True
+
+    await _vectorize(monkeypatch, f"{A}\n\n{B}")
+
+    # 读不到旧 chunk：不复用，整体清理后全部重新嵌入
+    assert store.embedded == [A, B, A, B]
+    assert store.deleted_by_metadata == [("id", "7"), ("id", "7")]
+    assert len(store.rows) == 2 and store.deleted == []
@@ -0,0 +1,81 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Embedding 缓存单元测试（进程内层；不连接 Redis / 上游 API）
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.ai.providers.embedding_cache import (
+    EmbeddingCache,
+    decode_vector,
+    encode_vector,
+)
+from app.core.ai.providers.openai_embeddings import OpenAICompatibleEmbeddings
+
+
+def test_float32_roundtrip():
+    raw = encode_vector([0.5, -1.25, 3.0])
+    assert len(raw) == 12
+    assert decode_vector(raw) == [0.5, -1.25, 3.0]
+
+
+def test_key_normalizes_whitespace_and_scopes_by_namespace():
+    assert EmbeddingCache.make_key("m:h1", " 你好\n世界 ") == EmbeddingCache.make_key(
+        "m:h1", "你好 世界"
+    )
+    assert EmbeddingCache.make_key("m:h1", "x") != EmbeddingCache.make_key("m:h2", "x")
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_stats():
+    cache = EmbeddingCache(max_size=2)
+    await cache.set_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+    assert await cache.get_many(["a", "c"]) == [None, [3.0]]
+    stats = cache.stats()
+    assert (stats["size"], stats["memory_hits"], stats["misses"]) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_embeddings_only_request_misses():
+    emb = OpenAICompatibleEmbeddings(
+        model="m", api_key="k", base_url="http://x", cache=EmbeddingCache(), cache_namespace="m:h"
+    )
+    emb._embed_texts = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+
+    assert await emb.aembed_documents(["aa", "bbb", "aa"]) == [[2.0], [3.0], [2.0]]
+    emb._embed_texts.assert_awaited_once_with(["aa", "bbb"])
+
+    assert await emb.aembed_documents(["bbb", "cccc"]) == [[3.0], [4.0]]
+    emb._embed_texts.assert_awaited_with(["cccc"])
+    assert await emb.aembed_query("aa") == [2.0]
+
+
+@pytest.mark.asyncio
+async def test_length_mismatch_raises_unless_matryoshka():
+    def response(dim):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] * dim)])
+
+    emb = OpenAICompatibleEmbeddings(model="m", api_key="k", base_url="http://x", dimensions=2)
+    emb.client.embeddings.create = AsyncMock(return_value=response(4))
+    with pytest.raises(ValueError):
+        await emb.aembed_query("q")
+
+    emb.matryoshka = True
+    vector = await emb.aembed_query("q")
+    assert len(vector) == 2 and abs(sum(x * x for x in vector) - 1.0) < 1e-9
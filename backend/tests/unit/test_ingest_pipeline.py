@@ -0,0 +1,95 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+向量写入流水线单元测试（embedding 与写库重叠、失败 ID 汇总）
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from app.core.vector.driver.base import run_ingest_pipeline
+
+
+class FakeEmbeddings:
+    def __init__(self, events: list[str], fail_on: int | None = None):
+        self.events = events
+        self.fail_on = fail_on
+        self.calls = 0
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("embedding down")
+        self.events.append(f"embed:{texts[0]}")
+        await asyncio.sleep(0)
+        return [[float(len(t))] for t in texts]
+
+
+def _docs(n: int) -> tuple[list[Document], list[str]]:
+    return [Document(page_content=str(i)) for i in range(n)], [f"id{i}" for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_embedding_overlaps_write_and_failures_are_collected():
+    events: list[str] = []
+    docs, ids = _docs(6)
+
+    async def write_batch(batch_docs, batch_ids, batch_vectors):
+        events.append(f"write-start:{batch_docs[0].page_content}")
+        await asyncio.sleep(0.01)
+        events.append(f"write-end:{batch_docs[0].page_content}")
+        return batch_ids if batch_ids[0] == "id2" else []
+
+    failed = await run_ingest_pipeline(
+        docs, ids, FakeEmbeddings(events), write_batch, batch_size=2, max_in_flight=1
+    )
+
+    assert failed == ["id2", "id3"]
+    # 第二批在第一批写入完成前就已 embedding
+    assert events.index("embed:2") < events.index("write-end:0")
+
+
+@pytest.mark.asyncio
+async def test_precomputed_vectors_skip_embedding():
+    docs, ids = _docs(2)
+    embeddings = FakeEmbeddings([])
+    written: list[list[float]] = []
+
+    async def write_batch(batch_docs, batch_ids, batch_vectors):
+        written.extend(batch_vectors)
+        return []
+
+    await run_ingest_pipeline(
+        docs, ids, embeddings, write_batch, batch_size=2, vectors=[[9.0], [8.0]]
+    )
+    assert written == [[9.0], [8.0]] and embeddings.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_error_stops_pipeline():
+    docs, ids = _docs(6)
+    written: list[str] = []
+
+    async def write_batch(batch_docs, batch_ids, batch_vectors):
+        written.extend(batch_ids)
+        return []
+
+    with pytest.raises(RuntimeError, match="embedding down"):
+        await run_ingest_pipeline(
+            docs, ids, FakeEmbeddings([], fail_on=2), write_batch, batch_size=2
+        )
+    assert written == ["id0", "id1"]
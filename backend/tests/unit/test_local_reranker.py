@@ -0,0 +1,98 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+本地 rerank（provider=local）的 (docs, meta) 契约（假打分函数，不加载真实模型）
+"""
+
+import pytest
+
+from app.core.ai.providers import local_reranker
+from app.core.ai.providers.base import Resolved
+from app.core.ai.providers.reranker import Reranker
+
+
+def _local_reranker(monkeypatch, model: str) -> Reranker:
+    reranker = Reranker()
+    inst = {"provider": "local", "model": model, "enabled": True}
+
+    async def resolve(tenant_id=None, *, force=False, purpose=None, emit_signal=True):
+        return Resolved(instance=inst, model=model, hash="h", tenant_id=tenant_id, extra={})
+
+    monkeypatch.setattr(reranker, "resolve", resolve)
+    return reranker
+
+
+@pytest.mark.asyncio
+async def test_local_rerank_sorts_by_score_and_keeps_contract(monkeypatch):
+    calls: list[tuple[str, list[str]]] = []
+
+    def fake_model(query, passages):
+        calls.append((query, passages))
+        return [float(len(p)) for p in passages]
+
+    monkeypatch.setitem(local_reranker._models, "fake-ce", fake_model)
+    reranker = _local_reranker(monkeypatch, "fake-ce")
+    documents = [
+        {"content": "aa", "score": 0.9},
+        {"content": "aaaa", "score": 0.5},
+        {"content": "a", "score": 0.7},
+    ]
+
+    docs, meta = await reranker.rerank("q", documents, top_n=2)
+
+    assert calls == [("q", ["aa", "aaaa", "a"])]  # 一次批量打分
+    assert [d["content"] for d in docs] == ["aaaa", "aa"]
+    assert docs[0]["original_score"] == 0.5 and docs[0]["rerank_score"] == 4.0
+    assert meta == {"model": "fake-ce", "hash": "h", "enabled": True, "applied": True}
+
+
+@pytest.mark.asyncio
+async def test_local_rerank_failure_falls_back(monkeypatch):
+    def broken(query, passages):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(local_reranker._models, "broken-ce", broken)
+    reranker = _local_reranker(monkeypatch, "broken-ce")
+    documents = [{"content": "x", "score": 0.2}, {"content": "y", "score": 0.1}]
+
+    docs, meta = await reranker.rerank("q", documents, top_n=1)
+
+    assert docs == documents[:1]
+    assert meta["applied"] is False
+
+
+@pytest.mark.asyncio
+async def test_score_cache_only_sends_new_candidates(monkeypatch):
+    from app.core.infra.config import settings
+
+    monkeypatch.setattr(settings, "RERANK_SCORE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RERANK_PASSAGE_MAX_CHARS", 3)
+    calls: list[list[str]] = []
+
+    def fake_model(query, passages):
+        calls.append(passages)
+        return [float(len(p)) for p in passages]
+
+    monkeypatch.setitem(local_reranker._models, "cached-ce", fake_model)
+    reranker = _local_reranker(monkeypatch, "cached-ce")
+    first = [{"content": "bb", "metadata": {"content_hash": "c1"}}]
+    second = first + [{"content": "aaaaaa", "metadata": {"content_hash": "c2"}}]
+
+    await reranker.rerank("same question", first, top_n=5)
+    docs, meta = await reranker.rerank("same  question", second, top_n=5)
+
+    assert calls == [["bb"], ["aaa"]]  # 已打分的 c1 不再发送；正文按预算截断
+    assert [d["metadata"]["content_hash"] for d in docs] == ["c2", "c1"]
+    assert meta["applied"] is True
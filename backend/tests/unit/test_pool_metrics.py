@@ -0,0 +1,74 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+连接池等待统计与连接预算（aiosqlite 引擎，不连接 Postgres）
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.infra.config import settings
+from app.core.infra.pool_metrics import (
+    MeteredAsyncPool,
+    connection_budget,
+    pool_stats,
+    register_engine,
+    unregister_pool,
+)
+
+
+@pytest.mark.asyncio
+async def test_waiting_checkout_is_recorded():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=MeteredAsyncPool, pool_size=1, max_overflow=0
+    )
+    register_engine("test", engine)
+    try:
+
+        async def hold():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(hold(), hold())
+        stats = pool_stats()["pools"]["test"]
+        assert stats["max"] == 1 and stats["in_use"] == 0 and stats["waiting"] == 0
+        assert stats["acquired"] == 2 and stats["max_wait_ms"] >= 40
+        assert sum(stats["wait_histogram"].values()) == 2
+    finally:
+        unregister_pool("test")
+        await engine.dispose()
+
+
+def test_connection_budget_counts_all_pools(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(settings, "CHECKPOINTER_POOL_MAX_SIZE", 10)
+    monkeypatch.setattr(settings, "VECTOR_STORE_TYPE", "postgres")
+
+    budget = connection_budget(200, 3)
+
+    assert budget["per_process_limits"] == {"app": 15, "vector": 15, "checkpointer": 10}
+    assert budget["per_process_max"] == 40 and budget["max_workers"] == 4
+
+
+def test_connection_budget_uses_checkpointer_min_when_larger(monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINTER_POOL_MIN_SIZE", 12)
+    monkeypatch.setattr(settings, "CHECKPOINTER_POOL_MAX_SIZE", 4)
+
+    assert connection_budget(200)["per_process_limits"]["checkpointer"] == 12
@@ -0,0 +1,99 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+检索结果缓存的键与版本令牌失效（进程内缓存，不连接 Redis）
+"""
+
+import pytest
+
+from app.core.infra import cache as cache_module
+from app.core.infra.cache import InMemoryCache
+from app.services.rag import result_cache
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache_instance", InMemoryCache())
+
+
+async def _key(site_id: int | None, query: str = "如何重置密码") -> str:
+    metadata_filter = {"tenant_id": 1, **({"site_id": site_id} if site_id else {})}
+    return await result_cache.make_key(
+        1,
+        metadata_filter,
+        query,
+        embedding_hash="e",
+        rerank_hash="r",
+        recall_k=50,
+        top_k=5,
+        threshold=0.3,
+    )
+
+
+@pytest.mark.asyncio
+async def test_normalized_query_shares_key():
+    assert await _key(3, "如何重置密码") == await _key(3, "  如何重置密码 ")
+    assert await _key(3) != await _key(4)
+
+
+@pytest.mark.asyncio
+async def test_site_invalidation_is_scoped():
+    site3, site4, everywhere = await _key(3), await _key(4), await _key(None)
+
+    await result_cache.invalidate(1, 3)
+
+    assert await _key(3) != site3
+    assert await _key(None) != everywhere  # 全局检索也可能包含该站点的文档
+    assert await _key(4) == site4
+
+
+@pytest.mark.asyncio
+async def test_unknown_site_invalidates_tenant():
+    site4 = await _key(4)
+    await result_cache.invalidate(1)
+    assert await _key(4) != site4
+
+
+@pytest.mark.asyncio
+async def test_published_index_reloads_after_site_invalidation(monkeypatch):
+    import contextlib
+
+    from app.crud.document import crud_document
+    from app.db import database
+    from app.services.rag import published_index
+
+    published = {3: {10, 11}}
+    loads: list[int] = []
+
+    async def by_site(db, *, site_id):
+        loads.append(site_id)
+        return set(published[site_id])
+
+    monkeypatch.setattr(crud_document, "get_published_ids_by_site", by_site)
+    monkeypatch.setattr(database, "AsyncSessionLocal", lambda: contextlib.nullcontext())
+    published_index.clear()
+    candidates = [{"document_id": doc_id, "metadata": {"site_id": 3}} for doc_id in (10, 11, 12)]
+
+    assert [c["document_id"] for c in await published_index.filter_published(1, candidates)] == [
+        10,
+        11,
+    ]
+    await published_index.filter_published(1, candidates)
+    assert loads == [3]  # 版本未变：不再查库
+
+    published[3] = {10, 11, 12}  # 发布文档 12
+    await result_cache.invalidate(1, 3)
+    assert len(await published_index.filter_published(1, candidates)) == 3
+    assert loads == [3, 3]
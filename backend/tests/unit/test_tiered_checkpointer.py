@@ -0,0 +1,141 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Redis 热层 Checkpointer 的回写与崩溃一致性（fakeredis 代替 Redis，InMemorySaver 代替 Postgres）
+"""
+
+from typing import Annotated, TypedDict
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from app.core.ai.graph import with_checkpointer
+from app.core.ai.graph.tiered_checkpointer import TieredCheckpointer
+
+
+class _State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+    turns: int
+
+
+def _graph():
+    def reply(state: _State) -> dict:
+        return {"messages": [AIMessage(content="ok")], "turns": state.get("turns", 0) + 1}
+
+    builder = StateGraph(_State)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile()
+
+
+def _saver(server: FakeServer, cold: InMemorySaver) -> TieredCheckpointer:
+    return TieredCheckpointer(FakeAsyncRedis(server=server), cold, ttl=60, prefix="t:")
+
+
+async def _turn(graph, saver, text: str) -> None:
+    config = with_checkpointer({"configurable": {"thread_id": "th"}}, saver)
+    await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+
+
+async def _values(graph, saver) -> dict:
+    config = with_checkpointer({"configurable": {"thread_id": "th"}}, saver)
+    state = await graph.aget_state(config)
+    return {
+        "turns": state.values["turns"],
+        "messages": [m.content for m in state.values["messages"]],
+    }
+
+
+@pytest.mark.asyncio
+async def test_crash_before_write_back_is_recovered_from_redis():
+    graph, server, cold = _graph(), FakeServer(), InMemorySaver()
+    saver = _saver(server, cold)
+    for text in ("a", "b"):
+        await _turn(graph, saver, text)
+
+    # 只写了热层
+    assert await cold.aget_tuple({"configurable": {"thread_id": "th"}}) is None
+    expected = await _values(graph, saver)
+
+    # 进程在回写前崩溃：新实例凭脏集合把会话回写冷层
+    recovered = _saver(server, cold)
+    assert await recovered.dirty_count() == 1
+    assert await recovered.flush_dirty() == 1
+    assert await recovered.dirty_count() == 0
+    # 中间 checkpoint 被合并，冷层只有最新一个
+    assert len([c async for c in cold.alist({"configurable": {"thread_id": "th"}})]) == 1
+
+    # Redis 数据也丢了：冷层恢复的状态与崩溃前一致，且能继续对话
+    fresh = _saver(FakeServer(), cold)
+    assert (
+        await _values(graph, fresh) == expected == {"turns": 2, "messages": ["a", "ok", "b", "ok"]}
+    )
+    await _turn(graph, fresh, "c")
+    assert (await _values(graph, fresh))["turns"] == 3
+
+    # 重复回写幂等
+    assert await recovered.flush("th") and await recovered.flush("th")
+    assert await _values(graph, _saver(FakeServer(), cold)) == expected
+
+
+@pytest.mark.asyncio
+async def test_write_during_flush_keeps_thread_dirty():
+    graph, server, cold = _graph(), FakeServer(), InMemorySaver()
+    saver = _saver(server, cold)
+    await _turn(graph, saver, "a")
+
+    cold_aput = cold.aput
+
+    async def aput_then_concurrent_turn(*args, **kwargs):
+        result = await cold_aput(*args, **kwargs)
+        if (await _values(graph, saver))["turns"] == 1:
+            await _turn(graph, saver, "b")
+        return result
+
+    cold.aput = aput_then_concurrent_turn
+    assert not await saver.flush("th")
+    assert await saver.dirty_count() == 1
+
+    cold.aput = cold_aput
+    assert await saver.flush("th")
+    assert (await _values(graph, _saver(FakeServer(), cold)))["turns"] == 2
+
+
+@pytest.mark.asyncio
+async def test_dirty_state_does_not_expire_until_written_back(caplog):
+    graph, server, cold = _graph(), FakeServer(), InMemorySaver()
+    saver = _saver(server, cold)
+    redis = FakeAsyncRedis(server=server)
+    await _turn(graph, saver, "a")
+
+    # 冷层不可用期间脏 hash 不过期，读取也不会给它加上 TTL
+    assert await redis.ttl("t:ckpt:th") == -1
+    await _values(graph, saver)
+    assert await redis.ttl("t:ckpt:th") == -1
+
+    assert await saver.flush("th")
+    assert 0 < await redis.ttl("t:ckpt:th") <= 60
+
+    # 脏 thread 的 hash 丢失：报错而不是当作已回写
+    await _turn(graph, saver, "b")
+    await redis.delete("t:ckpt:th")
+    assert not await saver.flush("th")
+    assert "unflushed turns are lost" in caplog.text
+    assert await saver.dirty_count() == 0
@@ -0,0 +1,112 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ES 驱动流式读取（PIT + search_after）与前缀两阶段检索单元测试（注入假 client，不连接 ES）
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.vector.driver.elasticsearch import ElasticsearchDriver
+
+
+class _FakeES:
+    def __init__(self, total: int):
+        self.docs = [
+            {"_id": f"c{i}", "_source": {"text": f"t{i}", "metadata": {"id": "1"}}, "sort": [i]}
+            for i in range(total)
+        ]
+        self.searches: list[dict] = []
+        self.closed: list[str] = []
+
+    async def open_point_in_time(self, index, keep_alive):
+        return {"id": "pit-0"}
+
+    async def search(self, **kwargs):
+        self.searches.append(kwargs)
+        after = kwargs.get("search_after")
+        start = after[0] + 1 if after else 0
+        hits = self.docs[start : start + kwargs["size"]]
+        return {"pit_id": f"pit-{len(self.searches)}", "hits": {"hits": hits}}
+
+    async def close_point_in_time(self, id):
+        self.closed.append(id)
+
+
+@pytest.mark.asyncio
+async def test_iter_by_filter_pages_with_search_after():
+    es = _FakeES(total=5)
+    driver = ElasticsearchDriver(es_client=es)
+
+    chunks = [c async for c in driver.iter_by_filter("id", "1", page_size=2)]
+
+    assert [c["id"] for c in chunks] == ["c0", "c1", "c2", "c3", "c4"]
+    assert [s["search_after"] for s in es.searches] == [None, [1], [3]]
+    assert [s["pit"]["id"] for s in es.searches] == ["pit-0", "pit-1", "pit-2"]
+    assert es.closed == ["pit-3"]  # 关闭最新的 PIT id
+
+
+@pytest.mark.asyncio
+async def test_iter_by_filter_closes_pit_when_consumer_stops_early():
+    es = _FakeES(total=10)
+    driver = ElasticsearchDriver(es_client=es)
+
+    stream = driver.iter_by_filter("id", "1", page_size=3)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    assert len(es.searches) == 1
+    assert es.closed == ["pit-1"]
+
+
+def test_prefix_knn_is_rescored_by_full_vector(monkeypatch):
+    from app.core.infra.config import settings
+
+    monkeypatch.setattr(settings, "ES_VECTOR_PREFIX_OVERSAMPLE", 4)
+    driver = ElasticsearchDriver(es_client=_FakeES(total=0))
+    driver._prefix_dims = 2
+
+    knn_body, _ = driver._search_bodies("q", [0.1, 0.2, 0.3, 0.4], 5, None, None)
+
+    knn = knn_body["query"]["knn"]
+    assert knn["field"] == "vector_prefix" and knn["query_vector"] == [0.1, 0.2]
+    assert knn["k"] == knn_body["rescore"]["window_size"] == 60  # fetch_k=15 × 4
+    rescore = knn_body["rescore"]["query"]["rescore_query"]["script_score"]["script"]
+    assert rescore["params"]["qv"] == [0.1, 0.2, 0.3, 0.4]
+    assert knn_body["size"] == 15
+
+
+@pytest.mark.asyncio
+async def test_open_pit_is_never_hedged(monkeypatch):
+    from app.core.infra.config import settings
+
+    class SlowPitES(_FakeES):
+        opened = 0
+
+        async def open_point_in_time(self, index, keep_alive):
+            SlowPitES.opened += 1
+            await asyncio.sleep(0.02)
+            return {"id": "pit-0"}
+
+    es = SlowPitES(total=1)
+    driver = ElasticsearchDriver(es_client=es)
+    monkeypatch.setattr(settings, "ES_HEDGE_READS", True)
+    monkeypatch.setattr(driver._circuit_breaker, "latency_quantile", lambda q: 0.001)
+
+    assert [c["id"] async for c in driver.iter_by_filter("id", "1", page_size=2)] == ["c0"]
+    assert SlowPitES.opened == 1  # 对冲会多开一个无人关闭的 PIT
+    assert es.closed == ["pit-1"]
@@ -0,0 +1,170 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+VectorStoreManager 蓝绿重建期间的 embedding 锁定逻辑（假 provider / driver，不连接存储）
+"""
+
+import pytest
+
+from app.core.ai.providers.base import Resolved
+from app.core.vector.manager import VectorStoreManager
+
+
+def _resolved(model: str, dim: int) -> Resolved:
+    return Resolved(
+        instance=model, model=model, hash=f"{model}-{dim}", tenant_id=1, extra={"Dimension": dim}
+    )
+
+
+def _pin(resolved: Resolved) -> dict:
+    return {
+        "model": resolved.model,
+        "dimension": resolved.extra["Dimension"],
+        "hash": resolved.hash,
+    }
+
+
+class FakeProvider:
+    def __init__(self, current: Resolved):
+        self.current = current
+
+    async def resolve(
+        self, tenant_id=None, *, force=False, purpose=None, emit_signal=True, pin=None
+    ):
+        if pin is None:
+            return self.current
+        # 与 EmbeddingProvider 一致：实例按锁定的模型构造，model / hash 仍来自当前配置
+        extra = {"Dimension": pin["dimension"]}
+        return Resolved(pin["model"], self.current.model, self.current.hash, tenant_id, extra)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.generation = "1"
+        self.schema_dims: list[int] = []
+        self.pins: dict = {}
+        self.shadow: FakeDriver | None = None
+
+    async def ensure_schema(self, dimension):
+        self.schema_dims.append(dimension)
+
+    async def storage_generation(self):
+        return self.generation
+
+    async def get_embedding_pins(self):
+        return dict(self.pins)
+
+    async def set_embedding_pins(self, pins):
+        self.pins = dict(pins)
+
+    async def get_shadow(self):
+        return None
+
+    async def open_shadow(self, dimension):
+        self.shadow = FakeDriver()
+        return self.shadow
+
+    async def promote_shadow(self):
+        self.generation = str(int(self.generation) + 1)
+        self.pins, self.shadow = self.shadow.pins, None
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_old_embedding_served_until_storage_switches():
+    old, new = _resolved("bge-m3", 1024), _resolved("text-embedding-3-large", 3072)
+    provider, driver = FakeProvider(old), FakeDriver()
+    manager = VectorStoreManager(provider, driver)
+
+    assert await manager._get_ready(1) is old
+    assert driver.pins == {"1": _pin(old)}  # 在线存储首次使用时记录向量空间
+
+    provider.current = new
+    served = await manager._get_ready(1)  # 在线存储未切换：仍用旧模型
+    assert (served.instance, served.model, served.hash) == ("bge-m3", "bge-m3", old.hash)
+    assert driver.schema_dims == [1024]
+
+    driver.generation, driver.pins = "2", {}  # 另一进程完成了切换
+    manager._storage_checked_at = 0.0
+    assert await manager._get_ready(1) is new
+    assert driver.schema_dims == [1024, 3072]
+    assert driver.pins == {"1": _pin(new)}
+
+
+@pytest.mark.asyncio
+async def test_fresh_manager_mid_reindex_keeps_old_embedding():
+    old, new = _resolved("bge-m3", 1024), _resolved("text-embedding-3-large", 3072)
+    provider, driver = FakeProvider(old), FakeDriver()
+    await VectorStoreManager(provider, driver)._get_ready(1)
+
+    provider.current = new
+    worker = VectorStoreManager(provider, driver)  # 新启动的 worker 执行重建
+    shadow, target = await worker.open_reindex(1)
+    assert target is new and shadow.pins == {"1": _pin(new)}
+    assert driver.pins == {"1": _pin(old)}
+
+    restarted = VectorStoreManager(provider, driver)  # 重建期间新启动的进程：内存里没有旧配置
+    served = await restarted._get_ready(1)
+    assert (served.instance, served.model, served.hash) == ("bge-m3", "bge-m3", old.hash)
+    assert served.extra["Dimension"] == 1024 and driver.schema_dims == [1024]
+
+    await worker.promote_reindex()
+    restarted._storage_checked_at = 0.0
+    assert await restarted._get_ready(1) is new
+    assert driver.pins == {"1": _pin(new)}
+
+
+@pytest.mark.asyncio
+async def test_credential_change_is_not_pinned():
+    old = _resolved("bge-m3", 1024)
+    rotated = Resolved(instance="k2", model="bge-m3", hash="other", tenant_id=1, extra=old.extra)
+    provider = FakeProvider(old)
+    manager = VectorStoreManager(provider, FakeDriver())
+
+    await manager._get_ready()
+    provider.current = rotated
+    assert await manager._get_ready() is rotated
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(texts)
+        return [[float(len(t))] for t in texts]
+
+
+class BatchDriver(FakeDriver):
+    async def search_many(self, queries, query_vectors, k, metadata_filter, options=None):
+        return [
+            [{"doc": q, "score": v[0], "score_comparable": True}]
+            for q, v in zip(queries, query_vectors, strict=True)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_search_many_embeds_once_and_keeps_order():
+    embeddings = CountingEmbeddings()
+    current = Resolved(
+        instance=embeddings, model="m", hash="h", tenant_id=1, extra={"Dimension": 1}
+    )
+    manager = VectorStoreManager(FakeProvider(current), BatchDriver())
+
+    results = await manager.search_many(["a", "bbb", "cc"], k=3)
+
+    assert embeddings.calls == [["a", "bbb", "cc"]]
+    assert [r[0]["doc"] for r in results] == ["a", "bbb", "cc"]
+    assert await manager.search_many([]) == []
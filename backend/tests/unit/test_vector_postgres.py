@@ -0,0 +1,272 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+PostgresDriver 纯逻辑单元测试（SQL 片段构造，不连接数据库）
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+from app.core.infra.config import settings
+from app.core.vector.driver.postgres import (
+    PostgresDriver,
+    _copy_stage_ddl,
+    _document_row,
+    _fulltext_column_ddl,
+    _partition_ddls,
+    _partition_index_name,
+    _partitioned_table_ddl,
+    _renamed,
+    _vector_literal,
+)
+
+
+class TestFilterSql:
+    def test_promoted_and_jsonb_keys(self):
+        driver = PostgresDriver()
+        where, params = driver._build_filter_sql({"site_id": 3, "chunk_index": 2})
+        assert where == "WHERE site_id = :f0 AND langchain_metadata->>'chunk_index' = :f1"
+        # promoted 列保留原类型，JSONB 路径比较需要 text
+        assert params == {"f0": 3, "f1": "2"}
+
+    def test_any_of_with_missing(self):
+        where, params = PostgresDriver()._build_filter_sql({"status": ["published", None]})
+        assert where == "WHERE (status = ANY(:f0) OR status IS NULL)"
+        assert params == {"f0": ["published"]}
+
+    def test_empty_filter(self):
+        assert PostgresDriver()._build_filter_sql(None) == ("", {})
+
+    def test_disallowed_key(self):
+        with pytest.raises(ValueError):
+            PostgresDriver()._build_filter_sql({"1=1; DROP TABLE x; --": 1})
+
+
+class TestVectorIndexDdl:
+    def test_hnsw(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_INDEX_TYPE", "hnsw")
+        monkeypatch.setattr(settings, "PG_HNSW_M", 24)
+        monkeypatch.setattr(settings, "PG_HNSW_EF_CONSTRUCTION", 128)
+        ddl = PostgresDriver("docs")._vector_index_ddl("idx_docs_embedding", concurrently=True)
+        assert ddl == (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_docs_embedding ON docs "
+            "USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 128)"
+        )
+
+    def test_ivfflat(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_INDEX_TYPE", "ivfflat")
+        monkeypatch.setattr(settings, "PG_IVFFLAT_LISTS", 200)
+        ddl = PostgresDriver("docs")._vector_index_ddl("i", concurrently=False)
+        assert ddl.endswith("USING ivfflat (embedding vector_cosine_ops) WITH (lists = 200)")
+        assert "CONCURRENTLY" not in ddl
+
+    def test_none(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_INDEX_TYPE", "none")
+        assert PostgresDriver()._vector_index_ddl("i", concurrently=True) is None
+
+    def test_halfvec_expression_index(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_INDEX_TYPE", "hnsw")
+        monkeypatch.setattr(settings, "PG_VECTOR_PRECISION", "halfvec")
+        ddl = PostgresDriver("docs")._vector_index_ddl("i", concurrently=False, dimension=1024)
+        assert "USING hnsw (((embedding)::halfvec(1024)) halfvec_cosine_ops)" in ddl
+
+    def test_prefix_expression_index(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_INDEX_TYPE", "hnsw")
+        monkeypatch.setattr(settings, "PG_VECTOR_PREFIX_DIMENSION", 256)
+        ddl = PostgresDriver("docs")._vector_index_ddl("i", concurrently=False, dimension=3072)
+        assert "USING hnsw (((subvector(embedding, 1, 256))::vector(256)) vector_cosine_ops)" in ddl
+
+
+class TestSearchSql:
+    def test_hybrid_sql_runs_as_lateral_subquery(self):
+        driver = PostgresDriver("docs")
+        driver._ts_config = "simple"
+        params: dict = {}
+        sql = driver._hybrid_sql("", params, "CAST(q.q_vec AS vector)", "q.q_text", 5)
+        # LATERAL 子查询里不用 CTE，查询向量 / 文本直接引用外层列
+        assert "WITH" not in sql
+        assert "embedding <=> CAST(q.q_vec AS vector)" in sql
+        assert "plainto_tsquery('simple', q.q_text)" in sql
+        assert params["fetch_k"] == 15
+
+    def test_vector_sql(self):
+        sql = PostgresDriver("docs")._vector_sql("WHERE site_id = :f0", "CAST(:qv AS vector)")
+        assert sql.endswith(
+            "FROM docs WHERE site_id = :f0 ORDER BY embedding <=> CAST(:qv AS vector) LIMIT :k"
+        )
+
+    def test_binary_candidates_rescored_by_full_vector(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_PRECISION", "binary")
+        monkeypatch.setattr(settings, "PG_VECTOR_RESCORE_OVERSAMPLE", 4)
+        sql = PostgresDriver("docs")._vector_sql("", "CAST(:qv AS vector)", 8)
+        # 内层按汉明距离走二值索引取 4k 候选，外层按原始向量余弦距离截断
+        assert (
+            "ORDER BY binary_quantize(embedding)::bit(8) <~> "
+            "binary_quantize(CAST(:qv AS vector))::bit(8) LIMIT :k * 4"
+        ) in sql
+        assert sql.endswith(") candidates ORDER BY distance LIMIT :k")
+        assert "embedding <=> CAST(:qv AS vector) AS distance" in sql
+
+    def test_prefix_candidates_rescored_by_full_vector(self, monkeypatch):
+        monkeypatch.setattr(settings, "PG_VECTOR_PREFIX_DIMENSION", 4)
+        monkeypatch.setattr(settings, "PG_VECTOR_RESCORE_OVERSAMPLE", 4)
+        sql = PostgresDriver("docs")._vector_sql("", "CAST(:qv AS vector)", 8)
+        assert (
+            "ORDER BY (subvector(embedding, 1, 4))::vector(4) <=> "
+            "(subvector(CAST(:qv AS vector), 1, 4))::vector(4) LIMIT :k * 4"
+        ) in sql
+        assert sql.endswith(") candidates ORDER BY distance LIMIT :k")
+
+
+def test_vector_literal():
+    assert _vector_literal([1, 0.5, -2]) == "[1.0,0.5,-2.0]"
+
+
+class TestPartitions:
+    def test_table_ddl_puts_keys_in_primary_key(self):
+        ddl = _partitioned_table_ddl("docs", 8, ["tenant_id", "site_id"])
+        assert "embedding vector(8) NOT NULL" in ddl
+        assert "tenant_id INTEGER NOT NULL" in ddl and "site_id INTEGER NOT NULL" in ddl
+        assert "collection_id INTEGER," in ddl
+        assert ddl.endswith(
+            "PRIMARY KEY (langchain_id, tenant_id, site_id)) PARTITION BY LIST (tenant_id)"
+        )
+
+    def test_partition_ddls(self):
+        assert _partition_ddls("docs", ["tenant_id"], 3, None) == [
+            ("docs_t3", "CREATE TABLE IF NOT EXISTS docs_t3 PARTITION OF docs FOR VALUES IN (3)")
+        ]
+        (tenant_name, tenant_ddl), (site_name, site_ddl) = _partition_ddls(
+            "docs", ["tenant_id", "site_id"], 3, 7, parent="docs_partitioned"
+        )
+        assert tenant_ddl.endswith(
+            "PARTITION OF docs_partitioned FOR VALUES IN (3) PARTITION BY LIST (site_id)"
+        )
+        assert (site_name, site_ddl) == (
+            "docs_t3_s7",
+            "CREATE TABLE IF NOT EXISTS docs_t3_s7 PARTITION OF docs_t3 FOR VALUES IN (7)",
+        )
+
+    def test_partition_index_name(self):
+        assert _partition_index_name("docs_t3", "idx_docs_embedding_rebuild", "docs") == (
+            "docs_t3_embedding_rebuild"
+        )
+
+    def test_upsert_conflict_target_follows_layout(self):
+        driver = PostgresDriver("docs")
+        assert "ON CONFLICT (langchain_id) DO UPDATE" in driver._upsert_sql()
+        driver._partition_keys = ["tenant_id", "site_id"]
+        sql = driver._upsert_sql()
+        assert "ON CONFLICT (langchain_id, tenant_id, site_id) DO UPDATE" in sql
+        assert "tenant_id = EXCLUDED.tenant_id" not in sql
+
+    def test_copy_upsert_selects_from_stage(self):
+        sql = PostgresDriver("docs")._upsert_sql(source="stage")
+        assert sql.startswith("INSERT INTO docs (langchain_id, content, embedding, source,")
+        assert "SELECT langchain_id, content, embedding::vector, source," in sql
+        assert sql.endswith(
+            "FROM stage ON CONFLICT (langchain_id) DO UPDATE SET "
+            "content = EXCLUDED.content, embedding = EXCLUDED.embedding, "
+            "source = EXCLUDED.source, id = EXCLUDED.id, "
+            "site_id = EXCLUDED.site_id, collection_id = EXCLUDED.collection_id, "
+            "tenant_id = EXCLUDED.tenant_id, summary = EXCLUDED.summary, "
+            "tags = EXCLUDED.tags, status = EXCLUDED.status, "
+            "langchain_metadata = EXCLUDED.langchain_metadata"
+        )
+
+    def test_copy_stage_ddl(self):
+        ddl = _copy_stage_ddl("stage")
+        assert ddl.startswith("CREATE TEMP TABLE stage (langchain_id UUID, content TEXT, ")
+        assert "embedding REAL[], source TEXT," in ddl
+        assert ddl.endswith("langchain_metadata JSON) ON COMMIT DROP")
+
+    def test_document_row_splits_promoted_columns(self):
+        doc = Document(page_content="hi", metadata={"tenant_id": 1, "site_id": 2, "chunk_index": 0})
+        row = _document_row(doc, "00000000-0000-0000-0000-000000000001", [0.5])
+        assert (row["tenant_id"], row["site_id"], row["source"]) == (1, 2, None)
+        assert row["langchain_metadata"] == '{"chunk_index": 0}'
+        assert row["embedding"] == "[0.5]"
+        assert _document_row(doc, "x", [0.5], literal=False)["embedding"] == [0.5]
+
+
+def test_fulltext_column_ddl():
+    ddl = _fulltext_column_ddl("docs", "jiebacfg")
+    assert ddl.startswith("ALTER TABLE docs ADD COLUMN IF NOT EXISTS content_tsv tsvector")
+    assert "setweight(to_tsvector('jiebacfg'::regconfig, coalesce(summary, '')), 'A')" in ddl
+    assert ddl.endswith("coalesce(content, '')), 'C')) STORED")
+
+
+def test_renamed_follows_table_prefix():
+    assert _renamed("docs_shadow", "docs_shadow", "docs") == "docs"
+    assert _renamed("docs_shadow_t3_s7", "docs_shadow", "docs") == "docs_t3_s7"
+    assert _renamed("idx_docs_shadow_embedding", "docs_shadow", "docs") == "idx_docs_embedding"
+    assert _renamed("docs_pkey", "docs", "docs_prev") == "docs_prev_pkey"
+    assert _renamed("docsx_pkey", "docs", "docs_prev") is None
+
+
+class TestMetadataPatch:
+    class _Conn:
+        def __init__(self, log):
+            self.log = log
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, sql, params=None):
+            self.log.append((str(sql), params))
+
+            class _Result:
+                rowcount = 3
+
+            return _Result()
+
+        async def commit(self):
+            pass
+
+    def _driver(self, log):
+        driver = PostgresDriver("docs")
+
+        async def ready():
+            pass
+
+        driver._ensure_engine = ready
+        driver._sa_engine = type("E", (), {"connect": lambda _self: self._Conn(log)})()
+        return driver
+
+    @pytest.mark.asyncio
+    async def test_promoted_columns_and_json_merge_in_one_update(self):
+        log: list = []
+        driver = self._driver(log)
+
+        updated = await driver.update_metadata_by_filter(
+            "id", "42", {"status": "draft", "title": "新标题"}
+        )
+
+        assert updated == 3
+        [(sql, params)] = log
+        assert sql == (
+            "UPDATE docs SET status = :p_status, langchain_metadata = "
+            "(COALESCE(langchain_metadata::jsonb, '{}'::jsonb) || CAST(:patch AS jsonb))::json "
+            "WHERE id = :value"
+        )
+        assert params == {"value": "42", "p_status": "draft", "patch": '{"title": "新标题"}'}
+
+    @pytest.mark.asyncio
+    async def test_identity_keys_rejected(self):
+        with pytest.raises(ValueError):
+            await self._driver([]).update_metadata_by_filter("id", "42", {"chunk_index": 1})
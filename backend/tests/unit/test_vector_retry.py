@@ -0,0 +1,130 @@
+# Copyright 2026 CatWiki Authors
+#
+# Licensed under the CatWiki Open Source License (Modified Apache 2.0);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://github.com/CatWiki/CatWiki/blob/main/LICENSE
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+滑动窗口熔断器 / 对冲请求 / 重试预算单元测试
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.vector.exceptions import VectorStoreConnectionError
+from app.core.vector.retry import CircuitBreaker, RetryPolicy, hedged, retry_on_transient
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.meta = type("Meta", (), {"status": status})()
+
+
+async def _ok():
+    return "ok"
+
+
+async def _fail():
+    raise ConnectionError("down")
+
+
+@pytest.mark.asyncio
+async def test_opens_on_error_rate_and_ignores_client_errors():
+    breaker = CircuitBreaker("t", min_calls=4, failure_rate=0.5, recovery_timeout=60)
+
+    async def bad_request():
+        raise _HTTPError(400)
+
+    for _ in range(4):
+        with pytest.raises(_HTTPError):
+            await breaker.call(bad_request)
+    assert breaker.snapshot()["state"] == "closed"  # 4xx 不代表服务不可用
+
+    await breaker.call(_ok)
+    await breaker.call(_ok)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == "open" and snapshot["opened_total"] == 1
+
+    with pytest.raises(VectorStoreConnectionError):
+        await breaker.call(_ok)
+    assert breaker.snapshot()["rejected_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_admits_single_probe():
+    breaker = CircuitBreaker("t", min_calls=1, recovery_timeout=0)
+    with pytest.raises(ConnectionError):
+        await breaker.call(_fail)
+
+    release = asyncio.Event()
+
+    async def slow_probe():
+        await release.wait()
+        return "probe"
+
+    probe = asyncio.create_task(breaker.call(slow_probe))
+    await asyncio.sleep(0)
+    with pytest.raises(VectorStoreConnectionError, match="probe in flight"):
+        await breaker.call(_ok)
+
+    release.set()
+    assert await probe == "probe"
+    assert breaker.snapshot()["state"] == "closed"
+    assert await breaker.call(_ok) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_opens_on_slow_call_rate():
+    breaker = CircuitBreaker("t", min_calls=2, slow_call_rate=1.0, recovery_timeout=60)
+    await breaker.call(_ok, slow_call_threshold=-1)
+    await breaker.call(_ok, slow_call_threshold=-1)
+    assert breaker.snapshot()["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_hedged_returns_first_success_and_cancels_loser():
+    calls = 0
+    cancelled = asyncio.Event()
+
+    async def request():
+        nonlocal calls
+        calls += 1
+        if calls == 1:  # 首个请求卡住
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return calls
+
+    assert await hedged(request, 0.01) == 2
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_retry_stops_at_budget():
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        raise ConnectionError("down")
+
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, jitter=False, budget=0.5)
+    with pytest.raises(ConnectionError):
+        await retry_on_transient(flaky, policy=policy)
+    assert attempts == 1